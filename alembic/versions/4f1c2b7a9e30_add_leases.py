@@ -0,0 +1,28 @@
+"""add leases
+
+Revision ID: 4f1c2b7a9e30
+Revises: dd3c60f39768
+Create Date: 2026-10-18 19:05:12.418233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2b7a9e30'
+down_revision = 'dd3c60f39768'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Leases',
+                    sa.Column('name', sa.VARCHAR(100), primary_key=True),
+                    sa.Column('holder', sa.VARCHAR(100), nullable=False),
+                    sa.Column('token', sa.BIGINT, nullable=False, comment="fencing token, incremented on each new holder"),
+                    sa.Column('expires', sa.BIGINT, nullable=False, comment="epoch milliseconds"))
+
+
+def downgrade():
+    op.drop_table('Leases')
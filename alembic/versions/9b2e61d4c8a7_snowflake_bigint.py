@@ -0,0 +1,178 @@
+"""snowflake bigint
+
+Revision ID: 9b2e61d4c8a7
+Revises: 4f1c2b7a9e30
+Create Date: 2026-10-18 19:48:37.902114
+
+Moves the DiscordSnowflake columns from VARCHAR(20) to 64-bit integers.
+
+On MySQL each table is rebuilt online, without locking it for the length of the copy: a shadow table with the new
+column types is filled in primary key order in small batches, each committed on its own, while triggers copy
+concurrent writes. It is then swapped in with an atomic RENAME TABLE. Foreign keys of the rebuilt tables are dropped
+for the copy and added back afterwards without revalidating the rows.
+On SQLite, which locks the whole database for any write, each table is recreated by a batch migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e61d4c8a7'
+down_revision = '4f1c2b7a9e30'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+SNOWFLAKE_COLUMNS = {
+    "Guilds": ["guild_id"],
+    "GuildExtensions": ["guild_id"],
+    "GuildUsage": ["guild_id"],
+    "GuildColourChangePermissions": ["guild_id", "role_id"],
+    "GuildInvalidCustomColourRoles": ["guild_id", "role_id"],
+    "GuildWelcomeMessages": ["guild_id"],
+    "GuildRFRMessages": ["guild_id", "channel_id", "message_id"],
+    "RFRMessageEmojiRoles": ["role_id"],
+    "GuildRFRRequiredRoles": ["guild_id", "role_id"],
+    "TextFilter": ["guild_id"],
+    "TextFilterModeration": ["channel_id", "guild_id"],
+    "TextFilterIgnoreList": ["guild_id", "ignore"],
+    "TwitchAlerts": ["guild_id", "channel_id"],
+    "UserInTwitchAlert": ["channel_id", "message_id"],
+    "TeamInTwitchAlert": ["channel_id"],
+    "UserInTwitchTeam": ["message_id"],
+    "verified_emails": ["u_id"],
+    "non_verified_emails": ["u_id"],
+    "roles": ["s_id", "r_id"],
+    "to_re_verify": ["u_id", "r_id"],
+    "VerifyBlacklist": ["user_id", "role_id"],
+    "Votes": ["vote_id", "author_id", "guild_id", "chair_id", "voice_id"],
+    "VoteTargetRoles": ["vote_id", "role_id"],
+    "VoteOptions": ["vote_id", "opt_id"],
+    "VoteSent": ["vote_id", "vote_receiver_id", "vote_receiver_message"],
+}
+
+
+def q(name):
+    return f"`{name}`"
+
+
+def placeholders(prefix, count):
+    return "(" + ", ".join(f":{prefix}{i}" for i in range(count)) + ")"
+
+
+def mysql_columns(bind, table):
+    return bind.execute(sa.text("SELECT COLUMN_NAME, IS_NULLABLE = 'YES' FROM information_schema.COLUMNS "
+                                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                                "ORDER BY ORDINAL_POSITION"), {"table": table}).all()
+
+
+def mysql_primary_key(bind, table):
+    return bind.execute(sa.text("SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                                "AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY ORDINAL_POSITION"),
+                        {"table": table}).scalars().all()
+
+
+def mysql_foreign_keys(bind, tables):
+    """
+    The foreign keys from or to the given tables
+    """
+    return bind.execute(sa.text("SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, "
+                                "k.REFERENCED_COLUMN_NAME, r.DELETE_RULE, r.UPDATE_RULE "
+                                "FROM information_schema.KEY_COLUMN_USAGE k "
+                                "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+                                "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA "
+                                "AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME AND r.TABLE_NAME = k.TABLE_NAME "
+                                "WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL "
+                                "AND (k.TABLE_NAME IN :tables OR k.REFERENCED_TABLE_NAME IN :tables)")
+                        .bindparams(sa.bindparam("tables", expanding=True)), {"tables": list(tables)}).all()
+
+
+def mysql_rebuild(bind, table, columns, column_type):
+    """
+    Copy a table into a shadow table with new column types in batches, then swap the shadow table in
+    """
+    new, old = f"_{table}_new", f"_{table}_old"
+    nullable = dict(mysql_columns(bind, table))
+    names = ", ".join(q(name) for name in nullable)
+    new_values = ", ".join(f"NEW.{q(name)}" for name in nullable)
+    pk = mysql_primary_key(bind, table)
+    pk_names = ", ".join(q(name) for name in pk)
+    old_row = " AND ".join(f"{q(name)} = OLD.{q(name)}" for name in pk)
+
+    bind.execute(sa.text(f"DROP TABLE IF EXISTS {q(new)}"))
+    bind.execute(sa.text(f"CREATE TABLE {q(new)} LIKE {q(table)}"))
+    bind.execute(sa.text(f"ALTER TABLE {q(new)} " + ", ".join(
+        f"MODIFY {q(column)} {column_type} {'NULL' if nullable[column] else 'NOT NULL'}" for column in columns)))
+
+    # Writes during the copy are applied to the shadow table by triggers, and win over the batch copy
+    bind.execute(sa.text(f"CREATE TRIGGER {q(f'_{table}_ins')} AFTER INSERT ON {q(table)} FOR EACH ROW "
+                         f"REPLACE INTO {q(new)} ({names}) VALUES ({new_values})"))
+    bind.execute(sa.text(f"CREATE TRIGGER {q(f'_{table}_upd')} AFTER UPDATE ON {q(table)} FOR EACH ROW BEGIN "
+                         f"DELETE FROM {q(new)} WHERE {old_row}; "
+                         f"REPLACE INTO {q(new)} ({names}) VALUES ({new_values}); END"))
+    bind.execute(sa.text(f"CREATE TRIGGER {q(f'_{table}_del')} AFTER DELETE ON {q(table)} FOR EACH ROW "
+                         f"DELETE FROM {q(new)} WHERE {old_row}"))
+
+    lower = None
+    while True:
+        # The last primary key of this batch, or None for the final batch
+        conditions, params = [], {}
+        if lower is not None:
+            conditions.append(f"({pk_names}) > {placeholders('lower', len(pk))}")
+            params.update({f"lower{i}": value for i, value in enumerate(lower)})
+        where = f"WHERE {conditions[0]}" if conditions else ""
+        upper = bind.execute(sa.text(f"SELECT {pk_names} FROM {q(table)} {where} "
+                                     f"ORDER BY {pk_names} LIMIT {BATCH_SIZE - 1}, 1"), params).first()
+        if upper is not None:
+            conditions.append(f"({pk_names}) <= {placeholders('upper', len(pk))}")
+            params.update({f"upper{i}": value for i, value in enumerate(upper)})
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        bind.execute(sa.text(f"INSERT INTO {q(new)} ({names}) SELECT {names} FROM {q(table)} {where} "
+                             f"ON DUPLICATE KEY UPDATE {q(pk[0])} = {q(new)}.{q(pk[0])}"), params)
+        if upper is None:
+            break
+        lower = tuple(upper)
+
+    bind.execute(sa.text(f"RENAME TABLE {q(table)} TO {q(old)}, {q(new)} TO {q(table)}"))
+    # The triggers belong to the old table, and are dropped with it
+    bind.execute(sa.text(f"DROP TABLE {q(old)}"))
+
+
+def mysql_convert(column_type):
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        bind.execute(sa.text("SET SESSION foreign_key_checks = 0"))
+        foreign_keys = mysql_foreign_keys(bind, SNOWFLAKE_COLUMNS)
+        for table, name, *_ in foreign_keys:
+            bind.execute(sa.text(f"ALTER TABLE {q(table)} DROP FOREIGN KEY {q(name)}"))
+
+        for table, columns in SNOWFLAKE_COLUMNS.items():
+            mysql_rebuild(bind, table, columns, column_type)
+
+        for table, name, column, referred_table, referred_column, on_delete, on_update in foreign_keys:
+            bind.execute(sa.text(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(name)} FOREIGN KEY ({q(column)}) "
+                                 f"REFERENCES {q(referred_table)} ({q(referred_column)}) "
+                                 f"ON DELETE {on_delete} ON UPDATE {on_update}"))
+        bind.execute(sa.text("SET SESSION foreign_key_checks = 1"))
+
+
+def sqlite_convert(column_type, existing_type):
+    for table, columns in SNOWFLAKE_COLUMNS.items():
+        with op.batch_alter_table(table, recreate="always") as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, type_=column_type, existing_type=existing_type)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "mysql":
+        mysql_convert("BIGINT UNSIGNED")
+    else:
+        sqlite_convert(sa.BigInteger(), sa.VARCHAR(20))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "mysql":
+        mysql_convert("VARCHAR(20)")
+    else:
+        sqlite_convert(sa.VARCHAR(20), sa.BigInteger())
@@ -0,0 +1,34 @@
+"""cache invalidations
+
+Revision ID: a3f7c91e5d20
+Revises: e4a9d2c6b153
+Create Date: 2026-10-19 10:12:47.205631
+
+The change log of cache invalidations, polled by every bot and API process to drop cached guild settings written by
+another process.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f7c91e5d20'
+down_revision = 'e4a9d2c6b153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('CacheInvalidations',
+                    sa.Column('id', sa.BIGINT().with_variant(sa.INT, "sqlite"), primary_key=True, autoincrement=True),
+                    sa.Column('origin', sa.VARCHAR(100), nullable=False),
+                    sa.Column('namespace', sa.VARCHAR(100), nullable=False),
+                    sa.Column('guild_id', sa.BIGINT().with_variant(mysql.BIGINT(unsigned=True), "mysql"),
+                              nullable=False),
+                    sa.Column('created', sa.BIGINT, nullable=False, comment="epoch milliseconds"),
+                    sqlite_autoincrement=True)
+
+
+def downgrade():
+    op.drop_table('CacheInvalidations')
@@ -0,0 +1,47 @@
+"""hot path indexes
+
+Revision ID: c71d5e08f2b4
+Revises: 9b2e61d4c8a7
+Create Date: 2026-10-18 21:02:44.150327
+
+Adds secondary indexes for the queries that filter on columns outside the primary key, on every message, reaction and
+loop iteration.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71d5e08f2b4'
+down_revision = '9b2e61d4c8a7'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_GuildExtensions_guild_id", "GuildExtensions", ["guild_id"]),
+    ("ix_TextFilter_guild_id", "TextFilter", ["guild_id"]),
+    ("ix_TextFilterModeration_guild_id", "TextFilterModeration", ["guild_id"]),
+    ("ix_TextFilterIgnoreList_guild_id_ignore_type", "TextFilterIgnoreList", ["guild_id", "ignore_type"]),
+    ("ix_Votes_end_time", "Votes", ["end_time"]),
+    ("ix_Votes_author_id_guild_id", "Votes", ["author_id", "guild_id"]),
+    ("ix_VoteOptions_opt_id", "VoteOptions", ["opt_id"]),
+    ("ix_VoteSent_vote_receiver_message", "VoteSent", ["vote_receiver_message"]),
+    ("ix_TwitchAlerts_guild_id", "TwitchAlerts", ["guild_id"]),
+    ("ix_UserInTwitchAlert_twitch_username_message_id", "UserInTwitchAlert", ["twitch_username", "message_id"]),
+    ("ix_TeamInTwitchAlert_channel_id_twitch_team_name", "TeamInTwitchAlert", ["channel_id", "twitch_team_name"]),
+    ("ix_UserInTwitchTeam_twitch_username_message_id", "UserInTwitchTeam", ["twitch_username", "message_id"]),
+    ("ix_verified_emails_email", "verified_emails", ["email"]),
+    ("ix_roles_r_id", "roles", ["r_id"]),
+    ("ix_to_re_verify_r_id", "to_re_verify", ["r_id"]),
+    ("ix_VerifyBlacklist_role_id", "VerifyBlacklist", ["role_id"]),
+]
+
+
+def upgrade():
+    # InnoDB adds secondary indexes in place, without blocking reads or writes of the table
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,27 @@
+"""guild left at
+
+Revision ID: e4a9d2c6b153
+Revises: c71d5e08f2b4
+Create Date: 2026-10-18 23:41:09.562184
+
+Records when the bot left a guild, instead of keeping no trace of it or deleting the guild's settings.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9d2c6b153'
+down_revision = 'c71d5e08f2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A nullable column without a default is added instantly by InnoDB
+    op.add_column('Guilds', sa.Column('left_at', sa.DATETIME, nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('Guilds') as batch_op:
+        batch_op.drop_column('left_at')
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot cog database benchmark
+Times the public functions of each cog's db.py and core.py against a synthetic large deployment (benchmarks.dataset)
+in a temporary SQLite database, and stores the results as JSON. Comparing against an earlier results file exits with
+an error if any function is slower by more than the threshold.
+
+Run with: python -m benchmarks.cogs [--scale 1.0] [--cog verification] [--output results.json]
+          [--compare baseline.json] [--threshold 1.25]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import inspect
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+# Libs
+from sqlalchemy import create_engine
+
+# Own modules
+from benchmarks import dataset
+from benchmarks.dataset import Scale, channel_id, guild_id, message_id, token, user_id
+from koala import cache, db
+from koala.cogs.announce.db import AnnounceDBManager
+from koala.cogs.base import core as base_core
+from koala.cogs.colour_role.db import ColourRoleDBManager
+from koala.cogs.intro_cog import db as intro_db
+from koala.cogs.react_for_role import db as rfr_db
+from koala.cogs.text_filter.db import TextFilterDBManager
+from koala.cogs.twitch_alert import core as twitch_core
+from koala.cogs.twitch_alert.db import TwitchAlertDBManager
+from koala.cogs.verification import core as verify_core
+from koala.cogs.voting.db import VoteManager
+
+# Constants
+DEFAULT_ITERATIONS = 200
+DEFAULT_THRESHOLD = 1.25
+LOOP_ITERATIONS = 5
+STARTUP_ITERATIONS = 1
+STRIDE = 7919  # A prime, so consecutive iterations look up rows spread over the tables
+WARM_GUILDS = 10  # The active guilds of the warm cases, whose events read cached settings
+
+# Variables
+
+
+class Case(NamedTuple):
+    cog: str
+    name: str
+    call: Callable[[int], Any]  # Called with the iteration number, may return a coroutine
+    iterations: int = DEFAULT_ITERATIONS
+
+
+class OfflineBot:
+    """
+    A bot that is not connected to Discord, so no guild, channel or member is cached
+    """
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_channel(self, channel_id):
+        return None
+
+
+class OfflineTwitchHandler:
+    """
+    A Twitch API handler for which every streamer is offline
+    """
+
+    async def get_streams_data(self, usernames):
+        return []
+
+
+def pick(i: int, count: int) -> int:
+    return i * STRIDE % count
+
+
+def cases(scale: Scale) -> List[Case]:
+    """
+    The functions to time, with arguments addressing rows of the dataset
+    """
+    bot = OfflineBot()
+    text_filter = TextFilterDBManager(bot)
+    twitch_alert = TwitchAlertDBManager(bot)
+    twitch_alert.twitch_handler = OfflineTwitchHandler()
+    colour_role = ColourRoleDBManager()
+    announce = AnnounceDBManager()
+
+    def guild(i):
+        return guild_id(pick(i, scale.guilds))
+
+    def warm_guild(i):
+        return guild(i % WARM_GUILDS)
+
+    def rfr_message(i):
+        m = pick(i, scale.guilds * scale.rfr_messages_per_guild)
+        g = m // scale.rfr_messages_per_guild
+        return guild_id(g), channel_id(g), message_id(m)
+
+    return [
+        Case("base", "get_enabled_guild_extensions", lambda i: db.get_enabled_guild_extensions(guild(i))),
+        Case("base", "refresh_guild_extension_cache", lambda i: db.refresh_guild_extension_cache(guild(i))),
+        Case("base", "list_enabled_extensions", lambda i: base_core.list_enabled_extensions(guild(i))),
+        Case("base", "activity_list", lambda i: base_core.activity_list(True)),
+        Case("base", "sync_guilds",
+             lambda i: base_core.sync_guilds([guild_id(g) for g in range(scale.guilds)]), LOOP_ITERATIONS),
+        Case("announce", "get_last_use_date", lambda i: announce.get_last_use_date(guild(i))),
+        Case("announce", "get_last_use_date.warm", lambda i: announce.get_last_use_date(warm_guild(i))),
+        Case("colour_role", "get_colour_change_roles", lambda i: colour_role.get_colour_change_roles(guild(i))),
+        Case("colour_role", "get_protected_colour_roles", lambda i: colour_role.get_protected_colour_roles(guild(i))),
+        Case("colour_role", "get_protected_colour_roles.warm",
+             lambda i: colour_role.get_protected_colour_roles(warm_guild(i))),
+        Case("intro_cog", "get_guild_welcome_message", lambda i: intro_db.get_guild_welcome_message(guild(i))),
+        Case("intro_cog", "get_guild_welcome_message.warm",
+             lambda i: intro_db.get_guild_welcome_message(warm_guild(i))),
+        Case("react_for_role", "get_rfr_message", lambda i: rfr_db.get_rfr_message(*rfr_message(i))),
+        Case("react_for_role", "get_rfr_message_async", lambda i: rfr_db.get_rfr_message_async(*rfr_message(i))),
+        Case("react_for_role", "get_guild_rfr_messages", lambda i: rfr_db.get_guild_rfr_messages(guild(i))),
+        Case("react_for_role", "get_guild_rfr_roles", lambda i: rfr_db.get_guild_rfr_roles(guild(i))),
+        Case("react_for_role", "get_rfr_reaction_role_by_emoji_str",
+             lambda i: rfr_db.get_rfr_reaction_role_by_emoji_str(
+                 pick(i, scale.guilds * scale.rfr_messages_per_guild) + 1,
+                 f"emoji{i % scale.emoji_roles_per_rfr_message}")),
+        Case("react_for_role", "get_guild_rfr_required_roles",
+             lambda i: rfr_db.get_guild_rfr_required_roles(guild(i))),
+        Case("react_for_role", "get_guild_rfr_required_roles_async.warm",
+             lambda i: rfr_db.get_guild_rfr_required_roles_async(warm_guild(i))),
+        Case("text_filter", "get_filtered_text_for_guild", lambda i: text_filter.get_filtered_text_for_guild(guild(i))),
+        Case("text_filter", "get_filtered_text_for_guild.warm",
+             lambda i: text_filter.get_filtered_text_for_guild(warm_guild(i))),
+        Case("text_filter", "get_ignore_list_channels", lambda i: text_filter.get_ignore_list_channels(guild(i))),
+        Case("text_filter", "get_mod_channel", lambda i: text_filter.get_mod_channel(guild(i))),
+        Case("text_filter", "get_all_ignored", lambda i: text_filter.get_all_ignored(guild(i))),
+        Case("twitch_alert", "get_users_in_ta",
+             lambda i: twitch_alert.get_users_in_ta(channel_id(pick(i, scale.guilds)))),
+        Case("twitch_alert", "get_default_message",
+             lambda i: twitch_alert.get_default_message(channel_id(pick(i, scale.guilds)))),
+        Case("twitch_alert", "create_user_alerts", lambda i: twitch_core.create_user_alerts(bot, twitch_alert),
+             LOOP_ITERATIONS),
+        Case("twitch_alert", "create_team_alerts", lambda i: twitch_core.create_team_alerts(bot, twitch_alert),
+             LOOP_ITERATIONS),
+        Case("verification", "list_verify_role", lambda i: verify_core.list_verify_role(guild(i))),
+        Case("verification", "get_verify_config_dto", lambda i: verify_core.get_verify_config_dto(guild(i))),
+        Case("verification", "email_verify_list",
+             lambda i: verify_core.email_verify_list(user_id(pick(i, scale.verified_emails)))),
+        # Each confirmation uses up a pending verification
+        Case("verification", "email_verify_confirm",
+             lambda i: verify_core.email_verify_confirm(user_id(i), token(i), bot),
+             min(DEFAULT_ITERATIONS, scale.pending_verifications)),
+        Case("voting", "load_from_db", lambda i: VoteManager().load_from_db(), STARTUP_ITERATIONS),
+    ]
+
+
+def summarise(durations: List[float]) -> Dict[str, float]:
+    durations = sorted(durations)
+    return {"iterations": len(durations),
+            "mean_ms": statistics.mean(durations) * 1e3,
+            "p50_ms": durations[len(durations) // 2] * 1e3,
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1e3}
+
+
+async def run_cases(selected: List[Case]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for case in selected:
+        durations = []
+        for i in range(case.iterations):
+            start = time.perf_counter()
+            result = case.call(i)
+            if inspect.isawaitable(result):
+                await result
+            durations.append(time.perf_counter() - start)
+        results[f"{case.cog}.{case.name}"] = summarise(durations)
+    return results
+
+
+@contextlib.contextmanager
+def use_database(url: str):
+    """
+    Point the database sessions of every cog at another database for the duration
+    """
+    engine, async_engine = db.engine, db.async_engine
+    db.engine = create_engine(url, future=True)
+    db.async_engine = db.__create_async_engine(url)
+    db.Session.configure(bind=db.engine)
+    db.AsyncSession.configure(bind=db.async_engine)
+    db.extension_cache.clear()
+    cache.clear_all()
+    try:
+        yield db.engine
+    finally:
+        asyncio.run(db.async_engine.dispose())
+        db.engine.dispose()
+        db.engine, db.async_engine = engine, async_engine
+        db.Session.configure(bind=engine)
+        db.AsyncSession.configure(bind=async_engine)
+        db.extension_cache.clear()
+        cache.clear_all()
+
+
+def run(scale: Scale = Scale(), cogs: List[str] = None) -> dict:
+    """
+    Generate the dataset in a temporary database and time every case
+    :param scale: The row counts of the dataset
+    :param cogs: Only time the cases of these cogs, or all cogs if None
+    :return: dict of the scale, environment and results by case
+    """
+    selected = [case for case in cases(scale) if not cogs or case.cog in cogs]
+    with tempfile.TemporaryDirectory() as directory, \
+            use_database(f"sqlite:///{Path(directory, 'benchmark.db')}") as engine:
+        db.__create_sqlite_tables()
+        dataset.generate(engine, scale)
+        # Roles that cannot be assigned while offline are logged as errors
+        logging.disable(logging.ERROR)
+        try:
+            results = asyncio.run(run_cases(selected))
+        finally:
+            logging.disable(logging.NOTSET)
+    return {"scale": dataclasses.asdict(scale), "database": "sqlite", "python": platform.python_version(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "results": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    The cases with a mean time more than threshold times their baseline mean time
+    """
+    if results["scale"] != baseline["scale"]:
+        raise ValueError("The baseline was run at a different scale")
+    return [name for name, result in results["results"].items()
+            if name in baseline["results"] and result["mean_ms"] > baseline["results"][name]["mean_ms"] * threshold]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.cogs", description=__doc__.split("\n")[2])
+    parser.add_argument("--scale", type=float, default=dataset.DEFAULT_SCALE,
+                        help="multiplier of the largest deployment dataset")
+    parser.add_argument("--cog", action="append", dest="cogs", help="only time this cog, can be repeated")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="a results JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="the slowdown from the baseline that is a regression")
+    args = parser.parse_args(argv)
+
+    results = run(Scale().scaled(args.scale), args.cogs)
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else {}
+    print("{:<56}{:>12}{:>12}{:>12}{:>12}".format("case", "mean (ms)", "p50 (ms)", "p95 (ms)", "baseline"))
+    for name, result in results["results"].items():
+        ratio = "{:.2f}x".format(result["mean_ms"] / baseline[name]["mean_ms"]) if name in baseline else ""
+        print("{:<56}{:>12.3f}{:>12.3f}{:>12.3f}{:>12}".format(name, result["mean_ms"], result["p50_ms"],
+                                                               result["p95_ms"], ratio))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"Slower than {args.threshold}x the baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot synthetic dataset
+Populates every table in mapper_registry with a deterministic dataset shaped like a large deployment: thousands of
+guilds, tens of thousands of twitch subscriptions and hundreds of thousands of verified emails. IDs are derived from
+the row number, so benchmarks can address existing rows without reading them back.
+
+Run with: python -m benchmarks.dataset [scale]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import dataclasses
+import datetime
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List
+
+# Libs
+import discord
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+# Own modules
+from koala.cogs.announce.models import GuildUsage
+from koala.cogs.base.models import ScheduledActivities
+from koala.cogs.colour_role.models import GuildColourChangePermissions, GuildInvalidCustomColourRoles
+from koala.cogs.intro_cog.models import GuildWelcomeMessages
+from koala.cogs.react_for_role.models import GuildRFRMessages, RFRMessageEmojiRoles, GuildRFRRequiredRoles
+from koala.cogs.text_filter.models import TextFilter, TextFilterIgnoreList, TextFilterModeration
+from koala.cogs.twitch_alert.models import TwitchAlerts, UserInTwitchAlert, TeamInTwitchAlert, UserInTwitchTeam
+from koala.cogs.verification.models import NonVerifiedEmails, Roles, ToReVerify, VerifiedEmails, VerifyBlacklist
+from koala.cogs.voting.models import Votes, VoteTargetRoles, VoteOptions, VoteSent
+from koala.models import mapper_registry, Guilds, KoalaExtensions, GuildExtensions, Leases
+
+# Constants
+DEFAULT_SCALE = 1.0
+CHUNK_SIZE = 10000
+FIRST_TIMESTAMP = 41944705796  # Milliseconds since the Discord epoch, early 2021
+EXTENSIONS = ["Announce", "ColourRole", "ReactForRole", "TextFilter", "TwitchAlert", "Verify", "Vote"]
+EMAIL_DOMAINS = 200
+LEASES = ["twitch_alert", "update_activity:0", "vote_end_loop:0"]
+
+# Kinds of snowflake, so that IDs of different kinds never collide
+GUILD, CHANNEL, ROLE, USER, MESSAGE = range(5)
+
+# Variables
+
+
+@dataclasses.dataclass(frozen=True)
+class Scale:
+    """
+    Row counts of the dataset, defaulting to the largest deployment
+    """
+    guilds: int = 5000
+    extensions_per_guild: int = 4
+    filters_per_guild: int = 20
+    rfr_messages_per_guild: int = 5
+    emoji_roles_per_rfr_message: int = 10
+    colour_roles_per_guild: int = 3
+    twitch_subscriptions: int = 50000
+    twitch_streamers: int = 10000
+    twitch_teams: int = 2000
+    users_per_twitch_team: int = 20
+    verified_emails: int = 300000
+    pending_verifications: int = 10000
+    verify_roles_per_guild: int = 2
+    votes: int = 2000
+    options_per_vote: int = 5
+    receivers_per_vote: int = 50
+    scheduled_activities: int = 100
+
+    def scaled(self, factor: float) -> "Scale":
+        """
+        The dataset with every table count multiplied by a factor, keeping the per-row counts
+        """
+        return dataclasses.replace(self, **{field.name: max(1, round(getattr(self, field.name) * factor))
+                                            for field in dataclasses.fields(self)
+                                            if "_per_" not in field.name})
+
+
+def snowflake(kind: int, i: int) -> int:
+    """
+    The ID of the i-th object of a kind, with the timestamp increasing with i so IDs spread over shards
+    """
+    return ((FIRST_TIMESTAMP + i) << 22) | (kind << 12)
+
+
+def guild_id(i: int) -> int:
+    return snowflake(GUILD, i)
+
+
+def channel_id(i: int) -> int:
+    return snowflake(CHANNEL, i)
+
+
+def role_id(i: int) -> int:
+    return snowflake(ROLE, i)
+
+
+def user_id(i: int) -> int:
+    return snowflake(USER, i)
+
+
+def message_id(i: int) -> int:
+    return snowflake(MESSAGE, i)
+
+
+def streamer(i: int) -> str:
+    return f"streamer{i}"
+
+
+def email_domain(i: int) -> str:
+    return f"uni{i % EMAIL_DOMAINS}.ac.uk"
+
+
+def email(i: int) -> str:
+    return f"student{i}@{email_domain(i)}"
+
+
+def token(i: int) -> str:
+    return f"{i:08x}"
+
+
+def _rows(scale: Scale) -> Dict[str, Iterable[dict]]:
+    """
+    Generators of the rows of every table, in foreign key order
+    """
+    guilds = range(scale.guilds)
+    now = datetime.datetime(2023, 1, 1)
+    rfr_messages = range(scale.guilds * scale.rfr_messages_per_guild)
+    teams = range(scale.twitch_teams)
+    votes = range(scale.votes)
+    subscriptions_per_channel = -(-scale.twitch_subscriptions // scale.guilds)
+    return {
+        Guilds.__tablename__: ({"guild_id": guild_id(g), "subscription": 0} for g in guilds),
+        KoalaExtensions.__tablename__: ({"extension_id": extension, "subscription_required": 0, "available": True,
+                                         "enabled": True} for extension in EXTENSIONS),
+        GuildExtensions.__tablename__: ({"guild_id": guild_id(g),
+                                         "extension_id": EXTENSIONS[(g + e) % len(EXTENSIONS)]}
+                                        for g in guilds for e in range(scale.extensions_per_guild)),
+        GuildUsage.__tablename__: ({"guild_id": guild_id(g), "last_message_epoch_time": 1672531200} for g in guilds),
+        GuildWelcomeMessages.__tablename__: ({"guild_id": guild_id(g), "welcome_message": f"Welcome to guild {g}"}
+                                             for g in guilds),
+        ScheduledActivities.__tablename__: ({"activity_type": discord.ActivityType.playing, "stream_url": None,
+                                             "message": f"activity {a}",
+                                             "time_start": now + datetime.timedelta(hours=a),
+                                             "time_end": now + datetime.timedelta(hours=a + 1)}
+                                            for a in range(scale.scheduled_activities)),
+        GuildColourChangePermissions.__tablename__: ({"guild_id": guild_id(g),
+                                                      "role_id": role_id(g * scale.colour_roles_per_guild + r)}
+                                                     for g in guilds for r in range(scale.colour_roles_per_guild)),
+        GuildInvalidCustomColourRoles.__tablename__: ({"guild_id": guild_id(g),
+                                                       "role_id": role_id(g * scale.colour_roles_per_guild + r)}
+                                                      for g in guilds for r in range(scale.colour_roles_per_guild)),
+        TextFilter.__tablename__: ({"filtered_text_id": f"{guild_id(g)}word{f}", "guild_id": guild_id(g),
+                                    "filtered_text": f"word{f}", "filter_type": "banned", "is_regex": False}
+                                   for g in guilds for f in range(scale.filters_per_guild)),
+        TextFilterModeration.__tablename__: ({"channel_id": channel_id(g), "guild_id": guild_id(g)} for g in guilds),
+        TextFilterIgnoreList.__tablename__: ({"ignore_id": f"{guild_id(g)}{ignore}", "guild_id": guild_id(g),
+                                              "ignore_type": ignore_type, "ignore": ignore}
+                                             for g in guilds
+                                             for ignore_type, ignore in (("channel", channel_id(g)),
+                                                                         ("user", user_id(g)))),
+        GuildRFRMessages.__tablename__: ({"emoji_role_id": m + 1,
+                                          "guild_id": guild_id(m // scale.rfr_messages_per_guild),
+                                          "channel_id": channel_id(m // scale.rfr_messages_per_guild),
+                                          "message_id": message_id(m)} for m in rfr_messages),
+        RFRMessageEmojiRoles.__tablename__: ({"emoji_role_id": m + 1, "emoji_raw": f"emoji{r}",
+                                              "role_id": role_id(m * scale.emoji_roles_per_rfr_message + r)}
+                                             for m in rfr_messages for r in range(scale.emoji_roles_per_rfr_message)),
+        GuildRFRRequiredRoles.__tablename__: ({"guild_id": guild_id(g), "role_id": role_id(g)} for g in guilds),
+        TwitchAlerts.__tablename__: ({"guild_id": guild_id(g), "channel_id": channel_id(g),
+                                     "default_message": "{user} is live!"} for g in guilds),
+        # The k-th subscription of a channel is to a different streamer for each k
+        UserInTwitchAlert.__tablename__: ({"channel_id": channel_id(s % scale.guilds),
+                                           "twitch_username": streamer((s % scale.guilds * subscriptions_per_channel
+                                                                        + s // scale.guilds) % scale.twitch_streamers),
+                                           "custom_message": None, "message_id": None}
+                                          for s in range(scale.twitch_subscriptions)),
+        TeamInTwitchAlert.__tablename__: ({"team_twitch_alert_id": t + 1, "channel_id": channel_id(t % scale.guilds),
+                                           "twitch_team_name": f"team{t}", "custom_message": None} for t in teams),
+        UserInTwitchTeam.__tablename__: ({"team_twitch_alert_id": t + 1,
+                                          "twitch_username": streamer((t * scale.users_per_twitch_team + u)
+                                                                      % scale.twitch_streamers),
+                                          "message_id": None}
+                                         for t in teams for u in range(scale.users_per_twitch_team)),
+        VerifiedEmails.__tablename__: ({"u_id": user_id(e), "email": email(e)} for e in range(scale.verified_emails)),
+        NonVerifiedEmails.__tablename__: ({"u_id": user_id(e), "email": email(e), "token": token(e)}
+                                          for e in range(scale.pending_verifications)),
+        Roles.__tablename__: ({"s_id": guild_id(g), "r_id": role_id(g * scale.verify_roles_per_guild + r),
+                               "email_suffix": email_domain(g * scale.verify_roles_per_guild + r)}
+                              for g in guilds for r in range(scale.verify_roles_per_guild)),
+        ToReVerify.__tablename__: ({"u_id": user_id(g), "r_id": role_id(g * scale.verify_roles_per_guild)}
+                                   for g in guilds),
+        VerifyBlacklist.__tablename__: ({"user_id": user_id(g + 1),
+                                         "role_id": role_id(g * scale.verify_roles_per_guild),
+                                         "email_suffix": email_domain(g * scale.verify_roles_per_guild)}
+                                        for g in guilds),
+        Votes.__tablename__: ({"vote_id": v + 1, "author_id": user_id(v), "guild_id": guild_id(v % scale.guilds),
+                               "title": f"vote {v}", "chair_id": None, "voice_id": None, "end_time": None}
+                              for v in votes),
+        VoteTargetRoles.__tablename__: ({"vote_id": v + 1, "role_id": role_id(v % scale.guilds)} for v in votes),
+        VoteOptions.__tablename__: ({"vote_id": v + 1, "opt_id": v * scale.options_per_vote + o + 1,
+                                     "option_title": f"option {o}", "option_desc": "description"}
+                                    for v in votes for o in range(scale.options_per_vote)),
+        VoteSent.__tablename__: ({"vote_id": v + 1, "vote_receiver_id": user_id(r),
+                                  "vote_receiver_message": message_id(v * scale.receivers_per_vote + r)}
+                                 for v in votes for r in range(scale.receivers_per_vote)),
+        Leases.__tablename__: ({"name": name, "holder": "benchmark", "token": 1, "expires": 0} for name in LEASES),
+    }
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate(engine: Engine, scale: Scale = Scale()) -> Dict[str, int]:
+    """
+    Insert the dataset into empty tables
+    :param engine: The database engine, with the tables created
+    :param scale: The row counts of the dataset
+    :return: dict of table name to rows inserted
+    """
+    tables = mapper_registry.metadata.tables
+    rows = _rows(scale)
+    missing = set(tables) - set(rows)
+    if missing:
+        raise ValueError(f"No synthetic rows for tables {sorted(missing)}")
+
+    counts = {}
+    with engine.begin() as conn:
+        for name, table_rows in rows.items():
+            table = tables[name]
+            if conn.execute(select(func.count()).select_from(table)).scalar_one():
+                raise ValueError(f"Table {name} is not empty")
+            counts[name] = 0
+            for chunk in _chunks(table_rows, CHUNK_SIZE):
+                conn.execute(table.insert(), chunk)
+                counts[name] += len(chunk)
+    return counts
+
+
+def main(factor: float = DEFAULT_SCALE):
+    from koala import db
+    db.__create_sqlite_tables()
+    start = time.perf_counter()
+    counts = generate(db.engine, Scale().scaled(factor))
+    for name, count in counts.items():
+        print("{:<32}{:>10}".format(name, count))
+    print("{:<32}{:>10.1f}s".format("generated in", time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SCALE)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot parse_request microbenchmark
+Compares binding request arguments with the binder compiled by parse_request against inspecting the endpoint
+signature on every request, for the base, react for role and verification endpoints.
+
+Run with: python -m benchmarks.parse_request [iterations]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import inspect
+import sys
+import time
+import typing
+
+# Libs
+from multidict import MultiDict
+
+# Own modules
+from koala.cogs.base.api import BaseEndpoint
+from koala.cogs.react_for_role.api import RfrEndpoint
+from koala.cogs.verification.api import VerifyEndpoint
+
+# Constants
+DEFAULT_ITERATIONS = 20000
+POST_METHODS = {"PATCH", "POST", "PUT"}
+
+# Variables
+
+
+class BenchmarkRequest:
+    """
+    The parts of an aiohttp request used to bind arguments
+    """
+    POST_METHODS = POST_METHODS
+
+    def __init__(self, method: str, query: dict = None, body: dict = None):
+        self.method = method
+        self.query = MultiDict(query or {})
+        self.body = body
+        self.can_read_body = body is not None
+
+    async def json(self):
+        return self.body
+
+
+CASES = [
+    ("base GET /scheduled-activity", BaseEndpoint.get_activities,
+     BenchmarkRequest("GET", query={"show_all": "true"})),
+    ("base POST /enable-extension", BaseEndpoint.post_enable_extension,
+     BenchmarkRequest("POST", body={"guild_id": "123456789012345678", "koala_ext": "Announce"})),
+    ("rfr GET /message", RfrEndpoint.get_message,
+     BenchmarkRequest("GET", query={"message_id": "1", "guild_id": "2", "channel_id": "3"})),
+    ("rfr POST /message", RfrEndpoint.post_message,
+     BenchmarkRequest("POST", body={"guild_id": 2, "channel_id": 3, "title": "Roles", "inline": True,
+                                    "roles": [{"emoji": "\U0001F428", "role_id": i} for i in range(10)]})),
+    ("rfr PUT /required-roles", RfrEndpoint.put_required_roles,
+     BenchmarkRequest("PUT", body={"guild_id": 2, "role_ids": list(range(10))})),
+    ("verify PUT /config", VerifyEndpoint.put_verify_config,
+     BenchmarkRequest("PUT", body={"guild_id": 2, "roles": [{"email_suffix": "koalabot.uk", "role_id": 1}]})),
+]
+
+
+def legacy_cast(type_class, value):
+    if isinstance(value, dict):
+        return type_class(**value)
+    elif typing.get_origin(type_class) == list:
+        return [legacy_cast(type_class.__args__[0], v) for v in list(value)]
+    if typing.get_origin(type_class) is not None:
+        return typing.get_origin(type_class)(type_class)
+    else:
+        return type_class(value)
+
+
+async def legacy_bind(func, request) -> dict:
+    """
+    Bind the request arguments the way parse_request did before the binder was compiled at decoration time
+    """
+    wanted_args = dict(inspect.signature(func).parameters)
+    wanted_args.pop("self")
+    required_args = {a: wanted_args.get(a) for a in wanted_args.keys()
+                     if wanted_args.get(a).default == inspect.Parameter.empty}
+    available_args = {}
+    values = await request.json() if request.method in request.POST_METHODS else request.query
+    for arg in wanted_args.keys():
+        if arg in values:
+            if wanted_args[arg].annotation == inspect.Parameter.empty:
+                available_args[arg] = values[arg]
+            else:
+                available_args[arg] = legacy_cast(wanted_args[arg].annotation, values[arg])
+    set(required_args.keys()) - set(available_args.keys())
+    return available_args
+
+
+async def compiled_bind(endpoint, request) -> dict:
+    available_args = await endpoint.binder.bind(request)
+    endpoint.binder.required - available_args.keys()
+    return available_args
+
+
+async def time_per_request(bind, endpoint, request, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await bind(endpoint, request)
+    return (time.perf_counter() - start) / iterations
+
+
+async def run(iterations: int = DEFAULT_ITERATIONS) -> list:
+    """
+    Time both binders for each endpoint
+    :param iterations: Requests bound per endpoint
+    :return: list of (case name, legacy seconds per request, compiled seconds per request)
+    """
+    results = []
+    for name, endpoint, request in CASES:
+        legacy = await time_per_request(lambda e, r: legacy_bind(e.__wrapped__, r), endpoint, request, iterations)
+        compiled = await time_per_request(compiled_bind, endpoint, request, iterations)
+        results.append((name, legacy, compiled))
+    return results
+
+
+def main(iterations: int = DEFAULT_ITERATIONS):
+    print("{:<32}{:>14}{:>14}{:>10}".format("endpoint", "legacy (us)", "compiled (us)", "speedup"))
+    for name, legacy, compiled in asyncio.run(run(iterations)):
+        print("{:<32}{:>14.2f}{:>14.2f}{:>9.1f}x".format(name, legacy * 1e6, compiled * 1e6, legacy / compiled))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
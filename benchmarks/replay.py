@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot gateway trace replay
+Replays a gateway trace recorded with GATEWAY_TRACE_PATH (koala.instrumentation.trace) through all the cogs as fast as
+possible, on the dpytest backend with a temporary SQLite database, and reports the events per second, the latency
+percentiles of each listener and the database queries made by each cog. Every guild in the trace has every extension
+enabled. Comparing against an earlier results file of the same trace exits with an error if the throughput drops or a
+listener is slower by more than the threshold.
+
+Run with: python -m benchmarks.replay trace.jsonl.gz [--window 100] [--scale 0] [--output results.json]
+          [--compare baseline.json] [--threshold 1.25]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import argparse
+import asyncio
+import collections
+import dataclasses
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Libs
+import discord
+import discord.ext.test as dpytest
+from aiohttp import web
+from discord.ext.test import backend as back, factories as facts, runner
+from sqlalchemy import select
+
+# Own modules
+import koalabot
+from benchmarks import dataset
+from benchmarks.cogs import DEFAULT_THRESHOLD, use_database
+from benchmarks.dataset import Scale
+from koala import db, instrumentation
+from koala.instrumentation.trace import read_trace
+from koala.models import GuildExtensions, KoalaExtensions
+
+# Constants
+DEFAULT_WINDOW = 100
+DRAIN_EVENTS = 1000
+MESSAGE_HISTORY = 100
+
+# Variables
+
+
+def percentiles(durations: List[float]) -> Dict[str, float]:
+    durations = sorted(durations)
+
+    def percentile(percent):
+        return durations[min(len(durations) - 1, int(len(durations) * percent))] * 1e3
+
+    return {"count": len(durations), "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99), "max_ms": durations[-1] * 1e3}
+
+
+class ReplayBot(koalabot.KoalaBot):
+    """
+    KoalaBot recording the duration of every listener run and the listener tasks still running
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listener_durations: Dict[str, List[float]] = collections.defaultdict(list)
+        self.listener_errors: Dict[str, int] = collections.Counter()
+        self.in_flight = set()
+
+    def _schedule_event(self, coro, event_name: str, *args, **kwargs) -> asyncio.Task:
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+        return task
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs) -> None:
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.listener_durations["{event}:{listener}".format(
+                event=event_name, listener=getattr(coro, "__qualname__", repr(coro)))].append(
+                time.perf_counter() - start)
+
+    async def on_error(self, event_method: str, *args, **kwargs) -> None:
+        self.listener_errors[event_method] += 1
+
+
+class Replayer:
+    """
+    Builds the guilds, channels, roles and members of a trace on the dpytest backend as they are first seen, without
+    dispatching events for them, and feeds the traced events to the bot
+    """
+
+    def __init__(self, bot: ReplayBot, extensions: List[str]):
+        self.bot = bot
+        self.state = back.get_state()
+        self.extensions = extensions
+        self.events = collections.Counter()
+        self.skipped = collections.Counter()
+
+    def guild(self, guild_id: int) -> discord.Guild:
+        guild = self.state._get_guild(guild_id)
+        if guild is None:
+            guild = back.make_guild("Guild {id}".format(id=guild_id), id_num=guild_id)
+            back.make_member(self.state.user, guild)
+            with db.session_manager() as session:
+                session.add_all([GuildExtensions(extension_id=extension, guild_id=guild_id)
+                                 for extension in self.extensions])
+                session.commit()
+        return guild
+
+    def channel(self, guild: discord.Guild, channel_id: int) -> discord.TextChannel:
+        return guild.get_channel(channel_id) or back.make_text_channel("channel-{id}".format(id=channel_id), guild,
+                                                                        id_num=channel_id)
+
+    def roles(self, guild: discord.Guild, role_ids: List[str]) -> List[discord.Role]:
+        return [guild.get_role(int(role_id)) or back.make_role("role-{id}".format(id=role_id), guild,
+                                                               id_num=int(role_id))
+                for role_id in role_ids]
+
+    def user(self, user_id: int, bot: bool = False) -> discord.User:
+        return self.state.get_user(user_id) or self.state.store_user(
+            facts.make_user_dict("user-{id}".format(id=user_id), "0001", None, id_num=user_id, bot=bot))
+
+    def member(self, guild: discord.Guild, user: discord.User, role_ids: List[str]) -> discord.Member:
+        roles = self.roles(guild, role_ids)
+        member = guild.get_member(user.id)
+        if member is None:
+            member = discord.Member(data=facts.make_member_dict(guild, user, [role.id for role in roles]),
+                                    guild=guild, state=self.state)
+            guild._add_member(member)
+        elif {role.id for role in roles} != set(member._roles):
+            back.update_member(member, roles=roles)
+        return member
+
+    def feed(self, event_type: str, data: dict):
+        """
+        Feed a traced event to the bot, which schedules its listeners
+        """
+        if data.get("guild_id") is None:
+            # Direct messages are not replayed, the dpytest backend has no DM channels for traced users
+            self.skipped[event_type] += 1
+            return
+        self.state.stop_dispatch()
+        try:
+            guild = self.guild(int(data["guild_id"]))
+            if event_type == "GUILD_MEMBER_ADD":
+                user = self.user(int(data["user"]["id"]), data["user"]["bot"])
+                payload = facts.make_member_dict(guild, user, [role.id for role in self.roles(guild, data["roles"])])
+            else:
+                channel = self.channel(guild, int(data["channel_id"]))
+                if event_type == "MESSAGE_CREATE":
+                    author = self.member(guild, self.user(int(data["author"]["id"]), data["author"]["bot"]),
+                                         data["roles"])
+                else:
+                    member = self.member(guild, self.user(int(data["user_id"])), data["roles"])
+                    payload = {"message_id": int(data["message_id"]), "channel_id": channel.id, "guild_id": guild.id,
+                               "user_id": member.id, "emoji": data["emoji"]}
+                    if event_type == "MESSAGE_REACTION_ADD":
+                        payload["member"] = facts.dict_from_member(member)
+        finally:
+            self.state.start_dispatch()
+
+        if event_type == "MESSAGE_CREATE":
+            back.make_message(data["content"], author, channel, id_num=int(data["id"]))
+        else:
+            self.state.parsers[event_type](payload)
+        self.events[event_type] += 1
+
+    def drain(self):
+        """
+        Discard the messages the bot sent and the message history kept by the backend
+        """
+        while not runner.sent_queue.empty():
+            runner.sent_queue.get_nowait()
+        while not runner.error_queue.empty():
+            _, error = runner.error_queue.get_nowait()
+            self.bot.listener_errors["command:" + type(error).__name__] += 1
+        for history in back._cur_config.messages.values():
+            del history[:-MESSAGE_HISTORY]
+
+
+async def replay(trace: str, window: int) -> dict:
+    """
+    Replay a trace through all the cogs
+    :param trace: The trace file
+    :param window: The maximum number of listener tasks running at once
+    :return: dict of the results
+    """
+    _, events = read_trace(trace)
+    bot = ReplayBot(command_prefix=[koalabot.COMMAND_PREFIX, koalabot.OPT_COMMAND_PREFIX], intents=koalabot.intent)
+    setattr(bot, "koala_web_app", web.Application())
+    await bot._async_setup_hook()
+    dpytest.configure(bot, num_guilds=0)
+    koalabot.is_dpytest = True
+    # Cogs defer their background loops and network setup to on_ready, which is not dispatched
+    await koalabot.load_all_cogs(bot)
+    with db.session_manager() as session:
+        extensions = session.execute(select(KoalaExtensions.extension_id)).scalars().all()
+    replayer = Replayer(bot, extensions)
+
+    instrumentation.sql.instrument_engine(db.engine)
+    instrumentation.sql.instrument_engine(db.async_engine.sync_engine)
+    instrumentation.sql.query_recorder.reset()
+    bot.listener_durations.clear()
+
+    start = time.perf_counter()
+    for _, event_type, data in events:
+        replayer.feed(event_type, data)
+        if len(bot.in_flight) >= window:
+            await asyncio.wait(bot.in_flight, return_when=asyncio.FIRST_COMPLETED)
+        if sum(replayer.events.values()) % DRAIN_EVENTS == 0:
+            replayer.drain()
+    while bot.in_flight:
+        await asyncio.wait(bot.in_flight)
+    duration = time.perf_counter() - start
+    replayer.drain()
+
+    replayed = sum(replayer.events.values())
+    queries = collections.Counter()
+    for (_, caller), stats in instrumentation.sql.query_recorder.queries.items():
+        queries[caller.split(":")[0]] += stats.count
+    koalabot.is_dpytest = False
+    return {"events": dict(replayer.events), "skipped": dict(replayer.skipped), "seconds": duration,
+            "events_per_second": replayed / duration if duration else 0.0,
+            "listeners": {name: percentiles(durations) for name, durations in sorted(bot.listener_durations.items())},
+            "errors": dict(bot.listener_errors),
+            "queries": {"total": sum(queries.values()), "per_event": sum(queries.values()) / max(replayed, 1),
+                        "by_cog": dict(queries.most_common())}}
+
+
+def run(trace: str, window: int = DEFAULT_WINDOW, scale: float = 0) -> dict:
+    """
+    Replay a trace in a temporary database
+    :param trace: The trace file
+    :param window: The maximum number of listener tasks running at once
+    :param scale: Fill the database with the synthetic dataset at this scale first, or leave it empty if 0
+    :return: dict of the trace, scale, environment and results
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            use_database(f"sqlite:///{Path(directory, 'replay.db')}") as engine:
+        db.__create_sqlite_tables()
+        if scale:
+            dataset.generate(engine, Scale().scaled(scale))
+        # Sending to the unknown channels and members of an anonymised trace is logged as errors
+        logging.disable(logging.ERROR)
+        try:
+            results = asyncio.run(replay(trace, window))
+        finally:
+            logging.disable(logging.NOTSET)
+    return {"trace": Path(trace).name, "window": window,
+            "scale": dataclasses.asdict(Scale().scaled(scale)) if scale else None, "database": "sqlite",
+            "python": platform.python_version(), "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "results": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    The regressions from a baseline: lower throughput, or listeners with a p95 more than threshold times their baseline
+    """
+    if (results["trace"], results["window"], results["scale"]) != \
+            (baseline["trace"], baseline["window"], baseline["scale"]):
+        raise ValueError("The baseline replayed a different trace, window or scale")
+    regressions = []
+    if results["results"]["events_per_second"] * threshold < baseline["results"]["events_per_second"]:
+        regressions.append("events_per_second")
+    listeners, baseline_listeners = results["results"]["listeners"], baseline["results"]["listeners"]
+    regressions.extend(name for name, result in listeners.items()
+                       if name in baseline_listeners and result["p95_ms"] > baseline_listeners[name]["p95_ms"] * threshold)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description=__doc__.split("\n")[2])
+    parser.add_argument("trace", help="a trace recorded with GATEWAY_TRACE_PATH")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="the maximum number of listener tasks running at once")
+    parser.add_argument("--scale", type=float, default=0,
+                        help="fill the database with the synthetic dataset at this scale first")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="a results JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="the slowdown from the baseline that is a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.trace, args.window, args.scale)
+    summary = results["results"]
+    print("{events} events in {seconds:.2f}s, {rate:.1f} events/s, {queries} queries ({per_event:.2f} per event)".format(
+        events=sum(summary["events"].values()), seconds=summary["seconds"], rate=summary["events_per_second"],
+        queries=summary["queries"]["total"], per_event=summary["queries"]["per_event"]))
+    print("{:<72}{:>10}{:>10}{:>10}{:>10}".format("listener", "count", "p50 (ms)", "p95 (ms)", "p99 (ms)"))
+    for name, result in summary["listeners"].items():
+        print("{:<72}{:>10}{:>10.3f}{:>10.3f}{:>10.3f}".format(name, result["count"], result["p50_ms"],
+                                                               result["p95_ms"], result["p99_ms"]))
+    print("{:<72}{:>10}".format("queries by cog", "count"))
+    for cog, count in summary["queries"]["by_cog"].items():
+        print("{:<72}{:>10}".format(cog, count))
+    if summary["errors"]:
+        print("Errors: " + ", ".join("{}: {}".format(name, count) for name, count in summary["errors"].items()))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"Slower than {args.threshold}x the baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot REST API JSON serializer benchmark
+Compares encoding large list responses with the previous json.dumps encoder against the per-type encoders on the
+json and orjson backends.
+
+Run with: python -m benchmarks.serializer [iterations]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import dataclasses
+import datetime
+import importlib.util
+import json
+import sys
+import time
+
+# Libs
+import discord
+
+# Own modules
+from koala.cogs.base.models import ScheduledActivities
+from koala.cogs.react_for_role.dto import ReactMessage, ReactRole
+from koala.cogs.verification.dto import VerifyConfig, VerifyRole
+from koala.models import BaseModel
+from koala.rest import serializer
+
+# Constants
+DEFAULT_ITERATIONS = 20
+
+# Variables
+
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    """
+    The encoder build_response used before the serializer
+    """
+
+    def default(self, o):
+        if isinstance(o, BaseModel):
+            return o.as_dict()
+        if dataclasses.is_dataclass(o):
+            return dataclasses.asdict(o)
+        if isinstance(o, (datetime.date, datetime.datetime)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def scheduled_activities(count: int) -> list:
+    """
+    A get_activities(show_all=True) response
+    """
+    start = datetime.datetime(2025, 1, 1)
+    return [ScheduledActivities(activity_id=i, activity_type=discord.ActivityType.playing,
+                                stream_url="https://twitch.tv/koala", message=f"activity {i}",
+                                time_start=start + datetime.timedelta(hours=i),
+                                time_end=start + datetime.timedelta(hours=i + 1)) for i in range(count)]
+
+
+def react_messages(count: int) -> list:
+    return [ReactMessage(i, 1, 2, f"title {i}", "description", "#0aff00", None, True,
+                         [ReactRole("\U0001F428", role) for role in range(20)]) for i in range(count)]
+
+
+def verify_configs(count: int) -> list:
+    return [VerifyConfig(str(i), [VerifyRole(f"{role}.koalabot.uk", role) for role in range(5)])
+            for i in range(count)]
+
+
+CASES = [
+    ("10k scheduled activities", scheduled_activities(10000)),
+    ("1k rfr messages (20 roles)", react_messages(1000)),
+    ("5k verify configs (5 roles)", verify_configs(5000)),
+]
+
+
+def legacy_dumps(data) -> bytes:
+    return json.dumps(data, cls=LegacyJSONEncoder).encode()
+
+
+def time_per_call(dumps, data, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        dumps(data)
+    return (time.perf_counter() - start) / iterations
+
+
+def run(iterations: int = DEFAULT_ITERATIONS) -> list:
+    """
+    Time each encoder for each response
+    :param iterations: Encodes per response
+    :return: list of (case name, dict of encoder name to seconds per encode)
+    """
+    encoders = {"legacy": legacy_dumps, "json": serializer._get_dumps("json")}
+    if importlib.util.find_spec("orjson"):
+        encoders["orjson"] = serializer._get_dumps("orjson")
+    return [(name, {encoder: time_per_call(dumps, data, iterations) for encoder, dumps in encoders.items()})
+            for name, data in CASES]
+
+
+def main(iterations: int = DEFAULT_ITERATIONS):
+    results = run(iterations)
+    encoders = list(results[0][1])
+    print("{:<30}".format("response") + "".join("{:>14}".format(encoder + " (ms)") for encoder in encoders))
+    for name, timings in results:
+        print("{:<30}".format(name) + "".join("{:>14.2f}".format(timings[encoder] * 1e3) for encoder in encoders))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
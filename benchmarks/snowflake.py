@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot snowflake column benchmark
+Compares storing Discord snowflakes as VARCHAR(20), as DiscordSnowflake did before, against 64-bit integers, on a
+synthetic SQLite dataset of guilds and per-guild rows: bulk insert, database size, primary key lookups, a join on
+guild_id and reading rows back into python ints.
+
+Run with: python -m benchmarks.snowflake [rows]
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Libs
+import sqlalchemy.types as types
+from sqlalchemy import Column, MetaData, Table, VARCHAR, create_engine, func, select
+
+# Own modules
+from koala.models import DiscordSnowflake
+
+# Constants
+DEFAULT_ROWS = 1000000
+ROWS_PER_GUILD = 50
+LOOKUPS = 10000
+SEED = 2022
+EPOCH_SNOWFLAKE = 175928847299117063  # 2016, so every generated snowflake has 18 or more digits
+
+# Variables
+
+
+class LegacySnowflake(types.TypeDecorator):
+    """
+    The VARCHAR(20) DiscordSnowflake used before the BIGINT migration
+    """
+
+    impl = VARCHAR(20)
+
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return str(value) if value else None
+
+    def process_result_value(self, value, dialect):
+        return int(value) if value else None
+
+
+def make_tables(snowflake) -> tuple:
+    metadata = MetaData()
+    guilds = Table("Guilds", metadata, Column("guild_id", snowflake, primary_key=True))
+    members = Table("Members", metadata,
+                    Column("guild_id", snowflake, primary_key=True),
+                    Column("user_id", snowflake, primary_key=True),
+                    Column("role_id", snowflake))
+    return metadata, guilds, members
+
+
+def dataset(rows: int) -> tuple:
+    """
+    Guild IDs, and (guild_id, user_id, role_id) rows spread over them
+    """
+    rng = random.Random(SEED)
+    guild_ids = [EPOCH_SNOWFLAKE + rng.getrandbits(58) for _ in range(max(rows // ROWS_PER_GUILD, 1))]
+    members = [{"guild_id": guild_ids[i % len(guild_ids)], "user_id": EPOCH_SNOWFLAKE + rng.getrandbits(58),
+                "role_id": EPOCH_SNOWFLAKE + rng.getrandbits(58)} for i in range(rows)]
+    return guild_ids, members
+
+
+def timed(function) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run_case(snowflake, guild_ids: list, members: list, directory: str) -> tuple:
+    """
+    Time each operation against one snowflake column type
+    :return: dict of operation to seconds, and the database size in MB
+    """
+    path = os.path.join(directory, f"{type(snowflake).__name__}.db")
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    metadata, guilds, member_table = make_tables(snowflake)
+    metadata.create_all(engine)
+    rng = random.Random(SEED)
+    lookups = [rng.choice(members) for _ in range(LOOKUPS)]
+    results = {}
+
+    def insert():
+        with engine.begin() as conn:
+            conn.execute(guilds.insert(), [{"guild_id": guild_id} for guild_id in guild_ids])
+            conn.execute(member_table.insert(), members)
+
+    def lookup():
+        with engine.connect() as conn:
+            for member in lookups:
+                conn.execute(select(member_table.c.role_id)
+                             .where(member_table.c.guild_id == member["guild_id"],
+                                    member_table.c.user_id == member["user_id"])).scalar_one()
+
+    def join():
+        with engine.connect() as conn:
+            return conn.execute(select(func.count())
+                                .select_from(guilds.join(member_table,
+                                                         guilds.c.guild_id == member_table.c.guild_id))).scalar_one()
+
+    def read():
+        with engine.connect() as conn:
+            return sum(1 for _ in conn.execute(select(member_table)))
+
+    results["bulk insert"], _ = timed(insert)
+    results[f"{LOOKUPS // 1000}k pk lookups"], _ = timed(lookup)
+    results["join on guild_id"], _ = timed(join)
+    results["read all rows"], _ = timed(read)
+    engine.dispose()
+    return results, os.path.getsize(path) / 2 ** 20
+
+
+def run(rows: int = DEFAULT_ROWS) -> dict:
+    """
+    Time both snowflake column types on the same dataset
+    :param rows: The number of per-guild rows
+    :return: dict of column type name to (dict of operation to seconds, database size in MB)
+    """
+    guild_ids, members = dataset(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        return {"varchar(20)": run_case(LegacySnowflake(), guild_ids, members, directory),
+                "bigint": run_case(DiscordSnowflake(), guild_ids, members, directory)}
+
+
+def main(rows: int = DEFAULT_ROWS):
+    results = run(rows)
+    columns = list(results)
+    operations = list(results[columns[0]][0])
+    print("{:<24}".format(f"{rows} rows") + "".join("{:>16}".format(column + " (s)") for column in columns))
+    for operation in operations:
+        print("{:<24}".format(operation) +
+              "".join("{:>16.3f}".format(results[column][0][operation]) for column in columns))
+    print("{:<24}".format("database size (MB)") +
+          "".join("{:>16.1f}".format(results[column][1]) for column in columns))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot cache invalidation bus
+Carries the cache invalidations of each bot or API process to the others. A process would otherwise keep serving guild
+settings that another process has written. Each invalidation is a (namespace, guild_id) message.
+
+The database transport queues messages and appends them to the CacheInvalidations table in batches from a worker thread,
+so publishing never blocks the event loop. Every process polls that table for rows from other processes. The socket transport also sends messages over Unix datagram sockets to processes on the same host, so
+they arrive before the next poll.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import functools
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Libs
+from prometheus_client import Counter, Histogram
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine
+
+# Own modules
+from koala import cache, db
+from koala.env import CACHE_BUS_TRANSPORTS, CACHE_BUS_POLL_INTERVAL, CACHE_BUS_RETENTION, CACHE_BUS_SOCKET_DIR
+from koala.log import logger
+from koala.models import CacheInvalidations
+from koala.utils import to_thread
+
+# Constants
+POLL_BATCH = 1000
+# IDs are allocated before commit, so a poll can see a later ID before an earlier one is committed. Each poll reads
+# back over the last ID_LOOKBACK IDs, skipping the ones already delivered
+ID_LOOKBACK = 100
+PRUNE_EVERY = 60  # polls
+MAX_DATAGRAM = 4096
+
+# Variables
+bus_messages = Counter("koala_cache_bus_messages", "Cache invalidations sent to and received from other processes",
+                       ["transport", "direction"])
+bus_delay = Histogram("koala_cache_bus_delay_seconds", "Time from publishing a cache invalidation to receiving it",
+                      ["transport"], buckets=(.001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5, 10))
+
+Deliver = Callable[[str, str, int, int], None]  # origin, namespace, guild_id, created epoch ms
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Transport:
+    """
+    Carries invalidation messages between processes
+    """
+    name = "transport"
+
+    async def start(self, deliver: Deliver):
+        """
+        Start receiving messages
+
+        :param deliver: Called in the event loop with each message received, including messages from this process
+        """
+        raise NotImplementedError
+
+    def publish(self, origin: str, namespace: str, guild_id: int, created: int):
+        """
+        Send a message to the other processes without blocking. Called from the event loop or a worker thread.
+        """
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class DatabaseTransport(Transport):
+    """
+    Messages are rows of the CacheInvalidations table, polled by every process. Published messages are queued and
+    written in batches by a background task.
+    """
+    name = "database"
+
+    def __init__(self, engine: Engine, interval: float = CACHE_BUS_POLL_INTERVAL,
+                 retention: float = CACHE_BUS_RETENTION):
+        """
+        :param engine: The engine of the primary database
+        :param interval: The seconds between polls
+        :param retention: The seconds rows are kept for, before any process deletes them
+        """
+        self.engine = engine
+        self.interval = interval
+        self.retention = retention
+        self.last_id = 0
+        self._delivered: Dict[int, None] = {}
+        self._deliver: Optional[Deliver] = None
+        self._pending: Deque[Tuple[str, str, int, int]] = deque()
+        self._flush_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        # Only messages published from now on are received
+        await to_thread(self._skip_published)
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run(), name="cache-bus-database")
+        self._flush_task = self._loop.create_task(self._run_flush(), name="cache-bus-database-flush")
+
+    def _skip_published(self):
+        with self.engine.connect() as connection:
+            self.last_id = connection.execute(select(func.max(CacheInvalidations.id))).scalar() or 0
+            self._delivered = dict.fromkeys(connection.execute(
+                select(CacheInvalidations.id).where(CacheInvalidations.id > self.last_id - ID_LOOKBACK)).scalars())
+
+    def publish(self, origin: str, namespace: str, guild_id: int, created: int):
+        self._pending.append((origin, namespace, guild_id, created))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def flush(self) -> int:
+        """
+        Write the queued messages in one statement
+
+        :return: The number of messages written
+        """
+        # A flush cancelled by stop keeps running in its thread, the final flush waits for it
+        with self._flush_lock:
+            messages = []
+            while self._pending:
+                messages.append(self._pending.popleft())
+            if not messages:
+                return 0
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(insert(CacheInvalidations), [
+                        {"origin": origin, "namespace": namespace, "guild_id": guild_id, "created": created}
+                        for origin, namespace, guild_id, created in messages])
+            except Exception:
+                # Retried by the next flush
+                self._pending.extendleft(reversed(messages))
+                raise
+            return len(messages)
+
+    def poll(self) -> list:
+        """
+        Read the messages published since the last poll
+
+        :return: list of (origin, namespace, guild_id, created)
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(CacheInvalidations.id, CacheInvalidations.origin,
+                                             CacheInvalidations.namespace, CacheInvalidations.guild_id,
+                                             CacheInvalidations.created)
+                                      .where(CacheInvalidations.id > self.last_id - ID_LOOKBACK)
+                                      .order_by(CacheInvalidations.id)
+                                      .limit(POLL_BATCH)).all()
+        messages = []
+        for row in rows:
+            if row.id in self._delivered:
+                continue
+            self._delivered[row.id] = None
+            self.last_id = max(self.last_id, row.id)
+            messages.append((row.origin, row.namespace, row.guild_id, row.created))
+        for delivered in [delivered for delivered in self._delivered if delivered <= self.last_id - ID_LOOKBACK]:
+            del self._delivered[delivered]
+        return messages
+
+    def prune(self) -> int:
+        """
+        Delete the rows older than the retention
+
+        :return: The number of rows deleted
+        """
+        with self.engine.begin() as connection:
+            return connection.execute(delete(CacheInvalidations)
+                                      .where(CacheInvalidations.created < now_ms() - int(self.retention * 1000))
+                                      ).rowcount
+
+    async def _run_flush(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await to_thread(self.flush)
+            except Exception as err:
+                logger.error("Failed to publish cache invalidations: %s", err)
+
+    async def _run(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self._pending:
+                    await to_thread(self.flush)
+                messages = await to_thread(self.poll)
+                while messages:
+                    for message in messages:
+                        self._deliver(*message)
+                    messages = await to_thread(self.poll) if len(messages) >= POLL_BATCH else []
+                polls += 1
+                if polls % PRUNE_EVERY == 0:
+                    await to_thread(self.prune)
+            except Exception as err:
+                logger.error("Failed to poll cache invalidations: %s", err)
+
+    async def stop(self):
+        for task in (self._task, self._flush_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._flush_task = None
+        self._loop = None
+        try:
+            await to_thread(self.flush)
+        except Exception as err:
+            logger.error("Failed to publish %s cache invalidations: %s", len(self._pending), err)
+
+
+class SocketTransport(Transport):
+    """
+    Messages are datagrams sent to the Unix socket of every process in a directory, i.e. on the same host.
+    Messages to a process that is not reading fast enough are dropped, so it is used with the database transport.
+    """
+    name = "socket"
+
+    def __init__(self, directory: Path = CACHE_BUS_SOCKET_DIR):
+        """
+        :param directory: The directory of the process sockets, shared by the processes on a host
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("The socket cache bus transport needs Unix sockets")
+        self.directory = Path(directory)
+        self.path: Optional[Path] = None
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / "{pid}-{id}.sock".format(pid=os.getpid(), id=uuid.uuid4().hex[:8])
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(str(self.path))
+        self._receiver.setblocking(False)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._receiver.fileno(), self._read)
+
+    def _read(self):
+        while True:
+            try:
+                data = self._receiver.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                origin, namespace, guild_id, created = json.loads(data)
+            except ValueError:
+                logger.warning("Ignoring malformed cache invalidation datagram")
+                continue
+            self._deliver(origin, namespace, guild_id, created)
+
+    def publish(self, origin: str, namespace: str, guild_id: int, created: int):
+        if self._sender is None:
+            return
+        data = json.dumps([origin, namespace, guild_id, created]).encode()
+        for path in self.directory.glob("*.sock"):
+            if path == self.path:
+                continue
+            try:
+                self._sender.sendto(data, str(path))
+            except ConnectionRefusedError:
+                # The process stopped without removing its socket
+                path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            except BlockingIOError:
+                logger.warning("Dropped cache invalidation to %s, its socket buffer is full", path.name)
+
+    async def stop(self):
+        if self._receiver is not None:
+            asyncio.get_running_loop().remove_reader(self._receiver.fileno())
+            self._receiver.close()
+            self._sender.close()
+            self._receiver = self._sender = None
+            self.path.unlink(missing_ok=True)
+
+
+class InvalidationBus:
+    """
+    Publishes the invalidations of this process's caches, and applies the invalidations of other processes
+    """
+
+    def __init__(self, origin: str = db.LEASE_HOLDER):
+        """
+        :param origin: The identity of this process
+        """
+        self.origin = origin
+        self.transports: List[Transport] = []
+
+    async def start(self, transports: List[Transport]):
+        """
+        Start the transports, and publish the invalidations of every cache
+        """
+        for transport in transports:
+            await transport.start(functools.partial(self.deliver, transport.name))
+            self.transports.append(transport)
+        cache.publishers.append(self.publish)
+        logger.info("Cache invalidation bus started with transports %s",
+                    ", ".join(transport.name for transport in self.transports))
+
+    def publish(self, namespace: str, guild_id):
+        """
+        Send an invalidation to the other processes
+
+        :param namespace: The namespace e.g. text_filter.filtered_text
+        :param guild_id: Discord guild ID for a given server
+        """
+        created = now_ms()
+        for transport in self.transports:
+            try:
+                transport.publish(self.origin, namespace, int(guild_id), created)
+            except Exception as err:
+                logger.error("Failed to publish invalidation of %s %s over %s: %s", namespace, guild_id,
+                             transport.name, err)
+                continue
+            bus_messages.labels(transport=transport.name, direction="sent").inc()
+
+    def deliver(self, transport: str, origin: str, namespace: str, guild_id: int, created: int):
+        """
+        Apply an invalidation received by a transport, unless it was published by this process
+        """
+        if origin == self.origin:
+            return
+        bus_messages.labels(transport=transport, direction="received").inc()
+        bus_delay.labels(transport=transport).observe(max(0, now_ms() - created) / 1000)
+        # The next read of the guild must see the write, not a replica that has not caught up yet
+        db.note_guild_write(guild_id)
+        cache.receive(namespace, guild_id)
+
+    async def stop(self):
+        if self.publish in cache.publishers:
+            cache.publishers.remove(self.publish)
+        for transport in self.transports:
+            await transport.stop()
+        self.transports = []
+
+
+def create_transports(names: List[str] = CACHE_BUS_TRANSPORTS) -> List[Transport]:
+    """
+    Create the configured transports
+
+    :param names: The transport names, database and/or socket
+    :raises ValueError: An unknown transport name
+    """
+    factories = {DatabaseTransport.name: lambda: DatabaseTransport(db.engine),
+                 SocketTransport.name: lambda: SocketTransport()}
+    transports = []
+    for name in names:
+        if name not in factories:
+            raise ValueError(f"Unknown cache bus transport {name}, expected one of {', '.join(factories)}")
+        transports.append(factories[name]())
+    return transports
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot cache
+A bounded, least recently used cache for small, rarely changing database reads such as a guild's settings. Each key is
+loaded once, however many events ask for it at the same time, and kept until its time to live ends or a write method
+invalidates it. Invalidations are published to the other bot and API processes by koala.bus.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Libs
+from prometheus_client import Counter, Gauge
+
+# Own modules
+from koala.env import CACHE_TTL, CACHE_MAX_SIZE
+from koala.log import logger
+
+# Constants
+_MISSING = object()
+
+# Variables
+cache_requests = Counter("koala_cache_requests", "Lookups of a cache by result", ["cache", "result"])
+cache_size = Gauge("koala_cache_size", "Keys held by a cache", ["cache"])
+caches: Dict[str, "TTLCache"] = {}
+# Invalidate the local copy of a namespace's key, by namespace
+subscribers: Dict[str, Callable[[Hashable], None]] = {}
+# Send an invalidation to the other processes
+publishers: List[Callable[[str, Hashable], None]] = []
+
+
+class TTLCache:
+    """
+    A cache of loaded values by key, with a time to live and least recently used eviction.
+    Cached values are shared by every caller, so they must not be modified.
+    """
+
+    def __init__(self, name: str, ttl: float = CACHE_TTL, max_size: int = CACHE_MAX_SIZE):
+        """
+        :param name: The name of the cache, used in stats and metrics
+        :param ttl: The seconds a value is kept for
+        :param max_size: The number of keys kept, the least recently used are evicted first
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, threading.Event] = {}
+        self._async_loading: Dict[Hashable, asyncio.Future] = {}
+        # Invalidating bumps the version, so that a load started before a write does not cache what it read
+        self._version = 0
+        caches[name] = self
+        subscribers[name] = self.invalidate_local
+        cache_size.labels(cache=name).set_function(lambda: len(self._entries))
+
+    def get(self, key: Hashable, default=None):
+        """
+        Get a cached value, counting the lookup as a hit or a miss
+
+        :param key: The key e.g. a guild ID
+        :param default: Returned if the key is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                cache_requests.labels(cache=self.name, result="miss").inc()
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        cache_requests.labels(cache=self.name, result="hit").inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None):
+        """
+        Cache a value, evicting the least recently used keys over max_size
+
+        :param key: The key e.g. a guild ID
+        :param value: The value, which must not be modified after
+        :param ttl: The seconds to keep the value for, or None for the ttl of the cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _set_if_current(self, key: Hashable, value, version: int):
+        with self._lock:
+            if version == self._version:
+                self.set(key, value)
+
+    def invalidate(self, key: Hashable):
+        """
+        Remove a key in this and the other processes, so it is loaded again on next use. Call after committing a write
+        to the data of the key.
+
+        :param key: The key e.g. a guild ID
+        """
+        self.invalidate_local(key)
+        publish(self.name, key)
+
+    def invalidate_local(self, key: Hashable):
+        """
+        Remove a key in this process only, e.g. on receiving an invalidation from another process
+
+        :param key: The key e.g. a guild ID
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
+            self._async_loading.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all keys and reset the counters
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._loading.clear()
+            self._async_loading.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]):
+        """
+        Get a cached value, or load and cache it. Threads loading the same key at the same time wait for the first.
+
+        :param key: The key e.g. a guild ID
+        :param loader: Function returning the value of the key
+        :return: The value
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            with self._lock:
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    version = self._version
+                    break
+            loading.wait()
+        try:
+            value = loader()
+            self._set_if_current(key, value, version)
+            return value
+        finally:
+            with self._lock:
+                if self._loading.get(key) is loading:
+                    del self._loading[key]
+            loading.set()
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable]):
+        """
+        The asyncio version of get_or_load. Tasks loading the same key at the same time wait for the first.
+
+        :param key: The key e.g. a guild ID
+        :param loader: Coroutine function returning the value of the key
+        :return: The value
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            loading = self._async_loading.get(key)
+            if loading is None or loading.get_loop() is not loop:
+                break
+            try:
+                return await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                if not loading.cancelled():
+                    raise
+                # The task loading the key was cancelled, so load it again
+
+        loading = self._async_loading[key] = loop.create_future()
+        version = self._version
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except Exception as err:
+            loading.set_exception(err)
+            # Only the waiting tasks see the error
+            loading.exception()
+            raise
+        else:
+            self._set_if_current(key, value, version)
+            loading.set_result(value)
+            return value
+        finally:
+            if self._async_loading.get(key) is loading:
+                del self._async_loading[key]
+
+    def stats(self) -> dict:
+        """
+        Get the size and hit/miss counters of this cache
+
+        :return: dict of keys cached, hits, misses, evictions and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {"keys": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached(cache: TTLCache, key: Callable[..., Hashable]):
+    """
+    Cache the results of a function or coroutine function, loading each key once at a time
+
+    Example usage:
+      @cached(protected_roles_cache, key=lambda self, guild_id: guild_id)
+      def get_protected_roles(self, guild_id): ...
+
+    :param cache: The cache, which the write methods of the same data invalidate
+    :param key: Function of the arguments returning the cache key
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await cache.get_or_load_async(key(*args, **kwargs), lambda: func(*args, **kwargs))
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return cache.get_or_load(key(*args, **kwargs), lambda: func(*args, **kwargs))
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def stats() -> Dict[str, dict]:
+    """
+    The stats of every cache by name
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+def clear_all():
+    """
+    Clear every cache, e.g. after writing to the database outside of the cog DB managers
+    """
+    for cache in caches.values():
+        cache.clear()
+
+
+def subscribe(namespace: str, callback: Callable[[Hashable], None]):
+    """
+    Receive the invalidations of a namespace from other processes. Each TTLCache subscribes to its name.
+
+    :param namespace: The namespace e.g. extensions
+    :param callback: Called with the invalidated key e.g. a guild ID
+    """
+    subscribers[namespace] = callback
+
+
+def publish(namespace: str, key: Hashable):
+    """
+    Send an invalidation to the other processes, if koala.bus is running
+
+    :param namespace: The namespace e.g. text_filter.filtered_text
+    :param key: The invalidated key e.g. a guild ID
+    """
+    for publisher in publishers:
+        try:
+            publisher(namespace, key)
+        except Exception as err:
+            logger.error("Failed to publish invalidation of %s %s: %s", namespace, key, err)
+
+
+def receive(namespace: str, key: Hashable) -> bool:
+    """
+    Apply an invalidation from another process
+
+    :param namespace: The namespace e.g. text_filter.filtered_text
+    :param key: The invalidated key e.g. a guild ID
+    :return: False if this process has no subscriber for the namespace
+    """
+    callback = subscribers.get(namespace)
+    if callback is None:
+        return False
+    callback(key)
+    return True
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot Cluster
+Runs KoalaBot as CLUSTER_COUNT processes, each connecting a contiguous range of the SHARD_COUNT gateway shards.
+Every process serves the REST API on an internal port, and the API_CLUSTER process also serves API_PORT, forwarding
+requests for a guild to the process that owns its shard.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import json
+import os
+import signal
+import time
+from http.client import BAD_GATEWAY
+from typing import Callable, Dict, List, Optional
+
+# Libs
+import aiohttp
+from aiohttp import web
+
+# Own modules
+from koala.env import SHARD_COUNT, CLUSTER_COUNT, CLUSTER_ID, API_CLUSTER, CLUSTER_API_PORT, IS_CLUSTER_LAUNCHER
+from koala.log import logger
+
+# Constants
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+CLUSTER_HEADER = "X-Koala-Cluster"
+RESTART_DELAY = 5
+HOP_BY_HOP_HEADERS = {"connection", "content-length", "content-encoding", "host", "keep-alive",
+                      "transfer-encoding"}
+
+# Variables
+cluster_id = CLUSTER_ID
+cluster_count = CLUSTER_COUNT
+shard_count = SHARD_COUNT
+shard_ids: Optional[List[int]] = None
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def shard_ids_for(cluster: int, clusters: int, shards: int) -> List[int]:
+    """
+    The shards connected by a cluster, as contiguous ranges so that shards start in their identify buckets together
+    :param cluster: The cluster ID
+    :param clusters: The number of clusters
+    :param shards: The total number of shards
+    :return: list of shard IDs
+    """
+    return list(range(cluster * shards // clusters, (cluster + 1) * shards // clusters))
+
+
+def shard_of(guild_id: int, shards: int) -> int:
+    """
+    The shard that receives the events of a guild
+    """
+    return (int(guild_id) >> 22) % shards
+
+
+def cluster_of(guild_id: int) -> int:
+    """
+    The cluster that owns the shard of a guild
+    """
+    if not is_clustered():
+        return cluster_id
+    # The last cluster whose range starts at or before the shard, the inverse of shard_ids_for
+    return ((shard_of(guild_id, shard_count) + 1) * cluster_count - 1) // shard_count
+
+
+def configure(cluster: int = CLUSTER_ID, clusters: int = CLUSTER_COUNT, shards: Optional[int] = SHARD_COUNT):
+    """
+    Set the cluster of this process
+    :param cluster: The cluster ID
+    :param clusters: The number of clusters
+    :param shards: The total number of shards, or None to let discord.py use the recommended count
+    """
+    global cluster_id, cluster_count, shard_count, shard_ids
+    if not 0 <= cluster < clusters:
+        raise ValueError(f"Cluster {cluster} is not one of the {clusters} clusters")
+    cluster_id = cluster
+    cluster_count = clusters
+    shard_count = shards
+    shard_ids = shard_ids_for(cluster, clusters, shards) if shards else None
+
+
+def is_clustered() -> bool:
+    # The launcher only knows the shard count once it has asked Discord, and is not a cluster itself
+    return cluster_count > 1 and shard_count is not None
+
+
+def is_sharded() -> bool:
+    return shard_count is not None
+
+
+def serves_api() -> bool:
+    """
+    If this process serves the public REST API port
+    """
+    return cluster_id == API_CLUSTER
+
+
+def owns_guild(guild_id: int) -> bool:
+    """
+    If the shard of a guild is connected by this process
+    """
+    return not is_clustered() or cluster_of(guild_id) == cluster_id
+
+
+def internal_port(cluster: int) -> int:
+    return CLUSTER_API_PORT + cluster
+
+
+def get_channel(bot, channel_id: int, guild_id: Optional[int] = None):
+    """
+    Get a channel by ID. In cluster mode, the channels of guilds owned by other clusters are not cached by this process,
+    so they are returned as a PartialMessageable that can still send and fetch messages. A channel of a guild owned by
+    this cluster that is not cached has been deleted.
+    :param bot: The bot client
+    :param channel_id: The channel ID
+    :param guild_id: The guild ID of the channel, if known
+    :return: The channel, or None if it is not found
+    """
+    channel = bot.get_channel(int(channel_id))
+    if channel is None and guild_id is not None and not owns_guild(int(guild_id)):
+        channel = bot.get_partial_messageable(int(channel_id), guild_id=int(guild_id))
+    return channel
+
+
+async def _request_guild_id(request: web.Request) -> Optional[int]:
+    guild_id = request.query.get("guild_id")
+    if guild_id is None and request.method in request.POST_METHODS and request.body_exists:
+        try:
+            # The body is cached by aiohttp, so it can still be read by the handler
+            body = json.loads(await request.read())
+        except ValueError:
+            return None
+        guild_id = body.get("guild_id") if isinstance(body, dict) else None
+    try:
+        return int(guild_id)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _forward(request: web.Request, cluster: int) -> web.Response:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+    # CORS headers are added by this process, so the owning cluster does not see the Origin
+    headers = {name: value for name, value in request.headers.items()
+               if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "origin"}
+    headers[CLUSTER_HEADER] = str(cluster_id)
+    try:
+        async with _session.request(request.method, f"http://127.0.0.1:{internal_port(cluster)}{request.path_qs}",
+                                    headers=headers, data=await request.read()) as response:
+            return web.Response(status=response.status, body=await response.read(),
+                                headers={name: value for name, value in response.headers.items()
+                                         if name.lower() not in HOP_BY_HOP_HEADERS})
+    except aiohttp.ClientError as err:
+        logger.error("Cluster %s is unavailable for %s %s", cluster, request.method, request.path, exc_info=err)
+        return web.json_response({"error": "BAD_GATEWAY", "message": f"Cluster {cluster} is unavailable"},
+                                 status=BAD_GATEWAY)
+
+
+@web.middleware
+async def route_middleware(request: web.Request, handler):
+    """
+    Forward requests for a guild to the cluster that owns it, as only that cluster has the guild cached
+    """
+    if is_clustered() and CLUSTER_HEADER not in request.headers and request.method != "OPTIONS":
+        guild_id = await _request_guild_id(request)
+        if guild_id is not None and not owns_guild(guild_id):
+            return await _forward(request, cluster_of(guild_id))
+    return await handler(request)
+
+
+async def close():
+    """
+    Close the session used to forward requests
+    """
+    if _session is not None:
+        await _session.close()
+
+
+async def fetch_shard_count(token: str) -> int:
+    """
+    The number of shards recommended by Discord for the bot
+    :param token: The bot token
+    :return: The recommended shard count
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def _start(context, target: Callable[[], None], cluster: int, clusters: int, shards: int):
+    # Child processes are spawned, so they read their cluster from the environment inherited at start
+    os.environ.update(CLUSTER_ID=str(cluster), CLUSTER_COUNT=str(clusters), SHARD_COUNT=str(shards))
+    process = context.Process(target=target, name=f"KoalaBot-cluster-{cluster}", daemon=False)
+    process.start()
+    logger.info("Started cluster %s (pid %s) with shards %s", cluster, process.pid,
+                shard_ids_for(cluster, clusters, shards))
+    return process
+
+
+def launch(target: Callable[[], None], token: str, clusters: int = CLUSTER_COUNT,
+           shards: Optional[int] = SHARD_COUNT, launcher: bool = IS_CLUSTER_LAUNCHER):
+    """
+    Run the bot, in this process or as a supervised cluster of processes. Clusters that exit with an error are
+    restarted, and all clusters are stopped when this process is interrupted or terminated.
+    :param target: The picklable function that runs the bot in a process
+    :param token: The bot token, used to get the recommended shard count
+    :param clusters: The number of processes
+    :param shards: The total number of shards, or None for the recommended count
+    :param launcher: If this process launches the clusters, rather than being one
+    """
+    if not launcher:
+        target()
+        return
+
+    if not shards:
+        shards = asyncio.run(fetch_shard_count(token))
+    shards = max(shards, clusters)
+    logger.info("Launching %s clusters with %s shards", clusters, shards)
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, terminate)
+
+    import multiprocessing.connection
+
+    context = multiprocessing.get_context("spawn")
+    processes: Dict[int, multiprocessing.Process] = {cluster: _start(context, target, cluster, clusters, shards)
+                                                     for cluster in range(clusters)}
+    try:
+        while processes:
+            multiprocessing.connection.wait([process.sentinel for process in processes.values()])
+            for cluster, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode == 0:
+                    logger.info("Cluster %s stopped", cluster)
+                    del processes[cluster]
+                else:
+                    logger.error("Cluster %s exited with code %s, restarting in %ss",
+                                 cluster, process.exitcode, RESTART_DELAY)
+                    time.sleep(RESTART_DELAY)
+                    processes[cluster] = _start(context, target, cluster, clusters, shards)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+
+configure()
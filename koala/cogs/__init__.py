@@ -1,10 +1,25 @@
-from .announce import Announce
-from .base import BaseCog
-from .colour_role import ColourRole
-from .insights import Insights
-from .intro_cog import IntroCog
-from .react_for_role import ReactForRole
-from .text_filter import TextFilter
-from .twitch_alert import TwitchAlert
-from .verification import Verification
-from .voting import Voting
\ No newline at end of file
+"""
+The KoalaBot cogs. Cog classes are imported on first use, so that importing one cog does not import them all.
+"""
+# Built-in/Generic Imports
+import importlib
+
+# Constants
+COG_CLASSES = {
+    "Announce": "announce",
+    "BaseCog": "base",
+    "ColourRole": "colour_role",
+    "Insights": "insights",
+    "IntroCog": "intro_cog",
+    "ReactForRole": "react_for_role",
+    "TextFilter": "text_filter",
+    "TwitchAlert": "twitch_alert",
+    "Verification": "verification",
+    "Voting": "voting",
+}
+
+
+def __getattr__(name):
+    if name in COG_CLASSES:
+        return getattr(importlib.import_module("." + COG_CLASSES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,7 +10,8 @@ from discord.ext import commands
 import koalabot
 from koala.colours import KOALA_GREEN
 from koala.db import insert_extension
-from koala.utils import extract_id, wait_for_message
+from koala.members import member_cache
+from koala.utils import extract_id, wait_for_message, to_thread
 from .announce_message import AnnounceMessage
 from .db import AnnounceDBManager
 from .log import logger
@@ -42,9 +43,22 @@ class Announce(commands.Cog):
         self.bot = bot
         self.messages = {}
         self.roles = {}
-        insert_extension("Announce", 0, True, True)
         self.announce_database_manager = AnnounceDBManager()
 
+    async def cog_load(self):
+        """
+        Adds Announce to the extensions guilds can enable. The insert blocks, so it runs in the executor.
+        """
+        await to_thread(insert_extension, "Announce", 0, True, True)
+
+    async def cog_before_invoke(self, ctx: commands.Context):
+        """
+        Caches every member of the guild, as announcements count their receivers and are sent to them
+        :param ctx: The context of the bot
+        """
+        if ctx.guild is not None:
+            await member_cache.require(ctx.guild)
+
     def not_exceeded_limit(self, guild_id):
         """
         Check if enough days have passed for the user to use the announce function
@@ -266,17 +280,14 @@ class Announce(commands.Cog):
         if self.has_active_msg(ctx.guild.id):
             embed = self.construct_embed(ctx.guild)
             if self.roles[ctx.guild.id]:
-                for receiver in self.get_receivers(ctx.guild.id, ctx.guild.roles):
-                    try:
-                        await receiver.send(embed=embed)
-                    except (discord.Forbidden, AttributeError, discord.HTTPException) as e:
-                        logger.error(f'User {receiver.id} cannot recieve dms')
+                receivers = self.get_receivers(ctx.guild.id, ctx.guild.roles)
             else:
-                for receiver in ctx.guild.members:
-                    try:
-                        await receiver.send(embed=embed)
-                    except (discord.Forbidden, AttributeError, discord.HTTPException) as e:
-                        logger.error(f'User {receiver.id} cannot recieve dms')
+                receivers = ctx.guild.members
+
+            async def log_progress(report):
+                logger.info(f"Announcement for guild {ctx.guild.id}: {report}")
+
+            await koalabot.dm_group_message(receivers, embed=embed, progress=log_progress)
 
             self.messages.pop(ctx.guild.id)
             self.roles.pop(ctx.guild.id)
@@ -2,17 +2,22 @@
 from sqlalchemy import select
 
 # Own modules
-from koala.db import session_manager
+from koala.cache import TTLCache, cached
+from koala.db import session_manager, note_guild_write
 from .models import GuildUsage
 
 
 # Libs
 
+# Variables
+last_use_date_cache = TTLCache("announce.last_use_date")
+
 
 class AnnounceDBManager:
     """
     A class for interacting with the KoalaBot announcement database
     """
+    @cached(last_use_date_cache, key=lambda self, guild_id: int(guild_id))
     def get_last_use_date(self, guild_id: int):
         """
         Gets the last time when this function was used
@@ -42,3 +47,5 @@ class AnnounceDBManager:
             else:
                 guild_usage.last_message_epoch_time = last_time
             session.commit()
+        note_guild_write(guild_id)
+        last_use_date_cache.invalidate(int(guild_id))
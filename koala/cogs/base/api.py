@@ -27,6 +27,9 @@ ENABLE_EXTENSION_ENDPOINT = 'enable-extension'
 DISABLE_EXTENSION_ENDPOINT = 'disable-extension'
 EXTENSIONS_ENDPOINT = 'extensions'
 
+EXTENSIONS_CACHE_SCOPE = 'extensions'
+EXTENSIONS_CACHE_TTL = 30
+
 # Variables
 
 class BaseEndpoint:
@@ -130,7 +133,7 @@ class BaseEndpoint:
         """
         return core.get_version()
 
-    @parse_request
+    @parse_request(invalidates=EXTENSIONS_CACHE_SCOPE)
     async def post_load_cog(self, extension):
         """
         Loads a cog from the cogs folder
@@ -146,7 +149,7 @@ class BaseEndpoint:
         
         return {'message': 'Cog loaded'}
 
-    @parse_request
+    @parse_request(invalidates=EXTENSIONS_CACHE_SCOPE)
     async def post_unload_cog(self, extension):
         """
         Unloads a cog from the cogs folder
@@ -165,7 +168,7 @@ class BaseEndpoint:
         # else:
         return {'message': 'Cog unloaded'}
 
-    @parse_request
+    @parse_request(invalidates=EXTENSIONS_CACHE_SCOPE)
     async def post_enable_extension(self, guild_id, koala_ext):
         """
         Enables a koala extension
@@ -183,7 +186,7 @@ class BaseEndpoint:
         
         return {'message': 'Extension enabled'}
 
-    @parse_request
+    @parse_request(invalidates=EXTENSIONS_CACHE_SCOPE)
     async def post_disable_extension(self, guild_id, koala_ext):
         """
         Disables a koala extension onto a server
@@ -201,7 +204,7 @@ class BaseEndpoint:
         
         return {'message': 'Extension disabled'}
 
-    @parse_request
+    @parse_request(cache_ttl=EXTENSIONS_CACHE_TTL, cache_scope=EXTENSIONS_CACHE_SCOPE)
     async def get_extensions(self, guild_id):
         """
         Gets enabled koala extensions of a guild
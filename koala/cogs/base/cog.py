@@ -18,7 +18,9 @@ from discord.ext import commands, tasks
 from discord.ext.commands import BadArgument
 
 import koalabot
-from koala.utils import convert_iso_datetime
+from koala import cluster
+from koala.db import LeaderLease, leader_only, warm_extension_cache
+from koala.utils import convert_iso_datetime, to_thread
 from . import core
 from .log import logger
 from .utils import AUTO_UPDATE_ACTIVITY_DELAY
@@ -27,6 +29,8 @@ from .utils import AUTO_UPDATE_ACTIVITY_DELAY
 # Constants
 
 # Variables
+# Presence is per gateway connection, so each cluster has its own lease
+activity_lease = LeaderLease(f"update_activity:{cluster.cluster_id}")
 
 
 def convert_activity_type(argument):
@@ -70,12 +74,20 @@ class BaseCog(commands.Cog, name='KoalaBot'):
         Ran after all cogs have been started and bot is ready
         """
         core.activity_clear_current()
+        await activity_lease.start()
         await self.update_activity()
-        core.add_all_guilds(self.bot)
-        self.update_activity.start()
+        guild_ids = [guild.id for guild in self.bot.guilds]
+        await to_thread(core.sync_guilds, guild_ids)
+        warm_extension_cache(guild_ids)
+        if not self.update_activity.is_running():
+            self.update_activity.start()
         self.started = True
         logger.info("Bot is ready.")
 
+    async def cog_unload(self):
+        self.update_activity.cancel()
+        await activity_lease.stop()
+
 
 
     @commands.Cog.listener()
@@ -87,6 +99,15 @@ class BaseCog(commands.Cog, name='KoalaBot'):
         core.add_guild(guild.id)
         logger.info(f"KoalaBot joined new guild, id = {guild.id}, name = {guild.name}.")
 
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        """
+        On bot leaving guild, mark the guild as left, keeping its settings in case the bot rejoins.
+        :param guild: Guild KoalaBot just left
+        """
+        core.remove_guild(guild.id)
+        logger.info(f"KoalaBot left guild, id = {guild.id}.")
+
     @commands.group(name="activity")
     @commands.check(koalabot.is_owner)
     async def activity_group(self, ctx: commands.Context):
@@ -157,6 +178,7 @@ class BaseCog(commands.Cog, name='KoalaBot'):
         await ctx.send(result)
 
     @tasks.loop(minutes=AUTO_UPDATE_ACTIVITY_DELAY)
+    @leader_only(activity_lease)
     async def update_activity(self):
         """
         Loop for updating the activity of the bot according to scheduled activities
@@ -241,6 +263,25 @@ class BaseCog(commands.Cog, name='KoalaBot'):
         """
         await ctx.send(embed=await core.list_enabled_extensions(ctx.message.guild.id))
 
+    @commands.command(name="profile")
+    @commands.check(koalabot.is_owner)
+    async def profile(self, ctx, seconds: float = 10):
+        """
+        Profile the event loop of the process running this shard, for flamegraphs of slow listeners
+        :param ctx: Context of the command
+        :param seconds: The seconds to profile for
+        """
+        await ctx.send(f"Event loop profile of {seconds:g}s", files=await core.profile(seconds))
+
+    @commands.command(name="memory")
+    @commands.check(koalabot.is_owner)
+    async def memory(self, ctx):
+        """
+        Report the approximate memory held by each cache of the process running this shard
+        :param ctx: Context of the command
+        """
+        await ctx.send(core.memory_report(self.bot))
+
     @commands.command(name="version")
     @commands.check(koalabot.is_owner)
     async def version(self, ctx):
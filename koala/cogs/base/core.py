@@ -1,14 +1,18 @@
 import datetime
-from typing import List, Optional
+import io
+import time
+from typing import List, NamedTuple, Optional
 
 import discord
 from discord.ext.commands import Bot
-from sqlalchemy import select, exists
+from sqlalchemy import exists, insert, select, update
 from sqlalchemy.orm import Session
 
 import koalabot
+from koala import cluster
 from koala.db import assign_session, get_all_available_guild_extensions, get_enabled_guild_extensions, \
     give_guild_extension, remove_guild_extension
+from koala.instrumentation import memory, profiler
 from . import db
 from .log import logger
 from .models import ScheduledActivities
@@ -16,6 +20,7 @@ from .utils import DEFAULT_ACTIVITY, activity_eq, list_ext_embed
 from ...models import GuildExtensions, Guilds
 
 # Constants
+GUILD_SYNC_CHUNK = 500  # Below the 999 bound parameters allowed by older SQLite versions
 
 # Variables
 current_activity = None
@@ -227,6 +232,26 @@ async def get_available_extensions(guild_id, **kwargs):
     return get_all_available_guild_extensions(guild_id, **kwargs)
 
 
+async def profile(seconds: float) -> List[discord.File]:
+    """
+    Samples the event loop of this process
+    :param seconds: The seconds to profile for
+    :return: The collapsed stacks and the summary of the top functions as attachments
+    """
+    result = await profiler.profiler.profile(seconds)
+    return [discord.File(io.BytesIO(result.collapsed().encode()), filename=profiler.COLLAPSED_FILENAME),
+            discord.File(io.BytesIO(result.summary().encode()), filename=profiler.SUMMARY_FILENAME)]
+
+
+def memory_report(bot: Bot):
+    """
+    Returns the approximate memory held by each cache of this process
+    :param bot:
+    :return:
+    """
+    return f"```\n{memory.memory_report(bot)}\n```"
+
+
 def get_version():
     """
     Returns version of KoalaBot
@@ -235,19 +260,77 @@ def get_version():
     return "version: "+koalabot.__version__
 
 
+class GuildSync(NamedTuple):
+    guilds: int
+    added: int
+    rejoined: int
+    left: int
+    seconds: float
+
+
+def chunks(items: list, size: int = GUILD_SYNC_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
 @assign_session
-def add_all_guilds(bot: koalabot.KoalaBot, *, session: Session):
-    guilds = bot.guilds
-    for guild in guilds:
-        db_guild = session.execute(select(Guilds).where(Guilds.guild_id == guild.id)).one_or_none()
-        if db_guild is None:
-            session.add(Guilds(guild_id=guild.id, subscription=0))
+def sync_guilds(guild_ids: List[int], *, session: Session) -> GuildSync:
+    """
+    Register the guilds the bot is in with set-based statements: the known IDs are diffed against the table in chunks,
+    missing guilds are inserted in batches, and rows of guilds owned by this process that the bot is no longer in are
+    marked as left. Left guilds keep their rows, and the settings of every cog that cascade from them, until they rejoin.
+    :param guild_ids: The IDs of every guild the bot is in
+    :param session: The database session
+    :return: The counts of guilds added, rejoined and left, and the time taken
+    """
+    start = time.perf_counter()
+    known = sorted(set(guild_ids))
+    left_at = {}
+    for chunk in chunks(known):
+        left_at.update(session.execute(select(Guilds.guild_id, Guilds.left_at)
+                                       .where(Guilds.guild_id.in_(chunk))).all())
+    added = [guild_id for guild_id in known if guild_id not in left_at]
+    rejoined = [guild_id for guild_id, left in left_at.items() if left is not None]
+
+    for chunk in chunks(added):
+        session.execute(insert(Guilds), [{"guild_id": guild_id, "subscription": 0} for guild_id in chunk])
+    for chunk in chunks(rejoined):
+        session.execute(update(Guilds).where(Guilds.guild_id.in_(chunk)).values(left_at=None))
+
+    # Other clusters register the guilds of their own shards
+    known = set(known)
+    active = session.execute(select(Guilds.guild_id).where(Guilds.left_at.is_(None))).scalars().all()
+    left = [guild_id for guild_id in active if guild_id not in known and cluster.owns_guild(guild_id)]
+    now = datetime.datetime.utcnow()
+    for chunk in chunks(left):
+        session.execute(update(Guilds).where(Guilds.guild_id.in_(chunk)).values(left_at=now))
     session.commit()
 
+    result = GuildSync(len(known), len(added), len(rejoined), len(left), time.perf_counter() - start)
+    logger.info("Synced %s guilds in %.3fs: %s added, %s rejoined, %s left", result.guilds, result.seconds,
+                result.added, result.rejoined, result.left)
+    return result
+
+
+def add_all_guilds(bot: koalabot.KoalaBot, **kwargs) -> GuildSync:
+    return sync_guilds([guild.id for guild in bot.guilds], **kwargs)
+
 
 @assign_session
 def add_guild(guild_id: int, *, session: Session):
-    db_guild = session.execute(select(Guilds).where(Guilds.guild_id == guild_id)).one_or_none()
+    db_guild = session.execute(select(Guilds).where(Guilds.guild_id == guild_id)).scalars().one_or_none()
     if db_guild is None:
         session.add(Guilds(guild_id=guild_id, subscription=0))
-        session.commit()
+    elif db_guild.left_at is not None:
+        db_guild.left_at = None
+    session.commit()
+
+
+@assign_session
+def remove_guild(guild_id: int, *, session: Session):
+    """
+    Mark a guild as left, keeping its settings in case the bot rejoins
+    """
+    session.execute(update(Guilds).where(Guilds.guild_id == guild_id, Guilds.left_at.is_(None))
+                    .values(left_at=datetime.datetime.utcnow()))
+    session.commit()
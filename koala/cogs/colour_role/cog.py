@@ -19,6 +19,8 @@ from discord.ext import commands
 # Own modules
 import koalabot
 from koala.db import insert_extension
+from koala.members import member_cache
+from koala.utils import to_thread
 from .db import ColourRoleDBManager
 from .log import logger
 from .utils import COLOUR_ROLE_NAMING
@@ -72,9 +74,14 @@ class ColourRole(commands.Cog):
         :param bot: The bot client for this cog
         """
         self.bot = bot
-        insert_extension("ColourRole", 0, True, True)
         self.cr_database_manager = ColourRoleDBManager()
 
+    async def cog_load(self):
+        """
+        Adds ColourRole to the extensions guilds can enable, writing it from an executor thread
+        """
+        await to_thread(insert_extension, "ColourRole", 0, True, True)
+
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
         """
@@ -212,6 +219,7 @@ class ColourRole(commands.Cog):
         :param ctx: Context of the command
         """
         guild: discord.Guild = ctx.guild
+        await member_cache.require(guild)
         roles: List[discord.Role] = [role for role in guild.roles if
                                      re.match(COLOUR_ROLE_NAMING, role.name) and len(role.members) == 0]
         if not roles:
@@ -382,8 +390,8 @@ class ColourRole(commands.Cog):
             return True, None
         for protected_colour in protected_colours:
             colour_distance = ColourRole.get_rgb_colour_distance(custom_colour, protected_colour)
-            logger.info(
-                f"Colour distance between {hex(custom_colour.value)} and {hex(protected_colour.value)} is {colour_distance}.")
+            logger.debug("Colour distance between %#x and %#x is %s.", custom_colour.value, protected_colour.value,
+                         colour_distance)
             if colour_distance < 38.4:
                 return False, protected_colour
         return True, None
@@ -546,6 +554,7 @@ class ColourRole(commands.Cog):
         if not role:
             await ctx.send("Please specify a single valid role's mention, ID or name.")
         else:
+            await member_cache.require(ctx.guild)
             members: List[discord.Member] = role.members
             await self.prune_members_old_colour_roles(members)
             self.cr_database_manager.remove_colour_change_role_perms(ctx.guild.id, role.id)
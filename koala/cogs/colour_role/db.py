@@ -13,12 +13,22 @@ from typing import List, Optional
 from sqlalchemy import select, delete, and_
 
 # Own modules
-from koala.db import session_manager
+from koala.cache import TTLCache, cached
+from koala.db import session_manager, note_guild_write
 # Own modules
 from .models import GuildColourChangePermissions, GuildInvalidCustomColourRoles
 
 
 # Variables
+protected_colour_roles_cache = TTLCache("colour_role.protected_colour_roles")
+colour_change_roles_cache = TTLCache("colour_role.colour_change_roles")
+
+
+def guild_key(self, guild_id) -> int:
+    """
+    The cache key of the guild settings read by a ColourRoleDBManager method
+    """
+    return int(guild_id)
 
 
 class ColourRoleDBManager:
@@ -31,6 +41,8 @@ class ColourRoleDBManager:
             new = GuildColourChangePermissions(guild_id=guild_id, role_id=role_id)
             session.add(new)
             session.commit()
+        note_guild_write(guild_id)
+        colour_change_roles_cache.invalidate(int(guild_id))
 
     def remove_colour_change_role_perms(self, guild_id, role_id):
         with session_manager() as session:
@@ -40,12 +52,16 @@ class ColourRoleDBManager:
                     and_(GuildColourChangePermissions.guild_id == guild_id,
                          GuildColourChangePermissions.role_id == role_id)))
             session.commit()
+        note_guild_write(guild_id)
+        colour_change_roles_cache.invalidate(int(guild_id))
 
     def add_guild_protected_colour_role(self, guild_id, role_id):
         with session_manager() as session:
             new = GuildInvalidCustomColourRoles(guild_id=guild_id, role_id=role_id)
             session.add(new)
             session.commit()
+        note_guild_write(guild_id)
+        protected_colour_roles_cache.invalidate(int(guild_id))
 
     def remove_guild_protected_colour_role(self, guild_id, role_id):
         with session_manager() as session:
@@ -55,7 +71,10 @@ class ColourRoleDBManager:
                     and_(GuildInvalidCustomColourRoles.guild_id == guild_id,
                          GuildInvalidCustomColourRoles.role_id == role_id)))
             session.commit()
+        note_guild_write(guild_id)
+        protected_colour_roles_cache.invalidate(int(guild_id))
 
+    @cached(protected_colour_roles_cache, key=guild_key)
     def get_protected_colour_roles(self, guild_id) -> Optional[List[int]]:
         with session_manager() as session:
             colour_roles = session.execute(select(GuildInvalidCustomColourRoles)
@@ -65,6 +84,7 @@ class ColourRoleDBManager:
             else:
                 return []
 
+    @cached(colour_change_roles_cache, key=guild_key)
     def get_colour_change_roles(self, guild_id) -> Optional[List[int]]:
         with session_manager() as session:
             colour_roles = session.execute(select(GuildColourChangePermissions)
@@ -10,6 +10,7 @@ Koala Bot Insights Core Code
 # Libs
 
 # Own modules
+from koala.members import member_cache
 
 # Constants
 
@@ -23,7 +24,7 @@ def get_insights(bot):
     """
 
     message = f"Insights:\nThis bot is in a total of {len(bot.guilds)} servers.\nThere are a total " +\
-              f"of {sum([len(guild.members) for guild in bot.guilds])} members across these servers."
+              f"of {sum([member_cache.count(guild) for guild in bot.guilds])} members across these servers."
 
     return message
 
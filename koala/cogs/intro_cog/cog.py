@@ -17,6 +17,7 @@ from discord.ext import commands
 
 # Own modules
 import koalabot
+from koala.members import member_cache
 from .db import get_guild_welcome_message, update_guild_welcome_message, new_guild_welcome_message, \
     remove_guild_welcome_message
 from .log import logger
@@ -75,6 +76,7 @@ class IntroCog(commands.Cog, name="Intro"):
 
         :param ctx: Context of the command
         """
+        await member_cache.require(ctx.guild)
         non_bot_members = get_non_bot_members(ctx.guild)
 
         await ctx.send(f"This will DM {len(non_bot_members)} people. Are you sure you wish to do this? Y/N")
@@ -6,7 +6,8 @@
 from sqlalchemy import select, update
 
 # Own modules
-from koala.db import session_manager
+from koala.cache import TTLCache, cached
+from koala.db import session_manager, note_guild_write
 from .models import GuildWelcomeMessages
 from .utils import DEFAULT_WELCOME_MESSAGE, BASE_LEGAL_MESSAGE
 
@@ -14,8 +15,10 @@ from .utils import DEFAULT_WELCOME_MESSAGE, BASE_LEGAL_MESSAGE
 # Constants
 
 # Variables
+welcome_message_cache = TTLCache("intro_cog.welcome_message")
 
 
+@cached(welcome_message_cache, key=lambda guild_id: int(guild_id))
 def fetch_guild_welcome_message(guild_id):
     """
     Fetches the guild welcome message for a given guild
@@ -43,6 +46,8 @@ def update_guild_welcome_message(guild_id, new_message: str):
                         .where(GuildWelcomeMessages.guild_id == guild_id)
                         .values(welcome_message=new_message))
         session.commit()
+    note_guild_write(guild_id)
+    welcome_message_cache.invalidate(int(guild_id))
     return new_message
 
 
@@ -58,6 +63,8 @@ def remove_guild_welcome_message(guild_id):
         if welcome_message:
             session.delete(welcome_message)
             session.commit()
+            note_guild_write(guild_id)
+            welcome_message_cache.invalidate(int(guild_id))
             return 1
         return 0
 
@@ -72,6 +79,8 @@ def new_guild_welcome_message(guild_id):
     with session_manager() as session:
         session.add(GuildWelcomeMessages(guild_id=guild_id, welcome_message=DEFAULT_WELCOME_MESSAGE))
         session.commit()
+    note_guild_write(guild_id)
+    welcome_message_cache.invalidate(int(guild_id))
     return fetch_guild_welcome_message(guild_id)
 
 
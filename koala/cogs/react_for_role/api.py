@@ -8,10 +8,11 @@ from aiohttp import web
 from discord.ext.commands import Bot
 
 import koalabot
+from koala.rest import serializer
 from koala.rest.api import parse_request
 # Own modules
 from . import core
-from .dto import ReactRole
+from .dto import ReactRole, ReactMessage, RequiredRoles
 from .log import logger
 from ... import colours
 
@@ -21,6 +22,14 @@ RFR_ENDPOINT = 'react-for-role'
 MESSAGE = 'message'
 REQUIRED_ROLES = 'required-roles'
 
+RFR_CACHE_SCOPE = 'react_for_role'
+MESSAGE_CACHE_TTL = 10
+REQUIRED_ROLES_CACHE_TTL = 30
+
+# Variables
+for dto in (ReactRole, ReactMessage, RequiredRoles):
+    serializer.register_encoder(dto)
+
 
 class RfrEndpoint:
     _bot: koalabot.KoalaBot
@@ -46,7 +55,7 @@ class RfrEndpoint:
                         web.get('/{}'.format(REQUIRED_ROLES), self.get_required_roles)])
         return app
 
-    @parse_request
+    @parse_request(invalidates=RFR_CACHE_SCOPE)
     async def post_message(self,
                            guild_id: int,
                            channel_id: int,
@@ -84,7 +93,7 @@ class RfrEndpoint:
                                              inline=inline,
                                              roles=roles)
 
-    @parse_request
+    @parse_request(cache_ttl=MESSAGE_CACHE_TTL, cache_scope=RFR_CACHE_SCOPE)
     async def get_message(self,
                           message_id: int,
                           guild_id: int,
@@ -100,7 +109,7 @@ class RfrEndpoint:
         """
         return await core.get_rfr_message_dto(self._bot, message_id, guild_id, channel_id)
 
-    @parse_request
+    @parse_request(invalidates=RFR_CACHE_SCOPE)
     async def put_message(self,
                           message_id: int,
                           guild_id: int,
@@ -140,7 +149,7 @@ class RfrEndpoint:
                                              inline=inline,
                                              roles=roles)
 
-    @parse_request
+    @parse_request(invalidates=RFR_CACHE_SCOPE)
     async def patch_message(self,
                             message_id: int,
                             guild_id: int,
@@ -184,7 +193,7 @@ class RfrEndpoint:
                                              inline=inline,
                                              roles=roles)
 
-    @parse_request
+    @parse_request(invalidates=RFR_CACHE_SCOPE)
     async def delete_message(self,
                              message_id: int,
                              guild_id: int,
@@ -201,7 +210,7 @@ class RfrEndpoint:
         await core.delete_rfr_message(self._bot, message_id, guild_id, channel_id)
         return {"status": "DELETED",  "message_id": message_id}
 
-    @parse_request
+    @parse_request(invalidates=RFR_CACHE_SCOPE)
     async def put_required_roles(self,
                                  guild_id: int,
                                  role_ids: List[int] = None
@@ -216,7 +225,7 @@ class RfrEndpoint:
         core.edit_guild_rfr_required_roles(self._bot, guild_id, role_ids)
         return core.rfr_list_guild_required_roles(self._bot.get_guild(guild_id))
 
-    @parse_request
+    @parse_request(cache_ttl=REQUIRED_ROLES_CACHE_TTL, cache_scope=RFR_CACHE_SCOPE)
     async def get_required_roles(self, guild_id: int):
         """
         Get RFR required roles for a guild
@@ -14,19 +14,20 @@ from typing import *
 
 import aiohttp
 import discord
-import emoji
 from discord.ext import commands
 
 import koalabot
 from koala.colours import KOALA_GREEN
 from koala.db import insert_extension
-from koala.utils import wait_for_message
+from koala.members import member_cache
+from koala.utils import wait_for_message, to_thread
 # Own modules
 from . import core
-from .db import get_rfr_message, get_rfr_message_emoji_roles, get_guild_rfr_required_roles, get_guild_rfr_roles, \
-    get_guild_rfr_messages
+from .db import get_rfr_message, get_rfr_message_emoji_roles, get_rfr_message_async, get_guild_rfr_roles_async, \
+    get_guild_rfr_messages_async, get_guild_rfr_required_roles_async
 from .exception import ReactionException, ReactionErrorCode
 from .log import logger
+from .utils import emoji
 
 
 def rfr_is_enabled(ctx):
@@ -51,7 +52,13 @@ class ReactForRole(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        insert_extension("ReactForRole", 0, True, True)
+
+    async def cog_load(self):
+        """
+        Adds ReactForRole to the extensions guilds can enable. Its messages and roles are read when a reaction
+        arrives, so nothing else is loaded here.
+        """
+        await to_thread(insert_extension, "ReactForRole", 0, True, True)
 
     @commands.check(koalabot.is_guild_channel)
     @commands.check(koalabot.is_admin)
@@ -543,7 +550,7 @@ class ReactForRole(commands.Cog):
         :return:
         """
         if payload.guild_id is not None and not payload.member.bot:
-            rfr_message = get_rfr_message(payload.guild_id, payload.channel_id, payload.message_id)
+            rfr_message = await get_rfr_message_async(payload.guild_id, payload.channel_id, payload.message_id)
             if not rfr_message:
                 return
 
@@ -559,11 +566,11 @@ class ReactForRole(commands.Cog):
                 msg: discord.Message = await channel.fetch_message(payload.message_id)
                 await msg.remove_reaction(payload.emoji, payload.member)
             else:
-                if self.can_have_rfr_role(member_role[0]):
+                if await self.can_have_rfr_role(member_role[0]):
                     await member_role[0].add_roles(member_role[1])
                 else:
                     # Remove all rfr roles from member
-                    role_ids = get_guild_rfr_roles(payload.guild_id)
+                    role_ids = await get_guild_rfr_roles_async(payload.guild_id)
                     roles: List[discord.Role] = []
                     for role_id in role_ids:
                         role = discord.utils.get(member_role[0].guild.roles, id=role_id)
@@ -573,7 +580,7 @@ class ReactForRole(commands.Cog):
                     for role_to_remove in roles:
                         await member_role[0].remove_roles(role_to_remove)
                     # Remove members' reaction from all rfr messages in guild
-                    guild_rfr_messages = get_guild_rfr_messages(payload.guild_id)
+                    guild_rfr_messages = await get_guild_rfr_messages_async(payload.guild_id)
                     if not guild_rfr_messages:
                         logger.error(
                             f"ReactForRole: Guild RFR messages is empty on raw reaction add. Please check"
@@ -659,8 +666,7 @@ class ReactForRole(commands.Cog):
         """
 
         if payload.guild_id is not None:
-            rfr_message = get_rfr_message(payload.guild_id, payload.channel_id,
-                                                                    payload.message_id)
+            rfr_message = await get_rfr_message_async(payload.guild_id, payload.channel_id, payload.message_id)
             if not rfr_message:
                 return
             member_role = await self.get_role_member_info(payload.emoji, payload.guild_id,
@@ -670,13 +676,13 @@ class ReactForRole(commands.Cog):
                 return
             await member_role[0].remove_roles(member_role[1])
 
-    def can_have_rfr_role(self, member: discord.Member) -> bool:
+    async def can_have_rfr_role(self, member: discord.Member) -> bool:
         """
         check for rfr required roles, taking a member as argument
         :param member: Member to check rfr perms for
         :return: True if member has one of the required roles, or if there are no required roles. False otherwise
         """
-        required_roles: List[int] = get_guild_rfr_required_roles(member.guild.id)
+        required_roles: List[int] = await get_guild_rfr_required_roles_async(member.guild.id)
         if not required_roles or len(required_roles) == 0:
             return True
         return any(x in required_roles for x in [y.id for y in member.roles])
@@ -721,7 +727,7 @@ class ReactForRole(commands.Cog):
         """
 
         guild: discord.Guild = self.bot.get_guild(guild_id)
-        member: discord.Member = discord.utils.get(guild.members, id=user_id)
+        member: discord.Member = await member_cache.get_member(guild, user_id)
         if not member:
             raise ReactionException(ReactionErrorCode.UNKNOWN_MEMBER_REACTION, user_id, guild_id)
         channel: discord.TextChannel = discord.utils.get(guild.text_channels, id=channel_id)
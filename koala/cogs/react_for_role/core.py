@@ -1,7 +1,6 @@
 from typing import *
 
 import discord
-import emoji
 from discord.ext import commands
 from discord.ext.commands import Bot
 
@@ -11,7 +10,7 @@ from . import db
 from .db import get_rfr_message
 from .dto import ReactMessage, ReactRole, RequiredRoles
 from .log import logger
-from .utils import CUSTOM_EMOJI_REGEXP, UNICODE_EMOJI_REGEXP, FLAG_EMOJI_REGEXP
+from .utils import CUSTOM_EMOJI_REGEXP, FLAG_EMOJI_REGEXP, emoji, get_unicode_emoji_regexp
 
 # Constants
 
@@ -361,7 +360,7 @@ async def get_first_emoji_from_str(bot: Bot, guild: discord.Guild,
             return None, "Couldn't get the emoji you used - is it from this server or a server I'm in?"
 
     # Check for a unicode emoji in the string
-    search_result = UNICODE_EMOJI_REGEXP.search(content)
+    search_result = get_unicode_emoji_regexp().search(content)
     search_result_flag = FLAG_EMOJI_REGEXP.search(content)
     if search_result or search_result_flag:
        return content, None
@@ -7,12 +7,31 @@ import sqlalchemy.exc
 import sqlalchemy.orm
 from sqlalchemy import select, delete, and_
 
-from koala.db import assign_session
+from koala.cache import TTLCache, cached
+from koala.db import assign_session, assign_async_session
 # Own modules
-from koala.db import session_manager
+from koala.db import session_manager, guild_recently_written, note_guild_write
 from .log import logger
 from .models import GuildRFRMessages, RFRMessageEmojiRoles, GuildRFRRequiredRoles
 
+# Variables
+required_roles_cache = TTLCache("react_for_role.required_roles")
+
+
+def replica_readable(guild_id, *args, **kwargs) -> bool:
+    """
+    If the listener reads of a guild can use the read replica, i.e. its rfr settings were not just written
+    """
+    return not guild_recently_written(guild_id)
+
+
+def note_emoji_role_write(emoji_role_id: int, session: sqlalchemy.orm.Session):
+    """
+    Record a write to the emoji-role combos of an rfr message against its guild, see koala.db.note_guild_write
+    """
+    note_guild_write(session.execute(select(GuildRFRMessages.guild_id)
+                                     .filter_by(emoji_role_id=emoji_role_id)).scalar())
+
 
 @assign_session
 def add_rfr_message(guild_id: int, channel_id: int, message_id: int, session: sqlalchemy.orm.Session):
@@ -27,6 +46,7 @@ def add_rfr_message(guild_id: int, channel_id: int, message_id: int, session: sq
     session.add(
         GuildRFRMessages(guild_id=guild_id, channel_id=channel_id, message_id=message_id))
     session.commit()
+    note_guild_write(guild_id)
 
 
 @assign_session
@@ -41,6 +61,7 @@ def add_rfr_message_emoji_role(emoji_role_id: int, emoji_raw: str, role_id: int,
     try:
         session.add(RFRMessageEmojiRoles(emoji_role_id=emoji_role_id, emoji_raw=emoji_raw, role_id=role_id))
         session.commit()
+        note_emoji_role_write(emoji_role_id, session)
     except sqlalchemy.exc.IntegrityError:
         logger.warning("RFRMessageEmojiRoles already exists for <%s, %s, %s>, continuing",
                        emoji_role_id, emoji_raw, role_id)
@@ -73,6 +94,7 @@ def remove_rfr_message_emoji_role(emoji_role_id: int, emoji_raw: str = None, rol
             ))
     session.execute(delete_sql)
     session.commit()
+    note_emoji_role_write(emoji_role_id, session)
 
 
 @assign_session
@@ -87,6 +109,7 @@ def remove_rfr_message_emoji_roles(emoji_role_id: int, session: sqlalchemy.orm.S
 
     session.execute(delete_sql)
     session.commit()
+    note_emoji_role_write(emoji_role_id, session)
 
 
 @assign_session
@@ -111,6 +134,7 @@ def remove_rfr_message(guild_id: int, channel_id: int, message_id: int, session:
         GuildRFRMessages.message_id == message_id))
     session.execute(delete_sql)
     session.commit()
+    note_guild_write(guild_id)
 
 
 @assign_session
@@ -133,6 +157,27 @@ def get_rfr_message(guild_id: int, channel_id: int, message_id: int, session: sq
         return None
 
 
+@assign_async_session(readonly=replica_readable)
+async def get_rfr_message_async(guild_id: int, channel_id: int, message_id: int, *, session) -> Optional[
+    Tuple[int, int, int, int]]:
+    """
+    The asyncio version of get_rfr_message, for use in event listeners.
+    :param guild_id: Guild ID of the rfr message
+    :param channel_id: Channel ID of the rfr message
+    :param message_id: Message ID of the rfr message
+    :param session: asyncio database session
+    :return: RFR message info of the specific message if found, otherwise None.
+    """
+    message = (await session.execute(select(GuildRFRMessages)
+                                     .filter_by(guild_id=guild_id,
+                                                channel_id=channel_id,
+                                                message_id=message_id))).scalars().one_or_none()
+    if message:
+        return message.old_format()
+    else:
+        return None
+
+
 @assign_session
 def get_guild_rfr_messages(guild_id: int, session: sqlalchemy.orm.Session) -> List[Tuple[int, int, int]]:
     """
@@ -146,6 +191,20 @@ def get_guild_rfr_messages(guild_id: int, session: sqlalchemy.orm.Session) -> Li
             for message in messages]
 
 
+@assign_async_session(readonly=replica_readable)
+async def get_guild_rfr_messages_async(guild_id: int, *, session) -> List[Tuple[int, int, int, int]]:
+    """
+    The asyncio version of get_guild_rfr_messages, for use in event listeners.
+    :param guild_id: ID of the guild
+    :param session: asyncio database session
+    :return: List of rfr messages in the guild.
+    """
+    messages = (await session.execute(select(GuildRFRMessages)
+                                      .filter_by(guild_id=guild_id))).scalars().all()
+    return [message.old_format()
+            for message in messages]
+
+
 @assign_session
 def get_guild_rfr_roles(guild_id: int, *, session) -> List[int]:
     """
@@ -168,6 +227,22 @@ def get_guild_rfr_roles(guild_id: int, *, session) -> List[int]:
     return role_ids
 
 
+@assign_async_session(readonly=replica_readable)
+async def get_guild_rfr_roles_async(guild_id: int, *, session) -> List[int]:
+    """
+    The asyncio version of get_guild_rfr_roles, for use in event listeners.
+
+    :param guild_id: Guild ID to check in.
+    :param session: asyncio database session
+    :return: Role IDs of RFR roles in a specific guild
+    """
+    rows = (await session.execute(
+        select(RFRMessageEmojiRoles.role_id)
+        .join(GuildRFRMessages, RFRMessageEmojiRoles.emoji_role_id == GuildRFRMessages.emoji_role_id)
+        .where(GuildRFRMessages.guild_id == guild_id))).all()
+    return [row.role_id for row in rows]
+
+
 @assign_session
 def get_rfr_message_emoji_roles(emoji_role_id: int, *, session: sqlalchemy.orm.Session):
     """
@@ -227,6 +302,8 @@ def add_guild_rfr_required_role(guild_id: int, role_id: int, session: sqlalchemy
     """
     session.add(GuildRFRRequiredRoles(guild_id=guild_id, role_id=role_id))
     session.commit()
+    note_guild_write(guild_id)
+    required_roles_cache.invalidate(int(guild_id))
 
 
 @assign_session
@@ -239,8 +316,11 @@ def remove_guild_rfr_required_role(guild_id: int, role_id: int, session: sqlalch
     """
     session.execute(delete(GuildRFRRequiredRoles).filter_by(guild_id=guild_id, role_id=role_id))
     session.commit()
+    note_guild_write(guild_id)
+    required_roles_cache.invalidate(int(guild_id))
 
 
+@cached(required_roles_cache, key=lambda guild_id, **kwargs: int(guild_id))
 @assign_session
 def get_guild_rfr_required_roles(guild_id, session: sqlalchemy.orm.Session) -> List[int]:
     """
@@ -254,3 +334,16 @@ def get_guild_rfr_required_roles(guild_id, session: sqlalchemy.orm.Session) -> L
     if not role_ids:
         return []
     return role_ids
+
+
+@cached(required_roles_cache, key=lambda guild_id, **kwargs: int(guild_id))
+@assign_async_session(readonly=replica_readable)
+async def get_guild_rfr_required_roles_async(guild_id, *, session) -> List[int]:
+    """
+    The asyncio version of get_guild_rfr_required_roles, for use in event listeners.
+    :param guild_id: guild ID
+    :param session: asyncio database session
+    :return: List of role IDs
+    """
+    rows = (await session.execute(select(GuildRFRRequiredRoles).filter_by(guild_id=guild_id))).scalars().all()
+    return [x.role_id for x in rows]
@@ -10,11 +10,12 @@ Commented using reStructuredText (reST)
 
 # Built-in/Generic Imports
 import re
+from functools import lru_cache
 
-import emoji
 import flag
 
 # Own modules
+from koala.utils import lazy_import
 
 # Libs
 
@@ -22,6 +23,17 @@ import flag
 
 UNICODE_DISCORD_EMOJI_REGEXP: re.Pattern = re.compile(r"^:(\w+):$")
 CUSTOM_EMOJI_REGEXP: re.Pattern = re.compile(r"^<a?:(\w+):(\d+)>$")
-UNICODE_EMOJI_REGEXP: re.Pattern = re.compile(emoji.get_emoji_regexp())
 FLAG_EMOJI_REGEXP: re.Pattern = re.compile("([\U0001F1E6-\U0001F1FF]+)", flags=re.UNICODE)
 IMAGE_FORMATS = ("image/png", "image/jpeg", "image/gif")
+
+# Variables
+emoji = lazy_import("emoji")
+
+
+@lru_cache(maxsize=None)
+def get_unicode_emoji_regexp() -> re.Pattern:
+    """
+    The regex matching any unicode emoji, compiled on first use as it takes ~0.1s to build
+    :return: The compiled regex
+    """
+    return re.compile(emoji.get_emoji_regexp())
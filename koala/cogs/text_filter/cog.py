@@ -16,7 +16,7 @@ from discord.ext import commands
 import koalabot
 from koala.colours import KOALA_GREEN
 from koala.db import insert_extension
-from koala.utils import extract_id
+from koala.utils import extract_id, to_thread
 from .db import TextFilterDBManager
 from .utils import type_exists, build_word_list_embed, build_moderation_channel_embed, \
     create_default_embed, build_moderation_deleted_embed
@@ -45,9 +45,15 @@ class TextFilter(commands.Cog, name="TextFilter"):
 
     def __init__(self, bot):
         self.bot = bot
-        insert_extension("TextFilter", 0, True, True)
         self.tf_database_manager = TextFilterDBManager(bot)
 
+    async def cog_load(self):
+        """
+        Adds TextFilter to the extensions guilds can enable. Each guild's filtered words are read when its
+        messages are checked, so nothing else is loaded here.
+        """
+        await to_thread(insert_extension, "TextFilter", 0, True, True)
+
     @commands.command(name="filter", aliases=["filter_word"])
     @commands.check(koalabot.is_admin)
     @commands.check(text_filter_is_enabled)
@@ -125,7 +131,7 @@ class TextFilter(commands.Cog, name="TextFilter"):
         :param ctx: The discord context
         :return:
         """
-        all_words_and_types = self.get_list_of_words(ctx)
+        all_words_and_types = await self.get_list_of_words(ctx)
         await ctx.channel.send(embed=build_word_list_embed(ctx, all_words_and_types[0], all_words_and_types[1],
                                                            all_words_and_types[2]))
 
@@ -181,7 +187,7 @@ class TextFilter(commands.Cog, name="TextFilter"):
         :param ctx: The discord context
         :return:
         """
-        channels = self.tf_database_manager.get_mod_channel(ctx.guild.id)
+        channels = await self.tf_database_manager.get_mod_channel(ctx.guild.id)
         await ctx.channel.send(embed=self.build_channel_list_embed(ctx, channels))
 
     @commands.command(name="ignoreUser")
@@ -279,10 +285,10 @@ class TextFilter(commands.Cog, name="TextFilter"):
                 message.content.startswith(koalabot.OPT_COMMAND_PREFIX + "unfilter"):
             return
         elif str(message.channel.type) == 'text' and message.channel.guild is not None:
-            censor_list = self.tf_database_manager.get_filtered_text_for_guild(message.channel.guild.id)
+            censor_list = await self.tf_database_manager.get_filtered_text_for_guild(message.channel.guild.id)
             for word, filter_type, is_regex in censor_list:
                 if (word in message.content or (
-                        is_regex == '1' and re.search(word, message.content))) and not self.is_ignored(message):
+                        is_regex == '1' and re.search(word, message.content))) and not await self.is_ignored(message):
                     if filter_type == "risky":
                         await message.author.send("Watch your language! Your message: '*" + message.content + "*' in " +
                                                   message.channel.mention + " contains a 'risky' word. "
@@ -326,15 +332,15 @@ class TextFilter(commands.Cog, name="TextFilter"):
         embed = self.build_channel_list(channels, embed)
         return embed
 
-    def is_ignored(self, message):
+    async def is_ignored(self, message):
         """
         Checks if the user/channel should be ignored
 
         :param message: The newly received message
         :return boolean if should be ignored or not:
         """
-        ignore_list_users = self.tf_database_manager.get_ignore_list_users(message.guild.id)
-        ignore_list_channels = self.tf_database_manager.get_ignore_list_channels(message.guild.id)
+        ignore_list_users = await self.tf_database_manager.get_ignore_list_users(message.guild.id)
+        ignore_list_channels = await self.tf_database_manager.get_ignore_list_channels(message.guild.id)
         return message.channel.id in ignore_list_channels or message.author.id in ignore_list_users
 
     async def filter_text(self, ctx, text, filter_type, is_regex):
@@ -357,14 +363,14 @@ class TextFilter(commands.Cog, name="TextFilter"):
         """
         self.tf_database_manager.remove_filter_text(ctx.guild.id, word)
 
-    def is_moderation_channel_available(self, guild_id):
+    async def is_moderation_channel_available(self, guild_id):
         """
         Checks if any mod channels exist to be sent to
 
         :param guild_id: The guild to retrieve mod channels from
         :return: boolean true if mod channel exists, false otherwise
         """
-        channels = self.tf_database_manager.get_mod_channel(guild_id)
+        channels = await self.tf_database_manager.get_mod_channel(guild_id)
         return len(channels) > 0
 
     async def send_to_moderation_channels(self, message):
@@ -373,13 +379,12 @@ class TextFilter(commands.Cog, name="TextFilter"):
 
         :param message: The message in question which is being deleted
         """
-        if self.is_moderation_channel_available(message.guild.id):
-            channels = self.tf_database_manager.get_mod_channel(message.guild.id)
-            for each_channel in channels:
-                channel = self.bot.get_channel(int(each_channel[0]))
-                await channel.send(embed=build_moderation_deleted_embed(message))
+        channels = await self.tf_database_manager.get_mod_channel(message.guild.id)
+        for each_channel in channels:
+            channel = self.bot.get_channel(int(each_channel[0]))
+            await channel.send(embed=build_moderation_deleted_embed(message))
 
-    def get_list_of_words(self, ctx):
+    async def get_list_of_words(self, ctx):
         """
         Gets a list of filtered words and corresponding types in a guild
 
@@ -387,7 +392,7 @@ class TextFilter(commands.Cog, name="TextFilter"):
         :return [all_words, all_types]: a list containing two lists of filtered words and types
         """
         all_words, all_types, all_regex = "", "", ""
-        for word, filter_type, regex in self.tf_database_manager.get_filtered_text_for_guild(ctx.guild.id):
+        for word, filter_type, regex in await self.tf_database_manager.get_filtered_text_for_guild(ctx.guild.id):
             all_words += word + "\n"
             all_types += filter_type + "\n"
             all_regex += regex + "\n"
@@ -12,9 +12,28 @@ import discord
 from sqlalchemy import select, delete
 
 # Own modules
-from koala.db import session_manager
+from koala.cache import TTLCache, cached
+from koala.db import session_manager, async_session_manager, guild_recently_written, note_guild_write
 from .models import TextFilter, TextFilterModeration, TextFilterIgnoreList
 
+# Variables
+filtered_text_cache = TTLCache("text_filter.filtered_text")
+ignored_channels_cache = TTLCache("text_filter.ignored_channels")
+ignored_users_cache = TTLCache("text_filter.ignored_users")
+mod_channels_cache = TTLCache("text_filter.mod_channels")
+
+
+def guild_key(self, guild_id) -> int:
+    """
+    The cache key of the guild settings read by a TextFilterDBManager method
+    """
+    return int(guild_id)
+
+
+def invalidate_ignore_lists(guild_id):
+    ignored_channels_cache.invalidate(int(guild_id))
+    ignored_users_cache.invalidate(int(guild_id))
+
 
 class TextFilterDBManager:
     """
@@ -41,6 +60,8 @@ class TextFilterDBManager:
         with session_manager() as session:
             session.add(TextFilterModeration(channel_id=channel_id, guild_id=guild_id))
             session.commit()
+            note_guild_write(guild_id)
+            mod_channels_cache.invalidate(int(guild_id))
 
     def new_filtered_text(self, guild_id, filtered_text, filter_type, is_regex):
         """
@@ -61,6 +82,8 @@ class TextFilterDBManager:
                                        filter_type=filter_type,
                                        is_regex=is_regex))
                 session.commit()
+                note_guild_write(guild_id)
+                filtered_text_cache.invalidate(int(guild_id))
                 return
             raise Exception("Filtered word already exists")
 
@@ -77,6 +100,8 @@ class TextFilterDBManager:
             if self.does_word_exist(ft_id):
                 session.execute(delete(TextFilter).filter_by(filtered_text_id=ft_id))
                 session.commit()
+                note_guild_write(guild_id)
+                filtered_text_cache.invalidate(int(guild_id))
                 return
             raise Exception("Filtered word does not exist")
 
@@ -94,6 +119,8 @@ class TextFilterDBManager:
                 session.add(TextFilterIgnoreList(ignore_id=ignore_id, guild_id=guild_id,
                                                  ignore_type=ignore_type, ignore=ignore))
                 session.commit()
+                note_guild_write(guild_id)
+                invalidate_ignore_lists(guild_id)
                 return
             raise Exception("Ignore already exists")
 
@@ -109,42 +136,47 @@ class TextFilterDBManager:
             if self.does_ignore_exist(ignore_id):
                 session.execute(delete(TextFilterIgnoreList).filter_by(ignore_id=ignore_id))
                 session.commit()
+                note_guild_write(guild_id)
+                invalidate_ignore_lists(guild_id)
                 return
             raise Exception("Ignore does not exist")
 
-    def get_filtered_text_for_guild(self, guild_id):
+    @cached(filtered_text_cache, key=guild_key)
+    async def get_filtered_text_for_guild(self, guild_id):
         """
         Retrieves all filtered words for a specific guild and formats into a nice list of words
 
         :param guild_id: Guild ID to retrieve filtered words from:
         :return: list of filtered words
         """
-        with session_manager() as session:
-            rows = session.execute(select(TextFilter).filter_by(guild_id=guild_id)).scalars()
+        async with async_session_manager(readonly=not guild_recently_written(guild_id)) as session:
+            rows = (await session.execute(select(TextFilter).filter_by(guild_id=guild_id))).scalars()
             return [(row.filtered_text, row.filter_type, str(int(row.is_regex))) for row in rows]
 
-    def get_ignore_list_channels(self, guild_id):
+    @cached(ignored_channels_cache, key=guild_key)
+    async def get_ignore_list_channels(self, guild_id):
         """
         Get lists of ignored channels
 
         :param guild_id: The guild id to get the list from
         :return: list of ignored channels
         """
-        with session_manager() as session:
-            rows = session.execute(select(TextFilterIgnoreList.ignore)
-                                   .filter_by(guild_id=guild_id, ignore_type="channel")).all()
+        async with async_session_manager(readonly=not guild_recently_written(guild_id)) as session:
+            rows = (await session.execute(select(TextFilterIgnoreList.ignore)
+                                          .filter_by(guild_id=guild_id, ignore_type="channel"))).all()
             return [row[0] for row in rows]
 
-    def get_ignore_list_users(self, guild_id):
+    @cached(ignored_users_cache, key=guild_key)
+    async def get_ignore_list_users(self, guild_id):
         """
         Get lists of ignored users
 
         :param guild_id: The guild id to get the list from
         :return: list of ignored users
         """
-        with session_manager() as session:
-            rows = session.execute(select(TextFilterIgnoreList.ignore)
-                                   .filter_by(guild_id=guild_id, ignore_type="user")).all()
+        async with async_session_manager(readonly=not guild_recently_written(guild_id)) as session:
+            rows = (await session.execute(select(TextFilterIgnoreList.ignore)
+                                          .filter_by(guild_id=guild_id, ignore_type="user"))).all()
             return [row[0] for row in rows]
 
     def get_all_ignored(self, guild_id):
@@ -157,16 +189,17 @@ class TextFilterDBManager:
                                    .filter_by(guild_id=guild_id, ignore_type="user")).all()
             return rows
 
-    def get_mod_channel(self, guild_id):
+    @cached(mod_channels_cache, key=guild_key)
+    async def get_mod_channel(self, guild_id):
         """
         Gets specific mod channels given a guild id
 
         :param guild_id: Guild ID to retrieve mod channel from
         :return: list of mod channels
         """
-        with session_manager() as session:
-            rows = session.execute(select(TextFilterModeration.channel_id)
-                                   .filter_by(guild_id=guild_id)).all()
+        async with async_session_manager(readonly=not guild_recently_written(guild_id)) as session:
+            rows = (await session.execute(select(TextFilterModeration.channel_id)
+                                          .filter_by(guild_id=guild_id))).all()
             return rows
 
     def remove_mod_channel(self, guild_id, channel_id):
@@ -181,6 +214,8 @@ class TextFilterDBManager:
             session.execute(delete(TextFilterModeration)
                             .filter_by(guild_id=guild_id, channel_id=channel_id))
             session.commit()
+            note_guild_write(guild_id)
+            mod_channels_cache.invalidate(int(guild_id))
 
     def does_word_exist(self, ft_id):
         """
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, VARCHAR, BOOLEAN
+from sqlalchemy import Column, VARCHAR, BOOLEAN, Index
 
 from koala.models import mapper_registry, DiscordSnowflake
 
@@ -11,6 +11,7 @@ class TextFilter:
     filtered_text = Column(VARCHAR(100, collation="utf8mb4_unicode_520_ci"))
     filter_type = Column(VARCHAR(10))
     is_regex = Column(BOOLEAN)
+    __table_args__ = (Index("ix_TextFilter_guild_id", "guild_id"),)
 
     def __repr__(self):
         return "<TextFilter(%s, %s, %s, %s, %s)>" % \
@@ -22,6 +23,7 @@ class TextFilterModeration:
     __tablename__ = 'TextFilterModeration'
     channel_id = Column(DiscordSnowflake, primary_key=True)
     guild_id = Column(DiscordSnowflake)
+    __table_args__ = (Index("ix_TextFilterModeration_guild_id", "guild_id"),)
 
     def __repr__(self):
         return "<TextFilterModeration(%s, %s)>" % \
@@ -35,6 +37,7 @@ class TextFilterIgnoreList:
     guild_id = Column(DiscordSnowflake)
     ignore_type = Column(VARCHAR(10))
     ignore = Column(DiscordSnowflake)
+    __table_args__ = (Index("ix_TextFilterIgnoreList_guild_id_ignore_type", "guild_id", "ignore_type"),)
 
     def __repr__(self):
         return "<TextFilterIgnoreList(%s, %s, %s, %s)>" % \
@@ -10,12 +10,14 @@ from discord.ext import commands, tasks
 
 # Own modules
 import koalabot
+from koala import startup
 from koala.colours import KOALA_GREEN
-from koala.db import insert_extension
-from koala.utils import error_embed, is_channel_in_guild
+from koala.db import LeaderLease, insert_extension, leader_only
+from koala.errors import LeaseLostError
+from koala.utils import error_embed, is_channel_in_guild, to_thread
 from koalabot import COMMAND_PREFIX as CP
 from . import core
-from .db import TwitchAlertDBManager
+from .db import TwitchAlertDBManager, delete_invalid_accounts
 from .env import TWITCH_KEY, TWITCH_SECRET
 from .log import logger
 from .utils import DEFAULT_MESSAGE, TWITCH_USERNAME_REGEX, \
@@ -26,6 +28,7 @@ from .utils import DEFAULT_MESSAGE, TWITCH_USERNAME_REGEX, \
 
 
 # Variables
+twitch_lease = LeaderLease("twitch_alert")
 
 
 def twitch_is_enabled(ctx):
@@ -55,7 +58,6 @@ class TwitchAlert(commands.Cog):
         :param bot: The bot client for this cog
         """
         self.bot = bot
-        insert_extension("TwitchAlert", 0, True, True)
         self.ta_database_manager = TwitchAlertDBManager(bot)
         # self.ta_database_manager.translate_names_to_ids()
         self.loop_thread = None
@@ -63,6 +65,14 @@ class TwitchAlert(commands.Cog):
         self.running = False
         self.stop_loop = False
 
+    async def cog_load(self):
+        """
+        Adds TwitchAlert to the extensions guilds can enable, from an executor thread. Removing accounts with
+        invalid names is only cleanup, so it is deferred until the bot has connected.
+        """
+        await to_thread(insert_extension, "TwitchAlert", 0, True, True)
+        startup.defer(self.bot, "twitch_alert", lambda: to_thread(delete_invalid_accounts))
+
     @commands.check(koalabot.is_guild_channel)
     @commands.check(koalabot.is_admin)
     @commands.check(twitch_is_enabled)
@@ -396,6 +406,8 @@ class TwitchAlert(commands.Cog):
         :return:
         """
         await self.ta_database_manager.setup_twitch_handler()
+        # The loops alert every guild, so they only run in the process holding the lease
+        await twitch_lease.start()
         if not self.running:
             self.start_loops()
 
@@ -411,7 +423,12 @@ class TwitchAlert(commands.Cog):
         self.loop_check_live.cancel()
         self.running = False
 
+    async def cog_unload(self):
+        self.end_loops()
+        await twitch_lease.stop()
+
     @tasks.loop(minutes=LOOP_CHECK_LIVE_DELAY)
+    @leader_only(twitch_lease)
     async def loop_check_live(self):
         """
         A loop that continually checks the live status of users and
@@ -419,20 +436,28 @@ class TwitchAlert(commands.Cog):
         :return:
         """
         try:
-            await core.create_user_alerts(self.bot, self.ta_database_manager)
+            await core.create_user_alerts(self.bot, self.ta_database_manager, twitch_lease)
+        except LeaseLostError as err:
+            logger.warning("Stopped Twitch user alerts: %s" % err)
         except Exception as err:
             logger.error("Twitch user live loop error: ", exc_info=err)
 
     @tasks.loop(minutes=REFRESH_TEAMS_DELAY)
+    @leader_only(twitch_lease)
     async def loop_update_teams(self):
         start = time.time()
         # logger.info("TwitchAlert: Started Update Teams")
-        await self.ta_database_manager.update_all_teams_members()
+        try:
+            await self.ta_database_manager.update_all_teams_members(twitch_lease)
+        except LeaseLostError as err:
+            logger.warning("Stopped updating Twitch teams: %s" % err)
+            return
         time_diff = time.time() - start
         if time_diff > 5:
             logger.warning(f"TwitchAlert: Teams updated in > 5s | {time_diff}s")
 
     @tasks.loop(minutes=TEAMS_LOOP_CHECK_LIVE_DELAY)
+    @leader_only(twitch_lease)
     async def loop_check_team_live(self):
         """
         A loop to repeatedly send messages if a member of a team is live, and remove it when they are not
@@ -440,7 +465,9 @@ class TwitchAlert(commands.Cog):
         :return:
         """
         try:
-            await core.create_team_alerts(self.bot, self.ta_database_manager)
+            await core.create_team_alerts(self.bot, self.ta_database_manager, twitch_lease)
+        except LeaseLostError as err:
+            logger.warning("Stopped Twitch team alerts: %s" % err)
         except Exception as err:
             logger.error("Twitch team live loop error: ", exc_info=err)
 
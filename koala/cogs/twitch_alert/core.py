@@ -1,19 +1,25 @@
+from __future__ import annotations
+
 import time
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
 
 import discord
 from discord.ext.commands import Bot
 from sqlalchemy import select, func, or_, and_, null, update, delete
-from twitchAPI.object import Stream
 
-from koala.db import assign_session
+from koala import cluster
+from koala.db import LeaderLease, assign_async_session, async_session_manager
+from koala.errors import LeaseLostError
 from koala.models import GuildExtensions
 from .log import logger
 from .models import UserInTwitchTeam, TeamInTwitchAlert, TwitchAlerts, UserInTwitchAlert
 
+if TYPE_CHECKING:
+    from twitchAPI.object import Stream
+
 
-@assign_session
-async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
+@assign_async_session
+async def create_team_alerts(bot: Bot, ta_database_manager, lease: Optional[LeaderLease] = None, *, session):
     start = time.time()
 
     sql_select_team_users = select(func.distinct(UserInTwitchTeam.twitch_username)) \
@@ -21,7 +27,9 @@ async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
         .join(TwitchAlerts, TeamInTwitchAlert.channel_id == TwitchAlerts.channel_id) \
         .join(GuildExtensions, TwitchAlerts.guild_id == GuildExtensions.guild_id) \
         .where(or_(GuildExtensions.extension_id == 'TwitchAlert', GuildExtensions.extension_id == 'All'))
-    users = session.execute(sql_select_team_users).all()
+    # The scan can use the replica, the alert message IDs are read from the primary to not alert twice
+    async with async_session_manager(readonly=True) as replica_session:
+        users = (await replica_session.execute(sql_select_team_users)).all()
     # sql_select_team_users = "SELECT twitch_username, twitch_team_name " \
     #                         "FROM UserInTwitchTeam " \
     #                         "JOIN TeamInTwitchAlert TITA " \
@@ -54,7 +62,8 @@ async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
                                              UserInTwitchTeam.message_id,
                                              TeamInTwitchAlert.team_twitch_alert_id,
                                              TeamInTwitchAlert.custom_message,
-                                             TwitchAlerts.default_message) \
+                                             TwitchAlerts.default_message,
+                                             TwitchAlerts.guild_id) \
                     .join(TeamInTwitchAlert,
                           UserInTwitchTeam.team_twitch_alert_id == TeamInTwitchAlert.team_twitch_alert_id) \
                     .join(TwitchAlerts, TeamInTwitchAlert.channel_id == TwitchAlerts.channel_id) \
@@ -75,7 +84,7 @@ async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
                 #       WHERE extension_id = 'TwitchAlert' OR extension_id = 'All') GE ON TA.guild_id = GE.guild_id
                 # WHERE twitch_username = ?"""
 
-                results = session.execute(sql_find_message_id).all()
+                results = (await session.execute(sql_find_message_id)).all()
 
                 new_message_embed = None
 
@@ -85,7 +94,7 @@ async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
                     team_twitch_alert_id = result.team_twitch_alert_id
                     custom_message = result.custom_message
                     channel_default_message = result.default_message
-                    channel: discord.TextChannel = bot.get_channel(channel_id)
+                    channel: discord.TextChannel = cluster.get_channel(bot, channel_id, result.guild_id)
                     try:
                         # If no Alert is posted
                         if message_id is None:
@@ -98,32 +107,38 @@ async def create_team_alerts(bot: Bot, ta_database_manager, *, session):
                                 new_message_embed = await ta_database_manager.create_alert_embed(stream, message)
 
                             if new_message_embed is not None and channel is not None:
+                                if lease is not None:
+                                    await lease.verify_async(session)
                                 new_message = await channel.send(embed=new_message_embed)
 
                                 sql_update_message_id = update(UserInTwitchTeam) \
                                     .where(and_(UserInTwitchTeam.team_twitch_alert_id == team_twitch_alert_id,
                                                 UserInTwitchTeam.twitch_username == current_username)) \
                                     .values(message_id=new_message.id)
-                                session.execute(sql_update_message_id)
-                                session.commit()
+                                await session.execute(sql_update_message_id)
+                                await session.commit()
                     except discord.errors.Forbidden as err:
                         logger.warning(f"TwitchAlert: {err}  Name: {channel} ID: {channel.id}")
+                        if lease is not None:
+                            await lease.verify_async(session)
                         sql_remove_invalid_channel = delete(TwitchAlerts).where(
                             TwitchAlerts.channel_id == channel.id)
-                        session.execute(sql_remove_invalid_channel)
-                        session.commit()
+                        await session.execute(sql_remove_invalid_channel)
+                        await session.commit()
+        except LeaseLostError:
+            raise
         except Exception as err:
             logger.error(f"TwitchAlert: Team Loop error {err}")
 
     # Deals with remaining offline streams
-    await ta_database_manager.delete_all_offline_team_streams(usernames, session=session)
+    await ta_database_manager.delete_all_offline_team_streams(usernames, lease, session=session)
     time_diff = time.time() - start
     if time_diff > 5:
         logger.warning(f"TwitchAlert: Teams Loop Finished in > 5s | {time_diff}s")
 
 
-@assign_session
-async def create_user_alerts(bot: Bot, ta_database_manager, session):
+@assign_async_session
+async def create_user_alerts(bot: Bot, ta_database_manager, lease: Optional[LeaderLease] = None, *, session):
     start = time.time()
     # logger.info("TwitchAlert: User Loop Started")
     sql_find_users = select(func.distinct(UserInTwitchAlert.twitch_username)) \
@@ -135,7 +150,9 @@ async def create_user_alerts(bot: Bot, ta_database_manager, session):
     #              "JOIN TwitchAlerts TA on UserInTwitchAlert.channel_id = TA.channel_id " \
     #              "JOIN (SELECT extension_id, guild_id FROM GuildExtensions " \
     #              "WHERE extension_id = 'twitch_alert' OR extension_id = 'All') GE on TA.guild_id = GE.guild_id;"
-    users = session.execute(sql_find_users).all()
+    # The scan can use the replica, the alert message IDs are read from the primary to not alert twice
+    async with async_session_manager(readonly=True) as replica_session:
+        users = (await replica_session.execute(sql_find_users)).all()
 
     usernames = [str.lower(user[0]) for user in users]
 
@@ -159,7 +176,8 @@ async def create_user_alerts(bot: Bot, ta_database_manager, session):
                 sql_find_message_id = select(UserInTwitchAlert.channel_id,
                                              UserInTwitchAlert.message_id,
                                              UserInTwitchAlert.custom_message,
-                                             TwitchAlerts.default_message) \
+                                             TwitchAlerts.default_message,
+                                             TwitchAlerts.guild_id) \
                     .join(TwitchAlerts, UserInTwitchAlert.channel_id == TwitchAlerts.channel_id) \
                     .join(GuildExtensions, TwitchAlerts.guild_id == GuildExtensions.guild_id) \
                     .where(and_(and_(or_(GuildExtensions.extension_id == 'TwitchAlert',
@@ -174,7 +192,7 @@ async def create_user_alerts(bot: Bot, ta_database_manager, session):
                 # "  OR extension_id = 'All') GE on TA.guild_id = GE.guild_id " \
                 # "WHERE twitch_username = ?;"
 
-                results = session.execute(sql_find_message_id).all()
+                results = (await session.execute(sql_find_message_id)).all()
 
                 new_message_embed = None
 
@@ -184,7 +202,7 @@ async def create_user_alerts(bot: Bot, ta_database_manager, session):
                     custom_message = result.custom_message
                     channel_default_message = result.default_message
 
-                    channel = bot.get_channel(channel_id)
+                    channel = cluster.get_channel(bot, channel_id, result.guild_id)
                     try:
                         # If no Alert is posted
                         if message_id is None:
@@ -198,25 +216,31 @@ async def create_user_alerts(bot: Bot, ta_database_manager, session):
                                                                                                  message)
 
                             if new_message_embed is not None and channel is not None:
+                                if lease is not None:
+                                    await lease.verify_async(session)
                                 new_message = await channel.send(embed=new_message_embed)
                                 sql_update_message_id = update(UserInTwitchAlert).where(and_(
                                     UserInTwitchAlert.channel_id == channel_id,
                                     UserInTwitchAlert.twitch_username == current_username)) \
                                     .values(message_id=new_message.id)
-                                session.execute(sql_update_message_id)
-                                session.commit()
+                                await session.execute(sql_update_message_id)
+                                await session.commit()
                     except discord.errors.Forbidden as err:
                         logger.warning(f"TwitchAlert: {err}  Name: {channel} ID: {channel.id}")
+                        if lease is not None:
+                            await lease.verify_async(session)
                         sql_remove_invalid_channel = delete(TwitchAlerts).where(
                             TwitchAlerts.channel_id == channel.id)
-                        session.execute(sql_remove_invalid_channel)
-                        session.commit()
+                        await session.execute(sql_remove_invalid_channel)
+                        await session.commit()
 
+        except LeaseLostError:
+            raise
         except Exception as err:
             logger.error(f"TwitchAlert: User Loop error {err}")
 
     # Deals with remaining offline streams
-    await ta_database_manager.delete_all_offline_streams(usernames, session=session)
+    await ta_database_manager.delete_all_offline_streams(usernames, lease, session=session)
     time_diff = time.time() - start
     if time_diff > 5:
         logger.warning(f"TwitchAlert: User Loop Finished in > 5s | {time_diff}s")
@@ -1,22 +1,27 @@
 # Futures
+from __future__ import annotations
 
 # Built-in/Generic Imports
 import re
+from typing import Optional, TYPE_CHECKING
 
 # Libs
 import discord
 from sqlalchemy import select, delete, and_, null
 from sqlalchemy.orm import joinedload
-from twitchAPI.object import Stream
 
 # Own modules
-from koala.db import session_manager
+from koala import cluster
+from koala.db import LeaderLease, session_manager, async_session_manager
 from .env import TWITCH_KEY, TWITCH_SECRET
 from .log import logger
 from .models import TwitchAlerts, TeamInTwitchAlert, UserInTwitchTeam, UserInTwitchAlert
 from .twitch_handler import TwitchAPIHandler
 from .utils import DEFAULT_MESSAGE, TWITCH_USERNAME_REGEX, create_live_embed
 
+if TYPE_CHECKING:
+    from twitchAPI.object import Stream
+
 
 # Constants
 
@@ -72,7 +77,6 @@ class TwitchAlertDBManager:
         Initialises local variables
         :param bot_client:
         """
-        delete_invalid_accounts()
         self.bot = bot_client
 
     def new_ta(self, guild_id, channel_id, default_message=None, replace=False):
@@ -146,30 +150,35 @@ class TwitchAlertDBManager:
         :param twitch_username: The Twitch username of the user to be added
         :return:
         """
-        with session_manager() as session:
-            message = session.execute(select(UserInTwitchAlert)
-                                      .filter_by(twitch_username=twitch_username, channel_id=channel_id)
-                                      ).scalars().first()
+        async with async_session_manager() as session:
+            message = (await session.execute(select(UserInTwitchAlert)
+                                             .filter_by(twitch_username=twitch_username, channel_id=channel_id)
+                                             )).scalars().first()
             if message is not None:
                 await self.delete_message(message.message_id, channel_id, session=session)
-                session.delete(message)
-                session.commit()
+                await session.delete(message)
+                await session.commit()
 
-    async def delete_message(self, message_id, channel_id, *, session):
+    async def delete_message(self, message_id, channel_id, guild_id=None, lease: Optional[LeaderLease] = None, *,
+                             session):
         """
         Deletes a given discord message
         :param message_id: discord message ID of the message to delete
         :param channel_id: discord channel ID which has the message
-        :param session: db session
+        :param guild_id: discord guild ID of the channel, if known
+        :param lease: The lease to verify before deleting, when called from a loop that only runs on its leader
+        :param session: asyncio db session
         :return:
         """
         try:
-            channel = self.bot.get_channel(int(channel_id))
+            channel = cluster.get_channel(self.bot, int(channel_id), guild_id)
+            if lease is not None:
+                await lease.verify_async(session)
             if channel is None:
                 logger.warning(f"TwitchAlert: Channel ID {channel_id} does not exist, removing from database")
                 sql_remove_invalid_channel = delete(TwitchAlerts).where(TwitchAlerts.channel_id == channel_id)
-                session.execute(sql_remove_invalid_channel)
-                session.commit()
+                await session.execute(sql_remove_invalid_channel)
+                await session.commit()
                 return
             message = await channel.fetch_message(message_id)
             await message.delete()
@@ -178,8 +187,8 @@ class TwitchAlertDBManager:
         except discord.errors.Forbidden as err:
             logger.warning(f"TwitchAlert: {err}  Channel ID: {channel_id}")
             sql_remove_invalid_channel = delete(TwitchAlerts).where(TwitchAlerts.channel_id == channel_id)
-            session.execute(sql_remove_invalid_channel)
-            session.commit()
+            await session.execute(sql_remove_invalid_channel)
+            await session.commit()
 
     def get_users_in_ta(self, channel_id):
         """
@@ -229,109 +238,122 @@ class TwitchAlertDBManager:
         :param team_name: The team name of the team to be removed
         :return:
         """
-        with session_manager() as session:
-            team = session.execute(select(TeamInTwitchAlert)
-                                   .filter_by(twitch_team_name=team_name, channel_id=channel_id)
-                                   ).scalars().first()
+        async with async_session_manager() as session:
+            team = (await session.execute(select(TeamInTwitchAlert)
+                                          .filter_by(twitch_team_name=team_name, channel_id=channel_id)
+                                          )).scalars().first()
             if not team:
                 raise AttributeError("Team name not found")
 
-            users = session.execute(select(UserInTwitchTeam)
-                                    .filter_by(team_twitch_alert_id=team.team_twitch_alert_id)).scalars().all()
+            users = (await session.execute(select(UserInTwitchTeam)
+                                           .filter_by(team_twitch_alert_id=team.team_twitch_alert_id))).scalars().all()
             if users is not None:
                 for user in users:
                     if user.message_id is not None:
                         await self.delete_message(user.message_id, channel_id, session=session)
-                    session.delete(user)
+                    await session.delete(user)
 
-            session.delete(team)
-            session.commit()
+            await session.delete(team)
+            await session.commit()
 
-    async def update_team_members(self, twitch_team_id, team_name):
+    async def update_team_members(self, twitch_team_id, team_name, lease: Optional[LeaderLease] = None):
         """
         Users in a team are updated to ensure they are assigned to the correct team
         :param twitch_team_id: the team twitch alert id
         :param team_name: the name of the team
+        :param lease: The lease to verify before adding users, when called from a loop that only runs on its leader
         :return:
         """
         if re.search(TWITCH_USERNAME_REGEX, team_name):
             users = await self.twitch_handler.get_team_users(team_name)
-            for user_info in users:
-                with session_manager() as session:
-                    user = session.execute(
+            async with async_session_manager() as session:
+                for user_info in users:
+                    user = (await session.execute(
                         select(UserInTwitchTeam)
-                        .filter_by(team_twitch_alert_id=twitch_team_id, twitch_username=user_info.user_login))\
+                        .filter_by(team_twitch_alert_id=twitch_team_id, twitch_username=user_info.user_login)))\
                         .scalars()\
                         .one_or_none()
 
                     if user is None:
+                        if lease is not None:
+                            await lease.verify_async(session)
                         session.add(UserInTwitchTeam(
                             team_twitch_alert_id=twitch_team_id, twitch_username=user_info.user_login))
-                        session.commit()
+                        await session.commit()
 
-    async def update_all_teams_members(self):
+    async def update_all_teams_members(self, lease: Optional[LeaderLease] = None):
         """
         Updates all teams with the current team members
+        :param lease: The lease to verify before adding users, when called from a loop that only runs on its leader
         :return:
         """
-        with session_manager() as session:
-            teams_info = session.execute(select(TeamInTwitchAlert)).scalars().all()
+        async with async_session_manager(readonly=True) as session:
+            teams_info = (await session.execute(select(TeamInTwitchAlert))).scalars().all()
 
         for team_info in teams_info:
-            await self.update_team_members(team_info.team_twitch_alert_id, team_info.twitch_team_name)
+            await self.update_team_members(team_info.team_twitch_alert_id, team_info.twitch_team_name, lease)
 
-    async def delete_all_offline_team_streams(self, usernames, *, session):
+    async def delete_all_offline_team_streams(self, usernames, lease: Optional[LeaderLease] = None, *, session):
         """
         A method that deletes all currently offline streams
         :param usernames: The usernames of the team members
-        :param session: db session
+        :param lease: The lease to verify before each delete, when called from a loop that only runs on its leader
+        :param session: asyncio db session
         :return:
         """
-        results = session.execute(
+        results = (await session.execute(
             select(UserInTwitchTeam).where(
                 and_(
                     UserInTwitchTeam.message_id != null(),
                     UserInTwitchTeam.twitch_username.in_(usernames))
                 ).options(
-                    joinedload(UserInTwitchTeam.team)
+                    joinedload(UserInTwitchTeam.team).joinedload(TeamInTwitchAlert.twitch_alert)
                 )
-        ).scalars().all()
+        )).scalars().all()
 
         if not results:
             return
         logger.debug("Deleting offline streams: %s" % results)
         for result in results:
             if result.team:
-                await self.delete_message(result.message_id, result.team.channel_id, session=session)
+                twitch_alert = result.team.twitch_alert
+                await self.delete_message(result.message_id, result.team.channel_id,
+                                          twitch_alert.guild_id if twitch_alert else None, lease, session=session)
                 result.message_id = None
             else:
                 logger.debug("Result team not found: %s", result)
-                logger.debug("Existing teams: %s", session.execute(select(TeamInTwitchAlert)).scalars().all())
+                logger.debug("Existing teams: %s", (await session.execute(select(TeamInTwitchAlert))).scalars().all())
                 # session.delete(result)
-        session.commit()
+        await session.commit()
 
-    async def delete_all_offline_streams(self, usernames, *, session):
+    async def delete_all_offline_streams(self, usernames, lease: Optional[LeaderLease] = None, *, session):
         """
         A method that deletes all currently offline streams
         :param usernames: The usernames of the twitch members
-        :param session: db session
+        :param lease: The lease to verify before each delete, when called from a loop that only runs on its leader
+        :param session: asyncio db session
         :return:
         """
-        results = session.execute(
+        results = (await session.execute(
             select(
                 UserInTwitchAlert
             ).where(
                 and_(
                     UserInTwitchAlert.message_id != null(),
-                    UserInTwitchAlert.twitch_username.in_(usernames)))
-        ).scalars().all()
+                    UserInTwitchAlert.twitch_username.in_(usernames))
+            ).options(
+                joinedload(UserInTwitchAlert.twitch_alert)
+            )
+        )).scalars().all()
 
         if results is None:
             return
         for result in results:
-            await self.delete_message(result.message_id, result.channel_id, session=session)
+            await self.delete_message(result.message_id, result.channel_id,
+                                      result.twitch_alert.guild_id if result.twitch_alert else None, lease,
+                                      session=session)
             result.message_id = None
-        session.commit()
+        await session.commit()
 
     # def translate_names_to_ids(self):
     #     """
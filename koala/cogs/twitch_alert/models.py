@@ -1,4 +1,4 @@
-from sqlalchemy import Column, INT, VARCHAR, ForeignKey, orm
+from sqlalchemy import Column, INT, VARCHAR, ForeignKey, Index, orm
 
 from koala.models import mapper_registry, DiscordSnowflake
 
@@ -9,6 +9,7 @@ class TwitchAlerts:
     guild_id = Column(DiscordSnowflake, ForeignKey("Guilds.guild_id", ondelete='CASCADE'))
     channel_id = Column(DiscordSnowflake, primary_key=True)
     default_message = Column(VARCHAR(1000, collation="utf8mb4_unicode_520_ci"))
+    __table_args__ = (Index("ix_TwitchAlerts_guild_id", "guild_id"),)
 
     def __repr__(self):
         return "<TwitchAlerts(%s, %s, %s)>" % \
@@ -23,6 +24,7 @@ class UserInTwitchAlert:
     custom_message = Column(VARCHAR(1000, collation="utf8mb4_unicode_520_ci"), nullable=True)
     message_id = Column(DiscordSnowflake, nullable=True)
     twitch_alert = orm.relationship("TwitchAlerts")
+    __table_args__ = (Index("ix_UserInTwitchAlert_twitch_username_message_id", "twitch_username", "message_id"),)
 
     def __repr__(self):
         return "<UserInTwitchAlert(%s, %s, %s, %s)>" % \
@@ -37,6 +39,7 @@ class TeamInTwitchAlert:
     twitch_team_name = Column(VARCHAR(25))
     custom_message = Column(VARCHAR(1000, collation="utf8mb4_unicode_520_ci"), nullable=True)
     twitch_alert = orm.relationship("TwitchAlerts")
+    __table_args__ = (Index("ix_TeamInTwitchAlert_channel_id_twitch_team_name", "channel_id", "twitch_team_name"),)
 
     def __repr__(self):
         return "<TeamInTwitchAlert(%s, %s, %s, %s)>" % \
@@ -50,6 +53,7 @@ class UserInTwitchTeam:
     twitch_username = Column(VARCHAR(25), primary_key=True)
     message_id = Column(DiscordSnowflake, nullable=True)
     team = orm.relationship("TeamInTwitchAlert")
+    __table_args__ = (Index("ix_UserInTwitchTeam_twitch_username_message_id", "twitch_username", "message_id"),)
 
     def __repr__(self):
         return "<UserInTwitchTeam(%s, %s, %s)>" % \
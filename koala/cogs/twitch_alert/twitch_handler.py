@@ -1,15 +1,19 @@
 # Futures
-from typing import List
+from __future__ import annotations
+
+from typing import List, TYPE_CHECKING
 
-from twitchAPI.object import Stream, TwitchUser, Game, ChannelTeam
 # Libs
-from twitchAPI.twitch import Twitch
-from twitchAPI.types import TwitchAPIException
 
-from .log import logger
 # Own modules
+from koala.utils import lazy_import
+from .log import logger
 from .utils import split_to_100s
 
+if TYPE_CHECKING:
+    from twitchAPI.object import Stream, TwitchUser, Game, ChannelTeam
+    from twitchAPI.twitch import Twitch
+
 
 # Built-in/Generic Imports
 
@@ -17,6 +21,9 @@ from .utils import split_to_100s
 
 
 # Variables
+twitch_api = lazy_import("twitchAPI.twitch")
+twitch_types = lazy_import("twitchAPI.types")
+
 
 class TwitchAPIHandler:
     """
@@ -25,7 +32,7 @@ class TwitchAPIHandler:
     twitch: Twitch
 
     async def setup(self, client_id: str, client_secret: str):
-        self.twitch = await Twitch(client_id, client_secret)
+        self.twitch = await twitch_api.Twitch(client_id, client_secret)
 
     async def get_streams_data(self, usernames) -> List[Stream]:
         """
@@ -40,13 +47,13 @@ class TwitchAPIHandler:
             try:
                 async for stream in self.twitch.get_streams(user_login=batch):
                     batch_result.append(stream)
-            except TwitchAPIException:
+            except twitch_types.TwitchAPIException:
                 logger.error(f"Streams data not received for batch, invalid request")
                 for user in batch:
                     try:
                         async for stream in self.twitch.get_streams(user_login=user):
                             batch_result.append(stream)
-                    except TwitchAPIException:
+                    except twitch_types.TwitchAPIException:
                         logger.error("User data cannot be found, invalid request")
 
             result.extend(batch_result)
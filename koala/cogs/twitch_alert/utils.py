@@ -1,14 +1,18 @@
 # Futures
+from __future__ import annotations
 
 # Built-in/Generic Imports
+from typing import TYPE_CHECKING
 
 # Libs
 import discord
-from twitchAPI.object import Game, Stream, TwitchUser
 
 # Own modules
 from koala.colours import KOALA_GREEN
 
+if TYPE_CHECKING:
+    from twitchAPI.object import Game, Stream, TwitchUser
+
 # Constants
 DEFAULT_MESSAGE = ""
 TWITCH_ICON = "https://cdn3.iconfinder.com/data/icons/social-messaging-ui-color-shapes-2-free" \
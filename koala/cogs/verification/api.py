@@ -6,10 +6,11 @@ from typing import List
 from aiohttp import web
 from discord.ext.commands import Bot
 
+from koala.rest import serializer
 from koala.rest.api import parse_request
 # Own modules
 from . import core
-from .dto import VerifyRole
+from .dto import VerifyRole, VerifyConfig
 from .log import logger
 
 # Constants
@@ -17,7 +18,12 @@ VERIFY_ENDPOINT = 'verify'
 CONFIG_ENDPOINT = 'config'
 REVERIFY_ENDPOINT = 'reverify'
 
+CONFIG_CACHE_SCOPE = 'verify_config'
+CONFIG_CACHE_TTL = 30
+
 # Variables
+for dto in (VerifyRole, VerifyConfig):
+    serializer.register_encoder(dto)
 
 
 class VerifyEndpoint:
@@ -38,7 +44,7 @@ class VerifyEndpoint:
                         web.post('/{}'.format(REVERIFY_ENDPOINT), self.post_reverify)])
         return app
 
-    @parse_request
+    @parse_request(cache_ttl=CONFIG_CACHE_TTL, cache_scope=CONFIG_CACHE_SCOPE)
     async def get_verify_config(self, guild_id: int):
         """
         Get verify config for a given server
@@ -48,7 +54,7 @@ class VerifyEndpoint:
         guild_id = int(guild_id)
         return core.get_verify_config_dto(guild_id)
 
-    @parse_request
+    @parse_request(invalidates=CONFIG_CACHE_SCOPE)
     async def put_verify_config(self, guild_id: int, roles: List[dict]):
         """
         Set verify config for a given server
@@ -15,6 +15,8 @@ from discord.ext import commands
 # Own modules
 import koalabot
 from koala.db import insert_extension
+from koala.members import member_cache
+from koala.utils import to_thread
 from . import core, errors
 from .env import GMAIL_EMAIL, GMAIL_PASSWORD
 from .log import logger
@@ -45,7 +47,6 @@ class Verification(commands.Cog, name="Verify"):
     def __init__(self, bot):
         self.bot = bot
         self.on_ready_ran=False
-        insert_extension("Verify", 0, True, True)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -53,6 +54,12 @@ class Verification(commands.Cog, name="Verify"):
             self.on_ready_ran = True
             await core.assign_roles_on_startup(self.bot)
 
+    async def cog_load(self):
+        """
+        Adds Verify to the extensions guilds can enable, writing it from an executor thread
+        """
+        await to_thread(insert_extension, "Verify", 0, True, True)
+
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """
@@ -131,6 +138,7 @@ class Verification(commands.Cog, name="Verify"):
         :return:
         """
         embed = discord.Embed(title=f"Current verification blacklist for {ctx.guild.name}")
+        await member_cache.require(ctx.guild)
         blacklist_map = core.grouped_list_blacklist(ctx.guild.id, self.bot)
 
         for rd_suffix, rd_roles in blacklist_map.items():
@@ -27,6 +27,7 @@ from koala.env import DB_TYPE
 # Constants
 # Variables
 from koala.errors import InvalidArgumentError
+from koala.members import member_cache
 
 '''
 COMMANDS
@@ -115,6 +116,7 @@ async def re_verify_role(guild_id, role_id, bot: koalabot.KoalaBot, *, session:
     existing_reverify = session.execute(select(ToReVerify.u_id).filter_by(r_id=role_id)).scalars().all()
     guild = bot.get_guild(guild_id)
     role = guild.get_role(role_id)
+    await member_cache.require(guild)
     for member in role.members:
         await member.remove_roles(role)
         if member.id not in existing_reverify:
@@ -317,6 +319,7 @@ UTILS
 
 @assign_session
 async def assign_role_to_guild(guild, role, suffix, *, session):
+    await member_cache.require(guild)
     results = session.execute(select(VerifiedEmails.u_id).where(VerifiedEmails.email.endswith(suffix),
                                                                 VerifiedEmails.u_id.in_(
                                                                     [member.id for member in guild.members]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, VARCHAR, ForeignKey
+from sqlalchemy import Column, VARCHAR, ForeignKey, Index
 
 from koala.models import mapper_registry, DiscordSnowflake
 
@@ -8,6 +8,7 @@ class VerifiedEmails:
     __tablename__ = 'verified_emails'
     u_id = Column(DiscordSnowflake, primary_key=True)
     email = Column(VARCHAR(100, collation="utf8_bin"), primary_key=True)
+    __table_args__ = (Index("ix_verified_emails_email", "email"),)
 
     def __repr__(self):
         return "<verified_emails(%s, %s)>" % \
@@ -32,6 +33,7 @@ class Roles:
     s_id = Column(DiscordSnowflake, ForeignKey("Guilds.guild_id", ondelete='CASCADE'), primary_key=True)
     r_id = Column(DiscordSnowflake, primary_key=True)
     email_suffix = Column(VARCHAR(100), primary_key=True)
+    __table_args__ = (Index("ix_roles_r_id", "r_id"),)
 
     def __repr__(self):
         return "<roles(%s, %s, %s)>" % \
@@ -43,6 +45,7 @@ class ToReVerify:
     __tablename__ = 'to_re_verify'
     u_id = Column(DiscordSnowflake, primary_key=True)
     r_id = Column(DiscordSnowflake, primary_key=True)
+    __table_args__ = (Index("ix_to_re_verify_r_id", "r_id"),)
 
     def __repr__(self):
         return "<to_re_verify(%s, %s)>" % \
@@ -55,6 +58,7 @@ class VerifyBlacklist:
     user_id = Column(DiscordSnowflake, primary_key=True)
     role_id = Column(DiscordSnowflake, primary_key=True)
     email_suffix = Column(VARCHAR(100), primary_key=True)
+    __table_args__ = (Index("ix_VerifyBlacklist_role_id", "role_id"),)
 
     def __repr__(self):
         return "<VerifyBlacklist(%s, %s, %s)>" % \
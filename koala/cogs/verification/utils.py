@@ -2,10 +2,11 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-from bs4 import BeautifulSoup
-
 import koalabot
 from koala.cogs.verification.env import GMAIL_EMAIL, GMAIL_PASSWORD
+from koala.utils import lazy_import
+
+bs4 = lazy_import("bs4")
 
 
 def send_email(email, token):
@@ -21,7 +22,7 @@ def send_email(email, token):
     password = GMAIL_PASSWORD
 
     html = open("koala/cogs/verification/templates/emailtemplate.html").read()
-    soup = BeautifulSoup(html, features="html.parser")
+    soup = bs4.BeautifulSoup(html, features="html.parser")
     soup.find(id="confirmbuttonbody").string = f"{koalabot.COMMAND_PREFIX}confirm {token}"
     soup.find(id="backup").string = "Main body not loading? Send this command to the bot: " \
                                     f"{koalabot.COMMAND_PREFIX}confirm {token}"
@@ -15,7 +15,12 @@ from sqlalchemy import select, delete, update
 
 # Own modules
 import koalabot
-from koala.db import session_manager, insert_extension
+from koala import cluster
+from koala.db import LeaderLease, insert_extension, leader_only, session_manager
+from koala.dm import DMStatus, dm_dispatcher
+from koala.errors import LeaseLostError
+from koala.members import member_cache
+from koala.utils import to_thread
 from .db import VoteManager, get_results, create_embed, add_reactions
 from .log import logger
 from .models import Votes
@@ -26,6 +31,8 @@ from .utils import make_result_embed
 # Constants
 
 # Variables
+# Votes are closed by the cluster of their guild, so each cluster has its own lease
+vote_lease = LeaderLease(f"vote_end_loop:{cluster.cluster_id}")
 
 
 def currently_configuring():
@@ -75,13 +82,20 @@ class Voting(commands.Cog, name="Vote"):
         :param db_manager: a database manager (allows testing on a clean database)
         """
         self.bot = bot
-        insert_extension("Vote", 0, True, True)
         self.vote_manager = VoteManager()
-        self.vote_manager.load_from_db()
         self.running = False
 
+    async def cog_load(self):
+        """
+        Adds Vote to the extensions guilds can enable, then reads every stored vote with its options, roles and
+        sent messages into the vote manager. Both block on the database, so they run in the executor.
+        """
+        await to_thread(insert_extension, "Vote", 0, True, True)
+        await to_thread(self.vote_manager.load_from_db)
+
     @commands.Cog.listener()
     async def on_ready(self):
+        await vote_lease.start()
         if not self.running:
             self.vote_end_loop.start()
             self.running = True
@@ -89,8 +103,10 @@ class Voting(commands.Cog, name="Vote"):
     async def cog_unload(self):
         self.vote_end_loop.cancel()
         self.running = False
+        await vote_lease.stop()
 
     @tasks.loop(seconds=60.0)
+    @leader_only(vote_lease)
     async def vote_end_loop(self):
         try:
             with session_manager() as session:
@@ -98,7 +114,12 @@ class Voting(commands.Cog, name="Vote"):
                 votes = session.execute(select(Votes.vote_id, Votes.author_id, Votes.guild_id, Votes.title, Votes.end_time)
                                         .where(Votes.end_time < now)).all()
                 for v_id, a_id, g_id, title, end_time in votes:
+                    # Votes are closed by the cluster of their guild, which sent them and has their voters cached
+                    if not cluster.owns_guild(g_id):
+                        continue
                     if v_id in self.vote_manager.sent_votes.keys():
+                        # Results are only sent once, even if this process paused and lost the lease
+                        vote_lease.verify(session)
                         vote = self.vote_manager.get_vote_from_id(v_id)
                         results = await get_results(self.bot, vote)
                         embed = await make_result_embed(vote, results)
@@ -129,6 +150,8 @@ class Voting(commands.Cog, name="Vote"):
                             session.execute(update(Votes).filter_by(vote_id=vote.id).values(end_time=time.time() + 86400))
                             session.commit()
                             logger.error(f"error in vote loop: {e}")
+        except LeaseLostError as e:
+            logger.warning("Stopped closing votes: %s" % e)
         except Exception as e:
             logger.error("Exception in outer vote loop: %s" % e, exc_info=e)
 
@@ -370,7 +393,7 @@ class Voting(commands.Cog, name="Vote"):
         self.vote_manager.configuring_votes.pop(ctx.author.id)
         self.vote_manager.sent_votes[vote.id] = vote
 
-        users = [x for x in ctx.guild.members if not x.bot]
+        users = [x for x in await member_cache.require(ctx.guild) if not x.bot]
         if vote.target_voice_channel:
             vc_users = discord.utils.get(ctx.guild.voice_channels, id=vote.target_voice_channel).members
             users = list(set(vc_users) & set(users))
@@ -381,13 +404,22 @@ class Voting(commands.Cog, name="Vote"):
                 role_users += role.members
             role_users = list(dict.fromkeys(role_users))
             users = list(set(role_users) & set(users))
-        for user in users:
-            try:
-                msg = await user.send(f"You have been asked to participate in this vote from {ctx.guild.name}.\nPlease react to make your choice (You can change your mind until the vote is closed)", embed=create_embed(vote))
-                vote.register_sent(user.id, msg.id)
-                await add_reactions(vote, msg)
-            except discord.Forbidden:
-                logger.error(f"tried to send vote to user {user.id} but direct messages are turned off.")
+        embed = create_embed(vote)
+
+        async def send(user):
+            return await user.send(f"You have been asked to participate in this vote from {ctx.guild.name}.\nPlease react to make your choice (You can change your mind until the vote is closed)", embed=embed)
+
+        # The dispatcher retries send when rate limited, so the vote is only registered and reacted to once sent
+        report = await dm_dispatcher.send(users, send)
+        for result in report.results:
+            if result.status == DMStatus.SENT:
+                vote.register_sent(result.recipient.id, result.message.id)
+                try:
+                    await add_reactions(vote, result.message)
+                except discord.HTTPException as e:
+                    logger.error(f"failed to add vote reactions for user {result.recipient.id}: {e}")
+            elif result.status == DMStatus.DMS_CLOSED:
+                logger.error(f"tried to send vote to user {result.recipient.id} but direct messages are turned off.")
         await ctx.send(f"Sent vote to {len(users)} users")
 
     @commands.check(vote_is_enabled)
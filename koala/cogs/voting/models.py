@@ -1,4 +1,4 @@
-from sqlalchemy import Column, VARCHAR, FLOAT
+from sqlalchemy import Column, VARCHAR, FLOAT, Index
 
 from koala.models import mapper_registry, DiscordSnowflake
 
@@ -17,6 +17,8 @@ class Votes:
     chair_id = Column(DiscordSnowflake, nullable=True)
     voice_id = Column(DiscordSnowflake, nullable=True)
     end_time = Column(FLOAT, nullable=True)
+    __table_args__ = (Index("ix_Votes_end_time", "end_time"),
+                      Index("ix_Votes_author_id_guild_id", "author_id", "guild_id"))
 
     def __repr__(self):
         return "<Votes(%s, %s, %s, %s, %s, %s, %s)>" % \
@@ -41,6 +43,7 @@ class VoteOptions:
     opt_id = Column(DiscordSnowflake, primary_key=True)
     option_title = Column(VARCHAR(150, collation="utf8mb4_unicode_520_ci"))
     option_desc = Column(VARCHAR(150, collation="utf8mb4_unicode_520_ci"))
+    __table_args__ = (Index("ix_VoteOptions_opt_id", "opt_id"),)
 
     def __repr__(self):
         return "<VoteOptions(%s, %s, %s, %s)>" % \
@@ -53,6 +56,7 @@ class VoteSent:
     vote_id = Column(DiscordSnowflake, primary_key=True)
     vote_receiver_id = Column(DiscordSnowflake, primary_key=True)
     vote_receiver_message = Column(DiscordSnowflake)
+    __table_args__ = (Index("ix_VoteSent_vote_receiver_message", "vote_receiver_message"),)
 
     def __repr__(self):
         return "<VoteSent(%s, %s, %s)>" % \
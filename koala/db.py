@@ -5,65 +5,253 @@ new Koala Bot database manager
 
 Commented using reStructuredText (reST)
 """
-import random
-import traceback
 # Futures
 
 # Built-in/Generic Imports
+import asyncio
+import os
+import socket
+import time
+import uuid
 # Libs
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
 from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
 
-from sqlalchemy import select, delete, and_, create_engine, VARCHAR
+from sqlalchemy import select, delete, update, and_, or_, create_engine, event, VARCHAR
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.util import await_only
 
-from koala.env import DB_URL, DB_TYPE
+from koala import cache
+from koala.env import DB_URL, DB_TYPE, LEASE_TTL, DB_REPLICA_URL
+from koala.errors import LeaseLostError
 from koala.log import logger
-from koala.models import mapper_registry, KoalaExtensions, GuildExtensions
+from koala.models import mapper_registry, KoalaExtensions, GuildExtensions, Leases
+from koala.pool import PoolMonitor, ReplicaMonitor, engine_options, pool_sessions
 # Own modules
 from .enums import DatabaseType
 
 # Constants
+EXTENSION_CACHE_WARM_CHUNK_SIZE = 500
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+RECENT_WRITES_MAX_SIZE = 10000
 
 # Variables
-pool_count = 0
-
-if not DB_URL or DB_TYPE == DatabaseType.SQLITE:
-    engine = create_engine(DB_URL, future=True)
-else:
-    engine = create_engine(DB_URL, future=True, pool_size=10, max_overflow=20)
+engine = create_engine(DB_URL, future=True, **engine_options(make_url(DB_URL), "sync"))
+pool_monitor = PoolMonitor(engine, "sync")
 Session = sessionmaker(future=True)
 Session.configure(bind=engine)
 
 
-def assign_session(func):
+def __create_aiosqlite_engine(url: URL, dbapi_module, connect: Callable, name: str = "async") -> AsyncEngine:
+    """
+    Creates an asyncio engine for sqlite, using a blocking sqlite3 compatible connect function.
+    aiosqlite runs the connection in its own thread, which lets drivers without an asyncio version (pysqlcipher)
+    be used by the asyncio engine.
+
+    :param url: The sqlite database url
+    :param dbapi_module: The sqlite3 compatible dbapi module (e.g. sqlite3 or pysqlcipher3.dbapi2)
+    :param connect: Function to open a new connection to the database
+    :param name: The name of the connection pool
+    :return: The asyncio engine
+    """
+    import aiosqlite
+    from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_connection, AsyncAdapt_aiosqlite_dbapi
+
+    dbapi = AsyncAdapt_aiosqlite_dbapi(dbapi_module, dbapi_module)
+
+    def creator():
+        connection = aiosqlite.Connection(connect, iter_chunk_size=64)
+        connection.daemon = True
+        return AsyncAdapt_aiosqlite_connection(dbapi, await_only(connection))
+
+    url = url.set(drivername=ASYNC_DRIVERS["sqlite"], username=None, password=None)
+    return create_async_engine(url, future=True, module=dbapi, creator=creator,
+                               **engine_options(url, name, is_async=True))
+
+
+def __create_async_engine(db_url, name: str = "async") -> AsyncEngine:
+    """
+    Creates the asyncio engine matching the blocking engine for the given database url
+
+    :param db_url: The database url of the blocking engine
+    :param name: The name of the connection pool
+    :return: The asyncio engine
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.get_driver_name() == "pysqlcipher":
+        from pysqlcipher3 import dbapi2 as sqlcipher
+
+        def connect():
+            connection = sqlcipher.connect(url.database, check_same_thread=False)
+            connection.execute('pragma key="%s"' % url.password)
+            return connection
+
+        return __create_aiosqlite_engine(url, sqlcipher, connect, name)
+
+    url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+    return create_async_engine(url, future=True, **engine_options(url, name, is_async=True))
+
 
-    @wraps(func)
-    def with_session(*args, **kwargs):
-        if not kwargs.get("session"):
-            with session_manager() as session:
-                kwargs["session"] = session
+async_engine = __create_async_engine(DB_URL)
+async_pool_monitor = PoolMonitor(async_engine.sync_engine, "async")
+AsyncSession = sessionmaker(class_=_AsyncSession, future=True, expire_on_commit=False)
+AsyncSession.configure(bind=async_engine)
+
+# Read-only sessions go to the replica while it is within DB_REPLICA_MAX_LAG of the primary
+replica_engine = None
+replica_pool_monitor = None
+async_replica_engine = None
+async_replica_pool_monitor = None
+replica_monitor: Optional[ReplicaMonitor] = None
+ReplicaSession = sessionmaker(future=True)
+AsyncReplicaSession = sessionmaker(class_=_AsyncSession, future=True, expire_on_commit=False)
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+_recent_writes: Dict[int, float] = {}
+
+
+def pool_monitors() -> List[PoolMonitor]:
+    """
+    :return: The monitors of every connection pool of this process
+    """
+    return [monitor for monitor in (pool_monitor, async_pool_monitor, replica_pool_monitor, async_replica_pool_monitor)
+            if monitor is not None]
+
+
+def __on_replica_error(exception_context):
+    if exception_context.is_disconnect and replica_monitor is not None:
+        replica_monitor.mark_unavailable()
+
+
+if DB_REPLICA_URL:
+    replica_engine = create_engine(DB_REPLICA_URL, future=True,
+                                   **engine_options(make_url(DB_REPLICA_URL), "replica"))
+    replica_pool_monitor = PoolMonitor(replica_engine, "replica")
+    async_replica_engine = __create_async_engine(DB_REPLICA_URL, "replica_async")
+    async_replica_pool_monitor = PoolMonitor(async_replica_engine.sync_engine, "replica_async")
+    replica_monitor = ReplicaMonitor(async_replica_engine, "replica")
+    ReplicaSession.configure(bind=replica_engine)
+    AsyncReplicaSession.configure(bind=async_replica_engine)
+    event.listen(replica_engine, "handle_error", __on_replica_error)
+    event.listen(async_replica_engine.sync_engine, "handle_error", __on_replica_error)
+
+
+def use_replica(readonly: Optional[bool] = None) -> bool:
+    """
+    Route a new session, counting it in the pool sessions metric
+
+    :param readonly: If the session only reads, or None to use the read_only context
+    :return: True if the session should use the replica
+    """
+    readonly = bool(_read_only.get() if readonly is None else readonly)
+    replica = readonly and replica_monitor is not None and replica_monitor.available
+    pool_sessions.labels(pool="replica" if replica else "primary", readonly=str(readonly).lower()).inc()
+    return replica
+
+
+@contextmanager
+def read_only_sessions(readonly: Optional[bool] = True):
+    """
+    Route the sessions opened in this context that are not given a readonly flag, including in to_thread calls
+
+    :param readonly: If the sessions only read, or None to leave the routing unchanged
+    """
+    if readonly is None:
+        yield
+        return
+    token = _read_only.set(readonly)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def read_only(func):
+    """
+    Route the sessions opened by a function or coroutine function to the replica, unless they are given a readonly flag.
+    Only use on functions that never write.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with read_only_sessions():
+                return await func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with read_only_sessions():
                 return func(*args, **kwargs)
-        else:
-            return func(*args, **kwargs)
-    return with_session
+    return wrapper
+
+
+def note_guild_write(guild_id):
+    """
+    Record a write to a guild's settings, so that reads of the guild stay on the primary until the replica has caught
+    up (read your writes)
+
+    :param guild_id: Discord guild ID for a given server
+    """
+    if replica_monitor is None or guild_id is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) >= RECENT_WRITES_MAX_SIZE:
+        for expired in [key for key, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[expired]
+    _recent_writes[int(guild_id)] = now + replica_monitor.max_lag + replica_monitor.interval
+
+
+def guild_recently_written(guild_id) -> bool:
+    """
+    If a guild's settings were written too recently to be read from the replica
+
+    :param guild_id: Discord guild ID for a given server
+    """
+    if guild_id is None:
+        return False
+    until = _recent_writes.get(int(guild_id))
+    return until is not None and time.monotonic() < until
+
+
+def assign_session(func=None, *, readonly: Optional[Union[bool, Callable[..., bool]]] = None):
+    """
+    Provide a Session to a function if none is given
+
+    Example usage:
+      @assign_session
+      def add_row(..., *, session): ...
+      @assign_session(readonly=True)
+      def get_rows(..., *, session): ...
+
+    :param readonly: If the function only reads, so its session can use the replica. Can be a function of the
+    arguments, e.g. to keep reads of a recently written guild on the primary
+    """
+    def decorator(func):
+        @wraps(func)
+        def with_session(*args, **kwargs):
+            if not kwargs.get("session"):
+                with session_manager(readonly(*args, **kwargs) if callable(readonly) else readonly) as session:
+                    kwargs["session"] = session
+                    return func(*args, **kwargs)
+            else:
+                return func(*args, **kwargs)
+        return with_session
+    return decorator(func) if func else decorator
 
 
 @contextmanager
-def session_manager():
+def session_manager(readonly: Optional[bool] = None):
     """
     Provide a transactional scope around a series of operations
+
+    :param readonly: If the session only reads, so it can use the replica. None uses the read_only context
     """
-    global pool_count
-    # i = random.randint(0, 1000000)
-    if pool_count == 0 and isinstance(engine.pool, QueuePool) and engine.pool.checkedout() >= 20:
-        logger.debug(f"Session Debug: CLEARING POOL {engine.pool.status()}")
-        engine.pool.dispose()
-        logger.debug(f"Session Debug: CLEARED POOL {engine.pool.status()}")
-    session = Session()
-    pool_count += 1
-    # logger.debug(f"Session Debug: CREATED {i}/{pool_count}\n{engine.pool.status()}\n{traceback.format_stack()}")
+    session = ReplicaSession() if use_replica(readonly) else Session()
     try:
         yield session
     except Exception:
@@ -71,8 +259,293 @@ def session_manager():
         raise
     finally:
         session.close()
-        pool_count -= 1
-        # logger.debug(f"Session Debug: CLOSED {i}/{pool_count}\n{engine.pool.status()}\n{traceback.format_stack()}")
+
+
+def assign_async_session(func=None, *, readonly: Optional[Union[bool, Callable[..., bool]]] = None):
+    """
+    The asyncio version of assign_session, provides an AsyncSession to a coroutine function if none is given
+
+    :param readonly: If the coroutine function only reads, so its session can use the replica. Can be a function of
+    the arguments
+    """
+    def decorator(func):
+        @wraps(func)
+        async def with_session(*args, **kwargs):
+            if not kwargs.get("session"):
+                async with async_session_manager(readonly(*args, **kwargs) if callable(readonly) else readonly) \
+                        as session:
+                    kwargs["session"] = session
+                    return await func(*args, **kwargs)
+            else:
+                return await func(*args, **kwargs)
+        return with_session
+    return decorator(func) if func else decorator
+
+
+@asynccontextmanager
+async def async_session_manager(readonly: Optional[bool] = None):
+    """
+    Provide an asyncio transactional scope around a series of operations
+
+    :param readonly: If the session only reads, so it can use the replica. None uses the read_only context
+    """
+    session = AsyncReplicaSession() if use_replica(readonly) else AsyncSession()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+class GuildExtensionCache:
+    """
+    A process-wide cache of the extension IDs enabled in each guild, so that extension checks on commands do not need
+    a database round trip. Guilds that are not cached are loaded from the database on first use.
+    """
+
+    def __init__(self):
+        self._guild_extensions: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, guild_id) -> Optional[Set[str]]:
+        """
+        Get the cached extension IDs of a guild, counting the lookup as a hit or a miss
+
+        :param guild_id: Discord guild ID for a given server
+        :return: The set of enabled extension IDs, or None if the guild is not cached
+        """
+        extensions = self._guild_extensions.get(int(guild_id))
+        if extensions is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return extensions
+
+    def set(self, guild_id, extension_ids: Iterable[str]):
+        """
+        Replace the cached extension IDs of a guild
+
+        :param guild_id: Discord guild ID for a given server
+        :param extension_ids: The extension IDs enabled in the guild
+        """
+        self._guild_extensions[int(guild_id)] = set(extension_ids)
+
+    def invalidate(self, guild_id):
+        """
+        Remove a guild from the cache, so it is reloaded on next use
+
+        :param guild_id: Discord guild ID for a given server
+        """
+        self._guild_extensions.pop(int(guild_id), None)
+
+    def clear(self):
+        """
+        Remove all guilds from the cache and reset the hit/miss counters
+        """
+        self._guild_extensions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Get the hit/miss counters of this cache
+
+        :return: dict of guilds cached, hits, misses and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {"guilds": len(self._guild_extensions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+
+extension_cache = GuildExtensionCache()
+cache.subscribe("extensions", extension_cache.invalidate)
+
+
+class LeaderLease:
+    """
+    Leadership of a named role, held by at most one process at a time through a row of the Leases table.
+    Once started, the lease is renewed in the background every third of its TTL, or taken over when its holder has let
+    it expire. Each change of holder increments the fencing token of the lease.
+    Expiry is stored as the wall clock time of the renewing host and compared with the wall clock of the host taking
+    over, so at most one process leads only while the clocks of the hosts differ by less than a renewal interval.
+    """
+
+    def __init__(self, name: str, ttl: float = LEASE_TTL, holder: str = LEASE_HOLDER):
+        """
+        :param name: The role, e.g. twitch_alert
+        :param ttl: The seconds until the lease expires if it is not renewed, the maximum fail over time
+        :param holder: The identity of this process
+        """
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = ttl / 3
+        self.holder = holder
+        self.token: Optional[int] = None
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """
+        If this process holds the lease. Leadership ends locally a renewal interval before the lease expires in the
+        database, so that a process which can no longer renew stops before another can take over
+        """
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    async def acquire(self) -> bool:
+        """
+        Renew the lease, or take it over if it is free or expired
+
+        :return: True if this process holds the lease
+        """
+        started = time.monotonic()
+        now = int(time.time() * 1000)
+        async with async_session_manager() as session:
+            token = await self._renew(session, now, now + int(self.ttl * 1000))
+            await session.commit()
+
+        if token is None:
+            if self.token is not None:
+                logger.warning("Lost lease %s", self.name)
+            self.token = None
+            return False
+        if token != self.token:
+            logger.info("Acquired lease %s with fencing token %s", self.name, token)
+        self.token = token
+        self._valid_until = started + self.ttl - self.renew_interval
+        return True
+
+    async def _renew(self, session, now: int, expires: int) -> Optional[int]:
+        if self.token is not None:
+            renewed = await session.execute(update(Leases)
+                                            .where(Leases.name == self.name, Leases.holder == self.holder,
+                                                   Leases.token == self.token, Leases.expires > now)
+                                            .values(expires=expires))
+            if renewed.rowcount:
+                return self.token
+
+        taken = await session.execute(update(Leases)
+                                      .where(Leases.name == self.name,
+                                             or_(Leases.expires <= now, Leases.holder == self.holder))
+                                      .values(holder=self.holder, token=Leases.token + 1, expires=expires))
+        if taken.rowcount:
+            return (await session.execute(select(Leases.token).where(Leases.name == self.name))).scalar_one()
+
+        if (await session.execute(select(Leases.name).where(Leases.name == self.name))).first():
+            return None
+        session.add(Leases(name=self.name, holder=self.holder, token=1, expires=expires))
+        try:
+            await session.flush()
+        except IntegrityError:
+            # Another process created the lease first
+            await session.rollback()
+            return None
+        return 1
+
+    async def release(self):
+        """
+        Expire the lease now if this process holds it, so that another process can take over without waiting
+        """
+        if self.token is None:
+            return
+        async with async_session_manager() as session:
+            await session.execute(update(Leases)
+                                  .where(Leases.name == self.name, Leases.holder == self.holder,
+                                         Leases.token == self.token)
+                                  .values(expires=0))
+            await session.commit()
+        logger.info("Released lease %s", self.name)
+        self.token = None
+
+    def verify(self, session: Session):
+        """
+        Check that this process still holds the lease, before a side effect that must only happen once.
+        This narrows the window for a duplicate rather than closing it: the lease can still be lost between the check
+        and the side effect, and Discord requests cannot be fenced with the token.
+
+        :param session: sqlalchemy Session
+        :raises LeaseLostError: If the lease has expired or been taken over by another process
+        """
+        token = session.execute(select(Leases.token)
+                                .where(Leases.name == self.name, Leases.holder == self.holder)).scalar()
+        self._check_token(token)
+
+    async def verify_async(self, session: _AsyncSession):
+        """
+        The asyncio version of verify, which narrows the window for a duplicate in the same way
+
+        :param session: sqlalchemy AsyncSession
+        :raises LeaseLostError: If the lease has expired or been taken over by another process
+        """
+        token = (await session.execute(select(Leases.token)
+                                       .where(Leases.name == self.name, Leases.holder == self.holder))).scalar()
+        self._check_token(token)
+
+    def _check_token(self, token: Optional[int]):
+        if not self.is_leader or token != self.token:
+            raise LeaseLostError(f"Lease {self.name} is no longer held by this process")
+
+    async def start(self):
+        """
+        Try to acquire the lease now, then keep renewing or trying to take it over in the background
+        """
+        if self._task is not None and not self._task.done() and self._task.get_loop() is asyncio.get_running_loop():
+            return
+        try:
+            await self.acquire()
+        except Exception as err:
+            logger.error("Failed to acquire lease %s", self.name, exc_info=err)
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat(), name=f"lease-{self.name}")
+
+    async def stop(self):
+        """
+        Stop renewing the lease, and release it
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.release()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.acquire()
+            except Exception as err:
+                logger.error("Failed to renew lease %s", self.name, exc_info=err)
+
+
+def leader_only(lease: LeaderLease):
+    """
+    Skip the iterations of a tasks.loop while this process does not hold a lease, so the loop runs on one process at a
+    time and moves to another process within the lease TTL if the leader stops. Start the lease where the loop is
+    started.
+    Leadership is only checked when an iteration starts, so an iteration which outlasts the lease can overlap one on
+    the new leader. Use LeaderLease.verify before side effects which must only happen once.
+
+    Example usage:
+      @tasks.loop(seconds=60)
+      @leader_only(lease)
+      async def loop(self): ...
+
+    :param lease: The lease of the loop
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if lease.is_leader:
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 def __create_sqlite_tables():
@@ -124,13 +597,51 @@ def extension_enabled(guild_id, extension_id: str):
     :param guild_id: Discord guild ID for a given server
     :param extension_id: The Koala extension ID
     """
-    with session_manager() as session:
-        result = session.execute(select(GuildExtensions.extension_id)
-                                 .where(GuildExtensions.guild_id == guild_id)
-                                 ).scalars().all()
+    result = extension_cache.get(guild_id)
+    if result is None:
+        # A guild is reloaded after its extensions are written, which must be read from the primary
+        with session_manager(readonly=not guild_recently_written(guild_id)) as session:
+            result = refresh_guild_extension_cache(guild_id, session=session)
     return "All" in result or extension_id in result
 
 
+@assign_session
+def refresh_guild_extension_cache(guild_id, session: Session) -> Set[str]:
+    """
+    Reload the cached extensions of a guild from the database
+
+    :param guild_id: Discord guild ID for a given server
+    :param session: sqlalchemy Session
+    :return: The set of enabled extension IDs
+    """
+    result = session.execute(select(GuildExtensions.extension_id)
+                             .where(GuildExtensions.guild_id == guild_id)
+                             ).scalars().all()
+    extension_cache.set(guild_id, result)
+    return set(result)
+
+
+@assign_session(readonly=True)
+def warm_extension_cache(guild_ids: Iterable[int], session: Session):
+    """
+    Load the enabled extensions of many guilds into the cache in bulk
+
+    :param guild_ids: Discord guild IDs to load
+    :param session: sqlalchemy Session
+    """
+    guild_ids = [int(guild_id) for guild_id in guild_ids]
+    for i in range(0, len(guild_ids), EXTENSION_CACHE_WARM_CHUNK_SIZE):
+        chunk = guild_ids[i:i + EXTENSION_CACHE_WARM_CHUNK_SIZE]
+        guild_extensions: Dict[int, Set[str]] = {guild_id: set() for guild_id in chunk}
+        rows = session.execute(select(GuildExtensions.guild_id, GuildExtensions.extension_id)
+                               .where(GuildExtensions.guild_id.in_(chunk))).all()
+        for row in rows:
+            guild_extensions[row.guild_id].add(row.extension_id)
+        for guild_id, extensions in guild_extensions.items():
+            extension_cache.set(guild_id, extensions)
+    logger.info("Extension cache warmed for %s guilds", len(guild_ids))
+
+
 @assign_session
 def give_guild_extension(guild_id, extension_id: str, session: Session):
     """
@@ -152,6 +663,9 @@ def give_guild_extension(guild_id, extension_id: str, session: Session):
                 .filter_by(extension_id=db_extension.extension_id, guild_id=guild_id)).one_or_none() is None:
             session.add(GuildExtensions(extension_id=db_extension.extension_id, guild_id=guild_id))
             session.commit()
+            note_guild_write(guild_id)
+            refresh_guild_extension_cache(guild_id, session=session)
+            cache.publish("extensions", int(guild_id))
     else:
         raise NotImplementedError(f"{extension_id} is not a valid extension")
 
@@ -167,6 +681,9 @@ def remove_guild_extension(guild_id, extension_id: str, session: Session):
     """
     session.execute(delete(GuildExtensions).filter_by(extension_id=extension_id, guild_id=guild_id))
     session.commit()
+    note_guild_write(guild_id)
+    refresh_guild_extension_cache(guild_id, session=session)
+    cache.publish("extensions", int(guild_id))
 
 
 @assign_session  # fallback assign session
@@ -225,3 +742,4 @@ def clear_all_tables(tables):
         for table in tables:
             session.execute('DELETE FROM ' + table + ';')
         session.commit()
+    extension_cache.clear()
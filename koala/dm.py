@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot bulk direct message dispatcher
+Sends DMs to many members concurrently, backing off when Discord rate limits the bot so that other traffic is not
+starved, and reports the outcome for each recipient
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+# Libs
+import discord
+from prometheus_client import Counter
+
+# Own modules
+from koala.env import DM_CONCURRENCY, DM_RATE, DM_MAX_RETRIES
+from koala.log import logger
+
+# Constants
+PROGRESS_INTERVAL = 100
+DEFAULT_RETRY_AFTER = 1.0
+
+# Variables
+dm_outcomes = Counter("koala_dm_total", "Direct messages sent in bulk, by outcome", ["status"])
+
+
+class DMStatus(Enum):
+    SENT = "sent"
+    DMS_CLOSED = "dms_closed"
+    FAILED = "failed"
+
+
+class DMResult:
+    """
+    The outcome of sending a DM to one recipient
+    """
+    __slots__ = ("recipient", "status", "message", "error")
+
+    def __init__(self, recipient, status: DMStatus, message: Optional[discord.Message] = None,
+                 error: Optional[Exception] = None):
+        self.recipient = recipient
+        self.status = status
+        self.message = message
+        self.error = error
+
+
+class DMReport:
+    """
+    The outcome of sending a DM to each recipient, filled in as the DMs are sent
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.results: List[DMResult] = []
+
+    def add(self, result: DMResult):
+        self.results.append(result)
+        dm_outcomes.labels(status=result.status.value).inc()
+
+    def count(self, status: DMStatus) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    @property
+    def sent(self) -> int:
+        return self.count(DMStatus.SENT)
+
+    @property
+    def dms_closed(self) -> int:
+        return self.count(DMStatus.DMS_CLOSED)
+
+    @property
+    def failed(self) -> int:
+        return self.count(DMStatus.FAILED)
+
+    def __str__(self):
+        return f"{self.sent} sent, {self.dms_closed} with DMs closed, {self.failed} failed of {self.total}"
+
+
+class _AdaptiveLimiter:
+    """
+    Limits both the number of sends in flight and the rate they are started at.
+    Halves the concurrency and pauses every send when rate limited, then adds one back after each run of successes.
+    """
+
+    def __init__(self, concurrency: int, rate: float):
+        self.max_concurrency = concurrency
+        self.concurrency = concurrency
+        self.interval = 1 / rate if rate else 0
+        self.active = 0
+        self.successes = 0
+        self._next_start = 0.0
+        self._paused_until = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.concurrency)
+            self.active += 1
+            now = time.monotonic()
+            start = max(now, self._next_start, self._paused_until)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def release(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def succeeded(self):
+        async with self._condition:
+            self.successes += 1
+            if self.successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self.successes = 0
+                self._condition.notify_all()
+
+    async def rate_limited(self, retry_after: float):
+        async with self._condition:
+            self.concurrency = max(1, self.concurrency // 2)
+            self.successes = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning("DMs rate limited, retrying in %.2fs with concurrency %d", retry_after, self.concurrency)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """
+    How long to wait before retrying a failed send
+    :param error: The exception raised by the send
+    :return: The seconds to wait, or None if the send should not be retried
+    """
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500):
+        headers = getattr(error.response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+        except ValueError:
+            return DEFAULT_RETRY_AFTER
+    return None
+
+
+class DMDispatcher:
+    """
+    Sends a DM to each of a list of recipients. Bulk sends running at the same time share one limit, and back off
+    together when rate limited.
+    """
+
+    def __init__(self, concurrency: int = DM_CONCURRENCY, rate: float = DM_RATE, max_retries: int = DM_MAX_RETRIES):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_retries = max_retries
+        self._limiter: Optional[_AdaptiveLimiter] = None
+        self._limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def limiter(self) -> _AdaptiveLimiter:
+        """
+        The limiter shared by every send on the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._limiter is None or self._limiter_loop is not loop:
+            self._limiter = _AdaptiveLimiter(self.concurrency, self.rate)
+            self._limiter_loop = loop
+        return self._limiter
+
+    async def send(self, recipients: Iterable, send: Callable[[object], Awaitable[Optional[discord.Message]]],
+                   progress: Callable[[DMReport], Awaitable] = None,
+                   progress_interval: int = PROGRESS_INTERVAL) -> DMReport:
+        """
+        Send a DM to each recipient. Rate limited and server errors are retried by calling send again, so send should
+        only make the one request that sends the DM.
+
+        :param recipients: The members or users to DM
+        :param send: A coroutine function sending the DM to a recipient, e.g. lambda member: member.send(message)
+        :param progress: A coroutine function called with the report after every progress_interval DMs, and at the end
+        :param progress_interval: How many DMs to send between progress callbacks
+        :return: The outcome for each recipient
+        """
+        recipients = list(recipients)
+        report = DMReport(len(recipients))
+        limiter = self.limiter
+
+        pending = iter(recipients)
+
+        async def worker():
+            for recipient in pending:
+                report.add(await self._send_with_retries(limiter, recipient, send))
+                if progress and report.done % progress_interval == 0 and report.done != report.total:
+                    await progress(report)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, len(recipients)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+        if progress:
+            await progress(report)
+        logger.info("Sent bulk DM: %s", report)
+        return report
+
+    async def _send_with_retries(self, limiter: _AdaptiveLimiter, recipient, send) -> DMResult:
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                message = await send(recipient)
+            except discord.Forbidden as e:
+                logger.debug("User %s cannot receive dms", getattr(recipient, "id", recipient))
+                return DMResult(recipient, DMStatus.DMS_CLOSED, error=e)
+            except (discord.HTTPException, discord.RateLimited) as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    logger.error("Failed to DM user %s: %s", getattr(recipient, "id", recipient), e)
+                    return DMResult(recipient, DMStatus.FAILED, error=e)
+                await limiter.rate_limited(retry_after)
+            except Exception as e:
+                logger.error("Failed to DM user %s", getattr(recipient, "id", recipient), exc_info=e)
+                return DMResult(recipient, DMStatus.FAILED, error=e)
+            else:
+                await limiter.succeeded()
+                return DMResult(recipient, DMStatus.SENT, message=message)
+            finally:
+                await limiter.release()
+
+
+dm_dispatcher = DMDispatcher()
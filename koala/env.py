@@ -16,6 +16,38 @@ API_PORT = os.environ.get("API_PORT", 8080)
 
 # Logging
 LOGGING_FILE = eval(os.environ.get("LOGGING_FILE", "True"))
+LOG_ROTATION = os.environ.get("LOG_ROTATION", "size")
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 7))
+LOG_RATE_LIMIT = int(os.environ.get("LOG_RATE_LIMIT", 0))
+LOG_RATE_LIMIT_PERIOD = float(os.environ.get("LOG_RATE_LIMIT_PERIOD", 60))
+
+# Bulk DMs
+DM_CONCURRENCY = int(os.environ.get("DM_CONCURRENCY", 5))
+DM_RATE = float(os.environ.get("DM_RATE", 10))
+DM_MAX_RETRIES = int(os.environ.get("DM_MAX_RETRIES", 3))
+
+# REST API
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+# Cluster
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", 0)) or None
+CLUSTER_COUNT = int(os.environ.get("CLUSTER_COUNT", 1))
+CLUSTER_ID = int(os.environ.get("CLUSTER_ID", 0))
+# Without a CLUSTER_ID, this process launches and supervises all the clusters
+IS_CLUSTER_LAUNCHER = CLUSTER_COUNT > 1 and "CLUSTER_ID" not in os.environ
+API_CLUSTER = int(os.environ.get("API_CLUSTER", 0))
+CLUSTER_API_PORT = int(os.environ.get("CLUSTER_API_PORT", int(API_PORT) + 1))
+
+# Leader leases
+LEASE_TTL = float(os.environ.get("LEASE_TTL", 30))
+
+# Member cache
+MEMBER_CHUNKING = os.environ.get("MEMBER_CHUNKING", "lazy")
+MEMBER_CACHE_FLAGS = [flag.strip() for flag in os.environ.get("MEMBER_CACHE_FLAGS", "voice,joined").split(",")
+                      if flag.strip()]
+MEMBER_CACHE_IDLE_TTL = float(os.environ.get("MEMBER_CACHE_IDLE_TTL", 3600))
 
 # CORS
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
@@ -47,3 +79,36 @@ if not DB_URL or DB_TYPE == DatabaseType.SQLITE:
         DB_URL = f"sqlite+pysqlcipher://:x'{DB_KEY}'@/{SQLITE_DB_PATH.absolute()}?charset=utf8mb4"
     else:
         DB_URL = f"sqlite:///{SQLITE_DB_PATH.absolute()}?charset=utf8mb4"
+
+# Database Pool
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 3600))
+DB_POOL_PRE_PING = eval(os.environ.get("DB_POOL_PRE_PING", "True"))
+DB_LEAK_THRESHOLD = float(os.environ.get("DB_LEAK_THRESHOLD", 60))
+DB_CHECKOUT_STACKS = eval(os.environ.get("DB_CHECKOUT_STACKS", "False"))
+
+# Read replica
+DB_REPLICA_URL = os.environ.get("DB_REPLICA_URL")
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5))
+
+# Cache
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 300))
+CACHE_MAX_SIZE = int(os.environ.get("CACHE_MAX_SIZE", 10000))
+CACHE_BUS_TRANSPORTS = [transport.strip() for transport in os.environ.get("CACHE_BUS_TRANSPORTS", "database").split(",")
+                        if transport.strip()]
+CACHE_BUS_POLL_INTERVAL = float(os.environ.get("CACHE_BUS_POLL_INTERVAL", 1))
+CACHE_BUS_RETENTION = float(os.environ.get("CACHE_BUS_RETENTION", 3600))
+CACHE_BUS_SOCKET_DIR = Path(os.environ.get("CACHE_BUS_SOCKET_DIR", Path(CONFIG_PATH, "bus")))
+
+# Instrumentation
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.5))
+SLOW_CALLBACK_THRESHOLD = float(os.environ.get("SLOW_CALLBACK_THRESHOLD", 0.1))
+LOOP_MONITOR_REPORT_INTERVAL = float(os.environ.get("LOOP_MONITOR_REPORT_INTERVAL", 300))
+SLOW_QUERY_THRESHOLD = float(os.environ.get("SLOW_QUERY_THRESHOLD", 0.25))
+GATEWAY_TRACE_PATH = os.environ.get("GATEWAY_TRACE_PATH")
+GATEWAY_TRACE_MAX_EVENTS = int(os.environ.get("GATEWAY_TRACE_MAX_EVENTS", 1000000)) or None
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", 0.01))
+PROFILER_MAX_DURATION = float(os.environ.get("PROFILER_MAX_DURATION", 300))
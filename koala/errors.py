@@ -12,3 +12,10 @@ class InvalidArgumentError(KoalaException):
     Invalid Argument provided by the user
     """
     pass
+
+
+class LeaseLostError(KoalaException):
+    """
+    Another process has taken over a leader lease held by this process
+    """
+    pass
@@ -0,0 +1,11 @@
+from koala.utils import lazy_import
+from . import metrics
+from . import sql
+from .loop import LoopMonitor, loop_monitor, set_task_label
+
+__all__ = ['api', 'memory', 'metrics', 'profiler', 'sql', 'trace', 'LoopMonitor', 'loop_monitor', 'set_task_label']
+
+api = lazy_import("koala.instrumentation.api")
+memory = lazy_import("koala.instrumentation.memory")
+profiler = lazy_import("koala.instrumentation.profiler")
+trace = lazy_import("koala.instrumentation.trace")
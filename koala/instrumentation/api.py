@@ -0,0 +1,127 @@
+# Futures
+# Built-in/Generic Imports
+# Libs
+from aiohttp import web
+from discord.ext.commands import Bot
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from koala import cache
+from koala.db import async_pool_monitor, pool_monitor, async_replica_pool_monitor, replica_pool_monitor, \
+    replica_monitor, extension_cache
+from koala.rest.api import parse_request
+from koala.utils import lazy_import
+# Own modules
+from .log import logger
+from .loop import loop_monitor
+from .sql import query_recorder
+
+# Constants
+INSTRUMENTATION_ENDPOINT = 'instrumentation'
+LOOP_ENDPOINT = 'loop'
+QUERIES_ENDPOINT = 'queries'
+POOL_ENDPOINT = 'pool'
+CACHES_ENDPOINT = 'caches'
+PROFILE_ENDPOINT = 'profile'
+METRICS_ENDPOINT = 'metrics'
+
+# Variables
+profiler = lazy_import("koala.instrumentation.profiler")
+
+
+class InstrumentationEndpoint:
+    """
+    The API endpoints for instrumentation
+    """
+    def __init__(self, monitor=loop_monitor, recorder=query_recorder,
+                 pool_monitors=(pool_monitor, async_pool_monitor, replica_pool_monitor, async_replica_pool_monitor),
+                 replica=replica_monitor, sampler=None):
+        self._monitor = monitor
+        self._recorder = recorder
+        self._pool_monitors = [pool for pool in pool_monitors if pool is not None]
+        self._replica = replica
+        self._sampler = sampler
+
+    def register(self, app):
+        """
+        Register the routes for the given application
+        :param app: The aiohttp.web.Application (likely of the sub app)
+        :return: app
+        """
+        app.add_routes([web.get('/{endpoint}'.format(endpoint=LOOP_ENDPOINT), self.get_loop),
+                        web.get('/{endpoint}'.format(endpoint=QUERIES_ENDPOINT), self.get_queries),
+                        web.get('/{endpoint}'.format(endpoint=POOL_ENDPOINT), self.get_pool),
+                        web.get('/{endpoint}'.format(endpoint=CACHES_ENDPOINT), self.get_caches),
+                        web.get('/{endpoint}'.format(endpoint=PROFILE_ENDPOINT), self.get_profile)])
+        return app
+
+    @parse_request
+    async def get_loop(self, top: int = 10):
+        """
+        Get the event loop lag and the callbacks that blocked the loop the most
+        :param top: The number of top offenders to return
+        :return: The loop monitor stats
+        """
+        return self._monitor.stats(top)
+
+    @parse_request
+    async def get_queries(self, top: int = 10, sort: str = "total"):
+        """
+        Get the SQL fingerprints that take the most time, or are executed the most
+        :param top: The number of fingerprints to return
+        :param sort: The stat to sort by, one of count, total, p50 or p99
+        :return: list of fingerprints with their calling cog and stats
+        """
+        return self._recorder.top(top, sort)
+
+    @parse_request
+    async def get_pool(self):
+        """
+        Get the utilisation of the database connection pools, and any leaked connections with their checkout stacks
+        :return: dict of pool name to pool stats, and the replication lag of the read replica if there is one
+        """
+        stats = {pool.name: pool.stats() for pool in self._pool_monitors}
+        if self._replica is not None:
+            stats["replication"] = self._replica.stats()
+        return stats
+
+
+    @parse_request
+    async def get_caches(self):
+        """
+        Get the size and hit ratio of the database caches
+        :return: dict of cache name to cache stats
+        """
+        return dict(cache.stats(), extensions=extension_cache.stats())
+
+    @parse_request(raw_response=True)
+    async def get_profile(self, seconds: float = 10):
+        """
+        Sample the event loop of this process for a number of seconds
+        :param seconds: The seconds to profile for
+        :return: A zip attachment of the collapsed stacks, for flamegraph tools, and a summary of the top functions
+        """
+        profile = await (self._sampler or profiler.profiler).profile(seconds)
+        return web.Response(body=profile.archive(), content_type="application/zip",
+                            headers={"Content-Disposition": f'attachment; filename="{profiler.ARCHIVE_FILENAME}"'})
+
+
+async def get_metrics(request):
+    """
+    Get all metrics in the Prometheus text format
+    :param request: The request
+    :return: The metrics response
+    """
+    return web.Response(body=generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def setup(bot: Bot):
+    """
+    Load the instrumentation API to the KoalaBot.
+    :param bot: the bot client for KoalaBot
+    """
+    sub_app = web.Application()
+    endpoint = InstrumentationEndpoint()
+    endpoint.register(sub_app)
+    getattr(bot, "koala_web_app").add_subapp('/{endpoint}'.format(endpoint=INSTRUMENTATION_ENDPOINT), sub_app)
+    getattr(bot, "koala_web_app").add_routes([web.get('/{endpoint}'.format(endpoint=METRICS_ENDPOINT), get_metrics)])
+    logger.info("Instrumentation API is ready.")
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot Event Loop Monitor
+Measures event loop lag and attributes slow callbacks to the cog that ran them
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import functools
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+# Libs
+
+# Own modules
+from koala.env import LOOP_LAG_INTERVAL, SLOW_CALLBACK_THRESHOLD, LOOP_MONITOR_REPORT_INTERVAL
+from .log import logger
+
+# Constants
+COGS_PACKAGE_PREFIX = "koala.cogs."
+LAG_HISTORY_SIZE = 600
+RECENT_SLOW_CALLBACKS_SIZE = 50
+TOP_OFFENDERS_COUNT = 5
+MAX_OFFENDER_LABELS = 500
+OTHER_LABEL = "other"
+# asyncio names unnamed tasks Task-1, Task-2, ...
+DEFAULT_TASK_NAME = re.compile(r"Task-\d+")
+
+# Variables
+task_label: ContextVar[Optional[str]] = ContextVar("task_label", default=None)
+
+
+def _code_name(code) -> str:
+    """
+    The qualified name of a code object, falling back to co_name before Python 3.11
+    :param code: The code object
+    :return: The name of the code object
+    """
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def cog_label(module: Optional[str], name: str) -> Optional[str]:
+    """
+    Build the attribution label for a function if it belongs to a cog
+    e.g. ('koala.cogs.text_filter.cog', 'TextFilter.on_message') -> 'text_filter:TextFilter.on_message'
+    :param module: The module the function is defined in
+    :param name: The qualified name of the function
+    :return: The label, or None if the module is not part of a cog
+    """
+    if not module or not module.startswith(COGS_PACKAGE_PREFIX):
+        return None
+    return "{cog}:{name}".format(cog=module.split(".")[2], name=name)
+
+
+def _callable_label(value) -> Optional[str]:
+    """
+    The cog label for a callable or coroutine that is about to be run
+    e.g. the listener passed to discord.py's Client._run_event
+    :param value: A frame local
+    :return: The label, or None if value is not a cog callable
+    """
+    frame = getattr(value, "cr_frame", None)
+    if frame is not None:
+        return cog_label(frame.f_globals.get("__name__"), _code_name(frame.f_code))
+    if not callable(value):
+        return None
+    func = getattr(value, "__func__", value)
+    return cog_label(getattr(func, "__module__", None), getattr(func, "__qualname__", ""))
+
+
+def coroutine_label(coro) -> Optional[str]:
+    """
+    Walk the await chain of a coroutine and find the outermost frame that belongs to a cog.
+    This is the listener, command or tasks.loop that is currently running.
+    :param coro: The coroutine of a task
+    :return: The label, or None if no cog is found
+    """
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None)
+        if frame is None:
+            return None
+        label = cog_label(frame.f_globals.get("__name__"), _code_name(frame.f_code))
+        if label:
+            return label
+        next_coro = getattr(coro, "cr_await", None)
+        if next_coro is None:
+            # Not started yet, the callable it will await is held in a local
+            for value in frame.f_locals.values():
+                label = _callable_label(value)
+                if label:
+                    return label
+        coro = next_coro
+    return None
+
+
+def set_task_label(func):
+    """
+    Label the running task with a cog function, e.g. an event listener or the callback of an invoked command.
+    Used when the function runs inside a task started outside of the cog, such as discord.py's on_message.
+    :param func: The cog function
+    """
+    task_label.set(_callable_label(func))
+
+
+def _callback_name(callback) -> str:
+    """
+    A readable name for a callback that could not be attributed to a cog
+    :param callback: The callback of an asyncio.Handle
+    :return: The name
+    """
+    while isinstance(callback, functools.partial):
+        callback = callback.func
+    func = getattr(callback, "__func__", callback)
+    return "{module}:{name}".format(module=getattr(func, "__module__", None) or "unknown",
+                                    name=getattr(func, "__qualname__", None) or type(callback).__qualname__)
+
+
+def task_name(task: asyncio.Task) -> str:
+    """
+    A name for a task that could not be attributed to a cog. Tasks asyncio named Task-N are named by their coroutine
+    instead, e.g. RequestHandler.start, so that every run of a coroutine shares one name.
+    :param task: The task
+    :return: The name
+    """
+    name = task.get_name()
+    if DEFAULT_TASK_NAME.fullmatch(name):
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or type(coro).__qualname__
+    return name
+
+
+class CallbackStats:
+    """
+    Rolling stats for the slow callbacks of a single label
+    """
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self):
+        return {"count": self.count,
+                "total": round(self.total, 6),
+                "max": round(self.max, 6),
+                "mean": round(self.total / self.count, 6) if self.count else 0.0}
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and times every callback run by the loop.
+    Callbacks that run longer than the slow callback threshold are attributed to the cog that ran them.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL,
+                 slow_callback_threshold: float = SLOW_CALLBACK_THRESHOLD,
+                 report_interval: float = LOOP_MONITOR_REPORT_INTERVAL):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.report_interval = report_interval
+        self.lag: Deque[float] = deque(maxlen=LAG_HISTORY_SIZE)
+        self.offenders: Dict[str, CallbackStats] = {}
+        self.window: Dict[str, CallbackStats] = {}
+        self.recent: Deque[dict] = deque(maxlen=RECENT_SLOW_CALLBACKS_SIZE)
+        self._original_run = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._original_run is not None
+
+    def start(self):
+        """
+        Start measuring the running event loop
+        """
+        if self.running:
+            return
+        self._install()
+        self._tasks = [asyncio.create_task(self._measure_lag(), name="koala: loop lag"),
+                       asyncio.create_task(self._report(), name="koala: loop monitor report")]
+        logger.info("Loop monitor started, slow callback threshold %ss", self.slow_callback_threshold)
+
+    def stop(self):
+        """
+        Stop measuring and restore the original asyncio.Handle
+        """
+        if not self.running:
+            return
+        asyncio.events.Handle._run = self._original_run
+        self._original_run = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def _install(self):
+        """
+        Wrap asyncio.Handle._run so every callback run by the loop is timed.
+        Only slow callbacks are labelled, from the label set on their task, then the frames left after the callback,
+        then the task's name. A task that finishes in one step has no frames left, so its label must be set with
+        set_task_label.
+        """
+        original_run = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            original_run(handle)
+            duration = time.perf_counter() - start
+            if duration >= monitor.slow_callback_threshold:
+                monitor.record_slow_callback(monitor.label(handle), duration)
+
+        self._original_run = original_run
+        asyncio.events.Handle._run = _run
+
+    @staticmethod
+    def label(handle) -> str:
+        """
+        The label of a callback that has been run
+        :param handle: The asyncio.Handle of the callback
+        :return: The cog label, otherwise the task or callback name
+        """
+        label = handle._context.get(task_label)
+        if label:
+            return label
+        task = getattr(handle._callback, "__self__", None)
+        if isinstance(task, asyncio.Task):
+            return coroutine_label(task.get_coro()) or task_name(task)
+        return _callback_name(handle._callback)
+
+    async def _measure_lag(self):
+        """
+        Sleep for the interval and record how late the loop woke up
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag.append(max(0.0, loop.time() - start - self.interval))
+
+    async def _report(self):
+        """
+        Periodically log the top offenders since the last report
+        """
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.log_top_offenders()
+
+    def record_slow_callback(self, label: str, duration: float):
+        """
+        Record a callback that ran longer than the threshold
+        :param label: The cog label, or task/callback name
+        :param duration: How long the callback blocked the loop for in seconds
+        """
+        if label not in self.offenders and len(self.offenders) >= MAX_OFFENDER_LABELS:
+            label = OTHER_LABEL
+        self.offenders.setdefault(label, CallbackStats()).add(duration)
+        self.window.setdefault(label, CallbackStats()).add(duration)
+        self.recent.append({"label": label, "duration": round(duration, 6), "time": time.time()})
+
+    def log_top_offenders(self):
+        """
+        Log the callbacks that blocked the loop the most since the last report, and reset the window
+        """
+        if self.window:
+            top = sorted(self.window.items(), key=lambda item: item[1].total, reverse=True)[:TOP_OFFENDERS_COUNT]
+            logger.warning("Slow callbacks in the last %ss (max lag %ss): %s", self.report_interval,
+                           self.lag_stats()["max"],
+                           ", ".join("{label} x{count} total {total}s max {max}s".format(label=label, **stats.as_dict())
+                                     for label, stats in top))
+        self.window = {}
+
+    def lag_stats(self) -> dict:
+        """
+        Summary of the recorded loop lag in seconds
+        :return: dict of samples, mean, p99 and max
+        """
+        if not self.lag:
+            return {"samples": 0, "mean": 0.0, "p99": 0.0, "max": 0.0}
+        samples = sorted(self.lag)
+        return {"samples": len(samples),
+                "mean": round(sum(samples) / len(samples), 6),
+                "p99": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 6),
+                "max": round(samples[-1], 6)}
+
+    def stats(self, top: int = 10) -> dict:
+        """
+        The rolling stats of this monitor
+        :param top: The number of top offenders to include
+        :return: dict of lag, offenders (by total time blocked) and recent slow callbacks
+        """
+        offenders = sorted(self.offenders.items(), key=lambda item: item[1].total, reverse=True)[:top]
+        return {"running": self.running,
+                "slow_callback_threshold": self.slow_callback_threshold,
+                "lag": self.lag_stats(),
+                "offenders": [dict(label=label, **stats.as_dict()) for label, stats in offenders],
+                "recent": list(self.recent)}
+
+    def reset(self):
+        """
+        Clear all recorded stats
+        """
+        self.lag.clear()
+        self.offenders = {}
+        self.window = {}
+        self.recent.clear()
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot Memory Report
+Approximates the memory held by the discord.py caches and Koala's own caches. The size of each cache is estimated by
+measuring a sample of its objects, without following references to objects that belong to another cache.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import gc
+import itertools
+import os
+import sys
+import types
+from typing import Iterable, List, NamedTuple, Optional
+
+# Libs
+import discord
+from discord.ext import commands
+from discord.state import ConnectionState
+
+# Own modules
+from koala import cache
+from koala.db import extension_cache
+from koala.members import member_cache
+from koala.rest.cache import response_cache
+
+# Constants
+SAMPLE_SIZE = 200
+MAX_DEPTH = 4
+# Objects held by their own cache, or shared by every object of a cache
+SHARED_TYPES = (discord.Client, ConnectionState, discord.Guild, discord.abc.User, discord.Role,
+                discord.abc.GuildChannel, discord.Thread, discord.Emoji, discord.GuildSticker, discord.Message,
+                type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+LEAF_TYPES = (str, bytes, int, float, bool, type(None))
+
+# Variables
+
+
+class CacheSize(NamedTuple):
+    name: str
+    objects: int
+    size: int
+
+
+def approximate_size(obj, depth: int = MAX_DEPTH) -> int:
+    """
+    The bytes held by an object and the objects it references, up to a depth, excluding objects of SHARED_TYPES
+
+    :param obj: The object
+    :param depth: The depth of references to follow
+    """
+    seen = {id(obj)}
+    size = 0
+    level = [obj]
+    for remaining in range(depth, -1, -1):
+        referents = []
+        for item in level:
+            size += sys.getsizeof(item, 0)
+            if remaining and not isinstance(item, LEAF_TYPES):
+                referents.extend(gc.get_referents(item))
+        level = []
+        for referent in referents:
+            if id(referent) not in seen and not isinstance(referent, SHARED_TYPES):
+                seen.add(id(referent))
+                level.append(referent)
+    return size
+
+
+def measure(name: str, objects: Iterable, count: int, container=None) -> CacheSize:
+    """
+    Estimate the size of a cache from a sample of its objects
+
+    :param name: The name of the cache
+    :param objects: The objects in the cache
+    :param count: The number of objects in the cache
+    :param container: The dict or list holding the objects, if any
+    """
+    sample = list(itertools.islice(objects, SAMPLE_SIZE))
+    size = sys.getsizeof(container) if container is not None else 0
+    if sample:
+        size += sum(approximate_size(obj) for obj in sample) * count // len(sample)
+    return CacheSize(name, count, size)
+
+
+def discord_caches(bot: commands.Bot) -> List[CacheSize]:
+    """
+    Estimate the size of the discord.py caches of a bot
+    """
+    state: ConnectionState = bot._connection
+    guilds = list(state._guilds.values())
+    messages = state._messages or []
+    return [
+        measure("discord.guilds", guilds, len(guilds), state._guilds),
+        measure("discord.members", itertools.chain.from_iterable(guild._members.values() for guild in guilds),
+                sum(len(guild._members) for guild in guilds)),
+        measure("discord.users", list(state._users.values()), len(state._users), state._users),
+        measure("discord.channels", itertools.chain.from_iterable(
+            itertools.chain(guild._channels.values(), guild._threads.values()) for guild in guilds),
+                sum(len(guild._channels) + len(guild._threads) for guild in guilds)),
+        measure("discord.roles", itertools.chain.from_iterable(guild._roles.values() for guild in guilds),
+                sum(len(guild._roles) for guild in guilds)),
+        measure("discord.emojis", list(state._emojis.values()), len(state._emojis), state._emojis),
+        measure("discord.stickers", list(state._stickers.values()), len(state._stickers), state._stickers),
+        measure("discord.messages", list(messages), len(messages), messages),
+    ]
+
+
+def koala_caches() -> List[CacheSize]:
+    """
+    Estimate the size of Koala's caches of database reads and API responses
+    """
+    sizes = [measure(f"koala.{name}", list(ttl_cache._entries.items()), len(ttl_cache), ttl_cache._entries)
+             for name, ttl_cache in sorted(cache.caches.items())]
+    sizes.append(measure("koala.extensions", list(extension_cache._guild_extensions.items()),
+                         len(extension_cache._guild_extensions), extension_cache._guild_extensions))
+    sizes.append(measure("koala.api_responses", list(response_cache._entries.items()), len(response_cache),
+                         response_cache._entries))
+    return sizes
+
+
+def resident_memory() -> Optional[int]:
+    """
+    :return: The resident set size of this process in bytes, or None if it is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def memory_report(bot: commands.Bot) -> str:
+    """
+    A table of the approximate memory held by each cache
+
+    :param bot: The bot of this process
+    :return: The report
+    """
+    sizes = discord_caches(bot) + koala_caches()
+    chunked = sum(1 for guild in bot.guilds if guild.chunked)
+    lines = ["Member cache: chunking {chunking}, flags {flags}, {chunked}/{guilds} guilds chunked".format(
+                 chunking=member_cache.chunking, chunked=chunked, guilds=len(bot.guilds),
+                 flags=", ".join(name for name, value in member_cache.flags if value) or "none"),
+             "",
+             "{:<40} {:>10} {:>12}".format("Cache", "Objects", "Size")]
+    lines += ["{:<40} {:>10,} {:>12}".format(size.name, size.objects, format_size(size.size))
+              for size in sizes if size.objects]
+    lines.append("{:<40} {:>10} {:>12}".format("Total", "", format_size(sum(size.size for size in sizes))))
+    rss = resident_memory()
+    if rss is not None:
+        lines.append("{:<40} {:>10} {:>12}".format("Process resident memory", "", format_size(rss)))
+    return "\n".join(lines)
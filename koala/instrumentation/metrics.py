@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot Prometheus Metrics
+Latency and throughput of commands, listeners, database queries and Discord HTTP requests
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import time
+from functools import wraps
+
+# Libs
+import discord
+from discord.ext import commands
+from prometheus_client import Histogram
+
+# Own modules
+
+# Constants
+
+# Variables
+command_duration = Histogram("koala_command_duration_seconds", "Time taken to invoke a command",
+                             ["cog", "command", "status"])
+listener_duration = Histogram("koala_listener_duration_seconds", "Time taken to run an event listener",
+                              ["event", "listener"])
+db_query_duration = Histogram("koala_db_query_duration_seconds", "Time taken to execute a database statement",
+                              ["operation"])
+discord_http_duration = Histogram("koala_discord_http_request_duration_seconds",
+                                  "Time taken for a request to the Discord REST API", ["method", "route", "status"])
+
+
+def observe_command(ctx: commands.Context, duration: float):
+    """
+    Record the latency of an invoked command
+    :param ctx: The invocation context
+    :param duration: Time taken in seconds
+    """
+    command_duration.labels(cog=ctx.cog.qualified_name if ctx.cog else "",
+                            command=ctx.command.qualified_name,
+                            status="error" if ctx.command_failed else "success").observe(duration)
+
+
+def observe_listener(event_name: str, listener, duration: float):
+    """
+    Record the duration of an event listener. The histogram count is the number of events handled.
+    :param event_name: The name of the dispatched event e.g. on_message
+    :param listener: The listener coroutine function
+    :param duration: Time taken in seconds
+    """
+    listener_duration.labels(event=event_name,
+                             listener=getattr(listener, "__qualname__", repr(listener))).observe(duration)
+
+
+def instrument_http(http: discord.http.HTTPClient):
+    """
+    Record the latency of every request made to the Discord REST API, labelled by the route template
+    :param http: The HTTPClient of the bot
+    """
+    request = http.request
+    if hasattr(request, "__wrapped__"):
+        return
+
+    @wraps(request)
+    async def instrumented_request(route: discord.http.Route, **kwargs):
+        start = time.perf_counter()
+        status = "success"
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as e:
+            status = str(e.status)
+            raise
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            discord_http_duration.labels(method=route.method, route=route.path,
+                                         status=status).observe(time.perf_counter() - start)
+
+    http.request = instrumented_request
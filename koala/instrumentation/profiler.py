@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot Event Loop Profiler
+Samples the stack of the event loop thread from a background thread, attributing each sample to the cog listener,
+command or task running at the time. Profiles are written as collapsed stacks, the input of flamegraph tools, and as a
+summary of the functions that took the most samples.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import io
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+# Libs
+
+# Own modules
+from koala.env import PROFILER_INTERVAL, PROFILER_MAX_DURATION
+from koala.errors import InvalidArgumentError, KoalaException
+from .log import logger
+from .loop import _code_name, cog_label, task_name
+
+# Constants
+MAX_DEPTH = 128
+IDLE_LABEL = "idle"
+LOOP_LABEL = "loop"
+COLLAPSED_FILENAME = "profile.collapsed"
+SUMMARY_FILENAME = "profile-summary.txt"
+ARCHIVE_FILENAME = "profile.zip"
+SUMMARY_TOP = 30
+
+# Variables
+
+
+class ProfilerRunningError(KoalaException):
+    """
+    A profile was requested while another is running in this process
+    """
+    pass
+
+
+class Profile:
+    """
+    The stacks sampled from the event loop thread, counted by cog label and stack
+    """
+
+    def __init__(self, interval: float):
+        """
+        :param interval: The seconds between samples
+        """
+        self.interval = interval
+        self.started = time.time()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self.sampling_time = 0.0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    @property
+    def overhead(self) -> float:
+        """
+        The fraction of the profile spent sampling, when the sampler thread holds the GIL and the loop cannot run
+        """
+        return self.sampling_time / self.duration if self.duration else 0.0
+
+    def add(self, label: str, frames: Tuple[str, ...]):
+        self.stacks[(label,) + frames] += 1
+
+    def labels(self) -> Counter:
+        """
+        :return: Counter of samples by cog label
+        """
+        labels = Counter()
+        for stack, count in self.stacks.items():
+            labels[stack[0]] += count
+        return labels
+
+    def functions(self) -> Tuple[Counter, Counter]:
+        """
+        :return: Counters of samples by function, with the function running (self) and on the stack (total)
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for function in set(stack[1:]):
+                total[function] += count
+        return own, total
+
+    def collapsed(self) -> str:
+        """
+        The stacks in the collapsed format of flamegraph.pl and speedscope, rooted at their cog label
+        e.g. text_filter:TextFilter.on_message;koala.cogs.text_filter.cog:TextFilter.on_message;... 12
+        """
+        return "".join("{stack} {count}\n".format(stack=";".join(stack), count=count)
+                       for stack, count in sorted(self.stacks.items()))
+
+    def summary(self, top: int = SUMMARY_TOP) -> str:
+        """
+        A readable summary of the cog labels and functions that took the most samples
+        :param top: The number of functions to list
+        """
+        samples = self.samples or 1
+        own, total = self.functions()
+        lines = ["Profile of {duration:.1f}s from {started}, {samples} samples every {interval}s, "
+                 "sampler overhead {overhead:.2%}".format(duration=self.duration, samples=self.samples,
+                                                          started=time.strftime("%Y-%m-%d %H:%M:%S %Z",
+                                                                                time.localtime(self.started)),
+                                                          interval=self.interval, overhead=self.overhead),
+                 "",
+                 "Cogs, listeners and tasks:",
+                 "{:>8} {:>7}  {}".format("samples", "%", "label")]
+        lines += ["{:>8} {:>7.2%}  {}".format(count, count / samples, label)
+                  for label, count in self.labels().most_common()]
+        lines += ["",
+                  "Top functions:",
+                  "{:>8} {:>7} {:>8} {:>7}  {}".format("self", "%", "total", "%", "function")]
+        lines += ["{:>8} {:>7.2%} {:>8} {:>7.2%}  {}".format(count, count / samples, total[function],
+                                                             total[function] / samples, function)
+                  for function, count in own.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+    def archive(self) -> bytes:
+        """
+        :return: A zip of the collapsed stacks and the summary
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(COLLAPSED_FILENAME, self.collapsed())
+            archive.writestr(SUMMARY_FILENAME, self.summary())
+        return buffer.getvalue()
+
+
+class SamplingProfiler:
+    """
+    Profiles the running event loop on demand. Sampling reads the loop thread's frames from another thread, so the
+    loop is only paused while a sample is taken.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, max_duration: float = PROFILER_MAX_DURATION):
+        """
+        :param interval: The seconds between samples
+        :param max_duration: The longest profile allowed, in seconds
+        """
+        self.interval = interval
+        self.max_duration = max_duration
+        self._names: Dict[object, str] = {}
+        self.running = False
+
+    async def profile(self, duration: float) -> Profile:
+        """
+        Sample the running event loop for a duration
+        :param duration: The seconds to profile for
+        :return: The profile
+        :raises InvalidArgumentError: The duration is not positive or is over max_duration
+        :raises ProfilerRunningError: Another profile is running
+        """
+        if not 0 < duration <= self.max_duration:
+            raise InvalidArgumentError(f"Profile duration must be between 0 and {self.max_duration} seconds")
+        if self.running:
+            raise ProfilerRunningError("A profile is already running")
+        self.running = True
+        loop = asyncio.get_running_loop()
+        profile = Profile(self.interval)
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(loop, threading.get_ident(), profile, stop),
+                                   name="koala: profiler", daemon=True)
+        logger.info("Profiling the event loop for %ss", duration)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            stop.set()
+            # The sampler stops within one interval
+            sampler.join()
+            profile.duration = time.perf_counter() - start
+            self.running = False
+        logger.info("Profiled %s samples, sampler overhead %.2f%%", profile.samples, profile.overhead * 100)
+        return profile
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, thread_id: int, profile: Profile, stop: threading.Event):
+        while not stop.wait(self.interval):
+            start = time.perf_counter()
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                profile.add(*self.stack(frame, loop))
+            del frame
+            profile.sampling_time += time.perf_counter() - start
+
+    def frame_name(self, frame) -> str:
+        code = frame.f_code
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = "{module}:{name}".format(module=frame.f_globals.get("__name__", "unknown"),
+                                                              name=_code_name(code))
+        return name
+
+    def stack(self, frame, loop: Optional[asyncio.AbstractEventLoop] = None) -> Tuple[str, Tuple[str, ...]]:
+        """
+        The label and frames of a sampled stack. Frames below the callback the loop is running, or below the loop's
+        iteration when it is not running a callback, are left out.
+        The label is the outermost cog function on the stack, e.g. text_filter:TextFilter.on_message, otherwise the
+        name of the running task, 'idle' while the loop waits for events, or 'loop' for the loop's own work.
+        :param frame: The innermost frame
+        :param loop: The loop of the running task
+        :return: The label, and the frame names from outermost to innermost
+        """
+        frames = []
+        in_callback = False
+        while frame is not None and len(frames) < MAX_DEPTH:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__")
+            if code.co_name == "_run" and module == "asyncio.events":
+                in_callback = True
+                break
+            frames.append(frame)
+            if code.co_name == "_run_once" and module == "asyncio.base_events":
+                break
+            frame = frame.f_back
+        frames.reverse()
+
+        label = None
+        for frame in frames:
+            label = cog_label(frame.f_globals.get("__name__"), _code_name(frame.f_code))
+            if label:
+                break
+        names = tuple(self.frame_name(frame) for frame in frames)
+        if label is None:
+            # Read without asyncio.current_task, which only works in the loop's thread
+            task = asyncio.tasks._current_tasks.get(loop) if loop is not None else None
+            if task is not None:
+                label = task_name(task)
+            elif in_callback:
+                label = names[0] if names else LOOP_LABEL
+            elif frames and frames[-1].f_globals.get("__name__") == "selectors":
+                label = IDLE_LABEL
+            else:
+                label = LOOP_LABEL
+        return label, names
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot SQL Instrumentation
+Fingerprints every statement executed by the database engines, timing them per calling cog and logging slow queries
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import re
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Optional, Tuple
+
+# Libs
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Own modules
+from koala.env import SLOW_QUERY_THRESHOLD
+from koala.utils import walk_stack
+from .log import logger
+from .loop import _code_name, cog_label, task_label
+from .metrics import db_query_duration
+
+# Constants
+QUERY_START_KEY = "koala_query_start"
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+QUERY_SAMPLE_SIZE = 500
+MAX_FINGERPRINTS = 1000
+MAX_STACK_DEPTH = 128
+UNKNOWN_CALLER = "unknown"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_NOT_LABELLED = object()
+
+# Variables
+_code_labels: Dict[object, Optional[str]] = {}
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Normalise a statement so that statements differing only by literals or parameters share a fingerprint
+    e.g. "SELECT * FROM T WHERE id IN (?, ?, ?) AND name = 'a'" -> "SELECT * FROM T WHERE id IN (?+) AND name = ?"
+    :param statement: The SQL statement
+    :return: The fingerprint
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?+)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def query_operation(statement: str) -> str:
+    """
+    The type of a statement, e.g. SELECT
+    :param statement: The SQL statement
+    :return: The operation, or OTHER for DDL, pragmas etc.
+    """
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in QUERY_OPERATIONS else "OTHER"
+
+
+def redact(parameters, executemany: bool = False):
+    """
+    Replace parameter values with their type names so they can be logged
+    :param parameters: The parameters of the statement
+    :param executemany: If the parameters are a list of parameter sets
+    :return: The redacted parameters
+    """
+    if executemany:
+        return "<{count} parameter sets>".format(count=len(parameters))
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def calling_cog() -> str:
+    """
+    Find the cog that executed the current statement. Commands and listeners label their task with set_task_label, so
+    the label is read from the task. Otherwise, the innermost cog function on the stack is found. Async sessions
+    execute statements inside a greenlet, so the stacks of its parent greenlets are searched too.
+    :return: The cog label e.g. 'twitch_alert:TwitchAlertDBManager.get_parent_database_manager', or 'unknown'
+    """
+    label = task_label.get()
+    if label:
+        return label
+    for frame, _ in zip(walk_stack(sys._getframe(1)), range(MAX_STACK_DEPTH)):
+        code = frame.f_code
+        label = _code_labels.get(code, _NOT_LABELLED)
+        if label is _NOT_LABELLED:
+            label = _code_labels[code] = cog_label(frame.f_globals.get("__name__"), _code_name(code))
+        if label:
+            return label
+    return UNKNOWN_CALLER
+
+
+class QueryStats:
+    """
+    Stats for a single fingerprint called from a single cog.
+    Percentiles are taken over the most recent QUERY_SAMPLE_SIZE executions.
+    """
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=QUERY_SAMPLE_SIZE)
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.samples.append(duration)
+
+    def percentile(self, percent: float) -> float:
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * percent))]
+
+    def as_dict(self):
+        return {"count": self.count,
+                "total": round(self.total, 6),
+                "p50": round(self.percentile(0.5), 6),
+                "p99": round(self.percentile(0.99), 6)}
+
+
+class QueryRecorder:
+    """
+    Records the count and duration of every statement by fingerprint and calling cog
+    """
+
+    def __init__(self, slow_query_threshold: float = SLOW_QUERY_THRESHOLD):
+        self.slow_query_threshold = slow_query_threshold
+        self.queries: Dict[Tuple[str, str], QueryStats] = {}
+
+    def record(self, statement: str, parameters, executemany: bool, duration: float, caller: Optional[str] = None):
+        """
+        Record an executed statement
+        :param statement: The SQL statement
+        :param parameters: The parameters of the statement, only logged redacted
+        :param executemany: If the parameters are a list of parameter sets
+        :param duration: Time taken in seconds
+        :param caller: The calling cog label, found from the stack if not given
+        """
+        caller = caller or calling_cog()
+        key = (fingerprint(statement), caller)
+        stats = self.queries.get(key)
+        if stats is None:
+            if len(self.queries) >= MAX_FINGERPRINTS:
+                key = ("<other>", caller)
+            stats = self.queries.setdefault(key, QueryStats())
+        stats.add(duration)
+
+        if duration >= self.slow_query_threshold:
+            logger.warning("Slow query (%.3fs) from %s: %s parameters: %s", duration, caller,
+                           _WHITESPACE.sub(" ", statement).strip(), redact(parameters, executemany))
+
+    def top(self, count: int = 10, sort: str = "total") -> list:
+        """
+        The top fingerprints
+        :param count: The number of fingerprints to return
+        :param sort: The stat to sort by, one of count, total, p50 or p99
+        :return: list of dicts of fingerprint, caller and stats
+        """
+        results = [dict(fingerprint=query, caller=caller, **stats.as_dict())
+                   for (query, caller), stats in self.queries.items()]
+        if sort not in {"count", "total", "p50", "p99"}:
+            raise ValueError("Unknown sort '{sort}', use count, total, p50 or p99".format(sort=sort))
+        return sorted(results, key=lambda result: result[sort], reverse=True)[:count]
+
+    def reset(self):
+        self.queries = {}
+
+
+query_recorder = QueryRecorder()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info[QUERY_START_KEY].pop()
+    db_query_duration.labels(operation=query_operation(statement)).observe(duration)
+    query_recorder.record(statement, parameters, executemany, duration)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get(QUERY_START_KEY) if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """
+    Record the count and duration of every statement executed by an engine
+    :param engine: The engine, for an AsyncEngine pass its sync_engine
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
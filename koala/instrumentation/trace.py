@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+"""
+KoalaBot Gateway Trace Recorder
+Records the gateway events that drive the cogs to a compact, anonymised trace file, for replaying against a build with
+benchmarks.replay. Events are decoded in the event loop, then anonymised and written by a background thread.
+
+A trace is a gzipped file of JSON lines: a header object, then an [offset_ms, event_type, data] array per event.
+Snowflakes keep their timestamp bits with the rest replaced by a keyed hash, message words are replaced by keyed-hash
+pseudo-words of the same length, and usernames are not recorded. The key is random for each recording and never written,
+so the same ID or word maps to the same value throughout a trace but cannot be recovered from it.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import gzip
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+# Libs
+
+# Own modules
+from .log import logger
+
+# Constants
+TRACE_VERSION = 1
+TRACED_EVENTS = ("MESSAGE_CREATE", "MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE", "GUILD_MEMBER_ADD")
+COMMAND_PREFIXES = ("k!", "K!")
+SNOWFLAKE_TIMESTAMP_SHIFT = 22
+SNOWFLAKE_HASH_MASK = (1 << SNOWFLAKE_TIMESTAMP_SHIFT) - 1
+PSEUDO_WORD_ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+FLUSH_EVENTS = 1000
+# A mention of a user, role or channel, a custom emoji, or a word
+_TOKEN = re.compile(r"<(@!?|@&|#)(\d+)>|<(a?):(\w+):(\d+)>|\w+")
+
+# Variables
+
+
+class Anonymiser:
+    """
+    Maps snowflakes and words to stable pseudonyms using a keyed hash
+    """
+
+    def __init__(self, key: Optional[bytes] = None):
+        self._key = key or os.urandom(32)
+
+    def _digest(self, value: str, size: int) -> bytes:
+        return hashlib.blake2b(value.encode(), key=self._key, digest_size=size).digest()
+
+    def snowflake(self, value) -> Optional[str]:
+        """
+        Replace the worker, process and increment bits of a snowflake, keeping its creation time
+        :param value: The snowflake as an int or str, or None
+        :return: The pseudonymous snowflake as a str, as in gateway payloads
+        """
+        if value is None:
+            return None
+        value = int(value)
+        noise = int.from_bytes(self._digest(str(value), 8), "big") & SNOWFLAKE_HASH_MASK
+        return str((value >> SNOWFLAKE_TIMESTAMP_SHIFT << SNOWFLAKE_TIMESTAMP_SHIFT) | noise)
+
+    def word(self, word: str) -> str:
+        """
+        A pseudo-word of the same length as a word
+        """
+        digest = self._digest(word, 64)
+        return "".join(PSEUDO_WORD_ALPHABET[digest[i % len(digest)] % len(PSEUDO_WORD_ALPHABET)]
+                       for i in range(len(word)))
+
+    def content(self, content: str) -> str:
+        """
+        Anonymise message content, keeping its shape: the command name of a command, mentions and custom emoji with
+        pseudonymous IDs, and punctuation and whitespace
+        :param content: The message content
+        :return: The anonymised content
+        """
+        command = ""
+        if content.startswith(COMMAND_PREFIXES):
+            command, content = re.match(r"(\S*)(.*)", content, re.DOTALL).groups()
+
+        def replace(match):
+            if match.group(2):
+                return "<{kind}{id}>".format(kind=match.group(1), id=self.snowflake(match.group(2)))
+            if match.group(5):
+                return "<{animated}:{name}:{id}>".format(animated=match.group(3), name=self.word(match.group(4)),
+                                                        id=self.snowflake(match.group(5)))
+            return self.word(match.group(0))
+
+        return command + _TOKEN.sub(replace, content)
+
+    def user(self, user: Optional[dict]) -> Optional[dict]:
+        if user is None:
+            return None
+        return {"id": self.snowflake(user["id"]), "bot": user.get("bot", False)}
+
+    def emoji(self, emoji: dict) -> dict:
+        # Unicode emoji have no ID and are kept, custom emoji names are chosen by the guild
+        if emoji.get("id") is None:
+            return {"id": None, "name": emoji.get("name")}
+        return {"id": self.snowflake(emoji["id"]), "name": self.word(emoji.get("name") or "")}
+
+    def event(self, event_type: str, data: dict) -> dict:
+        """
+        Anonymise the compact data of a traced event
+        :param event_type: The gateway event type e.g. MESSAGE_CREATE
+        :param data: The data from compact_event
+        :return: The anonymised data
+        """
+        result = dict(data)
+        for key in ("id", "channel_id", "guild_id", "message_id", "user_id"):
+            if key in result:
+                result[key] = self.snowflake(result[key])
+        if "roles" in result:
+            result["roles"] = [self.snowflake(role) for role in result["roles"]]
+        if "content" in result:
+            result["content"] = self.content(result["content"])
+        for key in ("author", "user"):
+            if key in result:
+                result[key] = self.user(result[key])
+        if "emoji" in result:
+            result["emoji"] = self.emoji(result["emoji"])
+        return result
+
+
+def compact_event(event_type: str, data: dict) -> dict:
+    """
+    The fields of a gateway event payload that the cogs act on
+    :param event_type: The gateway event type e.g. MESSAGE_CREATE
+    :param data: The decoded payload
+    :return: dict of the fields, not yet anonymised
+    """
+    if event_type == "MESSAGE_CREATE":
+        author = data.get("author") or {}
+        return {"id": data["id"], "channel_id": data["channel_id"], "guild_id": data.get("guild_id"),
+                "type": data.get("type", 0), "content": data.get("content", ""),
+                "author": {"id": author.get("id"), "bot": author.get("bot", False)},
+                "roles": (data.get("member") or {}).get("roles", [])}
+    if event_type == "GUILD_MEMBER_ADD":
+        user = data.get("user") or {}
+        return {"guild_id": data["guild_id"], "user": {"id": user.get("id"), "bot": user.get("bot", False)},
+                "roles": data.get("roles", [])}
+    return {"message_id": data["message_id"], "channel_id": data["channel_id"], "guild_id": data.get("guild_id"),
+            "user_id": data["user_id"], "emoji": dict(data.get("emoji") or {}),
+            "roles": (data.get("member") or {}).get("roles", [])}
+
+
+def cluster_path(path: str, cluster: int) -> str:
+    """
+    The trace path of a cluster process e.g. ('trace.jsonl.gz', 2) -> 'trace.cluster2.jsonl.gz'
+    """
+    path = Path(path)
+    name, _, suffixes = path.name.partition(".")
+    return str(path.with_name("{name}.cluster{cluster}{dot}{suffixes}".format(
+        name=name, cluster=cluster, dot="." if suffixes else "", suffixes=suffixes)))
+
+
+class TraceRecorder:
+    """
+    Records the traced gateway events received by a bot to a trace file
+    """
+
+    def __init__(self, path: str, max_events: Optional[int] = None, anonymiser: Optional[Anonymiser] = None):
+        """
+        :param path: The trace file to write, replaced if it exists
+        :param max_events: Stop recording after this many events, or None for no limit
+        :param anonymiser: The anonymiser, with a random key by default
+        """
+        self.path = path
+        self.max_events = max_events
+        self.anonymiser = anonymiser or Anonymiser()
+        self.count = 0
+        self._start = None
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def install(self, bot):
+        """
+        Start recording the traced events received by a bot, by wrapping its gateway event parsers
+        :param bot: The bot, before it connects
+        """
+        parsers = bot._connection.parsers
+        for event_type in TRACED_EVENTS:
+            parsers[event_type] = self._wrap(event_type, parsers[event_type])
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._write, name="koala-gateway-trace", daemon=True)
+        self._thread.start()
+        logger.info("Recording gateway events to %s", self.path)
+
+    def _wrap(self, event_type: str, parser):
+        def traced(data):
+            self.record(event_type, data)
+            return parser(data)
+
+        traced.__wrapped__ = parser
+        return traced
+
+    def record(self, event_type: str, data: dict):
+        """
+        Queue an event to be anonymised and written
+        :param event_type: The gateway event type e.g. MESSAGE_CREATE
+        :param data: The decoded payload
+        """
+        if self.max_events is not None and self.count >= self.max_events:
+            return
+        self.count += 1
+        if self.count == self.max_events:
+            logger.info("Recorded %s gateway events to %s, stopped recording", self.count, self.path)
+        try:
+            event = compact_event(event_type, data)
+        except KeyError:
+            logger.warning("Not recording %s event missing a field", event_type)
+            return
+        self._queue.put((round((time.monotonic() - self._start) * 1e3), event_type, event))
+
+    def _write(self):
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps({"version": TRACE_VERSION, "events": TRACED_EVENTS,
+                                   "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}) + "\n")
+            written = 0
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                offset, event_type, data = item
+                try:
+                    line = json.dumps([offset, event_type, self.anonymiser.event(event_type, data)],
+                                      separators=(",", ":"))
+                except Exception as e:
+                    logger.warning("Not recording %s event: %s", event_type, e)
+                    continue
+                file.write(line + "\n")
+                written += 1
+                if written % FLUSH_EVENTS == 0:
+                    file.flush()
+
+    def close(self):
+        """
+        Write the queued events and close the trace file
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+
+def read_trace(path: str) -> Tuple[dict, Iterator[Tuple[int, str, dict]]]:
+    """
+    Read a trace file
+    :param path: The trace file
+    :return: The header, and an iterator of (offset_ms, event_type, data) in the order they were received
+    """
+    file = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(file.readline())
+    if header.get("version") != TRACE_VERSION:
+        file.close()
+        raise ValueError("Unsupported trace version {version}".format(version=header.get("version")))
+
+    def events():
+        with file:
+            for line in file:
+                if line.strip():
+                    offset, event_type, data = json.loads(line)
+                    yield offset, event_type, data
+
+    return header, events()
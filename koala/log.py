@@ -1,60 +1,148 @@
+import atexit
 import logging
+import queue
 import sys
-from datetime import date
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
 
-from koala.env import CONFIG_PATH, LOGGING_FILE
+from koala.env import CONFIG_PATH, LOGGING_FILE, LOG_ROTATION, LOG_MAX_BYTES, LOG_ROTATE_WHEN, LOG_BACKUP_COUNT, \
+    LOG_RATE_LIMIT, LOG_RATE_LIMIT_PERIOD, CLUSTER_COUNT, CLUSTER_ID, IS_CLUSTER_LAUNCHER
 
 _LOG_LEVEL = logging.DEBUG
 _FORMATTER = logging.Formatter("%(asctime)s %(levelname)-8s %(message)s")
-_LOG_DIR = Path(CONFIG_PATH, "logs", str(date.today()))
+_LOG_DIR = Path(CONFIG_PATH, "logs")
+if CLUSTER_COUNT > 1:
+    # Each process rotates its own files
+    _LOG_DIR = Path(_LOG_DIR, "launcher" if IS_CLUSTER_LAUNCHER else f"cluster-{CLUSTER_ID}")
 
 Path(_LOG_DIR).mkdir(exist_ok=True, parents=True)
 
 
-logging.basicConfig(filename=Path(_LOG_DIR, 'KoalaBot.log'),
-                    level=logging.WARN,
-                    format='%(asctime)s %(levelname)-8s %(message)s')
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repetitive records, allowing at most `rate` records from each logging call per `period` seconds.
+    The next record let through after a period with dropped records says how many were dropped.
+    Only records at or below `max_level` are limited, so warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate: int = LOG_RATE_LIMIT, period: float = LOG_RATE_LIMIT_PERIOD,
+                 max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.max_level = max_level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.period:
+                start, count = now, 0
+            if count >= self.rate:
+                self._windows[key] = (start, count, suppressed + 1)
+                return False
+            self._windows[key] = (start, count + 1, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+class _RoutedQueueHandler(QueueHandler):
+    """
+    Puts records on the log queue along with the handlers that should write them
+    """
+
+    def __init__(self, log_queue, handlers):
+        super().__init__(log_queue)
+        self.handlers = handlers
+
+    def enqueue(self, record):
+        self.queue.put_nowait((record, self.handlers))
+
+
+class _RoutedQueueListener(QueueListener):
+    """
+    Writes records taken off the log queue to their handlers on a background thread
+    """
+
+    def handle(self, item):
+        record, handlers = item
+        record = self.prepare(record)
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_queue = queue.SimpleQueue()
+_listener = _RoutedQueueListener(_queue)
+_listener.start()
+atexit.register(_listener.stop)
+
+_file_handlers = {}
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(_FORMATTER)
 
 
-def _get_default_warn_log():
-    koala_log = logging.FileHandler(filename=Path(_LOG_DIR, "KoalaBotWarn.log"))
-    koala_log.setFormatter(_FORMATTER)
-    koala_log.setLevel(logging.WARN)
-    return koala_log
+def _get_file_handler(log_name, log_level):
+    # Handlers are shared by file, as rotating a file with more than one handler open loses records
+    if log_name not in _file_handlers:
+        if LOG_ROTATION == "time":
+            file_handler = TimedRotatingFileHandler(filename=Path(_LOG_DIR, log_name), when=LOG_ROTATE_WHEN,
+                                                    backupCount=LOG_BACKUP_COUNT)
+        else:
+            file_handler = RotatingFileHandler(filename=Path(_LOG_DIR, log_name), maxBytes=LOG_MAX_BYTES,
+                                               backupCount=LOG_BACKUP_COUNT)
+        file_handler.setFormatter(_FORMATTER)
+        file_handler.setLevel(log_level)
+        _file_handlers[log_name] = file_handler
+    return _file_handlers[log_name]
 
 
-def _get_file_handler(log_name, log_level):
-    file_handler = logging.FileHandler(filename=Path(_LOG_DIR, log_name))
-    file_handler.setFormatter(_FORMATTER)
-    file_handler.setLevel(log_level)
-    return file_handler
+def _get_default_warn_log():
+    return _get_file_handler("KoalaBotWarn.log", logging.WARN)
 
 
-def _get_stdout_stream_handler(log_level):
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setFormatter(_FORMATTER)
-    stream_handler.setLevel(log_level)
-    return stream_handler
+def flush():
+    """
+    Wait for every queued record to be written
+    """
+    _listener.stop()
+    _listener.start()
 
 
-def get_logger(log_name, log_level=_LOG_LEVEL, file_name=None, file_handler=True, stdout_handler=True):
+def get_logger(log_name, log_level=_LOG_LEVEL, file_name=None, file_handler=True, stdout_handler=True,
+               rate_limit=LOG_RATE_LIMIT):
     new_logger = logging.getLogger(log_name)
+    handlers = []
 
     if file_handler and LOGGING_FILE:
-        new_logger.addHandler(_get_file_handler(file_name if file_name else log_name, log_level))
-        new_logger.addHandler(_get_default_warn_log())
+        handlers.append(_get_file_handler(file_name if file_name else log_name, log_level))
+        handlers.append(_get_default_warn_log())
 
     if stdout_handler:
-        new_logger.addHandler(_get_stdout_stream_handler(log_level))
+        handlers.append(_stdout_handler)
+
+    if handlers:
+        queue_handler = _RoutedQueueHandler(_queue, tuple(handlers))
+        if rate_limit:
+            queue_handler.addFilter(RateLimitFilter(rate_limit))
+        new_logger.addHandler(queue_handler)
 
     new_logger.setLevel(log_level)
 
     return new_logger
 
 
+logging.root.addHandler(_RoutedQueueHandler(_queue, (_get_file_handler("KoalaBot.log", logging.WARN),)))
+logging.root.setLevel(logging.WARN)
+
 logger = get_logger(__name__)
 
 discord_logger = get_logger("discord", log_level=logging.WARN, file_name="discord.log", stdout_handler=False)
-
-
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot member cache policy
+Chunking and caching every member of every guild dominates the bot's memory and slows READY, but only a few features
+need a guild's full member list. With lazy chunking, guilds are not chunked at startup. Features that need a full list
+call MemberCache.require first, which chunks the guild if its members are not all cached. The members of guilds that
+have not needed a full list for MEMBER_CACHE_IDLE_TTL seconds are evicted.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+# Libs
+import discord
+from discord.ext import commands
+from prometheus_client import Counter, Histogram
+
+# Own modules
+from koala.env import MEMBER_CHUNKING, MEMBER_CACHE_FLAGS, MEMBER_CACHE_IDLE_TTL
+from koala.log import logger
+
+# Constants
+CHUNK_AT_STARTUP = "startup"
+CHUNK_LAZILY = "lazy"
+EVICT_INTERVAL = 60
+
+# Variables
+guild_chunks = Histogram("koala_member_chunk_seconds", "Time to chunk a guild on demand",
+                         buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+members_evicted = Counter("koala_member_cache_evicted", "Members evicted from the cache of idle guilds")
+
+
+def cache_flags(names: List[str]) -> discord.MemberCacheFlags:
+    """
+    Build the member cache flags of discord.py from their names
+
+    :param names: all, none, or flag names e.g. voice, joined
+    :raises ValueError: An unknown flag name
+    """
+    if names == ["all"]:
+        return discord.MemberCacheFlags.all()
+    flags = discord.MemberCacheFlags.none()
+    for name in names:
+        if name == "none":
+            continue
+        if name not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError(f"Unknown member cache flag {name}, expected all, none or any of "
+                             f"{', '.join(discord.MemberCacheFlags.VALID_FLAGS)}")
+        setattr(flags, name, True)
+    return flags
+
+
+class MemberCache:
+    """
+    Chunks guilds when a feature needs their full member list, and evicts the members of idle guilds
+    """
+
+    def __init__(self, chunking: str = MEMBER_CHUNKING, flags: List[str] = MEMBER_CACHE_FLAGS,
+                 idle_ttl: float = MEMBER_CACHE_IDLE_TTL):
+        """
+        :param chunking: startup to chunk every guild on connect, as discord.py does by default, or lazy
+        :param flags: The names of the discord.py member cache flags
+        :param idle_ttl: The seconds a lazily chunked guild's members are kept for after they were last needed,
+            or 0 to keep them
+        """
+        if chunking not in (CHUNK_AT_STARTUP, CHUNK_LAZILY):
+            raise ValueError(f"Unknown member chunking {chunking}, expected {CHUNK_AT_STARTUP} or {CHUNK_LAZILY}")
+        self.chunking = chunking
+        self.flags = cache_flags(flags)
+        self.idle_ttl = idle_ttl
+        self.last_used: Dict[int, float] = {}
+        self._bot: Optional[commands.Bot] = None
+        self._started = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def lazy(self) -> bool:
+        """
+        Whether guilds are chunked on demand by a running bot. Otherwise, every guild's members are already cached.
+        """
+        return self.chunking == CHUNK_LAZILY and self._bot is not None
+
+    def bot_options(self) -> dict:
+        """
+        :return: The options of the discord.py client for this policy
+        """
+        return {"chunk_guilds_at_startup": self.chunking == CHUNK_AT_STARTUP,
+                "member_cache_flags": self.flags}
+
+    def start(self, bot: commands.Bot):
+        """
+        Start chunking guilds on demand for a bot, and evicting idle guilds
+
+        :param bot: The bot, created with bot_options
+        """
+        self._bot = bot
+        self._started = time.monotonic()
+        if self.lazy and self.idle_ttl:
+            self._task = asyncio.create_task(self._evict_idle(), name="koala: member cache eviction")
+        logger.info("Member cache started, chunking %s with flags %s", self.chunking,
+                    ", ".join(name for name, value in self.flags if value) or "none")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._bot = None
+        self.last_used.clear()
+
+    async def require(self, guild: discord.Guild) -> List[discord.Member]:
+        """
+        Make sure every member of a guild is cached, chunking it if not. Call before using guild.members or
+        role.members.
+
+        :param guild: The guild
+        :return: The members of the guild
+        """
+        if self.lazy:
+            self.last_used[guild.id] = time.monotonic()
+            if not guild.chunked:
+                start = time.perf_counter()
+                # Concurrent chunks of a guild share one request
+                await guild.chunk(cache=True)
+                duration = time.perf_counter() - start
+                guild_chunks.observe(duration)
+                logger.debug("Chunked %s members of guild %s in %.2fs", len(guild.members), guild.id, duration)
+        return guild.members
+
+    async def get_member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """
+        Get a member of a guild, requesting it from the gateway if it is not cached
+
+        :param guild: The guild
+        :param user_id: Discord user ID of the member
+        :return: The member, or None if the user is not in the guild
+        """
+        member = guild.get_member(user_id)
+        if member is None and self.lazy:
+            members = await guild.query_members(user_ids=[user_id], limit=1, cache=True)
+            member = members[0] if members else None
+        return member
+
+    def count(self, guild: discord.Guild) -> int:
+        """
+        The number of members in a guild, without chunking it
+
+        :param guild: The guild
+        """
+        if self.lazy and not guild.chunked:
+            return guild.member_count or 0
+        return len(guild.members)
+
+    def evict(self, guild: discord.Guild) -> int:
+        """
+        Remove the members of a guild from the cache, except the bot and, with the voice flag, members in voice
+        channels
+
+        :param guild: The guild
+        :return: The number of members evicted
+        """
+        evicted = 0
+        for member in guild.members:
+            if member.id == self._bot.user.id or (self.flags.voice and member.voice is not None):
+                continue
+            guild._remove_member(member)
+            evicted += 1
+        self.last_used.pop(guild.id, None)
+        members_evicted.inc(evicted)
+        return evicted
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Evict the members of guilds that have not needed a full member list within the idle TTL
+
+        :param now: The time.monotonic() to compare last uses to
+        :return: The number of members evicted
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.idle_ttl
+        evicted = 0
+        for guild in self._bot.guilds:
+            if self.last_used.get(guild.id, self._started) < cutoff and len(guild.members) > 1:
+                evicted += self.evict(guild)
+        if evicted:
+            logger.info("Evicted %s members of idle guilds", evicted)
+        return evicted
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(EVICT_INTERVAL)
+            try:
+                self.evict_idle()
+            except Exception as err:
+                logger.error("Failed to evict idle guilds' members: %s", err, exc_info=err)
+
+
+member_cache = MemberCache()
@@ -2,42 +2,46 @@
 # Built-in/Generic Imports
 # Libs
 
-import sqlalchemy.dialects.mssql.information_schema
 import sqlalchemy.types as types
-from sqlalchemy import Column, ForeignKey
-from sqlalchemy import INT, VARCHAR, BOOLEAN
+from sqlalchemy import Column, ForeignKey, Index, Table
+from sqlalchemy import INT, VARCHAR, BOOLEAN, BIGINT, DATETIME
 from sqlalchemy.orm import registry
 from sqlalchemy.orm import validates
 
 # Own modules
+from koala.utils import lazy_import
 
 # Constants
 
 # Variables
+mysql = lazy_import("sqlalchemy.dialects.mysql")
 
 mapper_registry = registry()
 
 
 class DiscordSnowflake(types.TypeDecorator):
     """
-    Uses int for python, but VARCHAR(20) for storing in db
+    Uses int for python, and a 64-bit integer for storing in db (BIGINT UNSIGNED in MySQL)
+    Results are converted to int, as columns not yet migrated from VARCHAR(20) or with TEXT affinity in SQLite return str
     """
 
-    impl = types.VARCHAR(20)
+    impl = types.BigInteger
 
     cache_ok = True
 
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.BIGINT(unsigned=True))
+        return dialect.type_descriptor(types.BigInteger())
+
     def process_bind_param(self, value, dialect):
-        return str(value) if value else None
+        return int(value) if value else None
 
     def process_literal_param(self, value, dialect):
-        return str(value) if value else None
+        return str(int(value)) if value else "NULL"
 
     def process_result_value(self, value, dialect):
-        return int(value) if value else None
-
-    def copy(self, **kw):
-        return DiscordSnowflake(self.impl.length)
+        return int(value) if value is not None else None
 
     @property
     def python_type(self):
@@ -48,7 +52,7 @@ class BaseModel:
     """
     The base, serializable model for all sqlalchemy models in this project
     """
-    __table__: sqlalchemy.dialects.mssql.information_schema.tables
+    __table__: Table
 
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -59,10 +63,11 @@ class Guilds:
     __tablename__ = 'Guilds'
     guild_id = Column(DiscordSnowflake, primary_key=True)
     subscription = Column(INT)
+    left_at = Column(DATETIME, nullable=True)  # When the bot left the guild, or None while it is a member
 
     def __repr__(self):
-        return "<Guilds(%s, %s)>" % \
-               (self.guild_id, self.subscription)
+        return "<Guilds(%s, %s, %s)>" % \
+               (self.guild_id, self.subscription, self.left_at)
 
 
 @mapper_registry.mapped
@@ -83,6 +88,7 @@ class GuildExtensions:
     __tablename__ = 'GuildExtensions'
     extension_id = Column(VARCHAR(20), ForeignKey("KoalaExtensions.extension_id", ondelete='CASCADE'), primary_key=True)
     guild_id = Column(DiscordSnowflake, primary_key=True)
+    __table_args__ = (Index("ix_GuildExtensions_guild_id", "guild_id"),)
 
     @validates("guild_id")
     def validate_discord_snowflake(self, key, guild_id):
@@ -92,3 +98,36 @@ class GuildExtensions:
         return "<GuildExtensions(%s, %s)>" % \
                (self.extension_id, self.guild_id)
 
+
+
+@mapper_registry.mapped
+class Leases:
+    __tablename__ = 'Leases'
+    name = Column(VARCHAR(100), primary_key=True)
+    holder = Column(VARCHAR(100), nullable=False)
+    token = Column(BIGINT, nullable=False)
+    expires = Column(BIGINT, nullable=False)
+
+    def __repr__(self):
+        return "<Leases(%s, %s, %s, %s)>" % \
+               (self.name, self.holder, self.token, self.expires)
+
+
+@mapper_registry.mapped
+class CacheInvalidations:
+    """
+    The change log of cache invalidations, read by the other processes (see koala.bus)
+    """
+    __tablename__ = 'CacheInvalidations'
+    id = Column(BIGINT().with_variant(INT, "sqlite"), primary_key=True, autoincrement=True)
+    origin = Column(VARCHAR(100), nullable=False)
+    namespace = Column(VARCHAR(100), nullable=False)
+    guild_id = Column(DiscordSnowflake, nullable=False)
+    created = Column(BIGINT, nullable=False)  # epoch milliseconds
+    # Deleting old rows must not let SQLite reuse their IDs, or other processes would skip the new rows
+    __table_args__ = ({"sqlite_autoincrement": True},)
+
+    def __repr__(self):
+        return "<CacheInvalidations(%s, %s, %s, %s, %s)>" % \
+               (self.id, self.origin, self.namespace, self.guild_id, self.created)
+
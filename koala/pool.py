@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot database connection pool configuration and monitoring
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import sys
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+# Libs
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+# Own modules
+from koala.env import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, \
+    DB_LEAK_THRESHOLD, DB_CHECKOUT_STACKS, DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL
+from koala.log import logger
+from koala.utils import walk_stack
+
+# Constants
+CHECKOUT_STACK_LIMIT = 40
+LEAK_CHECK_INTERVAL = 10
+# MySQL 8.0.22 renamed the replication status statement and its lag column
+REPLICA_STATUS_QUERIES = (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                          ("SHOW SLAVE STATUS", "Seconds_Behind_Master"))
+
+# Variables
+pool_wait = Histogram("koala_db_pool_wait_seconds", "Time spent waiting to check out a database connection",
+                      ["pool"], buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 10, 30))
+pool_checked_out = Gauge("koala_db_pool_checked_out", "Database connections currently checked out", ["pool"])
+pool_utilisation = Gauge("koala_db_pool_utilisation",
+                         "Database connections checked out as a fraction of pool size plus max overflow", ["pool"])
+pool_leaks = Counter("koala_db_pool_leaks", "Database connections checked out for longer than the leak threshold",
+                     ["pool"])
+pool_sessions = Counter("koala_db_pool_sessions", "Database sessions opened, by the pool they were routed to",
+                        ["pool", "readonly"])
+replica_lag = Gauge("koala_db_replica_lag_seconds", "Replication lag of the read replica, -1 if unknown", ["pool"])
+replica_available = Gauge("koala_db_replica_available",
+                          "1 while read-only sessions use the replica, 0 while they fall back to the primary", ["pool"])
+
+
+class _MonitoredPoolMixin:
+    """
+    Records how long each checkout waited for a free connection
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.labels(pool=self.logging_name).observe(time.perf_counter() - start)
+
+
+class MonitoredQueuePool(_MonitoredPoolMixin, QueuePool):
+    pass
+
+
+class MonitoredAsyncAdaptedQueuePool(_MonitoredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: URL, name: str, is_async: bool = False) -> dict:
+    """
+    The create_engine arguments for the connection pool of a database.
+    SQLite and SQLCipher are local files, so connections are kept open (opening a SQLCipher connection derives the
+    key) but never need pinging or recycling. MySQL connections are pinged on checkout and recycled before the server
+    times them out.
+
+    :param url: The database url
+    :param name: The name of the pool, used in logs and metrics
+    :param is_async: If the engine is an asyncio engine
+    :return: dict of keyword arguments for create_engine
+    """
+    options = {"pool_logging_name": name}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        options.update(poolclass=StaticPool, connect_args={"check_same_thread": False})
+        return options
+
+    options.update(poolclass=MonitoredAsyncAdaptedQueuePool if is_async else MonitoredQueuePool,
+                   pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if url.get_backend_name() == "sqlite":
+        options.update(connect_args={"check_same_thread": False})
+    else:
+        options.update(pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING)
+    return options
+
+
+class PoolMonitor:
+    """
+    Tracks the connections checked out of an engine's pool, optionally with the stack that checked them out,
+    so that sessions which are never closed can be found.
+    """
+
+    def __init__(self, engine: Engine, name: str, leak_threshold: float = DB_LEAK_THRESHOLD,
+                 capture_stacks: bool = DB_CHECKOUT_STACKS, check_interval: float = LEAK_CHECK_INTERVAL):
+        """
+        :param engine: The engine of the pool
+        :param name: The name of the pool, used in logs and metrics
+        :param leak_threshold: The seconds a connection can be checked out for before it is reported as leaked
+        :param capture_stacks: If the stack of each checkout is recorded, which walks the stack on every checkout
+        :param check_interval: The seconds between checks for leaked connections
+        """
+        self.engine = engine
+        self.name = name
+        self.leak_threshold = leak_threshold
+        self.capture_stacks = capture_stacks
+        self.check_interval = check_interval
+        self._checked_out: Dict[object, Tuple[float, Optional[traceback.StackSummary]]] = {}
+        self._reported = set()
+        self._task: Optional[asyncio.Task] = None
+
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "detach", self._on_checkin)
+        pool_checked_out.labels(pool=name).set_function(lambda: len(self._checked_out))
+        pool_utilisation.labels(pool=name).set_function(self.utilisation)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        stack = None
+        if self.capture_stacks:
+            frames = ((frame, frame.f_lineno) for frame, _ in zip(walk_stack(sys._getframe(1)),
+                                                                  range(CHECKOUT_STACK_LIMIT)))
+            stack = traceback.StackSummary.extract(frames, lookup_lines=False)
+        self._checked_out[connection_record] = (time.monotonic(), stack)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._checked_out.pop(connection_record, None)
+        self._reported.discard(connection_record)
+
+    def capacity(self) -> int:
+        """
+        The maximum number of connections the pool can check out
+        """
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            return pool.size() + max(pool._max_overflow, 0)
+        return 1
+
+    def utilisation(self) -> float:
+        return len(self._checked_out) / self.capacity()
+
+    def leaks(self) -> list:
+        """
+        The connections that have been checked out for longer than the leak threshold
+
+        :return: list of (connection record, seconds checked out, checkout stack), oldest first
+        """
+        now = time.monotonic()
+        leaks = [(record, now - start, stack) for record, (start, stack) in list(self._checked_out.items())
+                 if now - start >= self.leak_threshold]
+        return sorted(leaks, key=lambda leak: leak[1], reverse=True)
+
+    def check_leaks(self):
+        """
+        Log each leaked connection once, with the stack that checked it out if stacks are captured
+        """
+        for record, age, stack in self.leaks():
+            if record in self._reported:
+                continue
+            self._reported.add(record)
+            pool_leaks.labels(pool=self.name).inc()
+            logger.warning("Database connection from pool %s checked out for %.0fs, possible leaked session. "
+                           "Checked out at:\n%s", self.name, age,
+                           "".join(reversed(stack.format())) if stack is not None
+                           else "unknown, set DB_CHECKOUT_STACKS=True to record checkout stacks")
+
+    def start(self):
+        """
+        Check for leaked connections every check interval in the background
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"koala: pool {self.name} leaks")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.check_leaks()
+
+    def stats(self) -> dict:
+        """
+        The current state of the pool
+
+        :return: dict of checked out, capacity, utilisation and leaked connections with their checkout stacks
+        """
+        return {"checked_out": len(self._checked_out),
+                "capacity": self.capacity(),
+                "utilisation": round(self.utilisation(), 4),
+                "status": self.engine.pool.status(),
+                "leaks": [{"age": round(age, 3), "stack": list(reversed(stack.format())) if stack is not None else None}
+                          for _, age, stack in self.leaks()]}
+
+
+class ReplicaMonitor:
+    """
+    Measures the replication lag of a read replica in the background, so that read-only sessions fall back to the
+    primary while the replica is lagging by more than max_lag or cannot be reached.
+    The replica is unavailable until its first successful check.
+    """
+
+    def __init__(self, engine: AsyncEngine, name: str, max_lag: float = DB_REPLICA_MAX_LAG,
+                 interval: float = DB_REPLICA_CHECK_INTERVAL):
+        """
+        :param engine: The asyncio engine of the replica
+        :param name: The name of the replica pool, used in logs and metrics
+        :param max_lag: The replication lag in seconds above which reads go to the primary
+        :param interval: The seconds between checks
+        """
+        self.engine = engine
+        self.name = name
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self.available = False
+        self.checked: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        replica_lag.labels(pool=name).set_function(lambda: -1 if self.lag is None else self.lag)
+        replica_available.labels(pool=name).set_function(lambda: int(self.available))
+
+    async def measure_lag(self) -> Optional[float]:
+        """
+        The replication lag of the replica
+        :return: The lag in seconds, 0 if the database does not report replication status, or None if replication is
+            stopped
+        """
+        async with self.engine.connect() as connection:
+            if self.engine.dialect.name != "mysql":
+                await connection.execute(text("SELECT 1"))
+                return 0.0
+            for query, column in REPLICA_STATUS_QUERIES:
+                try:
+                    status = (await connection.execute(text(query))).mappings().first()
+                except DBAPIError:
+                    continue
+                if status is None:
+                    # Not a replica of a binlog source e.g. a managed reader endpoint, which reports its lag elsewhere
+                    return 0.0
+                lag = status.get(column)
+                return None if lag is None else float(lag)
+            return 0.0
+
+    async def check(self) -> bool:
+        """
+        Measure the replication lag, and update whether read-only sessions use the replica
+        :return: If the replica is available
+        """
+        try:
+            self.lag = await self.measure_lag()
+        except Exception as err:
+            logger.warning("Failed to check replica %s: %s", self.name, err)
+            self.lag = None
+        self.checked = time.monotonic()
+        available = self.lag is not None and self.lag <= self.max_lag
+        if available != self.available:
+            if available:
+                logger.info("Read-only sessions use replica %s, lag %.1fs", self.name, self.lag)
+            else:
+                logger.warning("Read-only sessions fall back to the primary, replica %s lag %s", self.name,
+                               "unknown" if self.lag is None else "{:.1f}s".format(self.lag))
+        self.available = available
+        return available
+
+    def mark_unavailable(self):
+        """
+        Fall back to the primary until the next check, e.g. when a connection to the replica is lost
+        """
+        if self.available:
+            logger.warning("Read-only sessions fall back to the primary, lost connection to replica %s", self.name)
+        self.available = False
+
+    async def start(self):
+        """
+        Check the replica now, then every interval in the background
+        """
+        if self._task is not None and not self._task.done():
+            return
+        await self.check()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name=f"replica-{self.name}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.available = False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def stats(self) -> dict:
+        return {"available": self.available,
+                "lag": self.lag,
+                "max_lag": self.max_lag,
+                "checked": round(time.monotonic() - self.checked, 3) if self.checked is not None else None}
@@ -1,30 +1,31 @@
 # Futures
 # Built-in/Generic Imports
-import dataclasses
-import datetime
 import inspect
 import json
 import typing
 # Libs
 from functools import wraps
-from http.client import OK, BAD_REQUEST
+from http.client import OK, BAD_REQUEST, NOT_MODIFIED
 
 import aiohttp.web
 from aiohttp.abc import Request
 from aiohttp.typedefs import Handler
 
+from koala import db
 from koala.errors import KoalaException
 from koala.log import logger
 # Own modules
-from koala.models import BaseModel
+from koala.rest import cache, serializer
 from koala.rest.dto import ApiError, StringApiResponse
-from koala.utils import cast
+from koala.utils import compile_cast
 
 
 # Constants
 
 
 # Variables
+serializer.register_encoder(ApiError)
+serializer.register_encoder(StringApiResponse)
 
 
 class EnhancedJSONEncoder(json.JSONEncoder):
@@ -33,32 +34,69 @@ class EnhancedJSONEncoder(json.JSONEncoder):
     """
 
     def default(self, o):
-        if isinstance(o, BaseModel):
-            return o.as_dict()
-        if dataclasses.is_dataclass(o):
-            return dataclasses.asdict(o)
-        if isinstance(o, (datetime.date, datetime.datetime)):
-            return o.isoformat()
-        return super().default(o)
+        return serializer.default(o)
 
 
-def build_response(status_code, data):
+def build_response(status_code, data, headers=None):
     """
     Build a response object
     :param status_code:
     :param data:
+    :param headers: Extra response headers
     :return:
     """
     if data is not None:
-        body = json.dumps(data, cls=EnhancedJSONEncoder)
+        body = serializer.dumps(data)
     else:
         body = None
 
     return aiohttp.web.Response(status=status_code,
                                 body=body,
+                                headers=headers,
                                 content_type='application/json')
 
 
+def _cached_response(request: Request, entry: cache.CachedResponse, status: str = None) -> aiohttp.web.Response:
+    headers = {"ETag": entry.etag}
+    if status:
+        headers["X-Cache"] = status
+    if cache.etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        return aiohttp.web.Response(status=NOT_MODIFIED, headers=headers)
+    return aiohttp.web.Response(status=OK, body=entry.body, headers=headers, content_type='application/json')
+
+
+class RequestBinder:
+    """
+    The arguments of an API endpoint, inspected once when the endpoint is decorated
+    """
+
+    def __init__(self, func):
+        parameters = dict(inspect.signature(func).parameters)
+        parameters.pop("self")
+        self.parameters = tuple((name, None if parameter.annotation == inspect.Parameter.empty
+                                 else compile_cast(parameter.annotation))
+                                for name, parameter in parameters.items())
+        self.required = {name for name, parameter in parameters.items()
+                         if parameter.default == inspect.Parameter.empty}
+
+    async def bind(self, request: Request) -> dict:
+        """
+        Get the endpoint arguments from the body of a POST, PUT or PATCH request, or the query of any other request
+        :param request: The request
+        :return: dict of argument name to cast value, for the arguments given in the request
+        """
+        if (request.method in request.POST_METHODS) and request.body_exists:
+            values = await request.json()
+        else:
+            values = request.query
+
+        available_args = {}
+        for name, cast_value in self.parameters:
+            if name in values:
+                available_args[name] = cast_value(values[name]) if cast_value else values[name]
+        return available_args
+
+
 def parse_request(*args, **kwargs) -> Handler:
     """
     A wrapper for API endpoints that provide the required args
@@ -77,8 +115,16 @@ def parse_request(*args, **kwargs) -> Handler:
                                 text="done",
                                 content_type='application/json')
 
+    Arguments are cast to their annotated types, the casts are compiled once by RequestBinder
 
-    todo: add type parsing/conversion based on wanted_arg types
+    GET responses have a strong ETag, and a request with a matching If-None-Match gets a 304.
+    With cache_ttl and cache_scope, GET responses are cached for cache_ttl seconds per guild_id and query.
+    With invalidates, a write endpoint that succeeds removes the cached responses of that scope for its guild_id.
+    Cached GET endpoints read from the database replica, unless their guild_id was written within the replica lag.
+      @parse_request(cache_ttl=30, cache_scope="verify")
+      async def get_config(self, guild_id): ...
+      @parse_request(invalidates="verify")
+      async def put_config(self, guild_id, roles): ...
     :param args:
     :param kwargs:
     :return:
@@ -93,56 +139,63 @@ def parse_request(*args, **kwargs) -> Handler:
 
     if not func:
         raw_response = kwargs.get('raw_response')
+    cache_ttl = kwargs.get('cache_ttl')
+    cache_scope = kwargs.get('cache_scope')
+    invalidates = kwargs.get('invalidates')
 
     def parsed_request(func):
+        binder = RequestBinder(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             self = args[0]
             request: Request = args[1]
 
-            wanted_args: dict[str, inspect.Parameter] = dict(inspect.signature(func).parameters)
-            wanted_args.pop("self")
-
-            required_args: dict[str, inspect.Parameter] = {a: wanted_args.get(a) for a in wanted_args.keys() if
-                                                           wanted_args.get(a).default == inspect.Parameter.empty}
+            available_args = await binder.bind(request)
 
-            available_args = {}
-
-            if (request.method in request.POST_METHODS) and request.can_read_body:
-                body = await request.json()
-                for arg in wanted_args.keys():
-                    if arg in body:
-                        if wanted_args[arg].annotation == inspect.Parameter.empty:
-                            available_args[arg] = body[arg]
-                        else:
-                            available_args[arg] = cast(wanted_args[arg].annotation, body[arg])
-            else:
-                for arg in wanted_args.keys():
-                    if arg in request.query:
-                        if wanted_args[arg].annotation == inspect.Parameter.empty:
-                            available_args[arg] = request.query[arg]
-                        else:
-                            available_args[arg] = cast(wanted_args[arg].annotation, request.query[arg])
-
-            unsatisfied_args = set(required_args.keys()) - set(available_args.keys())
+            unsatisfied_args = binder.required - available_args.keys()
             if unsatisfied_args:
                 # Expected match info that doesn't exist
                 return build_response(BAD_REQUEST, ApiError("BAD_REQUEST",
                                                             "Unsatisfied Arguments: %s" % unsatisfied_args))
 
+            is_get = request.method == "GET" and not raw_response
+            readonly = None
+            if is_get and cache_ttl:
+                guild_id = cache.guild_key(available_args.get("guild_id"))
+                key = (func.__qualname__, tuple(sorted(request.query.items())))
+                entry = cache.response_cache.get(cache_scope, guild_id, key)
+                if entry is not None:
+                    return _cached_response(request, entry, "HIT")
+                # Cached reads use the replica, unless the guild was just written so the response would be stale
+                readonly = not db.guild_recently_written(guild_id)
+                # A write during the read invalidates before this response is cached, so it is not cached
+                version = cache.response_cache.version
+
             try:
-                result = await func(self, **{arg_name: available_args[arg_name] for arg_name in available_args.keys()})
+                with db.read_only_sessions(readonly):
+                    result = await func(self, **available_args)
                 if isinstance(result, str):
                     result = StringApiResponse(result)
 
             except Exception as e:
                 logger.error("API Failed", exc_info=e)
                 return build_response(BAD_REQUEST, ApiError(type(e).__name__, str(e)))
+            if invalidates:
+                cache.response_cache.invalidate(invalidates, cache.guild_key(available_args.get("guild_id")))
+                db.note_guild_write(cache.guild_key(available_args.get("guild_id")))
             if raw_response:
                 return result
+            elif is_get:
+                body = serializer.dumps(result) if result is not None else None
+                if cache_ttl:
+                    entry = cache.response_cache.put(cache_scope, guild_id, key, body, cache_ttl, version)
+                    return _cached_response(request, entry, "MISS")
+                return _cached_response(request, cache.CachedResponse(body, 0))
             else:
                 return build_response(OK, result)
 
+        wrapper.binder = binder
         return wrapper
 
     return parsed_request(func) if func else parsed_request
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot REST API response cache
+Caches the encoded responses of GET endpoints for a short time, with a strong ETag for each response, until a write
+endpoint of the same scope is called for the same guild
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+# Libs
+
+# Own modules
+
+# Constants
+MAX_ENTRIES = 2048
+
+# Variables
+
+
+def etag(body: Optional[bytes]) -> str:
+    """
+    A strong ETag for a response body
+    :param body: The encoded body
+    :return: The quoted ETag
+    """
+    return '"{}"'.format(hashlib.blake2b(body or b"", digest_size=16).hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    If the If-None-Match header of a request matches an ETag, using the weak comparison of RFC 7232
+    :param if_none_match: The If-None-Match header, a list of ETags or *
+    :param tag: The ETag of the current response
+    :return: True if the client already has the current response
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == tag:
+            return True
+    return False
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "expires")
+
+    def __init__(self, body: Optional[bytes], ttl: float):
+        self.body = body
+        self.etag = etag(body)
+        self.expires = time.monotonic() + ttl
+
+
+class ResponseCache:
+    """
+    Encoded responses by scope, guild and request query, least recently used first.
+    The queries cached for each scope and guild are indexed, so a write only visits its own guild's responses.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Optional[int], Hashable], CachedResponse]" = OrderedDict()
+        self._keys: Dict[str, Dict[Optional[int], Set[Hashable]]] = {}
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope: str, guild_id: Optional[int], key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get((scope, guild_id, key))
+        if entry is None or entry.expires <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end((scope, guild_id, key))
+        self.hits += 1
+        return entry
+
+    def put(self, scope: str, guild_id: Optional[int], key: Hashable, body: Optional[bytes],
+            ttl: float, version: Optional[int] = None) -> CachedResponse:
+        """
+        Cache a response
+        :param version: The version of the cache before the response was read. If a write has invalidated responses
+            since, the response may be stale so it is not cached.
+        :return: The cached response
+        """
+        entry = CachedResponse(body, ttl)
+        if version is not None and version != self.version:
+            return entry
+        self._entries[(scope, guild_id, key)] = entry
+        self._entries.move_to_end((scope, guild_id, key))
+        self._keys.setdefault(scope, {}).setdefault(guild_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            (evicted_scope, evicted_guild_id, evicted_key), _ = self._entries.popitem(last=False)
+            guild_keys = self._keys[evicted_scope][evicted_guild_id]
+            guild_keys.discard(evicted_key)
+            if not guild_keys:
+                del self._keys[evicted_scope][evicted_guild_id]
+        return entry
+
+    def invalidate(self, scope: str, guild_id: Optional[int] = None):
+        """
+        Remove the cached responses of a scope
+        :param scope: The scope, e.g. react_for_role
+        :param guild_id: Only remove the responses for this guild, or all guilds if None
+        """
+        self.version += 1
+        scope_keys = self._keys.get(scope)
+        if not scope_keys:
+            return
+        guild_ids = list(scope_keys) if guild_id is None else [guild_id, None]
+        for entry_guild_id in guild_ids:
+            for key in scope_keys.pop(entry_guild_id, ()):
+                del self._entries[(scope, entry_guild_id, key)]
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
+
+
+def guild_key(guild_id) -> Optional[int]:
+    """
+    The guild of a request, from its guild_id argument
+    """
+    try:
+        return int(guild_id)
+    except (TypeError, ValueError):
+        return None
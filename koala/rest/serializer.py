@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot REST API JSON serializer
+Encodes responses with orjson when it is installed, otherwise with the standard library json module.
+Dataclasses and database models are encoded by a per-type encoder, built once the first time each type is seen.
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import dataclasses
+import datetime
+import json
+from typing import Any, Callable, Dict
+
+# Libs
+
+# Own modules
+from koala.env import JSON_BACKEND
+from koala.log import logger
+from koala.models import BaseModel
+
+# Constants
+BACKENDS = ["auto", "orjson", "json"]
+
+# Variables
+_encoders: Dict[type, Callable[[Any], Any]] = {}
+
+
+def _field_encoder(names):
+    names = tuple(names)
+    return lambda o: {name: getattr(o, name) for name in names}
+
+
+def _isoformat(o):
+    return o.isoformat()
+
+
+def _build_encoder(cls: type) -> Callable[[Any], Any]:
+    """
+    Build the encoder for a type. Values in the encoded result are encoded by the backend, so nested dataclasses and
+    models are encoded by their own encoders without copying.
+
+    :param cls: The type to encode
+    :return: A function returning a JSON serializable version of an instance
+    """
+    if dataclasses.is_dataclass(cls):
+        return _field_encoder(field.name for field in dataclasses.fields(cls))
+    if issubclass(cls, BaseModel):
+        return _field_encoder(column.name for column in cls.__table__.columns)
+    if issubclass(cls, (datetime.date, datetime.datetime)):
+        return _isoformat
+    if issubclass(cls, tuple):
+        return list
+    raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+
+def register_encoder(cls: type, encoder: Callable[[Any], Any] = None):
+    """
+    Set the encoder of a type, or build it now rather than on first use
+    :param cls: The type to encode
+    :param encoder: A function returning a JSON serializable version of an instance
+    """
+    _encoders[cls] = encoder or _build_encoder(cls)
+
+
+def default(o):
+    """
+    Encode an object the JSON backend does not support
+    :param o: The object
+    :return: A JSON serializable version of the object
+    """
+    encoder = _encoders.get(type(o))
+    if encoder is None:
+        encoder = _encoders[type(o)] = _build_encoder(type(o))
+    return encoder(o)
+
+
+def _json_dumps(data) -> bytes:
+    return json.dumps(data, default=default).encode()
+
+
+def _get_dumps(backend: str) -> Callable[[Any], bytes]:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{backend}', use one of {BACKENDS}")
+    if backend != "json":
+        try:
+            import orjson
+        except ImportError:
+            if backend == "orjson":
+                logger.warning("orjson is not installed, using the json module")
+        else:
+            option = orjson.OPT_NON_STR_KEYS
+            return lambda data: orjson.dumps(data, default=default, option=option)
+    return _json_dumps
+
+
+dumps = _get_dumps(JSON_BACKEND)
+
+
+def use_backend(backend: str):
+    """
+    Change the JSON backend used by dumps
+    :param backend: One of auto, orjson or json
+    """
+    global dumps
+    dumps = _get_dumps(backend)
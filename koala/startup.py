@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""
+Koala Bot startup pipeline
+Times each phase of cog startup, and defers non-critical initialisation until the bot has connected to the gateway
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import importlib
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+# Libs
+from discord.ext import commands
+
+# Own modules
+from koala.log import logger
+
+# Constants
+PHASES = ["import", "load", "deferred"]
+
+# Variables
+
+
+class StartupTimings:
+    """
+    The time taken by each phase of startup for each cog
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def time(self, name: str, phase: str):
+        """
+        Time a phase of startup
+        :param name: The cog name
+        :param phase: The startup phase, one of PHASES
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self.timings.setdefault(name, {})
+            phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+    def report(self) -> str:
+        """
+        A table of the startup time of each cog, slowest first
+        :return: The table
+        """
+        rows = sorted(self.timings.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        lines = ["{:<16}".format("cog") + "".join("{:>10}".format(phase) for phase in PHASES) + "{:>10}".format("total")]
+        for name, phases in rows:
+            lines.append("{:<16}".format(name)
+                         + "".join("{:>10.3f}".format(phases[phase]) if phase in phases else "{:>10}".format("-")
+                                   for phase in PHASES)
+                         + "{:>10.3f}".format(sum(phases.values())))
+        return "\n".join(lines)
+
+    def log(self):
+        logger.info("Cog startup timings (s):\n%s", self.report())
+
+
+startup_timings = StartupTimings()
+_deferred: List[Tuple[str, Callable[[], Awaitable]]] = []
+_running = set()
+
+
+def import_cog(name: str, package: str):
+    """
+    Import a cog module, timing the import. Imports hold the import lock and the GIL, so they are not run concurrently.
+    Import errors are logged here with their cause, then raised again by load_extension.
+    :param name: The cog module name
+    :param package: The package of the cog
+    """
+    with startup_timings.time(name, "import"):
+        try:
+            importlib.import_module("." + name, package)
+        except Exception as e:
+            logger.error("Cog %s failed to import", name, exc_info=e)
+
+
+def defer(bot: commands.Bot, name: str, func: Callable[[], Awaitable]):
+    """
+    Run non-critical initialisation once the bot has connected to the gateway, instead of delaying startup.
+    Runs straight away if the bot is already connected, e.g. when a cog is reloaded.
+    :param bot: The bot client
+    :param name: The cog name
+    :param func: A coroutine function taking no arguments
+    """
+    if bot.is_ready():
+        task = asyncio.create_task(_run_deferred(name, func))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+    else:
+        _deferred.append((name, func))
+
+
+async def _run_deferred(name: str, func: Callable[[], Awaitable]):
+    with startup_timings.time(name, "deferred"):
+        try:
+            await func()
+        except Exception as e:
+            logger.error("Deferred startup of %s failed", name, exc_info=e)
+
+
+async def run_deferred():
+    """
+    Run all deferred initialisation concurrently, then log the startup timings.
+    Called when the bot has connected to the gateway.
+    """
+    if not _deferred:
+        return
+    deferred = list(_deferred)
+    _deferred.clear()
+    await asyncio.gather(*(_run_deferred(name, func) for name, func in deferred))
+    startup_timings.log()
@@ -9,7 +9,13 @@ Commented using reStructuredText (reST)
 
 # Built-in/Generic Imports
 import argparse
+import asyncio
+import contextvars
 import datetime
+import functools
+import importlib
+import sys
+import types
 import typing
 from pathlib import PurePath
 # Libs
@@ -18,6 +24,7 @@ from typing import Tuple, Optional
 import discord
 from discord.ext import commands
 from discord.ext.commands import BadArgument
+from greenlet import getcurrent
 
 # Own modules
 from koala.colours import ERROR_RED
@@ -125,15 +132,102 @@ def convert_iso_datetime(argument):
 
 
 
+TRUE_STRINGS = {"true", "1", "yes", "y", "on"}
+FALSE_STRINGS = {"false", "0", "no", "n", "off"}
+
+
+def _cast_bool(value):
+    if isinstance(value, str):
+        if value.lower() in TRUE_STRINGS:
+            return True
+        if value.lower() in FALSE_STRINGS:
+            return False
+        raise ValueError(f"Invalid boolean '{value}'")
+    return bool(value)
+
+
+def _identity(value):
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def compile_cast(type_class) -> typing.Callable[[typing.Any], typing.Any]:
+    """
+    Build a function that casts values to a type, so the type is only inspected once
+    e.g. compile_cast(List[int])(["1", "2"]) -> [1, 2]
+    :param type_class: The type to cast to, e.g. int, bool, a dataclass, List[dataclass] or Optional[int]
+    :return: The cast function
+    """
+    origin = typing.get_origin(type_class)
+    if origin is list:
+        cast_item = compile_cast(typing.get_args(type_class)[0])
+        return lambda value: [cast_item(v) for v in value]
+    if origin is dict:
+        cast_key, cast_value = (compile_cast(arg) for arg in typing.get_args(type_class))
+        return lambda value: {cast_key(k): cast_value(v) for k, v in dict(value).items()}
+    if origin is typing.Union and type(None) in typing.get_args(type_class):
+        type_args = [arg for arg in typing.get_args(type_class) if arg is not type(None)]
+        cast_value = compile_cast(type_args[0] if len(type_args) == 1 else typing.Union[tuple(type_args)])
+        return lambda value: None if value is None else cast_value(value)
+    if origin is not None:
+        return _identity
+    if type_class is typing.Any:
+        return _identity
+    if type_class is bool:
+        return _cast_bool
+    if type_class in (int, float, str):
+        return type_class
+    return lambda value: type_class(**value) if isinstance(value, dict) else type_class(value)
+
+
 def cast(type_class, value):
-    if isinstance(value, dict):
-        return type_class(**value)
-    elif typing.get_origin(type_class) == list:
-        return [cast(type_class.__args__[0], v) for v in list(value)]
-    if typing.get_origin(type_class) == dict:
-        return {cast(type_class.__args__[0], k): cast(type_class.__args__[1], v) for k, v in dict(value)}
-    if typing.get_origin(type_class) is not None:
-        return typing.get_origin(type_class)(type_class)
-    else:
-        return type_class(value)
+    return compile_cast(type_class)(value)
+
 
+def walk_stack(frame=None):
+    """
+    Walk up the stack from a frame, continuing into the parent greenlets of the current greenlet.
+    Asyncio SQLAlchemy runs blocking code inside a greenlet, so this reaches the coroutines that awaited it.
+    :param frame: The frame to start from, defaults to the caller
+    :return: Generator of frames, innermost first
+    """
+    current = getcurrent()
+    frame = frame or sys._getframe(1)
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return
+        frame = current.gr_frame
+
+
+class LazyModule(types.ModuleType):
+    """
+    A module that is only imported when one of its attributes is first used
+    """
+
+    def __getattr__(self, name):
+        return getattr(importlib.import_module(self.__name__), name)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Import a module on first use, for heavy dependencies that are not needed at startup
+    e.g. bs4 = lazy_import("bs4")
+    :param name: The full name of the module
+    :return: The module if already imported, otherwise a LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+async def to_thread(func, *args, **kwargs):
+    """
+    Run a blocking function in the default executor, like asyncio.to_thread which needs python 3.9
+    :param func: The function to run
+    :return: The return value of the function
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(context.run, func, *args, **kwargs))
@@ -25,13 +25,13 @@ from aiohttp import web
 import aiohttp_cors
 from discord.ext import commands
 
-from koala import env
+from koala import cluster, db, dm, env, instrumentation, startup
 # Own modules
-from koala.db import extension_enabled
+from koala.db import extension_enabled, engine, async_engine
 from koala.env import BOT_TOKEN, BOT_OWNER, API_PORT
 from koala.errors import KoalaException
 from koala.log import logger
-from koala.utils import error_embed
+from koala.utils import error_embed, lazy_import
 
 # Constants
 COMMAND_PREFIX = "k!"
@@ -48,9 +48,11 @@ ENABLED_COGS = ["base", "announce", "colour_role", "insights", "intro_cog", "rea
                 "twitch_alert", "verification", "voting"]
 
 # Variables
+bus = lazy_import("koala.bus")
+members = lazy_import("koala.members")
 intent = discord.Intents.default()
 intent.guilds = True        # on_guild_join, on_guild_remove
-intent.members = True       # on_member_join
+intent.members = True       # on_member_join, chunking guilds for the member cache
 intent.reactions = True     # on_raw_reaction_add
 intent.messages = True      # on_message
 intent.message_content = True
@@ -68,6 +70,40 @@ class KoalaBot(commands.Bot):
         logger.debug("hook setup")
         await self.tree.sync()
 
+    async def on_ready(self):
+        """
+        Runs the initialisation deferred by cogs until the bot has connected to the gateway
+        """
+        await startup.run_deferred()
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        """
+        Invoke the command given under the invocation context, recording its latency and labelling the running task
+        with the command so that slow callbacks can be attributed to its cog.
+        :param ctx: The invocation context
+        """
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        instrumentation.set_task_label(ctx.command.callback)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            instrumentation.metrics.observe_command(ctx, time.perf_counter() - start)
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs) -> None:
+        """
+        Run an event listener, recording its duration and labelling the running task with the listener
+        :param coro: The listener coroutine function
+        :param event_name: The name of the dispatched event
+        """
+        instrumentation.set_task_label(coro)
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            instrumentation.metrics.observe_listener(event_name, coro, time.perf_counter() - start)
+
     async def on_command_error(self, ctx, error: Exception):
         if ctx.guild is None:
             guild_id = "UNKNOWN"
@@ -101,6 +137,12 @@ class KoalaBot(commands.Bot):
             raise error
 
 
+class KoalaShardedBot(KoalaBot, commands.AutoShardedBot):
+    """
+    KoalaBot connecting a range of the gateway shards, for running as a cluster of processes
+    """
+
+
 def is_owner(ctx: commands.Context):
     """
     A command used to check if the user of a command is the owner, or the testing bot.
@@ -140,33 +182,41 @@ def is_guild_channel(ctx):
 
 async def load_all_cogs(bot):
     """
-    Loads all cogs in ENABLED_COGS into the client
+    Loads all cogs in ENABLED_COGS into the client.
+    Cog modules are imported one at a time, then loaded concurrently, and the time taken by each is logged.
     """
-
     for cog in ENABLED_COGS:
+        startup.import_cog(cog, COGS_PACKAGE)
+    await asyncio.gather(*(__load_cog(bot, cog) for cog in ENABLED_COGS))
+
+    logger.info("All cogs loaded")
+    startup.startup_timings.log()
+
+
+async def __load_cog(bot, cog):
+    """
+    Loads a cog into the client, reloading it if it is already loaded
+    """
+    with startup.startup_timings.time(cog, "load"):
         try:
             await bot.load_extension("."+cog, package=COGS_PACKAGE)
         except commands.errors.ExtensionAlreadyLoaded:
             await bot.reload_extension("."+cog, package=COGS_PACKAGE)
 
-    logger.info("All cogs loaded")
-
 
-async def dm_group_message(members: [discord.Member], message: str):
+async def dm_group_message(members: [discord.Member], message: str = None, embed: discord.Embed = None,
+                           progress=None):
     """
-    DMs members in a list of members
+    DMs members in a list of members, concurrently within Discord's rate limits
     :param members: list of members to DM
     :param message: The message to send to the group
+    :param embed: An embed to send to the group
+    :param progress: A coroutine function called with the DMReport as DMs are sent
     :return: how many were dm'ed successfully.
     """
-    count = 0
-    for member in members:
-        try:
-            await member.send(message)
-            count = count + 1
-        except Exception:  # In case of user dms being closed
-            pass
-    return count
+    report = await dm.dm_dispatcher.send(members, lambda member: member.send(message, embed=embed),
+                                         progress=progress)
+    return report.sent
 
 
 def check_guild_has_ext(ctx, extension_id):
@@ -184,11 +234,31 @@ def check_guild_has_ext(ctx, extension_id):
 
 
 async def run_bot():
-    app = web.Application()
+    app = web.Application(middlewares=[cluster.route_middleware])
 
-    bot = KoalaBot(command_prefix=[COMMAND_PREFIX, OPT_COMMAND_PREFIX], intents=intent)
+    if cluster.is_sharded():
+        bot = KoalaShardedBot(command_prefix=[COMMAND_PREFIX, OPT_COMMAND_PREFIX], intents=intent,
+                              shard_ids=cluster.shard_ids, shard_count=cluster.shard_count,
+                              **members.member_cache.bot_options())
+    else:
+        bot = KoalaBot(command_prefix=[COMMAND_PREFIX, OPT_COMMAND_PREFIX], intents=intent,
+                       **members.member_cache.bot_options())
     setattr(bot, "koala_web_app", app)
+    instrumentation.metrics.instrument_http(bot.http)
+    instrumentation.sql.instrument_engine(engine)
+    instrumentation.sql.instrument_engine(async_engine.sync_engine)
+    if db.replica_monitor:
+        instrumentation.sql.instrument_engine(db.replica_engine)
+        instrumentation.sql.instrument_engine(db.async_replica_engine.sync_engine)
     await load_all_cogs(bot)
+    instrumentation.api.setup(bot)
+    trace_recorder = None
+    if env.GATEWAY_TRACE_PATH:
+        trace_path = env.GATEWAY_TRACE_PATH
+        if cluster.is_clustered():
+            trace_path = instrumentation.trace.cluster_path(trace_path, cluster.cluster_id)
+        trace_recorder = instrumentation.trace.TraceRecorder(trace_path, env.GATEWAY_TRACE_MAX_EVENTS)
+        trace_recorder.install(bot)
 
     cors = aiohttp_cors.setup(app, defaults={
         env.FRONTEND_URL: aiohttp_cors.ResourceOptions(
@@ -199,8 +269,21 @@ async def run_bot():
 
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', API_PORT)
-    await site.start()
+    sites = []
+    if cluster.serves_api():
+        sites.append(web.TCPSite(runner, '0.0.0.0', API_PORT))
+    if cluster.is_clustered():
+        # Requests for guilds owned by this cluster are forwarded here by the API cluster
+        sites.append(web.TCPSite(runner, '127.0.0.1', cluster.internal_port(cluster.cluster_id)))
+    for site in sites:
+        await site.start()
+    instrumentation.loop_monitor.start()
+    for pool_monitor in db.pool_monitors():
+        pool_monitor.start()
+    if db.replica_monitor:
+        await db.replica_monitor.start()
+    await bus.invalidation_bus.start(bus.create_transports())
+    members.member_cache.start(bot)
 
     try:
         async with bot:
@@ -211,8 +294,25 @@ async def run_bot():
         raise
 
     finally:
+        instrumentation.loop_monitor.stop()
+        for pool_monitor in db.pool_monitors():
+            pool_monitor.stop()
+        members.member_cache.stop()
+        if trace_recorder:
+            trace_recorder.close()
         await runner.cleanup()
+        await cluster.close()
+        await bus.invalidation_bus.stop()
+        if db.replica_monitor:
+            await db.replica_monitor.stop()
+            await db.async_replica_engine.dispose()
+        await async_engine.dispose()
+
+
+def main():  # pragma: no cover
+    asyncio.run(run_bot())
+
 
 if __name__ == '__main__': # pragma: no cover
     # loop = asyncio.get_event_loop()
-    asyncio.run(run_bot())
+    cluster.launch(main, BOT_TOKEN)
@@ -94,8 +94,9 @@ async def test_create_message_to_no_dm_user(bot: discord.Client, announce_cog):
         # sending the message
         with mock.patch('discord.Member.send',
                         mock.Mock(side_effect=Exception('AttributeError'))):
-            with pytest.raises(discord.ext.commands.errors.CommandInvokeError) as e_info:
-                await dpytest.message(koalabot.COMMAND_PREFIX + 'announce send', channel=channel)
+            await dpytest.message(koalabot.COMMAND_PREFIX + 'announce send', channel=channel)
+        assert dpytest.verify().message().content("The announcement was made successfully")
+        assert not announce_cog.has_active_msg(guild.id)
 
 
 @pytest.mark.asyncio
@@ -384,8 +385,9 @@ async def test_send_announce_roles_with_no_dm_user(bot: discord.Client, number_o
         # sending the message
         with mock.patch('discord.Member.send',
                         mock.Mock(side_effect=Exception('AttributeError'))):
-            with pytest.raises(discord.ext.commands.errors.CommandInvokeError) as e_info:
-                await dpytest.message(koalabot.COMMAND_PREFIX + 'announce send', channel=channel)
+            await dpytest.message(koalabot.COMMAND_PREFIX + 'announce send', channel=channel)
+        assert dpytest.verify().message().content("The announcement was made successfully")
+        assert not announce_cog.has_active_msg(guild.id)
 
 
 @pytest.mark.asyncio
@@ -5,7 +5,7 @@ from sqlalchemy import delete
 
 from koala.cogs.base.api import BaseEndpoint
 from koala.cogs.base.models import ScheduledActivities
-from koala.models import KoalaExtensions, GuildExtensions
+from koala.models import KoalaExtensions, GuildExtensions, Guilds
 
 
 @pytest.fixture(autouse=True)
@@ -13,6 +13,7 @@ def delete_tables(session):
     session.execute(delete(KoalaExtensions))
     session.execute(delete(GuildExtensions))
     session.execute(delete(ScheduledActivities))
+    session.execute(delete(Guilds))
     session.commit()
 
 @pytest.fixture(autouse=True)
@@ -60,8 +60,7 @@ async def test_put_schedule_activity(api_client):
         'end_time': '2026-01-01 00:00:00'
     })
     assert resp.status == CREATED
-    text = await resp.text()
-    assert text == '{"message": "Activity scheduled"}'
+    assert await resp.json() == {"message": "Activity scheduled"}
 
 
 async def test_put_schedule_activity_missing_param(api_client):
@@ -131,8 +130,7 @@ async def test_put_set_activity(api_client):
         'url': 'test.com'
     })
     assert resp.status == CREATED
-    text = await resp.text()
-    assert text == '{"message": "Activity set"}'
+    assert await resp.json() == {"message": "Activity set"}
     assert dpytest.verify().activity().matches(
         discord.Activity(type=discord.ActivityType.playing, name="test", url="test.com"))
 
@@ -379,8 +377,7 @@ async def test_post_disable_extension(api_client, bot):
         'koala_ext': 'Announce'
     })
     assert resp.status == OK
-    text = await resp.text()
-    assert text == '{"message": "Extension disabled"}'
+    assert await resp.json() == {"message": "Extension disabled"}
 
 
 async def test_post_disable_extension_not_enabled(api_client):
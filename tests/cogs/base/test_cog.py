@@ -233,6 +233,25 @@ async def test_version(base_cog: BaseCog):
     assert dpytest.verify().message().content("version: " + koalabot.__version__)
 
 
+@pytest.mark.asyncio
+async def test_profile(base_cog: BaseCog):
+    # dpytest writes attachments to the working directory
+    with mock.patch.object(commands.Context, 'send') as mock_send:
+        await dpytest.message(koalabot.COMMAND_PREFIX + "profile 0.05")
+    mock_send.assert_called_once()
+    assert mock_send.call_args.args == ("Event loop profile of 0.05s",)
+    assert [file.filename for file in mock_send.call_args.kwargs["files"]] == ["profile.collapsed",
+                                                                               "profile-summary.txt"]
+
+
+@pytest.mark.asyncio
+async def test_memory(base_cog: BaseCog):
+    await dpytest.message(koalabot.COMMAND_PREFIX + "memory")
+    content = dpytest.get_message().content
+    assert content.startswith("```\nMember cache: chunking ")
+    assert "discord.members" in content
+
+
 @pytest.mark.asyncio
 async def test_setup(bot):
     with mock.patch.object(discord.ext.commands.bot.Bot, 'add_cog') as mock1:
@@ -5,9 +5,12 @@ import discord.ext.test as dpytest
 import mock
 import pytest
 from discord.ext import commands
+from sqlalchemy import event, select
 
 import koalabot
 from koala.cogs.base import core
+from koala.db import engine
+from koala.models import Guilds
 
 
 @pytest.fixture
@@ -211,4 +214,63 @@ async def test_get_extensions(bot: commands.Bot):
     guild: discord.Guild = dpytest.get_config().guilds[0]
     resp = core.get_all_available_guild_extensions(guild.id)
     print(resp)
-    assert resp[0] == "Announce"
\ No newline at end of file
+    assert resp[0] == "Announce"
+
+# Guild registration
+
+def guild_rows(session):
+    return {guild.guild_id: guild.left_at for guild in session.execute(select(Guilds)).scalars()}
+
+
+def test_sync_guilds(session):
+    session.add_all([Guilds(guild_id=1, subscription=0), Guilds(guild_id=2, subscription=0),
+                     Guilds(guild_id=3, subscription=0, left_at=datetime.datetime(2022, 1, 1))])
+    session.commit()
+
+    result = core.sync_guilds([2, 3, 4, 5])
+
+    assert (result.guilds, result.added, result.rejoined, result.left) == (4, 2, 1, 1)
+    rows = guild_rows(session)
+    assert rows[1] is not None
+    assert {guild_id: left_at for guild_id, left_at in rows.items() if guild_id != 1} == \
+           {2: None, 3: None, 4: None, 5: None}
+
+
+def test_sync_guilds_batches_statements():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        core.sync_guilds(list(range(1, 2 * core.GUILD_SYNC_CHUNK + 2)))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    # 3 chunks of selects and 3 of inserts, and one select of the active guilds
+    assert len(statements) == 7
+
+
+def test_sync_guilds_only_leaves_owned_guilds(session):
+    session.add_all([Guilds(guild_id=1, subscription=0), Guilds(guild_id=2, subscription=0)])
+    session.commit()
+
+    with mock.patch("koala.cluster.owns_guild", lambda guild_id: guild_id == 1):
+        assert core.sync_guilds([]).left == 1
+
+    rows = guild_rows(session)
+    assert rows[1] is not None
+    assert rows[2] is None
+
+
+def test_add_all_guilds(bot: commands.Bot, session):
+    core.add_all_guilds(bot)
+    assert guild_rows(session) == {guild.id: None for guild in bot.guilds}
+
+
+def test_add_and_remove_guild(session):
+    core.add_guild(1)
+    core.remove_guild(1)
+    assert guild_rows(session)[1] is not None
+    core.add_guild(1)
+    assert guild_rows(session) == {1: None}
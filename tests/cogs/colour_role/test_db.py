@@ -15,6 +15,7 @@ import discord.ext.test as dpytest
 import pytest
 from sqlalchemy import delete
 
+from koala.cogs.colour_role.db import protected_colour_roles_cache
 from koala.cogs.colour_role.models import GuildColourChangePermissions, GuildInvalidCustomColourRoles
 # Own modules
 from koala.db import session_manager
@@ -67,6 +68,20 @@ async def test_cr_db_functions_colour_change_roles(length):
         DBManager.remove_colour_change_role_perms(guild.id, role.id)
     assert independent_get_colour_change_roles(guild.id) == []
 
+
+@pytest.mark.asyncio
+async def test_cr_db_protected_colour_roles_cache_invalidated():
+    guild: discord.Guild = dpytest.get_config().guilds[0]
+    [role] = await make_list_of_roles(guild, 1)
+    assert DBManager.get_protected_colour_roles(guild.id) == []
+    DBManager.add_guild_protected_colour_role(guild.id, role.id)
+    assert DBManager.get_protected_colour_roles(guild.id) == [role.id]
+    assert DBManager.get_protected_colour_roles(guild.id) == [role.id]
+    assert protected_colour_roles_cache.hits == 1
+    DBManager.remove_guild_protected_colour_role(guild.id, role.id)
+    assert DBManager.get_protected_colour_roles(guild.id) == []
+
+
 @pytest.fixture(scope='session', autouse=True)
 def setup_db():
     with session_manager() as session:
@@ -12,6 +12,7 @@ import asyncio
 
 # Libs
 import discord.ext.test as dpytest
+import mock
 import pytest
 # Own modules
 from sqlalchemy import text
@@ -52,6 +53,15 @@ async def test_db_manager_update_welcome_message(guild_id, new_message, expected
     assert val == expected, intro_db.fetch_guild_welcome_message(guild_id)
 
 
+@pytest.mark.asyncio
+async def test_db_manager_update_welcome_message_noted():
+    await add_fake_guild_to_db(555)
+    with mock.patch.object(intro_db, "note_guild_write") as mock_note_guild_write:
+        intro_db.update_guild_welcome_message(555, "non-default message")
+    # Reads of the guild use the primary until the replica has the new message
+    mock_note_guild_write.assert_called_once_with(555)
+
+
 @pytest.mark.asyncio
 async def test_db_manager_new_guild_welcome_message():
     val = intro_db.new_guild_welcome_message(fake_guild_id)
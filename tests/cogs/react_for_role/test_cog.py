@@ -658,9 +658,9 @@ async def test_can_have_rfr_role(num_roles, num_required, rfr_cog):
 
             assert len(mem_roles) == i
             if len(required) == 0:
-                assert rfr_cog.can_have_rfr_role(member)
+                assert await rfr_cog.can_have_rfr_role(member)
             else:
-                assert rfr_cog.can_have_rfr_role(member) == any(
+                assert await rfr_cog.can_have_rfr_role(member) == any(
                     x in required for x in member.roles), f"\n\r{member.roles}\n\r{required}"
 
 
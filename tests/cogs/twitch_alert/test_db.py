@@ -24,7 +24,8 @@ from koala.cogs.twitch_alert import utils
 from koala.cogs.twitch_alert.cog import TwitchAlert
 from koala.cogs.twitch_alert.db import TwitchAlertDBManager
 from koala.cogs.twitch_alert.models import TwitchAlerts, TeamInTwitchAlert, UserInTwitchTeam, UserInTwitchAlert
-from koala.db import session_manager
+from koala.db import LeaderLease, session_manager, async_session_manager
+from koala.errors import LeaseLostError
 
 # Constants
 DB_PATH = "Koala.db"
@@ -145,9 +146,10 @@ async def test_remove_user_from_ta(twitch_alert_db_manager_tables):
 
 
 @pytest.mark.asyncio()
-async def test_delete_message(twitch_alert_db_manager_tables, session):
+async def test_delete_message(twitch_alert_db_manager_tables, async_session):
     with mock.patch.object(discord.TextChannel, 'fetch_message') as mock1:
-        await twitch_alert_db_manager_tables.delete_message(1234, dpytest.get_config().channels[0].id, session=session)
+        await twitch_alert_db_manager_tables.delete_message(1234, dpytest.get_config().channels[0].id,
+                                                            session=async_session)
     mock1.assert_called_with(1234)
 
 
@@ -271,7 +273,8 @@ async def test_delete_all_offline_streams(twitch_alert_db_manager_tables, bot: d
         session.execute(sql_add_message)
         session.commit()
 
-        await twitch_alert_db_manager_tables.delete_all_offline_streams(['monstercat'], session=session)
+        async with async_session_manager() as async_session:
+            await twitch_alert_db_manager_tables.delete_all_offline_streams(['monstercat'], session=async_session)
 
         sql_select_messages = select(UserInTwitchAlert).where(and_(
             UserInTwitchAlert.twitch_username == 'monstercat',
@@ -285,6 +288,26 @@ async def test_delete_all_offline_streams(twitch_alert_db_manager_tables, bot: d
             await bot.guilds[0].channels[0].fetch_message(message_id)
 
 
+@pytest.mark.asyncio()
+async def test_delete_all_offline_streams_lease_lost(twitch_alert_db_manager_tables, bot: discord.ext.commands.Bot):
+    message_id = (await dpytest.message("test_msg", bot.guilds[0].channels[0])).id
+    sql_add_message = insert(UserInTwitchAlert).values(
+        channel_id=bot.guilds[0].channels[0].id,
+        twitch_username='monstercat',
+        custom_message=None,
+        message_id=message_id)
+    with session_manager() as session:
+        session.execute(sql_add_message)
+        session.commit()
+
+    async with async_session_manager() as async_session:
+        with pytest.raises(LeaseLostError):
+            await twitch_alert_db_manager_tables.delete_all_offline_streams(
+                ['monstercat'], LeaderLease("test", holder="stalled"), session=async_session)
+
+    assert (await bot.guilds[0].channels[0].fetch_message(message_id)).id == message_id
+
+
 @pytest.mark.asyncio()
 async def test_delete_all_offline_streams_team(twitch_alert_db_manager_tables, bot: discord.ext.commands.Bot):
     await test_update_all_teams_members(twitch_alert_db_manager_tables)
@@ -296,7 +319,9 @@ async def test_delete_all_offline_streams_team(twitch_alert_db_manager_tables, b
         session.execute(sql_add_message)
         session.commit()
 
-        await twitch_alert_db_manager_tables.delete_all_offline_team_streams(['monstercat'], session=session)
+        async with async_session_manager() as async_session:
+            await twitch_alert_db_manager_tables.delete_all_offline_team_streams(['monstercat'],
+                                                                                 session=async_session)
 
         sql_select_messages = select(UserInTwitchTeam.message_id, UserInTwitchTeam.twitch_username).where(
             and_(or_(UserInTwitchTeam.team_twitch_alert_id == 614, UserInTwitchTeam.team_twitch_alert_id == 616),
@@ -9,7 +9,9 @@ Commented using reStructuredText (reST)
 # Built-in/Generic Imports
 
 # Libs
+import discord
 import discord.ext.test as dpytest
+import mock
 import pytest
 import pytest_asyncio
 from discord.ext import commands
@@ -18,7 +20,7 @@ from sqlalchemy import select
 # Own modules
 import koalabot
 from koala.cogs import Voting
-from koala.cogs.voting.models import Votes
+from koala.cogs.voting.models import Votes, VoteSent
 from koala.db import session_manager, insert_extension
 from tests.log import logger
 
@@ -131,3 +133,23 @@ async def test_discord_cancel_vote():
         f"to configure it.")
     await dpytest.message(f"{koalabot.COMMAND_PREFIX}vote cancel Test Vote")
     assert dpytest.verify().message().content("Vote Test Vote has been cancelled.")
+
+
+@pytest.mark.asyncio
+async def test_discord_send_vote_reactions_not_retried(cog):
+    config = dpytest.get_config()
+    guild = config.guilds[0]
+    users = [member for member in guild.members if not member.bot]
+    await dpytest.message(f"{koalabot.COMMAND_PREFIX}vote create Test Vote")
+    await dpytest.message(f"{koalabot.COMMAND_PREFIX}vote addOption test+test")
+    await dpytest.message(f"{koalabot.COMMAND_PREFIX}vote addOption other+other")
+    vote = cog.vote_manager.get_configuring_vote(guild.members[0].id)
+    rate_limited = discord.HTTPException(mock.MagicMock(status=429, reason="", headers={"Retry-After": "0"}), "")
+
+    with mock.patch("koala.cogs.voting.cog.add_reactions", side_effect=rate_limited) as mock_add_reactions:
+        await dpytest.message(f"{koalabot.COMMAND_PREFIX}vote send Test Vote")
+
+    assert mock_add_reactions.call_count == len(users)
+    assert sorted(vote.sent_to) == sorted(user.id for user in users)
+    with session_manager() as session:
+        assert len(session.execute(select(VoteSent).filter_by(vote_id=vote.id)).all()) == len(users)
@@ -8,14 +8,17 @@ import shutil
 
 import discord
 import discord.ext.test as dpytest
+import discord.ext.test.factories as dpytest_factories
 # Libs
 import pytest
 import pytest_asyncio
 
+import koala.cache as cache
 import koala.db as db
 # Own modules
 import koalabot
-from koala.db import session_manager
+from koala.db import session_manager, async_session_manager
+from koala.rest.cache import response_cache
 from tests.log import logger
 
 # Constants
@@ -54,7 +57,13 @@ async def bot():
 
 @pytest.fixture(autouse=True)
 def setup_is_dpytest():
+    # dpytest counts generated IDs across the session, and its 12 bit increment overflows into IDs wider than the
+    # 64 bit snowflake columns after 4096 IDs
+    dpytest_factories.generated_ids = 0
     db.__create_sqlite_tables()
+    db.extension_cache.clear()
+    cache.clear_all()
+    response_cache.clear()
     koalabot.is_dpytest = True
     yield
     koalabot.is_dpytest = False
@@ -64,3 +73,9 @@ def setup_is_dpytest():
 async def session():
     with session_manager() as session:
         yield session
+
+
+@pytest_asyncio.fixture
+async def async_session():
+    async with async_session_manager() as session:
+        yield session
@@ -0,0 +1,68 @@
+# Futures
+# Built-in/Generic Imports
+import io
+import zipfile
+from http.client import BAD_REQUEST, OK
+
+# Libs
+import pytest
+from aiohttp import web
+
+# Own modules
+from koala.cogs.text_filter.db import filtered_text_cache
+from koala.instrumentation.api import InstrumentationEndpoint
+from koala.instrumentation.loop import LoopMonitor
+
+
+@pytest.fixture
+def monitor():
+    return LoopMonitor()
+
+
+@pytest.fixture
+def api_client(monitor, aiohttp_client, loop):
+    app = web.Application()
+    endpoint = InstrumentationEndpoint(monitor)
+    app = endpoint.register(app)
+    return loop.run_until_complete(aiohttp_client(app))
+
+
+async def test_get_loop(api_client, monitor):
+    monitor.record_slow_callback("text_filter:TextFilter.on_message", 0.5)
+    monitor.record_slow_callback("base:BaseCog.ping", 0.2)
+    monitor.record_slow_callback("base:BaseCog.ping", 0.2)
+    resp = await api_client.get('/loop?top=1')
+    assert resp.status == OK
+    stats = await resp.json()
+    assert not stats["running"]
+    assert stats["lag"]["samples"] == 0
+    assert stats["offenders"] == [{"label": "text_filter:TextFilter.on_message", "count": 1, "total": 0.5,
+                                   "max": 0.5, "mean": 0.5}]
+    assert len(stats["recent"]) == 3
+
+
+async def test_get_caches(api_client):
+    filtered_text_cache.set(1, [])
+    filtered_text_cache.get(1)
+    resp = await api_client.get('/caches')
+    assert resp.status == OK
+    stats = await resp.json()
+    assert stats["text_filter.filtered_text"] == {"keys": 1, "hits": 1, "misses": 0, "evictions": 0,
+                                                  "hit_ratio": 1.0}
+    assert "hit_ratio" in stats["extensions"]
+
+
+async def test_get_profile(api_client):
+    resp = await api_client.get('/profile?seconds=0.05')
+    assert resp.status == OK
+    assert resp.content_type == "application/zip"
+    assert resp.headers["Content-Disposition"] == 'attachment; filename="profile.zip"'
+    with zipfile.ZipFile(io.BytesIO(await resp.read())) as archive:
+        assert sorted(archive.namelist()) == ["profile-summary.txt", "profile.collapsed"]
+        assert archive.read("profile-summary.txt").decode().startswith("Profile of ")
+
+
+async def test_get_profile_invalid_duration(api_client):
+    resp = await api_client.get('/profile?seconds=0')
+    assert resp.status == BAD_REQUEST
+    assert (await resp.json())["error"] == "InvalidArgumentError"
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Event Loop Monitor
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import time
+
+# Libs
+import discord.ext.test as dpytest
+import mock
+import pytest
+import pytest_asyncio
+
+# Own modules
+import koalabot
+from koala.cogs.base.cog import BaseCog
+from koala.instrumentation.loop import MAX_OFFENDER_LABELS, OTHER_LABEL, LoopMonitor, cog_label, coroutine_label
+
+# Constants
+FAKE_COG_SOURCE = """
+import asyncio
+import time
+
+from koala.instrumentation.loop import set_task_label
+
+
+class FakeCog:
+    async def on_message(self, block):
+        time.sleep(block)
+
+    async def loop(self, block):
+        await asyncio.sleep(0)
+        time.sleep(block)
+        await asyncio.sleep(0)
+
+
+async def run_event(coro, *args):
+    set_task_label(coro)
+    await coro(*args)
+"""
+
+# Variables
+fake_cog = {"__name__": "koala.cogs.fake_cog.cog"}
+exec(FAKE_COG_SOURCE, fake_cog)
+run_event = {"__name__": "discord.client"}
+exec(FAKE_COG_SOURCE, run_event)
+
+
+@pytest_asyncio.fixture
+async def monitor():
+    loop_monitor = LoopMonitor(interval=0.01, slow_callback_threshold=0.05, report_interval=60)
+    loop_monitor.start()
+    yield loop_monitor
+    loop_monitor.stop()
+
+
+def test_cog_label():
+    assert cog_label("koala.cogs.text_filter.cog", "TextFilter.on_message") == "text_filter:TextFilter.on_message"
+    assert cog_label("discord.client", "Client._run_event") is None
+    assert cog_label(None, "") is None
+
+
+@pytest.mark.asyncio
+async def test_coroutine_label_not_started():
+    coro = run_event["run_event"](fake_cog["FakeCog"]().on_message, 0)
+    assert coroutine_label(coro) == "fake_cog:FakeCog.on_message"
+    await coro
+
+
+@pytest.mark.asyncio
+async def test_slow_listener_attributed_to_cog(monitor):
+    await asyncio.create_task(run_event["run_event"](fake_cog["FakeCog"]().on_message, 0.1))
+    offenders = monitor.stats()["offenders"]
+    assert offenders[0]["label"] == "fake_cog:FakeCog.on_message"
+    assert offenders[0]["count"] == 1
+    assert offenders[0]["max"] >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_slow_loop_step_attributed_to_cog(monitor):
+    await asyncio.create_task(fake_cog["FakeCog"]().loop(0.1))
+    assert [offender["label"] for offender in monitor.stats()["offenders"]] == ["fake_cog:FakeCog.loop"]
+
+
+@pytest.mark.asyncio
+async def test_fast_callbacks_not_recorded(monitor):
+    await asyncio.create_task(fake_cog["FakeCog"]().loop(0))
+    assert monitor.stats()["offenders"] == []
+
+
+@pytest.mark.asyncio
+async def test_fast_callbacks_not_labelled(monitor):
+    with mock.patch("koala.instrumentation.loop.coroutine_label") as mock_label:
+        await asyncio.create_task(fake_cog["FakeCog"]().loop(0))
+    mock_label.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unlabelled_task_named(monitor):
+    await asyncio.create_task(fake_cog["FakeCog"]().on_message(0.1), name="koala: fake")
+    assert monitor.stats()["offenders"][0]["label"] == "koala: fake"
+
+
+@pytest.mark.asyncio
+async def test_default_task_named_by_coroutine(monitor):
+    for _ in range(2):
+        await asyncio.create_task(fake_cog["FakeCog"]().on_message(0.1))
+    offenders = monitor.stats()["offenders"]
+    assert [(offender["label"], offender["count"]) for offender in offenders] == [("FakeCog.on_message", 2)]
+
+
+def test_offender_labels_capped():
+    loop_monitor = LoopMonitor()
+    for number in range(MAX_OFFENDER_LABELS + 10):
+        loop_monitor.record_slow_callback(f"label {number}", 0.1)
+    assert len(loop_monitor.offenders) == MAX_OFFENDER_LABELS + 1
+    assert loop_monitor.offenders[OTHER_LABEL].count == 10
+
+
+@pytest.mark.asyncio
+async def test_unattributed_callback(monitor):
+    asyncio.get_running_loop().call_soon(time.sleep, 0.1)
+    await asyncio.sleep(0.01)
+    assert monitor.stats()["offenders"][0]["label"] == "time:sleep"
+
+
+@pytest.mark.asyncio
+async def test_lag_measured(monitor):
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    lag = monitor.lag_stats()
+    assert lag["samples"] >= 1
+    assert lag["max"] >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_stop_restores_handle():
+    original_run = asyncio.events.Handle._run
+    loop_monitor = LoopMonitor()
+    loop_monitor.start()
+    assert asyncio.events.Handle._run is not original_run
+    loop_monitor.stop()
+    assert asyncio.events.Handle._run is original_run
+    assert not loop_monitor.running
+
+
+def test_log_top_offenders_resets_window(caplog):
+    loop_monitor = LoopMonitor(report_interval=60)
+    loop_monitor.record_slow_callback("fake_cog:FakeCog.on_message", 0.2)
+    loop_monitor.log_top_offenders()
+    assert "fake_cog:FakeCog.on_message x1" in caplog.text
+    assert loop_monitor.window == {}
+    assert loop_monitor.stats()["offenders"][0]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_command_attributed_to_cog(bot):
+    await bot.add_cog(BaseCog(bot))
+    dpytest.configure(bot)
+    loop_monitor = LoopMonitor(slow_callback_threshold=0)
+    loop_monitor.start()
+    try:
+        await dpytest.message(koalabot.COMMAND_PREFIX + "version")
+    finally:
+        loop_monitor.stop()
+    assert "base:BaseCog.version" in [offender["label"] for offender in loop_monitor.stats(50)["offenders"]]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Memory Report
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import sys
+
+# Libs
+import discord.ext.test as dpytest
+import pytest
+
+# Own modules
+from koala.cogs.text_filter.db import filtered_text_cache
+from koala.instrumentation.memory import approximate_size, discord_caches, format_size, koala_caches, measure, \
+    memory_report
+
+# Constants
+
+# Variables
+
+
+def test_approximate_size():
+    words = [f"koala{number}" for number in range(10)]
+    assert approximate_size(words) == sys.getsizeof(words) + sum(sys.getsizeof(word) for word in words)
+    assert approximate_size([[words]], depth=1) == sys.getsizeof([[words]]) + sys.getsizeof([words])
+
+
+@pytest.mark.asyncio
+async def test_members_exclude_shared_objects(bot):
+    member = dpytest.get_config().members[0]
+    # The guild, user and state of a member are measured by their own caches
+    assert approximate_size(member) < approximate_size(member.guild)
+    assert approximate_size(member) < 10000
+
+
+def test_measure_extrapolates_sample():
+    words = ["koala"] * 1000
+    assert measure("words", iter(words), 1000).size == 1000 * sys.getsizeof("koala")
+    assert measure("empty", [], 0) == ("empty", 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_discord_caches(bot):
+    sizes = {size.name: size for size in discord_caches(bot)}
+    assert sizes["discord.members"].objects == sum(len(guild.members) for guild in bot.guilds)
+    assert sizes["discord.members"].size > 0
+    assert sizes["discord.guilds"].objects == len(bot.guilds)
+
+
+def test_koala_caches():
+    filtered_text_cache.set(1, ["koala"])
+    sizes = {size.name: size for size in koala_caches()}
+    assert sizes["koala.text_filter.filtered_text"].objects == 1
+    assert sizes["koala.text_filter.filtered_text"].size > 0
+
+
+def test_format_size():
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(3 * 1024 ** 3) == "3.0 GiB"
+
+
+@pytest.mark.asyncio
+async def test_memory_report(bot):
+    report = memory_report(bot).splitlines()
+    assert report[0].startswith("Member cache: chunking ")
+    assert any(line.startswith("discord.members ") for line in report)
+    assert any(line.startswith("Total ") for line in report)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Prometheus Metrics
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+from http.client import OK
+
+# Libs
+import discord
+import discord.ext.test as dpytest
+import mock
+import pytest
+from aiohttp import web
+from prometheus_client import REGISTRY
+
+# Own modules
+import koalabot
+from koala.cogs.base.cog import BaseCog
+from koala.instrumentation import api, metrics
+
+# Constants
+
+# Variables
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def api_client(bot, aiohttp_client, loop):
+    setattr(bot, "koala_web_app", web.Application())
+    api.setup(bot)
+    return loop.run_until_complete(aiohttp_client(bot.koala_web_app))
+
+
+@pytest.mark.asyncio
+async def test_command_and_listener_metrics(bot):
+    await bot.add_cog(BaseCog(bot))
+    dpytest.configure(bot)
+    commands_before = sample("koala_command_duration_seconds_count", cog="KoalaBot", command="version",
+                             status="success")
+    listener_before = sample("koala_listener_duration_seconds_count", event="on_message",
+                             listener="BotBase.on_message")
+    await dpytest.message(koalabot.COMMAND_PREFIX + "version")
+    assert sample("koala_command_duration_seconds_count", cog="KoalaBot", command="version",
+                  status="success") == commands_before + 1
+    assert sample("koala_listener_duration_seconds_count", event="on_message",
+                  listener="BotBase.on_message") >= listener_before + 1
+
+
+@pytest.mark.asyncio
+async def test_instrument_http():
+    route = discord.http.Route("GET", "/channels/{channel_id}", channel_id=1)
+    http = mock.Mock()
+    http.request = mock.AsyncMock(side_effect=[{"id": 1}, discord.NotFound(mock.Mock(status=404), "Unknown")])
+    metrics.instrument_http(http)
+    metrics.instrument_http(http)
+    success_before = sample("koala_discord_http_request_duration_seconds_count", method="GET",
+                            route="/channels/{channel_id}", status="success")
+    assert await http.request(route) == {"id": 1}
+    with pytest.raises(discord.NotFound):
+        await http.request(route)
+    assert sample("koala_discord_http_request_duration_seconds_count", method="GET", route="/channels/{channel_id}",
+                  status="success") == success_before + 1
+    assert sample("koala_discord_http_request_duration_seconds_count", method="GET", route="/channels/{channel_id}",
+                  status="404") >= 1
+
+
+async def test_get_metrics(api_client):
+    metrics.observe_listener("on_ready", BaseCog.on_ready, 0.1)
+    resp = await api_client.get('/metrics')
+    assert resp.status == OK
+    assert resp.content_type == "text/plain"
+    body = await resp.text()
+    assert 'koala_listener_duration_seconds_count{event="on_ready",listener="BaseCog.on_ready"}' in body
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Event Loop Profiler
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import io
+import zipfile
+
+# Libs
+import pytest
+
+# Own modules
+from koala.errors import InvalidArgumentError
+from koala.instrumentation.profiler import COLLAPSED_FILENAME, IDLE_LABEL, Profile, ProfilerRunningError, \
+    SamplingProfiler, SUMMARY_FILENAME
+
+# Constants
+COG_SOURCE = """
+import time
+
+
+class FakeCog:
+    async def on_message(self, seconds):
+        self.spin(seconds)
+
+    def spin(self, seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+"""
+
+# Variables
+
+
+@pytest.fixture
+def fake_cog():
+    namespace = {"__name__": "koala.cogs.fake.cog"}
+    exec(compile(COG_SOURCE, "koala/cogs/fake/cog.py", "exec"), namespace)
+    return namespace["FakeCog"]()
+
+
+@pytest.fixture
+def sampler():
+    return SamplingProfiler(interval=0.002, max_duration=5)
+
+
+@pytest.mark.asyncio
+async def test_profile_attributes_cog_listener(sampler, fake_cog):
+    async def listener():
+        await asyncio.sleep(0.05)
+        await fake_cog.on_message(0.3)
+
+    task = asyncio.create_task(listener(), name="discord.py: on_message")
+    profile = await sampler.profile(0.5)
+    await task
+
+    labels = profile.labels()
+    assert set(labels) == {"fake:FakeCog.on_message", IDLE_LABEL}
+    own, total = profile.functions()
+    assert own["koala.cogs.fake.cog:FakeCog.spin"] == total["koala.cogs.fake.cog:FakeCog.on_message"] \
+           == labels["fake:FakeCog.on_message"] > 0
+    collapsed = profile.collapsed().splitlines()
+    # Frames of the loop below the running callback are left out
+    assert [line for line in collapsed if line.startswith("fake:FakeCog.on_message;")] == [
+        "fake:FakeCog.on_message;tests.instrumentation.test_profiler:"
+        "test_profile_attributes_cog_listener.<locals>.listener;koala.cogs.fake.cog:FakeCog.on_message;"
+        "koala.cogs.fake.cog:FakeCog.spin {}".format(labels["fake:FakeCog.on_message"])]
+    assert [line for line in collapsed if line.startswith("idle;")][0].startswith(
+        "idle;asyncio.base_events:BaseEventLoop._run_once;selectors:")
+    assert profile.overhead < 0.05
+
+
+@pytest.mark.asyncio
+async def test_profile_running(sampler):
+    task = asyncio.create_task(sampler.profile(0.1))
+    await asyncio.sleep(0)
+    with pytest.raises(ProfilerRunningError):
+        await sampler.profile(0.1)
+    await task
+    assert not sampler.running
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seconds", [0, -1, 6])
+async def test_profile_invalid_duration(sampler, seconds):
+    with pytest.raises(InvalidArgumentError):
+        await sampler.profile(seconds)
+
+
+def test_collapsed_and_summary():
+    profile = Profile(0.01)
+    profile.duration = 1.0
+    profile.add("base:BaseCog.ping", ("koala.cogs.base.cog:BaseCog.ping", "koala.cogs.base.core:ping"))
+    profile.add("base:BaseCog.ping", ("koala.cogs.base.cog:BaseCog.ping", "koala.cogs.base.core:ping"))
+    profile.add(IDLE_LABEL, ("selectors:EpollSelector.select",))
+    assert profile.collapsed() == "base:BaseCog.ping;koala.cogs.base.cog:BaseCog.ping;koala.cogs.base.core:ping 2\n" \
+                                  "idle;selectors:EpollSelector.select 1\n"
+    summary = profile.summary()
+    assert "       2  66.67%  base:BaseCog.ping" in summary
+    assert "       2  66.67%        2  66.67%  koala.cogs.base.core:ping" in summary
+
+    with zipfile.ZipFile(io.BytesIO(profile.archive())) as archive:
+        assert archive.read(COLLAPSED_FILENAME).decode() == profile.collapsed()
+        assert archive.read(SUMMARY_FILENAME).decode() == summary
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot SQL Instrumentation
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+from http.client import BAD_REQUEST, OK
+
+# Libs
+import mock
+import pytest
+from aiohttp import web
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+# Own modules
+import koala.db
+from koala.instrumentation import sql
+from koala.instrumentation.api import InstrumentationEndpoint
+from koala.instrumentation.loop import set_task_label
+from koala.instrumentation.sql import QueryRecorder, fingerprint, query_operation, redact
+
+# Constants
+FAKE_DB_SOURCE = """
+from sqlalchemy import text
+
+from koala.db import async_session_manager
+
+
+class FakeDBManager:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_user(self, user_id):
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT :user_id"), {"user_id": user_id}).scalar()
+
+    async def get_user_async(self, user_id):
+        async with async_session_manager() as session:
+            return (await session.execute(text("SELECT :user_id"), {"user_id": user_id})).scalar()
+"""
+
+# Variables
+fake_db = {"__name__": "koala.cogs.fake_cog.db"}
+exec(FAKE_DB_SOURCE, fake_db)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", future=True)
+    sql.instrument_engine(engine)
+    sql.instrument_engine(engine)
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def reset_recorder():
+    sql.query_recorder.reset()
+    yield
+    sql.query_recorder.reset()
+
+
+@pytest.fixture
+def api_client(aiohttp_client, loop):
+    recorder = QueryRecorder()
+    recorder.record("SELECT 1", (), False, 0.1, caller="fake_cog:FakeDBManager.get_user")
+    recorder.record("SELECT 2", (), False, 0.1, caller="fake_cog:FakeDBManager.get_user")
+    recorder.record("DELETE FROM T", (), False, 0.3, caller="fake_cog:FakeDBManager.delete")
+    app = web.Application()
+    InstrumentationEndpoint(recorder=recorder).register(app)
+    return loop.run_until_complete(aiohttp_client(app))
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT * FROM T WHERE id = 1", "SELECT * FROM T WHERE id = ?"),
+    ("SELECT * FROM T WHERE name = 'it''s' AND t1.id = 2.5", "SELECT * FROM T WHERE name = ? AND t1.id = ?"),
+    ("SELECT *\n  FROM T\n WHERE id IN (?, ?,?)", "SELECT * FROM T WHERE id IN (?+)"),
+    ("SELECT * FROM T WHERE id IN (%s, %s) AND a = %(a)s", "SELECT * FROM T WHERE id IN (?+) AND a = ?"),
+    ("UPDATE T SET a = :a_1 WHERE b = :b", "UPDATE T SET a = ? WHERE b = ?"),
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
+
+
+def test_query_operation():
+    assert query_operation("  select 1") == "SELECT"
+    assert query_operation("PRAGMA main.table_info(\"T\")") == "OTHER"
+    assert query_operation("") == "OTHER"
+
+
+def test_redact():
+    assert redact({"user_id": 1, "name": "secret"}) == {"user_id": "int", "name": "str"}
+    assert redact((1, "secret")) == ["int", "str"]
+    assert redact([(1,), (2,)], executemany=True) == "<2 parameter sets>"
+
+
+def test_instrument_engine(engine):
+    select_before = REGISTRY.get_sample_value("koala_db_query_duration_seconds_count", {"operation": "SELECT"}) or 0
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM MissingTable"))
+        assert connection.info[sql.QUERY_START_KEY] == []
+    assert REGISTRY.get_sample_value("koala_db_query_duration_seconds_count",
+                                     {"operation": "SELECT"}) == select_before + 1
+    assert sql.query_recorder.top() == [dict(fingerprint="SELECT ?", caller="unknown", count=1, **{
+        stat: sql.query_recorder.top()[0][stat] for stat in ["total", "p50", "p99"]})]
+
+
+def test_caller_from_stack(engine):
+    manager = fake_db["FakeDBManager"](engine)
+    for user_id in range(3):
+        assert manager.get_user(user_id) == user_id
+    top = sql.query_recorder.top()
+    assert [(query["fingerprint"], query["caller"], query["count"]) for query in top] == \
+           [("SELECT ?", "fake_cog:FakeDBManager.get_user", 3)]
+    assert top[0]["p50"] <= top[0]["p99"]
+
+
+@pytest.mark.asyncio
+async def test_caller_from_async_task():
+    sql.instrument_engine(koala.db.async_engine.sync_engine)
+    assert await fake_db["FakeDBManager"](None).get_user_async(1) == 1
+    assert ("SELECT ?", "fake_cog:FakeDBManager.get_user_async") in \
+           [(query["fingerprint"], query["caller"]) for query in sql.query_recorder.top()]
+
+
+@pytest.mark.asyncio
+async def test_caller_from_task_label(engine):
+    async def listener():
+        set_task_label(fake_db["FakeDBManager"].get_user)
+        with mock.patch.object(sql, "walk_stack") as mock_walk_stack:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        mock_walk_stack.assert_not_called()
+
+    await asyncio.create_task(listener())
+    assert [query["caller"] for query in sql.query_recorder.top()] == ["fake_cog:FakeDBManager.get_user"]
+
+
+def test_slow_query_logged_redacted(caplog):
+    recorder = QueryRecorder(slow_query_threshold=0.5)
+    recorder.record("SELECT * FROM T WHERE name = ?", ("secret",), False, 0.1, caller="fake_cog:get")
+    assert "Slow query" not in caplog.text
+    recorder.record("SELECT * FROM T WHERE name = ?", ("secret",), False, 1, caller="fake_cog:get")
+    assert "Slow query (1.000s) from fake_cog:get: SELECT * FROM T WHERE name = ? parameters: ['str']" in caplog.text
+    assert "secret" not in caplog.text
+
+
+async def test_get_queries(api_client):
+    resp = await api_client.get('/queries?top=1')
+    assert resp.status == OK
+    assert await resp.json() == [{"fingerprint": "DELETE FROM T", "caller": "fake_cog:FakeDBManager.delete",
+                                  "count": 1, "total": 0.3, "p50": 0.3, "p99": 0.3}]
+    resp = await api_client.get('/queries?sort=count')
+    assert [query["fingerprint"] for query in await resp.json()] == ["SELECT ?", "DELETE FROM T"]
+
+
+async def test_get_queries_bad_sort(api_client):
+    resp = await api_client.get('/queries?sort=abc')
+    assert resp.status == BAD_REQUEST
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Gateway Trace Recorder
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import gzip
+
+# Libs
+import discord.ext.test as dpytest
+import pytest
+from discord.ext.test import factories as dpytest_factories
+
+# Own modules
+from koala.instrumentation.trace import Anonymiser, TraceRecorder, cluster_path, read_trace
+
+# Constants
+KEY = b"koala"
+SNOWFLAKE = 175928847299117063
+
+# Variables
+
+
+@pytest.fixture
+def anonymiser():
+    return Anonymiser(KEY)
+
+
+def test_snowflake_keeps_timestamp(anonymiser):
+    pseudonym = int(anonymiser.snowflake(SNOWFLAKE))
+    assert pseudonym != SNOWFLAKE
+    assert pseudonym >> 22 == SNOWFLAKE >> 22
+    assert anonymiser.snowflake(str(SNOWFLAKE)) == str(pseudonym)
+    assert anonymiser.snowflake(None) is None
+
+
+def test_pseudonyms_depend_on_key(anonymiser):
+    assert Anonymiser(b"other").snowflake(SNOWFLAKE) != anonymiser.snowflake(SNOWFLAKE)
+    assert Anonymiser(b"other").word("koala") != anonymiser.word("koala")
+
+
+def test_content_keeps_shape(anonymiser):
+    content = anonymiser.content("k!welcomeUpdateMsg Hello <@!{id}>, see <#{id}> <:koala:{id}>!".format(id=SNOWFLAKE))
+    pseudonym = anonymiser.snowflake(SNOWFLAKE)
+    assert content == "k!welcomeUpdateMsg {hello} <@!{id}>, {see} <#{id}> <:{koala}:{id}>!".format(
+        hello=anonymiser.word("Hello"), see=anonymiser.word("see"), koala=anonymiser.word("koala"), id=pseudonym)
+    assert len(anonymiser.word("Hello")) == 5
+    assert "Hello" not in content
+
+
+def test_emoji(anonymiser):
+    assert anonymiser.emoji({"id": None, "name": "👍"}) == {"id": None, "name": "👍"}
+    assert anonymiser.emoji({"id": str(SNOWFLAKE), "name": "koala"}) == {"id": anonymiser.snowflake(SNOWFLAKE),
+                                                                         "name": anonymiser.word("koala")}
+
+
+def test_cluster_path():
+    assert cluster_path("config/trace.jsonl.gz", 2) == "config/trace.cluster2.jsonl.gz"
+    assert cluster_path("trace", 0) == "trace.cluster0"
+
+
+@pytest.mark.asyncio
+async def test_record_and_read(bot, anonymiser, tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    recorder = TraceRecorder(path, max_events=1, anonymiser=anonymiser)
+    recorder.install(bot)
+    config = dpytest.get_config()
+    channel, member = config.channels[0], config.members[0]
+    data = dpytest_factories.make_message_dict(channel, member, content="hello koala", guild_id=channel.guild.id)
+
+    bot._connection.parsers["MESSAGE_CREATE"](data)
+    bot._connection.parsers["MESSAGE_CREATE"](dict(data, id=data["id"] + 1))
+    recorder.close()
+
+    assert bot._connection._get_message(data["id"]).content == "hello koala"
+    header, events = read_trace(path)
+    assert header["version"] == 1
+    [(offset, event_type, event)] = list(events)
+    assert event_type == "MESSAGE_CREATE"
+    assert event["author"] == {"id": anonymiser.snowflake(member.id), "bot": False}
+    assert event["guild_id"] == anonymiser.snowflake(channel.guild.id)
+    assert event["content"] == " ".join(anonymiser.word(word) for word in ("hello", "koala"))
+    with gzip.open(path, "rt") as file:
+        assert member.name not in file.read()
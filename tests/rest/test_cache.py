@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot REST API response cache
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+from http.client import BAD_REQUEST, OK, NOT_MODIFIED
+
+# Libs
+import mock
+import pytest
+from aiohttp import web
+
+# Own modules
+from koala.rest.api import parse_request
+from koala.rest.cache import ResponseCache, etag, etag_matches, response_cache
+
+# Constants
+
+# Variables
+
+
+class CountingEndpoint:
+    def __init__(self):
+        self.calls = 0
+        self.value = "a"
+
+    def register(self, app):
+        app.add_routes([web.get('/cached', self.get_cached),
+                        web.get('/uncached', self.get_uncached),
+                        web.put('/cached', self.put_cached)])
+        return app
+
+    @parse_request(cache_ttl=30, cache_scope="counting")
+    async def get_cached(self, guild_id: int):
+        self.calls += 1
+        return {"guild_id": guild_id, "value": self.value}
+
+    @parse_request
+    async def get_uncached(self, guild_id: int):
+        self.calls += 1
+        return {"guild_id": guild_id, "value": self.value}
+
+    @parse_request(invalidates="counting")
+    async def put_cached(self, guild_id: int, value: str):
+        if not value:
+            raise ValueError("value must not be empty")
+        self.value = value
+        return {"value": value}
+
+
+class SlowEndpoint(CountingEndpoint):
+    """
+    Waits for a write after reading, as a GET still reading when a write commits
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.read = asyncio.Event()
+        self.written = asyncio.Event()
+
+    @parse_request(cache_ttl=30, cache_scope="counting")
+    async def get_cached(self, guild_id: int):
+        self.calls += 1
+        result = {"guild_id": guild_id, "value": self.value}
+        self.read.set()
+        await self.written.wait()
+        return result
+
+
+@pytest.fixture
+def endpoint():
+    return CountingEndpoint()
+
+
+@pytest.fixture
+def api_client(endpoint, aiohttp_client, loop):
+    app = endpoint.register(web.Application())
+    return loop.run_until_complete(aiohttp_client(app))
+
+
+async def test_get_cached(api_client, endpoint):
+    first = await api_client.get('/cached?guild_id=1')
+    second = await api_client.get('/cached?guild_id=1')
+
+    assert first.status == second.status == OK
+    assert await first.json() == await second.json() == {"guild_id": 1, "value": "a"}
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert endpoint.calls == 1
+
+
+async def test_get_cached_per_guild(api_client, endpoint):
+    await api_client.get('/cached?guild_id=1')
+    await api_client.get('/cached?guild_id=2')
+    assert endpoint.calls == 2
+
+
+async def test_get_not_modified(api_client, endpoint):
+    first = await api_client.get('/cached?guild_id=1')
+    resp = await api_client.get('/cached?guild_id=1', headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status == NOT_MODIFIED
+    assert resp.headers["ETag"] == first.headers["ETag"]
+    assert await resp.read() == b""
+
+
+async def test_get_uncached_not_modified(api_client, endpoint):
+    first = await api_client.get('/uncached?guild_id=1')
+    resp = await api_client.get('/uncached?guild_id=1', headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status == NOT_MODIFIED
+    assert "X-Cache" not in resp.headers
+    assert endpoint.calls == 2
+
+
+async def test_write_invalidates_guild(api_client, endpoint):
+    first = await api_client.get('/cached?guild_id=1')
+    await api_client.get('/cached?guild_id=2')
+    await api_client.put('/cached', json={"guild_id": 1, "value": "b"})
+
+    resp = await api_client.get('/cached?guild_id=1', headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status == OK
+    assert (await resp.json())["value"] == "b"
+    assert resp.headers["ETag"] != first.headers["ETag"]
+    assert (await api_client.get('/cached?guild_id=2')).headers["X-Cache"] == "HIT"
+    assert endpoint.calls == 3
+
+
+async def test_failed_write_keeps_cache(api_client, endpoint):
+    await api_client.get('/cached?guild_id=1')
+    resp = await api_client.put('/cached', json={"guild_id": 1, "value": ""})
+
+    assert resp.status == BAD_REQUEST
+    assert (await api_client.get('/cached?guild_id=1')).headers["X-Cache"] == "HIT"
+    assert endpoint.calls == 1
+
+
+async def test_get_during_write_not_cached(aiohttp_client):
+    endpoint = SlowEndpoint()
+    client = await aiohttp_client(endpoint.register(web.Application()))
+
+    stale = asyncio.ensure_future(client.get('/cached?guild_id=1'))
+    await endpoint.read.wait()
+    await client.put('/cached', json={"guild_id": 1, "value": "b"})
+    endpoint.written.set()
+    assert (await (await stale).json())["value"] == "a"
+    assert (await (await client.get('/cached?guild_id=1')).json())["value"] == "b"
+    assert endpoint.calls == 2
+
+
+async def test_bad_request_not_cached(api_client, endpoint):
+    await api_client.get('/cached')
+    await api_client.get('/cached?guild_id=1')
+    assert endpoint.calls == 1
+    assert len(response_cache) == 1
+
+
+def test_cache_expires():
+    cache = ResponseCache()
+    with mock.patch("time.monotonic", return_value=0):
+        cache.put("scope", 1, "key", b"body", 10)
+    with mock.patch("time.monotonic", return_value=5):
+        assert cache.get("scope", 1, "key").body == b"body"
+    with mock.patch("time.monotonic", return_value=10):
+        assert cache.get("scope", 1, "key") is None
+
+
+def test_cache_max_entries():
+    cache = ResponseCache(max_entries=2)
+    cache.put("scope", 1, "a", b"a", 10)
+    cache.put("scope", 1, "b", b"b", 10)
+    cache.get("scope", 1, "a")
+    cache.put("scope", 1, "c", b"c", 10)
+    assert cache.get("scope", 1, "a") is not None
+    assert cache.get("scope", 1, "b") is None
+
+
+def test_cache_put_after_invalidate_skipped():
+    cache = ResponseCache()
+    version = cache.version
+    cache.invalidate("scope", 1)
+    assert cache.put("scope", 1, "a", b"stale", 10, version).body == b"stale"
+    assert cache.get("scope", 1, "a") is None
+    cache.put("scope", 1, "a", b"a", 10, cache.version)
+    assert cache.get("scope", 1, "a").body == b"a"
+
+
+def test_cache_invalidate_all_guilds():
+    cache = ResponseCache()
+    cache.put("scope", 1, "a", b"a", 10)
+    cache.put("scope", 2, "a", b"a", 10)
+    cache.put("other", 1, "a", b"a", 10)
+    cache.invalidate("scope")
+    assert len(cache) == 1
+
+
+def test_cache_invalidate_after_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.put("scope", 1, "a", b"a", 10)
+    cache.put("scope", 2, "a", b"a", 10)
+    cache.put("scope", 1, "b", b"b", 10)
+    cache.invalidate("scope", 1)
+    assert list(cache._entries) == [("scope", 2, "a")]
+    assert cache._keys == {"scope": {2: {"a"}}}
+
+
+def test_etag_matches():
+    tag = etag(b"body")
+    assert tag.startswith('"') and tag.endswith('"')
+    assert etag_matches(tag, tag)
+    assert etag_matches('"other", ' + tag, tag)
+    assert etag_matches("*", tag)
+    assert etag_matches('"other", *', tag)
+    assert etag_matches('W/' + tag, tag)
+    assert not etag_matches('W/"other"', tag)
+    assert not etag_matches(None, tag)
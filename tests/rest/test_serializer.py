@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot REST API JSON serializer
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import datetime
+import json
+
+# Libs
+import discord
+import pytest
+
+# Own modules
+from koala.cogs.base.models import ScheduledActivities
+from koala.cogs.react_for_role.dto import ReactMessage, ReactRole
+from koala.cogs.verification.dto import VerifyConfig, VerifyRole
+from koala.rest import serializer
+from koala.rest.dto import ApiError
+
+# Constants
+BACKENDS = ["json", "orjson"]
+
+# Variables
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    serializer.use_backend(request.param)
+    yield request.param
+    serializer.use_backend("auto")
+
+
+def loads(data):
+    return json.loads(serializer.dumps(data))
+
+
+def test_dumps_dataclass(backend):
+    assert loads(ApiError("BAD_REQUEST", "message")) == {"error": "BAD_REQUEST", "message": "message"}
+
+
+def test_dumps_nested_dataclass(backend):
+    message = ReactMessage(1, 2, 3, "title", "description", "#000000", None, True,
+                           [ReactRole("\U0001F428", 4), ReactRole("a", 5)])
+    assert loads(message) == {"message_id": 1, "guild_id": 2, "channel_id": 3, "title": "title",
+                              "description": "description", "colour": "#000000", "thumbnail": None,
+                              "inline": True, "roles": [{"emoji": "\U0001F428", "role_id": 4},
+                                                        {"emoji": "a", "role_id": 5}]}
+    assert loads(VerifyConfig("1", [VerifyRole("koalabot.uk", 2)])) == \
+           {"guild_id": "1", "roles": [{"email_suffix": "koalabot.uk", "role_id": 2}]}
+
+
+def test_dumps_model(backend):
+    activity = ScheduledActivities(activity_id=1, activity_type=discord.ActivityType.playing, stream_url=None,
+                                   message="test", time_start=datetime.datetime(2025, 1, 1),
+                                   time_end=datetime.datetime(2026, 1, 1, 12, 30))
+    assert loads([activity]) == [{"activity_id": 1, "activity_type": ["playing", 0], "stream_url": None,
+                                  "message": "test", "time_start": "2025-01-01T00:00:00",
+                                  "time_end": "2026-01-01T12:30:00"}]
+
+
+def test_dumps_int_keys(backend):
+    assert loads({1: "a"}) == {"1": "a"}
+
+
+def test_dumps_unknown_type(backend):
+    with pytest.raises(TypeError):
+        serializer.dumps(object())
+
+
+def test_register_encoder():
+    class Point:
+        def __init__(self, x, y):
+            self.x = x
+            self.y = y
+
+    serializer.register_encoder(Point, lambda point: [point.x, point.y])
+    assert loads({"point": Point(1, 2)}) == {"point": [1, 2]}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        serializer.use_backend("unknown")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Cache Invalidation Bus
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Libs
+import pytest
+from sqlalchemy import create_engine, event, func, select, update
+
+# Own modules
+from koala import bus, cache
+from koala.bus import DatabaseTransport, InvalidationBus, SocketTransport, create_transports
+from koala.cache import TTLCache
+from koala.models import CacheInvalidations, mapper_registry
+
+# Constants
+GUILD_ID = 1234567890
+CONVERGENCE_LIMIT = 2  # seconds
+PROCESS_SCRIPT = """
+import asyncio, pathlib, sys, time
+from koala import bus, cache
+
+role, ready = sys.argv[1], pathlib.Path(sys.argv[2])
+settings = cache.TTLCache("test_bus.settings")
+
+
+async def main():
+    invalidation_bus = bus.InvalidationBus(origin=role)
+    await invalidation_bus.start(bus.create_transports())
+    if role == "reader":
+        settings.set({guild_id}, "old")
+        ready.touch()
+        deadline = time.time() + 10
+        while settings.get({guild_id}) is not None and time.time() < deadline:
+            await asyncio.sleep(0.005)
+        at = time.time()
+    else:
+        while not ready.exists():
+            await asyncio.sleep(0.005)
+        at = time.time()
+        settings.invalidate({guild_id})
+    # Let the reader finish before the writer's socket is removed
+    await asyncio.sleep(0.2)
+    await invalidation_bus.stop()
+    print(at)
+
+asyncio.run(main())
+""".format(guild_id=GUILD_ID)
+
+# Variables
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # The SQLite database of processes with CONFIG_PATH=tmp_path
+    engine = create_engine(f"sqlite:///{tmp_path / 'windows_Koala.db'}", future=True)
+    mapper_registry.metadata.create_all(engine, tables=[CacheInvalidations.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def settings():
+    settings = TTLCache("test_bus.settings")
+    yield settings
+    cache.caches.pop(settings.name, None)
+    cache.subscribers.pop(settings.name, None)
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_database_transport_between_buses(engine, settings):
+    publisher, subscriber = InvalidationBus("publisher"), InvalidationBus("subscriber")
+    await publisher.start([DatabaseTransport(engine, interval=0.01)])
+    try:
+        await subscriber.start([DatabaseTransport(engine, interval=0.01)])
+        settings.set(GUILD_ID, "old")
+        # The publisher's process is simulated by publishing directly, as both buses publish for this process's caches
+        publisher.publish(settings.name, GUILD_ID)
+        await wait_for(lambda: settings.get(GUILD_ID) is None)
+    finally:
+        await subscriber.stop()
+        await publisher.stop()
+    assert cache.publishers == []
+
+
+@pytest.mark.asyncio
+async def test_own_invalidations_skipped(engine, settings, monkeypatch):
+    received = []
+    monkeypatch.setattr(cache, "receive", lambda namespace, key: received.append((namespace, key)))
+    invalidation_bus = InvalidationBus("self")
+    await invalidation_bus.start([DatabaseTransport(engine, interval=0.01)])
+    try:
+        settings.invalidate(GUILD_ID)
+        await asyncio.sleep(0.05)
+    finally:
+        await invalidation_bus.stop()
+    assert received == []
+    with engine.connect() as connection:
+        assert connection.execute(select(CacheInvalidations.namespace, CacheInvalidations.guild_id)).all() \
+               == [(settings.name, GUILD_ID)]
+
+
+@pytest.mark.asyncio
+async def test_publish_written_off_loop(engine):
+    insert_threads = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.startswith("INSERT"):
+            insert_threads.append(threading.get_ident())
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    transport = DatabaseTransport(engine, interval=60)
+    await transport.start(lambda *message: None)
+    try:
+        for guild_id in range(1, 4):
+            transport.publish("other", "namespace", guild_id, bus.now_ms())
+        assert insert_threads == []
+        await wait_for(lambda: insert_threads)
+    finally:
+        await transport.stop()
+    assert threading.get_ident() not in insert_threads
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(CacheInvalidations)).scalar() == 3
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_pending(engine):
+    transport = DatabaseTransport(engine, interval=60)
+    await transport.start(lambda *message: None)
+    transport.publish("other", "namespace", GUILD_ID, bus.now_ms())
+    await transport.stop()
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(CacheInvalidations)).scalar() == 1
+
+
+def test_poll_skips_published_and_delivered(engine):
+    transport = DatabaseTransport(engine)
+    transport.publish("other", "old", GUILD_ID, bus.now_ms())
+    assert transport.flush() == 1
+    transport._skip_published()
+    assert transport.poll() == []
+
+    transport.publish("other", "new", GUILD_ID, 1)
+    assert transport.poll() == []
+    transport.flush()
+    assert transport.poll() == [("other", "new", GUILD_ID, 1)]
+    assert transport.poll() == []
+
+
+def test_poll_reads_late_commits(engine):
+    transport = DatabaseTransport(engine)
+    for namespace in ("first", "second"):
+        transport.publish("other", namespace, GUILD_ID, bus.now_ms())
+    transport.flush()
+    with engine.begin() as connection:
+        # The first ID is committed after the second has been polled
+        connection.execute(update(CacheInvalidations).where(CacheInvalidations.namespace == "first")
+                           .values(id=3))
+    assert [message[1] for message in transport.poll()] == ["second", "first"]
+
+
+def test_prune(engine):
+    transport = DatabaseTransport(engine, retention=60)
+    transport.publish("other", "expired", GUILD_ID, bus.now_ms() - 61000)
+    transport.publish("other", "kept", GUILD_ID, bus.now_ms())
+    transport.flush()
+    assert transport.prune() == 1
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(CacheInvalidations)).scalar() == 1
+
+
+@pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"), reason="needs Unix sockets")
+@pytest.mark.asyncio
+async def test_socket_transport(tmp_path):
+    received = []
+    first, second = SocketTransport(tmp_path), SocketTransport(tmp_path)
+    await first.start(lambda *message: received.append(("first",) + message))
+    await second.start(lambda *message: received.append(("second",) + message))
+    try:
+        first.publish("first", "namespace", GUILD_ID, 1)
+        await wait_for(lambda: received)
+    finally:
+        await first.stop()
+        await second.stop()
+    assert received == [("second", "first", "namespace", GUILD_ID, 1)]
+    assert list(tmp_path.glob("*.sock")) == []
+
+
+def test_create_transports_unknown():
+    with pytest.raises(ValueError):
+        create_transports(["bogus"])
+
+
+@pytest.mark.parametrize("transports", ["database", "database,socket"])
+def test_processes_converge(tmp_path, engine, transports):
+    script = tmp_path / "process.py"
+    script.write_text(PROCESS_SCRIPT)
+    ready = tmp_path / "ready"
+    env = dict(os.environ, CONFIG_PATH=str(tmp_path), ENCRYPTED="False", CACHE_BUS_TRANSPORTS=transports,
+               CACHE_BUS_POLL_INTERVAL="0.05", CACHE_BUS_SOCKET_DIR=str(tmp_path / "bus"),
+               PYTHONPATH=os.getcwd())
+    reader = subprocess.Popen([sys.executable, str(script), "reader", str(ready)], env=env,
+                              stdout=subprocess.PIPE, text=True)
+    writer = subprocess.Popen([sys.executable, str(script), "writer", str(ready)], env=env,
+                              stdout=subprocess.PIPE, text=True)
+    invalidated, _ = writer.communicate(timeout=30)
+    converged, _ = reader.communicate(timeout=30)
+    assert writer.returncode == reader.returncode == 0
+    # Logs are written to stdout before the time
+    assert 0 <= float(converged.split()[-1]) - float(invalidated.split()[-1]) < CONVERGENCE_LIMIT
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Cache
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import threading
+import time
+
+# Libs
+import pytest
+from prometheus_client import REGISTRY
+
+# Own modules
+from koala import cache
+from koala.cache import TTLCache, cached
+
+# Constants
+GUILD_ID = 1234567890
+
+# Variables
+
+
+@pytest.fixture
+def guild_cache():
+    return TTLCache("test", ttl=60, max_size=2)
+
+
+def test_get_set(guild_cache):
+    hits_before = REGISTRY.get_sample_value("koala_cache_requests_total", {"cache": "test", "result": "hit"}) or 0
+    assert guild_cache.get(GUILD_ID) is None
+    guild_cache.set(GUILD_ID, [1, 2])
+    assert guild_cache.get(GUILD_ID) == [1, 2]
+    assert guild_cache.stats() == {"keys": 1, "hits": 1, "misses": 1, "evictions": 0, "hit_ratio": 0.5}
+    assert REGISTRY.get_sample_value("koala_cache_requests_total", {"cache": "test", "result": "hit"}) \
+           == hits_before + 1
+    assert cache.stats()["test"] == guild_cache.stats()
+
+
+def test_ttl_expires(guild_cache):
+    guild_cache.set(GUILD_ID, None, ttl=0)
+    assert guild_cache.get(GUILD_ID, "missing") == "missing"
+
+
+def test_least_recently_used_evicted(guild_cache):
+    guild_cache.set(1, "one")
+    guild_cache.set(2, "two")
+    guild_cache.get(1)
+    guild_cache.set(3, "three")
+    assert guild_cache.get(2) is None
+    assert guild_cache.get(1) == "one"
+    assert guild_cache.get(3) == "three"
+    assert guild_cache.evictions == 1
+
+
+def test_invalidate(guild_cache):
+    guild_cache.set(GUILD_ID, "old")
+    guild_cache.set(GUILD_ID + 1, "other")
+    guild_cache.invalidate(GUILD_ID)
+    assert guild_cache.get(GUILD_ID) is None
+    assert guild_cache.get(GUILD_ID + 1) == "other"
+
+
+def test_get_or_load_single_flight(guild_cache):
+    calls = []
+    started = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "loaded"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(guild_cache.get_or_load(GUILD_ID, loader)))
+    first.start()
+    started.wait()
+    results.append(guild_cache.get_or_load(GUILD_ID, loader))
+    first.join()
+    assert results == ["loaded", "loaded"]
+    assert len(calls) == 1
+
+
+def test_get_or_load_error_not_cached(guild_cache):
+    def loader():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        guild_cache.get_or_load(GUILD_ID, loader)
+    assert guild_cache.get_or_load(GUILD_ID, lambda: "loaded") == "loaded"
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_async_single_flight(guild_cache):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "loaded"
+
+    assert await asyncio.gather(*(guild_cache.get_or_load_async(GUILD_ID, loader) for _ in range(5))) \
+           == ["loaded"] * 5
+    assert len(calls) == 1
+    assert guild_cache.get(GUILD_ID) == "loaded"
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_async_error(guild_cache):
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ValueError()
+
+    results = await asyncio.gather(*(guild_cache.get_or_load_async(GUILD_ID, loader) for _ in range(2)),
+                                   return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert guild_cache.get(GUILD_ID) is None
+
+
+@pytest.mark.asyncio
+async def test_load_during_invalidate_not_cached(guild_cache):
+    async def loader():
+        # A write is committed while the old value is being read
+        guild_cache.invalidate(GUILD_ID)
+        return "stale"
+
+    assert await guild_cache.get_or_load_async(GUILD_ID, loader) == "stale"
+    assert guild_cache.get(GUILD_ID) is None
+
+
+@pytest.mark.asyncio
+async def test_cached(guild_cache):
+    calls = []
+
+    class Manager:
+        @cached(guild_cache, key=lambda self, guild_id: int(guild_id))
+        def get_roles(self, guild_id):
+            calls.append(guild_id)
+            return [guild_id]
+
+        @cached(guild_cache, key=lambda self, guild_id: ("async", int(guild_id)))
+        async def get_roles_async(self, guild_id):
+            calls.append(guild_id)
+            return [guild_id]
+
+    manager = Manager()
+    assert manager.get_roles(GUILD_ID) == manager.get_roles(str(GUILD_ID)) == [GUILD_ID]
+    assert await manager.get_roles_async(GUILD_ID) == await manager.get_roles_async(GUILD_ID) == [GUILD_ID]
+    assert calls == [GUILD_ID, GUILD_ID]
+    assert Manager.get_roles.cache is guild_cache
+
+
+def test_clear_all(guild_cache):
+    guild_cache.set(GUILD_ID, "value")
+    cache.clear_all()
+    assert len(guild_cache) == 0
+    assert guild_cache.hits == 0
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Cluster
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+from http.client import BAD_GATEWAY, OK
+
+# Libs
+import discord
+import mock
+import pytest
+from aiohttp import web
+
+# Own modules
+from koala import cluster
+
+# Constants
+LOCAL_GUILD = 0
+REMOTE_GUILD = 2 << 22  # shard 2 of 4, owned by cluster 1 of 2
+
+# Variables
+
+
+@pytest.fixture
+def two_clusters():
+    cluster.configure(0, 2, 4)
+    yield
+    cluster.configure()
+
+
+def handler(name):
+    async def handle(request):
+        body = await request.json() if request.body_exists else None
+        return web.json_response({"cluster": name, "query": dict(request.query), "body": body})
+    return handle
+
+
+def make_app(name):
+    app = web.Application(middlewares=[cluster.route_middleware])
+    app.add_routes([web.get('/guild', handler(name)), web.post('/guild', handler(name))])
+    return app
+
+
+@pytest.fixture
+def api_client(two_clusters, aiohttp_client, aiohttp_server, loop):
+    remote = loop.run_until_complete(aiohttp_server(make_app("remote")))
+    with mock.patch("koala.cluster.internal_port", return_value=remote.port):
+        yield loop.run_until_complete(aiohttp_client(make_app("local")))
+    loop.run_until_complete(cluster.close())
+
+
+@pytest.mark.parametrize("clusters, shards", [(1, 1), (2, 4), (3, 8), (4, 4), (5, 16)])
+def test_shard_ids_for(clusters, shards):
+    shard_ids = [cluster.shard_ids_for(cluster_id, clusters, shards) for cluster_id in range(clusters)]
+    assert sum(shard_ids, []) == list(range(shards))
+    assert all(shard_ids)
+
+
+@pytest.mark.parametrize("clusters, shards", [(2, 4), (3, 8), (4, 4), (5, 16)])
+def test_cluster_of(clusters, shards):
+    cluster.configure(0, clusters, shards)
+    try:
+        for shard_id in range(shards):
+            assert shard_id in cluster.shard_ids_for(cluster.cluster_of(shard_id << 22), clusters, shards)
+    finally:
+        cluster.configure()
+
+
+def test_owns_guild(two_clusters):
+    assert cluster.shard_ids == [0, 1]
+    assert cluster.owns_guild(LOCAL_GUILD)
+    assert not cluster.owns_guild(REMOTE_GUILD)
+
+
+def test_owns_guild_not_clustered():
+    assert not cluster.is_clustered()
+    assert cluster.owns_guild(REMOTE_GUILD)
+
+
+def test_configure_invalid_cluster():
+    with pytest.raises(ValueError):
+        cluster.configure(2, 2, 4)
+    cluster.configure()
+
+
+def test_get_channel(two_clusters):
+    bot = mock.MagicMock(spec=discord.Client)
+    bot.get_channel.return_value = None
+    bot.get_partial_messageable.return_value = "partial"
+    assert cluster.get_channel(bot, 1, REMOTE_GUILD) == "partial"
+    bot.get_partial_messageable.assert_called_once_with(1, guild_id=REMOTE_GUILD)
+    # Channels of this cluster's guilds are cached unless they were deleted
+    assert cluster.get_channel(bot, 1, LOCAL_GUILD) is None
+    assert cluster.get_channel(bot, 1) is None
+    cluster.configure()
+    assert cluster.get_channel(bot, 1, REMOTE_GUILD) is None
+
+
+async def test_route_local_guild(api_client):
+    resp = await api_client.get('/guild', params={"guild_id": LOCAL_GUILD})
+    assert resp.status == OK
+    assert (await resp.json())["cluster"] == "local"
+
+
+async def test_route_remote_guild(api_client):
+    resp = await api_client.get('/guild', params={"guild_id": REMOTE_GUILD, "a": "b"})
+    assert resp.status == OK
+    assert await resp.json() == {"cluster": "remote", "query": {"guild_id": str(REMOTE_GUILD), "a": "b"},
+                                 "body": None}
+
+
+async def test_route_remote_guild_body(api_client):
+    resp = await api_client.post('/guild', json={"guild_id": REMOTE_GUILD})
+    assert resp.status == OK
+    assert await resp.json() == {"cluster": "remote", "query": {}, "body": {"guild_id": REMOTE_GUILD}}
+
+
+async def test_route_local_guild_body(api_client):
+    resp = await api_client.post('/guild', json={"guild_id": LOCAL_GUILD})
+    assert (await resp.json())["body"] == {"guild_id": LOCAL_GUILD}
+    assert (await resp.json())["cluster"] == "local"
+
+
+async def test_route_cluster_unavailable(api_client):
+    with mock.patch("koala.cluster.internal_port", return_value=1):
+        resp = await api_client.get('/guild', params={"guild_id": REMOTE_GUILD})
+    assert resp.status == BAD_GATEWAY
+
+
+def test_launch_single_process():
+    target = mock.MagicMock()
+    cluster.launch(target, "token", clusters=1, launcher=False)
+    target.assert_called_once_with()
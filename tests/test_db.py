@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Database Manager
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import sqlite3
+
+# Libs
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, delete, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+# Own modules
+import koala.db
+from koala.db import extension_cache, extension_enabled, give_guild_extension, insert_extension, \
+    remove_guild_extension, warm_extension_cache, assign_async_session, async_session_manager, LeaderLease, \
+    leader_only, assign_session, session_manager, read_only, read_only_sessions, guild_recently_written
+from koala.errors import LeaseLostError
+from koala.models import GuildExtensions, Guilds, KoalaExtensions, Leases, mapper_registry
+from koala.pool import ReplicaMonitor
+
+# Constants
+GUILD_ID = 1234567890
+
+# Variables
+
+
+@pytest.fixture(autouse=True)
+def setup_extensions(session):
+    session.execute(delete(GuildExtensions))
+    session.execute(delete(KoalaExtensions))
+    session.commit()
+    insert_extension("Announce", 0, True, True)
+    insert_extension("TwitchAlert", 0, True, True)
+    insert_extension("All", 0, True, True)
+    extension_cache.clear()
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """
+    A read replica that is available, with only the ReplicaOnly extension
+    """
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(url, future=True)
+    mapper_registry.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(KoalaExtensions.__table__.insert(), [
+            {"extension_id": "ReplicaOnly", "subscription_required": 0, "available": True, "enabled": True}])
+    async_engine = koala.db.__create_async_engine(url, "replica_test")
+    monitor = ReplicaMonitor(async_engine, "replica_test", max_lag=5, interval=5)
+    monitor.available = True
+    monkeypatch.setattr(koala.db, "replica_monitor", monitor)
+    koala.db.ReplicaSession.configure(bind=engine)
+    koala.db.AsyncReplicaSession.configure(bind=async_engine)
+    koala.db._recent_writes.clear()
+    yield monitor
+    koala.db._recent_writes.clear()
+    koala.db.ReplicaSession.configure(bind=None)
+    koala.db.AsyncReplicaSession.configure(bind=None)
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+@pytest.fixture
+def clear_leases(session):
+    session.execute(delete(Leases))
+    session.commit()
+
+
+def test_extension_enabled_miss_then_hit():
+    assert not extension_enabled(GUILD_ID, "Announce")
+    assert extension_cache.misses == 1
+    assert not extension_enabled(GUILD_ID, "Announce")
+    assert extension_cache.hits == 1
+    assert extension_cache.misses == 1
+
+
+def test_give_guild_extension_refreshes_cache():
+    assert not extension_enabled(GUILD_ID, "Announce")
+    give_guild_extension(GUILD_ID, "Announce")
+    assert extension_enabled(GUILD_ID, "Announce")
+    assert not extension_enabled(GUILD_ID, "TwitchAlert")
+    assert extension_cache.misses == 1
+
+
+def test_remove_guild_extension_refreshes_cache():
+    give_guild_extension(GUILD_ID, "Announce")
+    assert extension_enabled(GUILD_ID, "Announce")
+    remove_guild_extension(GUILD_ID, "Announce")
+    assert not extension_enabled(GUILD_ID, "Announce")
+
+
+def test_extension_enabled_all():
+    give_guild_extension(GUILD_ID, "All")
+    assert extension_enabled(GUILD_ID, "Announce")
+    assert extension_enabled(GUILD_ID, "TwitchAlert")
+
+
+def test_warm_extension_cache(session):
+    session.add(GuildExtensions(extension_id="Announce", guild_id=GUILD_ID))
+    session.commit()
+    warm_extension_cache([GUILD_ID, GUILD_ID + 1])
+    assert extension_enabled(GUILD_ID, "Announce")
+    assert not extension_enabled(GUILD_ID + 1, "Announce")
+    assert extension_cache.stats() == {"guilds": 2, "hits": 2, "misses": 0, "hit_ratio": 1.0}
+
+
+@assign_async_session
+async def get_extension_ids(*, session):
+    return (await session.execute(select(KoalaExtensions.extension_id))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_assign_async_session():
+    assert sorted(await get_extension_ids()) == ["All", "Announce", "TwitchAlert"]
+
+
+@pytest.mark.asyncio
+async def test_assign_async_session_given_session(async_session):
+    assert sorted(await get_extension_ids(session=async_session)) == ["All", "Announce", "TwitchAlert"]
+
+
+@pytest.mark.asyncio
+async def test_async_session_manager_rollback():
+    with pytest.raises(ValueError):
+        async with async_session_manager() as session:
+            session.add(KoalaExtensions(extension_id="Rollback", subscription_required=0, available=True,
+                                        enabled=True))
+            await session.flush()
+            raise ValueError()
+    assert "Rollback" not in await get_extension_ids()
+
+
+@assign_session(readonly=True)
+def get_extension_ids_readonly(*, session):
+    return session.execute(select(KoalaExtensions.extension_id)).scalars().all()
+
+
+@assign_async_session(readonly=True)
+async def get_extension_ids_readonly_async(*, session):
+    return (await session.execute(select(KoalaExtensions.extension_id))).scalars().all()
+
+
+@read_only
+async def get_extension_ids_read_only():
+    return await get_extension_ids()
+
+
+def test_readonly_sessions_use_replica(replica):
+    assert get_extension_ids_readonly() == ["ReplicaOnly"]
+    with session_manager() as session:
+        assert "ReplicaOnly" not in session.execute(select(KoalaExtensions.extension_id)).scalars().all()
+    with read_only_sessions(), session_manager() as session:
+        assert session.execute(select(KoalaExtensions.extension_id)).scalars().all() == ["ReplicaOnly"]
+
+
+@pytest.mark.asyncio
+async def test_readonly_async_sessions_use_replica(replica):
+    assert await get_extension_ids_readonly_async() == ["ReplicaOnly"]
+    assert await get_extension_ids_read_only() == ["ReplicaOnly"]
+    assert "ReplicaOnly" not in await get_extension_ids()
+    with read_only_sessions():
+        assert await get_extension_ids() == ["ReplicaOnly"]
+        async with async_session_manager(readonly=False) as session:
+            assert "ReplicaOnly" not in await get_extension_ids(session=session)
+
+
+def test_readonly_sessions_fall_back_to_primary(replica):
+    replica.mark_unavailable()
+    assert "ReplicaOnly" not in get_extension_ids_readonly()
+
+
+def test_readonly_sessions_without_replica():
+    assert koala.db.replica_monitor is None
+    assert sorted(get_extension_ids_readonly()) == ["All", "Announce", "TwitchAlert"]
+
+
+def test_readonly_callable(replica):
+    @assign_session(readonly=lambda guild_id: not guild_recently_written(guild_id))
+    def get_ids(guild_id, *, session):
+        return session.execute(select(KoalaExtensions.extension_id)).scalars().all()
+
+    assert get_ids(GUILD_ID) == ["ReplicaOnly"]
+    koala.db.note_guild_write(GUILD_ID)
+    assert "ReplicaOnly" not in get_ids(GUILD_ID)
+    assert get_ids(GUILD_ID + 1) == ["ReplicaOnly"]
+
+
+def test_recently_written_guild_reads_primary(replica):
+    give_guild_extension(GUILD_ID, "Announce")
+    assert guild_recently_written(GUILD_ID)
+    assert not guild_recently_written(GUILD_ID + 1)
+    extension_cache.clear()
+    # The replica has not replicated the extension yet, so it must be read from the primary
+    assert extension_enabled(GUILD_ID, "Announce")
+    assert not extension_enabled(GUILD_ID + 1, "Announce")
+
+
+def test_recently_written_expires(replica):
+    replica.max_lag = replica.interval = 0
+    koala.db.note_guild_write(GUILD_ID)
+    assert not guild_recently_written(GUILD_ID)
+
+
+def test_pool_sessions_metric(replica):
+    labels = {"pool": "replica", "readonly": "true"}
+    before = REGISTRY.get_sample_value("koala_db_pool_sessions_total", labels) or 0
+    get_extension_ids_readonly()
+    assert REGISTRY.get_sample_value("koala_db_pool_sessions_total", labels) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_create_aiosqlite_engine(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    engine = koala.db.__create_aiosqlite_engine(make_url(f"sqlite:///{db_path}"), sqlite3,
+                                                lambda: sqlite3.connect(db_path, check_same_thread=False))
+    async with engine.connect() as connection:
+        assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+        with pytest.raises(OperationalError):
+            await connection.execute(text("SELECT * FROM MissingTable"))
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lease_single_leader(clear_leases):
+    first = LeaderLease("test", holder="first")
+    second = LeaderLease("test", holder="second")
+
+    assert await first.acquire()
+    assert not await second.acquire()
+    assert await first.acquire()
+    assert first.is_leader and not second.is_leader
+    assert first.token == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_takeover_after_expiry(clear_leases):
+    first = LeaderLease("test", ttl=0.05, holder="first")
+    second = LeaderLease("test", ttl=0.05, holder="second")
+    assert await first.acquire()
+
+    await asyncio.sleep(0.1)
+    assert not first.is_leader
+    assert await second.acquire()
+    assert second.token == 2
+    assert not await first.acquire()
+    assert first.token is None
+
+
+@pytest.mark.asyncio
+async def test_lease_release(clear_leases):
+    first = LeaderLease("test", holder="first")
+    second = LeaderLease("test", holder="second")
+    assert await first.acquire()
+
+    await first.release()
+    assert not first.is_leader
+    assert await second.acquire()
+    assert second.token == 2
+
+
+@pytest.mark.asyncio
+async def test_lease_verify(clear_leases, session):
+    first = LeaderLease("test", ttl=0.05, holder="first")
+    second = LeaderLease("test", ttl=0.05, holder="second")
+    assert await first.acquire()
+    first.verify(session)
+
+    await asyncio.sleep(0.1)
+    assert await second.acquire()
+    with pytest.raises(LeaseLostError):
+        first.verify(session)
+
+
+@pytest.mark.asyncio
+async def test_lease_verify_async(clear_leases):
+    first = LeaderLease("test", ttl=0.05, holder="first")
+    second = LeaderLease("test", ttl=0.05, holder="second")
+    assert await first.acquire()
+    async with async_session_manager() as session:
+        await first.verify_async(session)
+
+        await asyncio.sleep(0.1)
+        assert await second.acquire()
+        with pytest.raises(LeaseLostError):
+            await first.verify_async(session)
+
+
+@pytest.mark.asyncio
+async def test_lease_start_stop(clear_leases):
+    lease = LeaderLease("test", holder="first")
+    await lease.start()
+    assert lease.is_leader
+
+    await lease.stop()
+    assert not lease.is_leader
+    assert await LeaderLease("test", holder="second").acquire()
+
+
+@pytest.mark.asyncio
+async def test_leader_only(clear_leases):
+    leader = LeaderLease("test", holder="first")
+    follower = LeaderLease("test", holder="second")
+    calls = []
+
+    @leader_only(leader)
+    async def leader_loop():
+        calls.append("leader")
+
+    @leader_only(follower)
+    async def follower_loop():
+        calls.append("follower")
+
+    await leader.acquire()
+    await follower.acquire()
+    await leader_loop()
+    await follower_loop()
+    assert calls == ["leader"]
+
+
+def test_snowflake_from_unmigrated_column(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'unmigrated.db'}", future=True)
+    with engine.begin() as connection:
+        # Guilds.guild_id before the snowflake migration
+        connection.execute(text("CREATE TABLE Guilds (guild_id VARCHAR(20) PRIMARY KEY, subscription INT)"))
+        connection.execute(text(f"INSERT INTO Guilds (guild_id) VALUES ('{GUILD_ID}')"))
+        assert connection.execute(select(Guilds.guild_id)).scalar() == GUILD_ID
+    engine.dispose()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot bulk direct message dispatcher
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+import time
+
+# Libs
+import discord
+import mock
+import pytest
+
+# Own modules
+from koala.dm import DMDispatcher, DMStatus, _AdaptiveLimiter
+
+# Constants
+
+# Variables
+
+
+def http_error(error_class, status, headers=None):
+    response = mock.MagicMock(status=status, reason="", headers=headers or {})
+    return error_class(response, "error")
+
+
+class FakeMember:
+    def __init__(self, member_id, errors=()):
+        self.id = member_id
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send(self, message):
+        await asyncio.sleep(0)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(message)
+        return message
+
+
+def send_hello(member):
+    return member.send("hello")
+
+
+@pytest.mark.asyncio
+async def test_send_outcomes():
+    members = [FakeMember(1),
+               FakeMember(2, [http_error(discord.Forbidden, 403)]),
+               FakeMember(3, [http_error(discord.NotFound, 404)])]
+
+    report = await DMDispatcher(concurrency=2, rate=0).send(members, send_hello)
+
+    assert [result.status for result in sorted(report.results, key=lambda r: r.recipient.id)] == \
+           [DMStatus.SENT, DMStatus.DMS_CLOSED, DMStatus.FAILED]
+    assert (report.sent, report.dms_closed, report.failed) == (1, 1, 1)
+    assert members[0].sent == ["hello"]
+    assert str(report) == "1 sent, 1 with DMs closed, 1 failed of 3"
+
+
+@pytest.mark.asyncio
+async def test_send_empty():
+    report = await DMDispatcher(rate=0).send([], send_hello)
+    assert report.total == 0
+    assert report.results == []
+
+
+@pytest.mark.asyncio
+async def test_send_retries_rate_limit():
+    member = FakeMember(1, [http_error(discord.HTTPException, 429, {"Retry-After": "0.01"}),
+                            discord.RateLimited(0.01)])
+
+    report = await DMDispatcher(rate=0, max_retries=2).send([member], send_hello)
+
+    assert report.sent == 1
+    assert member.sent == ["hello"]
+
+
+@pytest.mark.asyncio
+async def test_send_gives_up_after_max_retries():
+    member = FakeMember(1, [discord.RateLimited(0.01)] * 3)
+
+    report = await DMDispatcher(rate=0, max_retries=1).send([member], send_hello)
+
+    assert report.failed == 1
+    assert isinstance(report.results[0].error, discord.RateLimited)
+
+
+@pytest.mark.asyncio
+async def test_send_bounded_concurrency():
+    active = 0
+    max_active = 0
+
+    async def send(member):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    report = await DMDispatcher(concurrency=3, rate=0).send([FakeMember(i) for i in range(10)], send)
+
+    assert report.sent == 10
+    assert max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_adapts_concurrency():
+    limiter = _AdaptiveLimiter(concurrency=4, rate=0)
+
+    await limiter.rate_limited(0.01)
+    assert limiter.concurrency == 2
+    await limiter.rate_limited(0.01)
+    await limiter.rate_limited(0.01)
+    assert limiter.concurrency == 1
+
+    await limiter.succeeded()
+    assert limiter.concurrency == 2
+    for _ in range(10):
+        await limiter.succeeded()
+    assert limiter.concurrency == 4
+
+
+@pytest.mark.asyncio
+async def test_limiter_pauses_when_rate_limited():
+    limiter = _AdaptiveLimiter(concurrency=1, rate=0)
+    await limiter.rate_limited(0.05)
+
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_send_progress():
+    reports = []
+
+    async def progress(report):
+        reports.append(report.done)
+
+    await DMDispatcher(concurrency=1, rate=0).send([FakeMember(i) for i in range(5)], send_hello,
+                                                   progress=progress, progress_interval=2)
+
+    assert reports == [2, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_send_records_unexpected_error():
+    members = [FakeMember(i) for i in range(5)]
+    members[0].errors.append(ValueError("unexpected"))
+
+    report = await DMDispatcher(concurrency=2, rate=0).send(members, send_hello)
+
+    assert (report.sent, report.failed) == (4, 1)
+    assert isinstance(report.results[0].error, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sends_share_limit():
+    dispatcher = DMDispatcher(concurrency=3, rate=0)
+    active = 0
+    max_active = 0
+
+    async def send(member):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    await asyncio.gather(dispatcher.send([FakeMember(i) for i in range(6)], send),
+                         dispatcher.send([FakeMember(i) for i in range(6)], send))
+
+    assert max_active == 3
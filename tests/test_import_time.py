@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot startup import time
+Imports the bot and every cog in a fresh interpreter with python -X importtime
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import os
+import re
+import subprocess
+import sys
+
+# Libs
+import pytest
+
+# Own modules
+from koala.cogs import COG_CLASSES
+from koala.utils import LazyModule, lazy_import
+
+# Constants
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", 1.5))
+IMPORT_TIME_RUNS = int(os.environ.get("IMPORT_TIME_RUNS", 3))
+LAZY_MODULES = ["twitchAPI", "bs4", "emoji", "sqlalchemy.dialects.mssql", "sqlalchemy.dialects.mysql", "aiomysql",
+                "multiprocessing", "koala.bus", "koala.instrumentation.profiler", "koala.instrumentation.trace"]
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+# Variables
+
+
+@pytest.fixture(scope="module")
+def import_times():
+    """
+    The self and cumulative import time in microseconds, and the nesting depth, of each module imported at startup,
+    for each of IMPORT_TIME_RUNS fresh interpreters
+    """
+    modules = ["koalabot"] + ["koala.cogs." + cog for cog in sorted(set(COG_CLASSES.values()))]
+    env = dict(os.environ, ENCRYPTED="False", DISCORD_TOKEN="x", BOT_OWNER="1",
+               CONFIG_PATH="./config-testing", LOGGING_FILE="False")
+    runs = []
+    for _ in range(IMPORT_TIME_RUNS):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                                env=env, capture_output=True, text=True, check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            match = _IMPORT_TIME_LINE.match(line)
+            if match:
+                times[match.group(4)] = (int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2)
+        runs.append(times)
+    return runs
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_heavy_module_not_imported(import_times, module):
+    assert module not in import_times[0]
+
+
+def test_import_time_budget(import_times):
+    # The fastest run is the least affected by other load on the machine
+    total = min(sum(cumulative for _, cumulative, depth in times.values() if depth == 1)
+                for times in import_times) / 1e6
+    assert total < IMPORT_TIME_BUDGET, \
+        f"Startup imports took {total:.3f}s, over the budget of {IMPORT_TIME_BUDGET}s"
+
+
+def test_lazy_import():
+    module = lazy_import("this_module_does_not_exist")
+    assert isinstance(module, LazyModule)
+    with pytest.raises(ModuleNotFoundError):
+        module.attribute
+
+
+def test_lazy_import_already_imported():
+    assert lazy_import("re") is re
+
+
+def test_lazy_import_first_use():
+    module = lazy_import("json.tool")
+    sys.modules.pop("json.tool", None)
+    assert module.main is not None
+    assert "json.tool" in sys.modules
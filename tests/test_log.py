@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Logging
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import logging
+import threading
+
+# Libs
+import mock
+
+# Own modules
+from koala import log
+from koala.log import RateLimitFilter
+
+# Constants
+
+# Variables
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.getMessage(), threading.current_thread()))
+
+
+def make_record(level=logging.INFO, lineno=1):
+    return logging.LogRecord("test_log", level, "test_log.py", lineno, "message %s", ("a",), None)
+
+
+def test_records_written_on_background_thread():
+    handler = CollectingHandler()
+    test_logger = logging.getLogger("test_log.queue")
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+    test_logger.addHandler(log._RoutedQueueHandler(log._queue, (handler,)))
+
+    test_logger.info("message %s", "a")
+    log.flush()
+
+    assert [message for message, _ in handler.records] == ["message a"]
+    assert handler.records[0][1] is not threading.current_thread()
+
+
+def test_handler_level_respected():
+    handler = CollectingHandler()
+    handler.setLevel(logging.WARN)
+    test_logger = logging.getLogger("test_log.level")
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+    test_logger.addHandler(log._RoutedQueueHandler(log._queue, (handler,)))
+
+    test_logger.info("info")
+    test_logger.warning("warning")
+    log.flush()
+
+    assert [message for message, _ in handler.records] == ["warning"]
+
+
+def test_rate_limit():
+    rate_limit = RateLimitFilter(rate=2, period=60)
+    assert [rate_limit.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    assert rate_limit.filter(make_record(lineno=2))
+
+
+def test_rate_limit_new_period():
+    rate_limit = RateLimitFilter(rate=1, period=60)
+    with mock.patch("time.monotonic", return_value=0):
+        assert rate_limit.filter(make_record())
+        assert not rate_limit.filter(make_record())
+        assert not rate_limit.filter(make_record())
+    record = make_record()
+    with mock.patch("time.monotonic", return_value=61):
+        assert rate_limit.filter(record)
+    assert record.getMessage() == "message a (2 similar messages suppressed)"
+
+
+def test_rate_limit_ignores_warnings():
+    rate_limit = RateLimitFilter(rate=1, period=60)
+    assert all(rate_limit.filter(make_record(level=logging.WARN)) for _ in range(5))
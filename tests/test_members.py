@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot Member Cache Policy
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import time
+
+# Libs
+import discord
+import discord.ext.test as dpytest
+import mock
+import pytest
+
+# Own modules
+from koala.cogs.insights.core import get_insights
+from koala.members import CHUNK_AT_STARTUP, CHUNK_LAZILY, MemberCache, cache_flags
+
+# Constants
+
+# Variables
+
+
+@pytest.fixture
+def lazy_cache(bot):
+    member_cache = MemberCache(CHUNK_LAZILY, ["voice", "joined"], idle_ttl=60)
+    member_cache._bot = bot
+    member_cache._started = time.monotonic()
+    yield member_cache
+    member_cache.stop()
+
+
+def test_cache_flags():
+    assert cache_flags(["all"]) == discord.MemberCacheFlags.all()
+    assert cache_flags(["none"]) == discord.MemberCacheFlags.none()
+    flags = cache_flags(["voice"])
+    assert flags.voice and not flags.joined
+    with pytest.raises(ValueError):
+        cache_flags(["online"])
+
+
+def test_invalid_chunking():
+    with pytest.raises(ValueError):
+        MemberCache("never")
+
+
+def test_bot_options():
+    assert MemberCache(CHUNK_LAZILY, ["voice"]).bot_options() == {
+        "chunk_guilds_at_startup": False, "member_cache_flags": cache_flags(["voice"])}
+    assert MemberCache(CHUNK_AT_STARTUP, ["all"]).bot_options()["chunk_guilds_at_startup"]
+
+
+@pytest.mark.asyncio
+async def test_require_not_started(bot):
+    member_cache = MemberCache(CHUNK_LAZILY)
+    guild = dpytest.get_config().guilds[0]
+    with mock.patch.object(discord.Guild, "chunk") as mock_chunk:
+        assert list(await member_cache.require(guild)) == list(guild.members)
+    mock_chunk.assert_not_called()
+    assert member_cache.count(guild) == len(guild.members)
+
+
+@pytest.mark.asyncio
+async def test_require_chunks_lazily(lazy_cache):
+    guild = dpytest.get_config().guilds[0]
+    with mock.patch.object(discord.Guild, "chunk") as mock_chunk:
+        await lazy_cache.require(guild)
+        mock_chunk.assert_called_once_with(cache=True)
+        with mock.patch.object(discord.Guild, "chunked", True):
+            await lazy_cache.require(guild)
+        mock_chunk.assert_called_once()
+    assert guild.id in lazy_cache.last_used
+
+
+@pytest.mark.asyncio
+async def test_get_member(lazy_cache):
+    guild = dpytest.get_config().guilds[0]
+    member = dpytest.get_config().members[0]
+    with mock.patch.object(discord.Guild, "query_members", return_value=[member]) as mock_query:
+        assert await lazy_cache.get_member(guild, member.id) is member
+        mock_query.assert_not_called()
+        guild._remove_member(member)
+        assert await lazy_cache.get_member(guild, member.id) is member
+        mock_query.assert_called_once_with(user_ids=[member.id], limit=1, cache=True)
+
+
+@pytest.mark.asyncio
+async def test_count_without_chunking(lazy_cache, bot):
+    guild = dpytest.get_config().guilds[0]
+    guild._member_count = 1000
+    assert lazy_cache.count(guild) == 1000
+    with mock.patch("koala.cogs.insights.core.member_cache", lazy_cache):
+        assert get_insights(bot).endswith("There are a total of 1000 members across these servers.")
+
+
+@pytest.mark.asyncio
+async def test_evict_idle(lazy_cache, bot):
+    guild = dpytest.get_config().guilds[0]
+    await dpytest.member_join()
+    assert len(guild.members) > 1
+    now = time.monotonic()
+    lazy_cache.last_used[guild.id] = now
+
+    assert lazy_cache.evict_idle(now + 30) == 0
+    evicted = len(guild.members) - 1
+    assert lazy_cache.evict_idle(now + 61) == evicted
+    assert [member.id for member in guild.members] == [bot.user.id]
+    assert guild.id not in lazy_cache.last_used
+    assert not guild.chunked
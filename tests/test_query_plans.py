@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot hot query plans
+Fails if a query run on every message, reaction, API request or loop iteration scans a whole table
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+
+# Libs
+import pytest
+from sqlalchemy import and_, null, select, text
+
+# Own modules
+from koala.cogs.react_for_role.models import GuildRFRMessages, RFRMessageEmojiRoles, GuildRFRRequiredRoles
+from koala.cogs.text_filter.models import TextFilter, TextFilterIgnoreList, TextFilterModeration
+from koala.cogs.twitch_alert.models import TwitchAlerts, UserInTwitchAlert, TeamInTwitchAlert, UserInTwitchTeam
+from koala.cogs.verification.models import NonVerifiedEmails, Roles, ToReVerify, VerifiedEmails, VerifyBlacklist
+from koala.cogs.voting.models import Votes, VoteOptions, VoteSent
+from koala.db import engine
+from koala.models import GuildExtensions
+
+# Constants
+GUILD_ID = 123456789012345678
+CHANNEL_ID = 223456789012345678
+MESSAGE_ID = 323456789012345678
+USER_ID = 423456789012345678
+ROLE_ID = 523456789012345678
+
+HOT_QUERIES = {
+    "guild extensions": select(GuildExtensions.extension_id).where(GuildExtensions.guild_id == GUILD_ID),
+    "text filters": select(TextFilter).filter_by(guild_id=GUILD_ID),
+    "text filter ignore list": select(TextFilterIgnoreList.ignore).filter_by(guild_id=GUILD_ID,
+                                                                              ignore_type="channel"),
+    "text filter moderation channels": select(TextFilterModeration.channel_id).filter_by(guild_id=GUILD_ID),
+    "rfr message": select(GuildRFRMessages).filter_by(guild_id=GUILD_ID, channel_id=CHANNEL_ID,
+                                                       message_id=MESSAGE_ID),
+    "rfr guild messages": select(GuildRFRMessages).filter_by(guild_id=GUILD_ID),
+    "rfr emoji role": select(RFRMessageEmojiRoles.role_id).filter_by(emoji_role_id=1, emoji_raw="a"),
+    "rfr required roles": select(GuildRFRRequiredRoles).filter_by(guild_id=GUILD_ID),
+    "votes ended": select(Votes.vote_id).where(Votes.end_time < 1e9),
+    "votes by author": select(Votes.title).filter_by(author_id=USER_ID, guild_id=GUILD_ID),
+    "vote option": select(VoteOptions).filter_by(opt_id=1),
+    "vote sent message": select(VoteSent).filter_by(vote_receiver_message=MESSAGE_ID),
+    "twitch alert": select(TwitchAlerts).where(TwitchAlerts.channel_id == CHANNEL_ID,
+                                               TwitchAlerts.guild_id == GUILD_ID),
+    "twitch alert user": select(UserInTwitchAlert).filter_by(twitch_username="koala", channel_id=CHANNEL_ID),
+    "twitch offline streams": select(UserInTwitchAlert).where(and_(UserInTwitchAlert.message_id != null(),
+                                                                   UserInTwitchAlert.twitch_username.in_(
+                                                                       ["koala", "bot"]))),
+    "twitch team": select(TeamInTwitchAlert).filter_by(twitch_team_name="koalas", channel_id=CHANNEL_ID),
+    "twitch offline team streams": select(UserInTwitchTeam).where(and_(UserInTwitchTeam.message_id != null(),
+                                                                       UserInTwitchTeam.twitch_username.in_(
+                                                                           ["koala", "bot"]))),
+    "verify token": select(NonVerifiedEmails).filter_by(token="abcdefgh", u_id=USER_ID),
+    "verified email": select(VerifiedEmails).filter_by(email="koala@koalabot.uk"),
+    "verify roles": select(Roles).filter_by(s_id=GUILD_ID),
+    "verify role users": select(ToReVerify.u_id).filter_by(r_id=ROLE_ID),
+    "verify blacklist": select(VerifyBlacklist).where(VerifyBlacklist.role_id.in_([ROLE_ID])),
+}
+
+# Variables
+
+
+def query_plan(statement) -> list:
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        return [row.detail for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(name):
+    plan = query_plan(HOT_QUERIES[name])
+    # A full table or index scan is 'SCAN <table>', an index lookup is 'SEARCH <table> USING ...'
+    assert not [step for step in plan if step.startswith("SCAN")], plan
+
+
+def test_query_plan_detects_scan():
+    assert query_plan(select(VoteOptions).filter_by(option_title="koala"))[0].startswith("SCAN")
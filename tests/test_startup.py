@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""
+Testing KoalaBot startup pipeline
+
+Commented using reStructuredText (reST)
+"""
+# Futures
+
+# Built-in/Generic Imports
+import asyncio
+
+# Libs
+import mock
+import pytest
+
+# Own modules
+import koalabot
+from koala import startup
+from koala.startup import StartupTimings
+
+# Constants
+
+# Variables
+
+
+@pytest.fixture(autouse=True)
+def reset_startup():
+    startup.startup_timings.timings.clear()
+    startup._deferred.clear()
+    yield
+    startup._deferred.clear()
+
+
+def test_startup_timings_report():
+    timings = StartupTimings()
+    timings.timings = {"voting": {"import": 0.1, "load": 0.5}, "base": {"import": 0.2}}
+    assert timings.report().splitlines() == [
+        "cog                 import      load  deferred     total",
+        "voting               0.100     0.500         -     0.600",
+        "base                 0.200         -         -     0.200"]
+
+
+def test_import_cog(caplog):
+    startup.import_cog("greetings_cog", "tests.tests_utils.fake_load_all_cogs")
+    startup.import_cog("missing_cog", "tests.tests_utils.fake_load_all_cogs")
+    assert set(startup.startup_timings.timings) == {"greetings_cog", "missing_cog"}
+    assert [(record.levelname, record.exc_info is not None) for record in caplog.records
+            if "failed to import" in record.getMessage()] == [("ERROR", True)]
+
+
+@mock.patch("koalabot.COGS_PACKAGE", "tests.tests_utils.fake_load_all_cogs")
+@mock.patch("koalabot.ENABLED_COGS", ['greetings_cog'])
+@pytest.mark.asyncio
+async def test_load_all_cogs_timed(bot):
+    await koalabot.load_all_cogs(bot)
+    assert set(startup.startup_timings.timings["greetings_cog"]) == {"import", "load"}
+
+
+@pytest.mark.asyncio
+async def test_defer_until_ready():
+    func = mock.AsyncMock()
+    startup.defer(mock.Mock(is_ready=lambda: False), "voting", func)
+    func.assert_not_called()
+    await startup.run_deferred()
+    func.assert_awaited_once()
+    assert "deferred" in startup.startup_timings.timings["voting"]
+    await startup.run_deferred()
+    func.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_defer_when_ready():
+    func = mock.AsyncMock()
+    startup.defer(mock.Mock(is_ready=lambda: True), "voting", func)
+    await asyncio.sleep(0)
+    func.assert_awaited_once()
+    assert startup._deferred == []
+
+
+@pytest.mark.asyncio
+async def test_deferred_failure_logged(caplog):
+    startup.defer(mock.Mock(is_ready=lambda: False), "voting", mock.AsyncMock(side_effect=ValueError()))
+    await startup.run_deferred()
+    assert "Deferred startup of voting failed" in caplog.text
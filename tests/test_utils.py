@@ -8,6 +8,8 @@ Commented using reStructuredText (reST)
 # Futures
 
 # Built-in/Generic Imports
+import dataclasses
+from typing import Dict, List, Optional
 
 # Libs
 import discord
@@ -19,7 +21,7 @@ from discord.ext import commands
 
 # Own modules
 import koalabot
-from koala.utils import __parse_args, format_config_path, wait_for_message
+from koala.utils import __parse_args, cast, compile_cast, format_config_path, wait_for_message
 from tests.log import logger
 from tests.tests_utils.last_ctx_cog import LastCtxCog
 
@@ -75,6 +77,38 @@ async def test_wait_for_message_none(utils_cog: LastCtxCog):
     assert channel == ctx.channel
 
 
+@dataclasses.dataclass
+class CastDto:
+    name: str
+    value: int = 0
+
+
+@pytest.mark.parametrize("type_class, value, expected", [
+    (int, "1", 1),
+    (str, 1, "1"),
+    (bool, "false", False),
+    (bool, "True", True),
+    (bool, True, True),
+    (List[int], ["1", 2], [1, 2]),
+    (Dict[str, int], {"a": "1"}, {"a": 1}),
+    (Optional[int], None, None),
+    (Optional[int], "1", 1),
+    (CastDto, {"name": "a", "value": 2}, CastDto("a", 2)),
+    (List[CastDto], [{"name": "a"}], [CastDto("a")]),
+])
+def test_cast(type_class, value, expected):
+    assert cast(type_class, value) == expected
+
+
+def test_cast_invalid_bool():
+    with pytest.raises(ValueError):
+        cast(bool, "maybe")
+
+
+def test_compile_cast_cached():
+    assert compile_cast(List[int]) is compile_cast(List[int])
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def utils_cog(bot: commands.Bot):
     utils_cog = LastCtxCog(bot)